@@ -1,6 +1,22 @@
 # assistant package
 # Módulo principal del asistente personal
+#
+# Los submódulos se importan bajo demanda (PEP 562): importar assistant.admission o
+# assistant.tracing no carga google.adk, el CV ni los agentes. Esa carga la hace el
+# calentamiento en segundo plano (ver warmup.py) o la primera petición.
 
-from . import agents, services, tools
+import importlib
+from typing import Any
+
+from dotenv import load_dotenv
+
+# Antes de que cualquier submódulo lea su configuración de os.getenv.
+load_dotenv()
 
 __all__ = ["agents", "services", "tools"]
+
+
+def __getattr__(name: str) -> Any:
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,276 @@
+# admission.py
+# Control de admisión y reparto justo de las ejecuciones del agente entre usuarios.
+#
+# Sin límite, un solo usuario (o un crawler) puede agotar la cuota de Gemini y dejar sin
+# servicio al resto. Cada petición a /api/invoke y /api/invoke/stream pide un turno:
+#   - Límite por usuario (token bucket): ADMISSION_USER_RATE peticiones/s con ráfagas de
+#     hasta ADMISSION_USER_BURST. Si se agota: 429 con Retry-After.
+#   - Límite global: como mucho ADMISSION_MAX_CONCURRENT ejecuciones a la vez.
+#   - Cola acotada: las peticiones que no caben esperan turno. Con la cola llena (o tras
+#     ADMISSION_QUEUE_TIMEOUT_SECONDS esperando): 503 con Retry-After. Cada usuario
+#     puede tener como mucho ADMISSION_MAX_QUEUED_PER_USER peticiones esperando (429 si
+#     no).
+#   - Reparto round-robin: al quedar un hueco, el turno pasa al siguiente usuario con
+#     peticiones en cola, no a la petición más antigua; quien envía muchas no adelanta
+#     al resto.
+# Los límites son por proceso (con varios workers, multiplicar por su número).
+#
+# Variables de entorno:
+#   ADMISSION_MAX_CONCURRENT         ejecuciones simultáneas (por defecto: 8)
+#   ADMISSION_MAX_QUEUE              peticiones esperando turno (por defecto: 32)
+#   ADMISSION_MAX_QUEUED_PER_USER    peticiones esperando por usuario (por defecto: 4)
+#   ADMISSION_QUEUE_TIMEOUT_SECONDS  espera máxima en la cola (por defecto: 30)
+#   ADMISSION_USER_RATE              peticiones/s por usuario; 0 desactiva el límite
+#                                    (por defecto: 0.5)
+#   ADMISSION_USER_BURST             ráfaga máxima por usuario (por defecto: 10)
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, List, Optional
+
+from assistant.logger import get_logger
+from assistant.metrics import registry
+from assistant.tracing import current_trace
+
+logger = get_logger(__name__)
+
+# Usuarios de los que se recuerda el token bucket (los más antiguos se olvidan).
+MAX_TRACKED_USERS = 10000
+
+_wait_seconds = registry.histogram(
+    "assistant_admission_wait_seconds",
+    "Tiempo de espera en la cola de admisión hasta empezar la ejecución.",
+    buckets=(0.005, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+_rejections = registry.counter(
+    "assistant_admission_rejections_total",
+    "Peticiones rechazadas por el control de admisión por motivo.",
+    ("reason",),
+)
+_queue_depth = registry.gauge(
+    "assistant_admission_queue_depth",
+    "Peticiones esperando turno en la cola de admisión.",
+)
+_in_flight = registry.gauge(
+    "assistant_admission_in_flight",
+    "Ejecuciones del agente en curso.",
+)
+
+
+class AdmissionRejected(Exception):
+    """
+    La petición no se admite: status_code (429/503) y segundos sugeridos para
+    reintentar.
+    """
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(f"Petición rechazada ({reason}); reintentar en {retry_after}s")
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def detail(self) -> str:
+        """Mensaje para el visitante."""
+        if self.status_code == 429:
+            return "Demasiadas peticiones; inténtalo de nuevo en unos segundos."
+        return "El asistente está saturado; inténtalo de nuevo en unos segundos."
+
+
+class AdmissionController:
+    """
+    Semáforo global con cola de espera acotada, repartida por usuario en round-robin, y
+    token bucket por usuario. Pensado para un único event loop (el de uvicorn).
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_queue: int = 32,
+        max_queued_per_user: int = 4,
+        queue_timeout: float = 30.0,
+        user_rate: float = 0.5,
+        user_burst: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.max_queued_per_user = max(1, max_queued_per_user)
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self._clock = clock
+        self._in_flight = 0
+        self._queued = 0
+        # Usuario -> peticiones esperando; el orden de las claves es el turno
+        # round-robin.
+        self._waiting: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        # Usuario -> [tokens, instante de la última recarga].
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        # Media móvil de la duración de una ejecución (para estimar Retry-After).
+        self._avg_run_seconds = 1.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def _take_token(self, user_id: str) -> float:
+        """
+        Consume un token del usuario. Devuelve 0 o los segundos hasta el siguiente
+        token.
+        """
+        if self.user_rate <= 0:
+            return 0.0
+        now = self._clock()
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = [self.user_burst, now]
+            if len(self._buckets) > MAX_TRACKED_USERS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+            bucket[0] = min(
+                self.user_burst, bucket[0] + (now - bucket[1]) * self.user_rate
+            )
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.user_rate
+
+    def retry_after(self) -> int:
+        """Segundos estimados hasta que la cola actual se vacíe."""
+        pending = self._queued + 1
+        return max(1, math.ceil(self._avg_run_seconds * pending / self.max_concurrent))
+
+    def _reject(
+        self, status_code: int, reason: str, retry_after: int
+    ) -> AdmissionRejected:
+        _rejections.inc(reason=reason)
+        logger.warning(
+            "Petición rechazada por el control de admisión",
+            extra={
+                "reason": reason,
+                "retry_after": retry_after,
+                "queued": self._queued,
+            },
+        )
+        return AdmissionRejected(status_code, reason, retry_after)
+
+    def _grant_next(self) -> None:
+        """
+        Cede los huecos libres a los usuarios en espera, uno por usuario y por vuelta.
+        """
+        while self._in_flight < self.max_concurrent and self._waiting:
+            user_id, waiters = next(iter(self._waiting.items()))
+            waiter = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            if waiter.done():  # Cancelada o caducada mientras esperaba.
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    def _remove_waiter(self, user_id: str, waiter: asyncio.Future) -> None:
+        waiters = self._waiting.get(user_id)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self._queued -= 1
+        if not waiters:
+            del self._waiting[user_id]
+
+    async def acquire(self, user_id: str) -> None:
+        """Espera un turno para `user_id` o lanza AdmissionRejected."""
+        wait = self._take_token(user_id)
+        if wait:
+            raise self._reject(429, "rate_limited", math.ceil(wait))
+
+        if self._in_flight < self.max_concurrent and not self._queued:
+            self._in_flight += 1
+            _wait_seconds.observe(0.0)
+            return
+        if self._queued >= self.max_queue:
+            raise self._reject(503, "queue_full", self.retry_after())
+        waiters = self._waiting.setdefault(user_id, deque())
+        if len(waiters) >= self.max_queued_per_user:
+            raise self._reject(429, "user_queue_full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        self._queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # El turno llegó a la vez que la cancelación: se cede al siguiente.
+                self.release()
+            else:
+                self._remove_waiter(user_id, waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                raise self._reject(503, "queue_timeout", self.retry_after()) from None
+            raise
+        _wait_seconds.observe(time.perf_counter() - started)
+
+    def release(self, run_seconds: Optional[float] = None) -> None:
+        """Libera un turno y lo cede al siguiente usuario en espera."""
+        self._in_flight -= 1
+        if run_seconds is not None:
+            self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * run_seconds
+        self._grant_next()
+
+    @asynccontextmanager
+    async def slot(self, user_id: str) -> AsyncIterator[None]:
+        """Bloque `async with` que se ejecuta con un turno concedido."""
+        trace = current_trace()
+        if trace is not None:
+            with trace.span(
+                "admission.wait", kind="queue", **{"queue.depth": self._queued}
+            ):
+                await self.acquire(user_id)
+        else:
+            await self.acquire(user_id)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+
+def create_admission_controller() -> AdmissionController:
+    """Construye el control de admisión con la configuración del entorno."""
+    return AdmissionController(
+        max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "8")),
+        max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "32")),
+        max_queued_per_user=int(os.getenv("ADMISSION_MAX_QUEUED_PER_USER", "4")),
+        queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "30")),
+        user_rate=float(os.getenv("ADMISSION_USER_RATE", "0.5")),
+        user_burst=float(os.getenv("ADMISSION_USER_BURST", "10")),
+    )
+
+
+_admission = create_admission_controller()
+_queue_depth.set_function(lambda: {(): _admission.queued})
+_in_flight.set_function(lambda: {(): _admission.in_flight})
+
+
+def get_admission_controller() -> AdmissionController:
+    return _admission
+
+
+def set_admission_controller(controller: AdmissionController) -> None:
+    """Sustituye el control de admisión (p. ej. con otros límites)."""
+    global _admission
+    _admission = controller
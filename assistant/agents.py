@@ -4,35 +4,45 @@
 from dotenv import load_dotenv
 from google.adk.agents import Agent
 
-from assistant.tools import load_cv_data, search_blog_posts
+from assistant.compaction import compact_history
+from assistant.config import agent_model, record_model_tier, select_model_tier
+from assistant.cv_index import CVIndex, get_cv_index, on_cv_reload
+from assistant.offload import offload_tool
+from assistant.prompt_cache import cache_prompt_prefix
+from assistant.resilience import gemini_content_config, gemini_guard
+from assistant.tools import query_cv, search_blog_posts
 
 load_dotenv()
 
 
-# --- Carga de Datos Lazy ---
-_cached_cv: str | None = None
-
-
-def get_cv_data() -> str:
-    """Carga el CV de forma lazy desde archivo local para evitar I/O innecesario en import."""
-    global _cached_cv
-    if _cached_cv is None:
-        print("Cargando CV desde archivo local por primera vez...")
-        _cached_cv = load_cv_data()
-    return _cached_cv
-
-
-# --- AGENTES ESPECIALISTAS ---
-
-# 1. Agente experto en el CV
-cv_agent = Agent(
-    name="CV_Expert",
-    description="Un especialista que articula la trayectoria profesional de Sergio basándose estrictamente en su CV.",
-    model="gemini-1.5-flash",
-    instruction=f"""
+def _model_options() -> dict:
+    """
+    Opciones comunes de las llamadas al modelo: nivel del modelo de cada llamada (ver
+    config.py), plazo y reintentos del cliente de Gemini, circuit breaker con respuesta
+    degradada (ver resilience.py), compactación del historial reenviado en
+    conversaciones largas (ver compaction.py) y caché del prefijo estático del prompt
+    (ver prompt_cache.py), que va al final porque necesita la petición ya completa, con
+    su modelo definitivo.
+    """
+    return dict(
+        generate_content_config=gemini_content_config(),
+        before_model_callback=[
+            select_model_tier,
+            gemini_guard.before_model,
+            compact_history,
+            cache_prompt_prefix,
+        ],
+        after_model_callback=[gemini_guard.after_model, record_model_tier],
+        on_model_error_callback=gemini_guard.on_model_error,
+    )
+
+
+def cv_instruction(index: CVIndex) -> str:
+    """Instrucción de CV_Expert para una instantánea del índice del CV."""
+    return f"""
     **⚠️ ATENCIÓN: NUNCA USES TRIPLE BACKTICKS (```) NI FORMATO MARKDOWN. RESPONDE SOLO CON HTML PURO.**
 
-    **Directiva Principal:** Encarna la identidad profesional de Sergio Márquez. Eres el custodio de su narrativa profesional. Tu base de conocimiento es EXCLUSIVAMENTE el documento CV proporcionado. Habla siempre en primera persona.
+    **Directiva Principal:** Encarna la identidad profesional de Sergio Márquez. Eres el custodio de su narrativa profesional. Tu base de conocimiento es EXCLUSIVAMENTE la información del CV que devuelve la herramienta `query_cv`. Habla siempre en primera persona.
 
     **FORMATO DE RESPUESTA - MUY IMPORTANTE:**
     - SIEMPRE responde ÚNICAMENTE con HTML válido, sin markdown, sin triple backticks, sin formato de código
@@ -50,17 +60,40 @@ cv_agent = Agent(
 
     **Persona:** Proyecta la imagen de un experto de clase mundial en IA/ML, apasionado por la tecnología y la resolución de problemas complejos. Tu comunicación es directa, segura y orientada a resultados.
 
-    **CV Data:**
-    {get_cv_data()}
-    """,
-    tools=[],
+    **Consulta del CV:** Antes de responder, invoca `query_cv` con la sección adecuada y/o palabras clave de la pregunta (tecnologías, empresas, roles). Puedes invocarla varias veces. Nunca respondas sin haber consultado el CV.
+
+    **Secciones del CV (nº de fragmentos):** {index.outline()}
+    """
+
+
+def _refresh_cv_instruction(index: CVIndex) -> None:
+    """
+    Tras recargar el CV, las peticiones nuevas usan la instrucción de la nueva
+    instantánea. Las que están en curso no la ven: ADK clona los agentes al empezar cada
+    ejecución.
+    """
+    cv_agent.instruction = cv_instruction(index)
+
+
+# --- AGENTES ESPECIALISTAS ---
+
+# 1. Agente experto en el CV
+cv_agent = Agent(
+    name="CV_Expert",
+    description="Un especialista que articula la trayectoria profesional de Sergio basándose estrictamente en su CV.",
+    model=agent_model("CV_Expert"),
+    instruction=cv_instruction(get_cv_index()),
+    # Consulta en memoria sobre un índice precalculado: no necesita offload_tool.
+    tools=[query_cv],
+    **_model_options(),
 )
+on_cv_reload(_refresh_cv_instruction)
 
 # 2. Agente experto en el Blog
 blog_agent = Agent(
     name="Blog_Expert",
     description="Un especialista que determina si Sergio ha escrito sobre un tema específico en su blog.",
-    model="gemini-1.5-flash",
+    model=agent_model("Blog_Expert"),
     instruction="""
     **⚠️ ATENCIÓN: NUNCA USES TRIPLE BACKTICKS (```) NI FORMATO MARKDOWN. RESPONDE SOLO CON HTML PURO.**
 
@@ -78,7 +111,9 @@ blog_agent = Agent(
 
     **Persona:** Eres un especialista enfocado y preciso. Tu valor reside en la exactitud de tus búsquedas. Eres eficiente y vas directo al grano.
     """,
-    tools=[search_blog_posts],
+    # Las herramientas síncronas se ejecutan fuera del event loop (ver offload.py).
+    tools=[offload_tool(search_blog_posts, max_concurrency=4, timeout=20)],
+    **_model_options(),
 )
 
 
@@ -86,7 +121,7 @@ blog_agent = Agent(
 root_agent = Agent(
     name="Personal_Orchestrator",
     description="Coordinador Ejecutivo que analiza las peticiones y las delega al especialista adecuado.",
-    model="gemini-1.5-flash",
+    model=agent_model("Personal_Orchestrator"),
     instruction="""
     **⚠️ ATENCIÓN CRÍTICA: NUNCA USES TRIPLE BACKTICKS (```) NI FORMATO MARKDOWN. RESPONDE SOLO CON HTML PURO.**
     **⚠️ PROHIBIDO ABSOLUTO: NUNCA muestres código, procesos de delegación o menciones que "consultas" con alguien.**
@@ -124,4 +159,5 @@ root_agent = Agent(
     **RECUERDA:** Eres SERGIO MÁRQUEZ. Actúa como tal. Delega internamente pero responde como si fueras yo mismo.
     """,
     sub_agents=[cv_agent, blog_agent],
+    **_model_options(),
 )
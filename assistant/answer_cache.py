@@ -0,0 +1,371 @@
+# answer_cache.py
+# Caché de respuestas para las preguntas de primer turno, con coincidencia exacta y
+# semántica.
+#
+# La mayoría de visitas hacen las mismas preguntas con distintas palabras. Para el
+# primer mensaje de una conversación (sin contexto previo), la respuesta solo depende de
+# la pregunta y del contenido (CV + índice del blog), así que puede reutilizarse:
+#   1. Coincidencia exacta sobre la pregunta normalizada (sin tildes, stopwords ni
+#      orden), si además es compatible con la pregunta (ver 2).
+#   2. Similitud coseno TF-IDF (NumPy) contra la matriz de preguntas cacheadas; se
+#      acepta la mejor que supere ANSWER_CACHE_THRESHOLD y sea compatible con la
+#      pregunta: con la misma negación, el mismo interrogativo si las dos lo tienen
+#      ('¿Dónde estudiaste?' frente a '¿Cuándo estudiaste?') y sin ser más genérica
+#      (cada término de la pregunta cacheada debe aparecer en la nueva, aunque sea con
+#      una errata o flexión). Sin esa condición, '¿Cuál es tu experiencia?'
+#      reutilizaría la respuesta de '¿... experiencia con Docker?'.
+# Cambiar el CV o el índice del blog cambia la versión de contenido y vacía la caché.
+# Dentro de bypass_cached_answers (lotes de evaluación) no se sirve nada precalculado:
+# ni FAQ ni caché; las respuestas nuevas sí se guardan.
+#
+# Variables de entorno:
+#   ANSWER_CACHE_ENABLED       true | false (por defecto: true)
+#   ANSWER_CACHE_THRESHOLD     similitud mínima para reutilizar una respuesta (por
+#                              defecto: 0.75)
+#   ANSWER_CACHE_MAX_ENTRIES   preguntas cacheadas (LRU, por defecto: 512)
+#   ANSWER_CACHE_TTL_SECONDS   vida de cada respuesta (por defecto: 24h)
+
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from assistant.text_utils import (
+    NEGATIONS,
+    normalize_query,
+    query_terms,
+    question_words,
+)
+
+# Dimensión del espacio de hashing de términos: evita mantener un vocabulario.
+DEFAULT_DIMENSIONS = 4096
+# Peso de los trigramas de caracteres frente a las palabras (toleran erratas y
+# flexiones).
+CHAR_NGRAM_WEIGHT = 0.5
+# Trigramas compartidos (coeficiente de Dice) para que un término cuente como presente
+# en otra pregunta: 'experiencia'/'experiencai' o 'trabajaste'/'trabajado', no
+# 'python'/'java'.
+MIN_TERM_OVERLAP = 0.5
+
+
+class CachedAnswer(NamedTuple):
+    """Respuesta encontrada en la caché."""
+
+    answer: str
+    author: Optional[str]
+    similarity: float
+    match: str  # "exact" | "semantic"
+    latency: float  # lo que tardó el agente en generarla
+
+
+class _Entry:
+    __slots__ = (
+        "key",
+        "answer",
+        "author",
+        "latency",
+        "expires_at",
+        "vector",
+        "terms",
+        "questions",
+    )
+
+    def __init__(
+        self, key, answer, author, latency, expires_at, vector, terms, questions
+    ):
+        self.key = key
+        self.answer = answer
+        self.author = author
+        self.latency = latency
+        self.expires_at = expires_at
+        self.vector = vector
+        self.terms = terms
+        self.questions = questions
+
+
+def _trigrams(token: str) -> List[str]:
+    padded = f" {token} "
+    return [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+
+def _features(text: str) -> List[tuple]:
+    """
+    Términos ponderados: palabras normalizadas y trigramas de caracteres de cada
+    palabra.
+    """
+    features = []
+    for token in query_terms(text):
+        features.append((token, 1.0))
+        features.extend(("#" + gram, CHAR_NGRAM_WEIGHT) for gram in _trigrams(token))
+    return features
+
+
+def _covers(terms: FrozenSet[str], term: str) -> bool:
+    """`term` aparece en `terms`, igual o con suficientes trigramas en común."""
+    if term in terms:
+        return True
+    grams = set(_trigrams(term))
+    for other in terms:
+        other_grams = set(_trigrams(other))
+        if (
+            2 * len(grams & other_grams) / (len(grams) + len(other_grams))
+            >= MIN_TERM_OVERLAP
+        ):
+            return True
+    return False
+
+
+def _compatible(
+    query: FrozenSet[str], questions: FrozenSet[str], cached: _Entry
+) -> bool:
+    """
+    La respuesta a `cached` vale para `query` si ambas tienen la misma negación, el
+    mismo interrogativo (si las dos lo tienen: 'háblame de...' sirve para '¿qué...?')
+    y `query` no es más genérica: cada término de `cached` aparece en `query`.
+    """
+    if bool(query & NEGATIONS) != bool(cached.terms & NEGATIONS):
+        return False
+    if questions and cached.questions and questions != cached.questions:
+        return False
+    return all(_covers(query, term) for term in cached.terms)
+
+
+class SemanticAnswerCache:
+    """
+    Caché de respuestas thread-safe con búsqueda exacta y por similitud.
+
+    Los vectores guardan la frecuencia de término (sublineal) y el IDF se aplica en cada
+    consulta con las preguntas cacheadas en ese momento; la matriz de vectores solo se
+    reconstruye cuando cambian las entradas.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.75,
+        max_entries: int = 512,
+        ttl: float = 24 * 60 * 60,
+        dimensions: int = DEFAULT_DIMENSIONS,
+        clock: Callable[[], float] = time.monotonic,
+        similarity_observer: Optional[Callable[[float], None]] = None,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.dimensions = dimensions
+        self._clock = clock
+        # Recibe la mejor similitud de cada búsqueda semántica (útil para ajustar el
+        # umbral).
+        self._similarity_observer = similarity_observer
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._document_frequency = np.zeros(dimensions, dtype=np.float32)
+        # Matriz de vectores y entradas de cada fila, en el orden en que se construyó:
+        # el orden LRU de _entries cambia con cada acierto, el de las filas no.
+        self._matrix: Optional[np.ndarray] = None
+        self._rows: List[_Entry] = []
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.invalidations = 0
+
+    def _vectorize(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for term, weight in _features(text):
+            vector[zlib.crc32(term.encode("utf-8")) % self.dimensions] += weight
+        return np.log1p(vector, out=vector)
+
+    def _check_version(self, version: str) -> None:
+        """
+        Vacía la caché si ha cambiado el contenido. Debe llamarse con el lock tomado.
+        """
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._clear()
+            self._version = version
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._document_frequency[:] = 0
+        self._matrix = None
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._document_frequency -= entry.vector > 0
+        self._matrix = None
+
+    def _purge_expired(self) -> None:
+        now = self._clock()
+        for key in [
+            key for key, entry in self._entries.items() if entry.expires_at <= now
+        ]:
+            self._remove(key)
+
+    def _best_semantic(
+        self, vector: np.ndarray, terms: FrozenSet[str], questions: FrozenSet[str]
+    ) -> tuple:
+        """
+        Devuelve (entrada, similitud) de la pregunta cacheada más parecida que supera el
+        umbral y es compatible con la consulta, o (None, mejor similitud) si no hay
+        ninguna. Sin búsqueda (caché vacía o consulta sin términos), la similitud es
+        None.
+        """
+        if not self._entries or not vector.any():
+            return None, None
+        if self._matrix is None:
+            self._rows = list(self._entries.values())
+            self._matrix = np.stack([entry.vector for entry in self._rows])
+        total = len(self._rows)
+        idf = np.log((1 + total) / (1 + self._document_frequency)) + 1
+        weighted = self._matrix * idf
+        query = vector * idf
+        norms = np.linalg.norm(weighted, axis=1) * np.linalg.norm(query)
+        similarities = (weighted @ query) / np.where(norms == 0, 1, norms)
+        for row in np.argsort(-similarities):
+            if similarities[row] < self.threshold:
+                break
+            if _compatible(terms, questions, self._rows[row]):
+                return self._rows[row], float(similarities[row])
+        return None, float(similarities.max())
+
+    def lookup(self, message: str, version: str) -> Optional[CachedAnswer]:
+        """Busca una respuesta para el mensaje con la versión de contenido actual."""
+        questions = frozenset(question_words(message))
+        key = normalize_query(message)
+        terms = frozenset(query_terms(message))
+        with self._lock:
+            self._check_version(version)
+            self._purge_expired()
+
+            entry = self._entries.get(key)
+            if entry is not None and not _compatible(terms, questions, entry):
+                # Misma clave, otra pregunta ('¿Dónde...?' frente a '¿Cuándo...?').
+                entry = None
+            similarity, match = 1.0, "exact"
+            if entry is None:
+                entry, similarity = self._best_semantic(
+                    self._vectorize(message), terms, questions
+                )
+                match = "semantic"
+                if similarity is not None and self._similarity_observer is not None:
+                    self._similarity_observer(similarity)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry.key)
+            if match == "exact":
+                self.hits_exact += 1
+            else:
+                self.hits_semantic += 1
+            self.saved_seconds += entry.latency
+            return CachedAnswer(
+                entry.answer, entry.author, similarity, match, entry.latency
+            )
+
+    def store(
+        self,
+        message: str,
+        answer: str,
+        version: str,
+        latency: float,
+        author: Optional[str] = None,
+    ) -> None:
+        """Guarda la respuesta del agente a un mensaje de primer turno."""
+        questions = frozenset(question_words(message))
+        key = normalize_query(message)
+        vector = self._vectorize(message)
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(
+                key,
+                answer,
+                author,
+                latency,
+                self._clock() + self.ttl,
+                vector,
+                frozenset(query_terms(message)),
+                questions,
+            )
+            self._document_frequency += vector > 0
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para ajustar el umbral: aciertos por tipo y latencia ahorrada."""
+        with self._lock:
+            hits = self.hits_exact + self.hits_semantic
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "threshold": self.threshold,
+                "hits_exact": self.hits_exact,
+                "hits_semantic": self.hits_semantic,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "invalidations": self.invalidations,
+            }
+
+
+def content_version() -> str:
+    """Versión del contenido del que dependen las respuestas (CV e índice del blog)."""
+    from assistant.blog_index import get_blog_index
+    from assistant.cv_index import get_cv_index
+
+    blog_index = get_blog_index()
+    blog_version = blog_index.version if blog_index is not None else "none"
+    return f"cv:{get_cv_index().version}|blog:{blog_version}"
+
+
+def answer_cache_enabled() -> bool:
+    return os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+
+
+_bypassed: ContextVar[bool] = ContextVar("cached_answers_bypassed", default=False)
+
+
+def cached_answers_bypassed() -> bool:
+    return _bypassed.get()
+
+
+@contextmanager
+def bypass_cached_answers() -> Iterator[None]:
+    """
+    Ejecuta siempre a los agentes en el contexto actual (y las tareas que se creen
+    dentro).
+    """
+    token = _bypassed.set(True)
+    try:
+        yield
+    finally:
+        _bypassed.reset(token)
+
+
+def create_answer_cache(**options: Any) -> SemanticAnswerCache:
+    """Construye la caché de respuestas con la configuración del entorno."""
+    return SemanticAnswerCache(
+        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.75")),
+        max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512")),
+        ttl=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(24 * 60 * 60))),
+        **options,
+    )
@@ -0,0 +1,199 @@
+# batch.py
+# Ejecución de lotes de preguntas con concurrencia acotada: evaluación offline de
+# regresiones y precalentamiento de la caché de respuestas tras actualizar el CV.
+#
+# Cada pregunta es el primer turno de una conversación nueva (con un usuario propio),
+# así que su respuesta solo depende de la pregunta y del contenido y se guarda en la
+# caché de respuestas como cualquier primer turno; con use_cache=False (evaluación de
+# regresiones) no se sirve desde las FAQ ni desde la caché, para medir siempre a los
+# agentes. Un número fijo de workers reparte el lote: nunca hay más de `concurrency`
+# preguntas en marcha. Los resultados salen en orden de finalización, cada uno con su
+# latencia, su traza (ver /api/traces) y, si falla, el motivo; al final, un resumen. Lo
+# usan /api/invoke/batch (NDJSON) e invoke_batch.py.
+#
+# Variables de entorno:
+#   BATCH_MAX_CONCURRENCY   preguntas de un lote en marcha a la vez (por defecto: 4)
+#   BATCH_MAX_ITEMS         preguntas por lote (por defecto: 500)
+
+import asyncio
+import math
+import os
+import time
+import uuid
+from collections import Counter
+from contextlib import nullcontext
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from assistant.answer_cache import bypass_cached_answers
+from assistant.logger import get_logger
+from assistant.metrics import registry
+from assistant.resilience import UpstreamUnavailable
+from assistant.tracing import start_trace, use_trace
+
+logger = get_logger(__name__)
+
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+# invoke(message, session_id, user_id) -> (respuesta, session_id), como
+# invoke_agent_async.
+Invoke = Callable[[str, Optional[str], str], Awaitable[Tuple[str, str]]]
+
+_batch_items = registry.counter(
+    "assistant_batch_items_total",
+    "Preguntas ejecutadas en lotes por resultado (ok, timeout, unavailable, error).",
+    ("result",),
+)
+_batch_item_seconds = registry.histogram(
+    "assistant_batch_item_seconds",
+    "Latencia de cada pregunta de un lote.",
+)
+
+
+class BatchItem(NamedTuple):
+    """
+    Una pregunta del lote; `id` (opcional) se devuelve tal cual para casar los
+    resultados.
+    """
+
+    message: str
+    id: Optional[str] = None
+
+
+def _error_kind(exc: BaseException) -> str:
+    if isinstance(exc, TimeoutError):
+        return "timeout"
+    if isinstance(exc, UpstreamUnavailable):
+        return "unavailable"
+    return "error"
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Percentil por rango más cercano (q entre 0 y 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q / 100 * len(ordered))) - 1]
+
+
+async def _run_item(
+    index: int,
+    item: BatchItem,
+    invoke: Invoke,
+    timeout: Optional[float],
+    use_cache: bool,
+) -> Dict[str, Any]:
+    """
+    Ejecuta una pregunta en su propia traza; los errores se devuelven, no se lanzan.
+    """
+    trace = start_trace("batch item", **{"batch.index": index, "batch.id": item.id})
+    started = time.perf_counter()
+    outcome: Dict[str, Any]
+    try:
+        with use_trace(trace), nullcontext() if use_cache else bypass_cached_answers():
+            async with asyncio.timeout(timeout):
+                response, session_id = await invoke(
+                    item.message, None, f"batch_{uuid.uuid4().hex}"
+                )
+        outcome = {"ok": True, "response": response, "session_id": session_id}
+    except Exception as exc:
+        trace.finish(error=exc)
+        outcome = {
+            "ok": False,
+            "error": _error_kind(exc),
+            "detail": str(exc) or type(exc).__name__,
+        }
+        logger.warning(
+            "Pregunta del lote fallida", extra={"index": index, "error": repr(exc)}
+        )
+    finally:
+        trace.finish()
+    latency = time.perf_counter() - started
+    _batch_items.inc(result="ok" if outcome["ok"] else outcome["error"])
+    _batch_item_seconds.observe(latency)
+    return {
+        "type": "result",
+        "index": index,
+        "id": item.id,
+        "latency_ms": round(latency * 1000, 1),
+        "trace_id": trace.trace_id,
+        **outcome,
+    }
+
+
+async def run_batch(
+    items: Sequence[BatchItem],
+    invoke: Invoke,
+    concurrency: int = BATCH_MAX_CONCURRENCY,
+    timeout: Optional[float] = None,
+    use_cache: bool = True,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Ejecuta `items` con como mucho `concurrency` a la vez (cada una con un plazo de
+    `timeout` segundos) y emite cada resultado según termina, seguido del resumen
+    ({"type": "summary", ...}). Con `use_cache=False` ninguna respuesta sale de las FAQ
+    ni de la caché de respuestas. Si quien consume deja de iterar, las preguntas en
+    curso se cancelan.
+    """
+    pending = iter(enumerate(items))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker() -> None:
+        # Los workers comparten el iterador: cada uno toma la siguiente pregunta al
+        # terminar.
+        for index, item in pending:
+            results.put_nowait(await _run_item(index, item, invoke, timeout, use_cache))
+
+    started = time.perf_counter()
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(min(max(1, concurrency), len(items)))
+    ]
+    latencies: List[float] = []
+    failures: Counter = Counter()
+    try:
+        for _ in range(len(items)):
+            result = await results.get()
+            latencies.append(result["latency_ms"])
+            if not result["ok"]:
+                failures[result["error"]] += 1
+            yield result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    summary = {
+        "type": "summary",
+        "total": len(items),
+        "ok": len(items) - sum(failures.values()),
+        "failed": sum(failures.values()),
+        "errors": dict(failures),
+        "concurrency": len(workers),
+        "use_cache": use_cache,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "max": max(latencies, default=0.0),
+        },
+    }
+    logger.info(
+        "Lote completado",
+        extra={
+            key: summary[key]
+            for key in ("total", "failed", "concurrency", "elapsed_ms")
+        },
+    )
+    yield summary
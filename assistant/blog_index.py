@@ -0,0 +1,470 @@
+# blog_index.py
+# Índice invertido local (BM25) del blog para responder búsquedas sin consultar Google.
+#
+# Uso:
+#   python -m assistant.blog_index build \
+#       --sitemap https://blog.sergiomarquez.dev/sitemap.xml
+#   python -m assistant.blog_index build --rss https://blog.sergiomarquez.dev/rss.xml
+#   python -m assistant.blog_index build --dir ./posts
+#   python -m assistant.blog_index search "agentes LLM"
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from assistant.logger import get_logger
+from assistant.text_utils import tokenize
+
+logger = get_logger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+BLOG_BASE_URL = "https://blog.sergiomarquez.dev"
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..")),
+    "nginx",
+    "blog_index.json",
+)
+
+# Peso de cada campo al calcular la frecuencia de términos (BM25F simplificado).
+FIELD_WEIGHTS = {"title": 3.0, "headings": 2.0, "body": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Rutas del sitemap que no son artículos.
+_SKIPPED_PATH_PATTERN = re.compile(r"/(tag|tags|category|categories|page|author)/")
+
+
+# --- Extracción de contenido ---
+
+
+class _PostHTMLParser(HTMLParser):
+    """Extrae título, encabezados, cuerpo, descripción y fecha de una página HTML."""
+
+    _SKIPPED_TAGS = {"script", "style", "nav", "footer", "header", "aside", "noscript"}
+    _HEADING_TAGS = {"h1", "h2", "h3"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html_title = ""
+        self.og_title = ""
+        self.headings: List[str] = []
+        self.body: List[str] = []
+        self.description = ""
+        self.published = ""
+        self._stack: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag == "meta":
+            key = attributes.get("property") or attributes.get("name") or ""
+            value = attributes.get("content") or ""
+            if key == "og:title" and not self.og_title:
+                self.og_title = value.strip()
+            elif key in ("description", "og:description") and not self.description:
+                self.description = value.strip()
+            elif key in ("article:published_time", "date") and not self.published:
+                self.published = value.strip()
+            return
+        if tag == "time" and not self.published and attributes.get("datetime"):
+            self.published = attributes["datetime"].strip()
+        if tag in ("br", "img", "hr", "link", "input"):
+            return
+        self._stack.append(tag)
+        if tag in self._SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag not in self._stack:
+            return
+        while self._stack:
+            current = self._stack.pop()
+            if current in self._SKIPPED_TAGS:
+                self._skip_depth -= 1
+            if current == tag:
+                break
+
+    def handle_data(self, data):
+        text = data.strip()
+        if not text:
+            return
+        if "title" in self._stack:
+            self.html_title = self.html_title or text
+        elif self._skip_depth:
+            return
+        elif self._HEADING_TAGS.intersection(self._stack):
+            self.headings.append(text)
+        else:
+            self.body.append(text)
+
+
+def parse_html_post(url: str, html: str) -> Dict[str, Any]:
+    """Convierte una página HTML del blog en un documento indexable."""
+    parser = _PostHTMLParser()
+    parser.feed(html)
+    # Los títulos de <title> suelen acabar en " | Blog de ..."
+    html_title = re.split(r"\s[|–]\s", parser.html_title)[0].strip()
+    title = (
+        parser.og_title
+        or html_title
+        or (parser.headings[0] if parser.headings else url)
+    )
+    return {
+        "url": url,
+        "title": title,
+        "headings": " ".join(parser.headings),
+        "body": " ".join(parser.body),
+        "description": parser.description,
+        "published": parser.published,
+    }
+
+
+def parse_markdown_post(path: str, text: str, base_url: str) -> Dict[str, Any]:
+    """
+    Convierte un post en Markdown (con front matter opcional) en un documento indexable.
+    """
+    meta: Dict[str, str] = {}
+    front_matter = re.match(r"^---\s*\n(.*?)\n---\s*\n", text, re.S)
+    if front_matter:
+        for line in front_matter.group(1).splitlines():
+            key, _, value = line.partition(":")
+            if value:
+                meta[key.strip().lower()] = value.strip().strip("\"'")
+        text = text[front_matter.end() :]
+
+    headings = re.findall(r"^#{1,3}\s+(.+)$", text, re.M)
+    body = re.sub(r"^#{1,6}\s+.+$", " ", text, flags=re.M)
+    slug = meta.get("slug") or os.path.splitext(os.path.basename(path))[0]
+    return {
+        "url": meta.get("url") or f"{base_url.rstrip('/')}/{slug}",
+        "title": meta.get("title") or (headings[0] if headings else slug),
+        "headings": " ".join(headings),
+        "body": body,
+        "description": meta.get("description", ""),
+        "published": meta.get("date", ""),
+    }
+
+
+# --- Fuentes de documentos ---
+
+
+def _fetch(url: str, timeout: float = 15.0) -> str:
+    import requests
+
+    response = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
+    response.raise_for_status()
+    return response.text
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_sitemap_urls(sitemap_url: str) -> Iterable[str]:
+    """Recorre un sitemap (o índice de sitemaps) y devuelve las URLs de artículos."""
+    root = ET.fromstring(_fetch(sitemap_url))
+    for node in root:
+        loc = next(
+            (child.text for child in node if _local_name(child.tag) == "loc"), None
+        )
+        if not loc:
+            continue
+        loc = loc.strip()
+        if _local_name(node.tag) == "sitemap":
+            yield from iter_sitemap_urls(loc)
+        elif urlparse(loc).path.strip("/") and not _SKIPPED_PATH_PATTERN.search(loc):
+            yield loc
+
+
+def documents_from_sitemap(sitemap_url: str) -> List[Dict[str, Any]]:
+    documents = []
+    for url in iter_sitemap_urls(sitemap_url):
+        try:
+            documents.append(parse_html_post(url, _fetch(url)))
+        except Exception as e:
+            logger.warning(
+                "No se pudo indexar el artículo", extra={"url": url, "error": str(e)}
+            )
+    return documents
+
+
+def documents_from_rss(feed_url: str) -> List[Dict[str, Any]]:
+    """Lee un feed RSS 2.0 o Atom; el contenido del feed basta para indexar."""
+    root = ET.fromstring(_fetch(feed_url))
+    documents = []
+    for item in root.iter():
+        if _local_name(item.tag) not in ("item", "entry"):
+            continue
+        fields: Dict[str, str] = {}
+        for child in item:
+            name = _local_name(child.tag)
+            if name == "link" and child.get("href"):
+                fields.setdefault("link", child.get("href", ""))
+            elif child.text:
+                fields.setdefault(name, child.text.strip())
+        content = fields.get("encoded") or fields.get("content") or ""
+        parsed = parse_html_post(fields.get("link", ""), content) if content else {}
+        documents.append(
+            {
+                "url": fields.get("link", ""),
+                "title": fields.get("title", ""),
+                "headings": parsed.get("headings", ""),
+                "body": parsed.get("body", "")
+                or re.sub(r"<[^>]+>", " ", fields.get("description", "")),
+                "description": re.sub(
+                    r"<[^>]+>",
+                    " ",
+                    fields.get("description") or fields.get("summary", ""),
+                ).strip(),
+                "published": fields.get("pubDate") or fields.get("published", ""),
+            }
+        )
+    return documents
+
+
+def documents_from_directory(
+    path: str, base_url: str = BLOG_BASE_URL
+) -> List[Dict[str, Any]]:
+    """Indexa un directorio local de posts en Markdown o HTML."""
+    documents = []
+    for directory, _, filenames in os.walk(path):
+        for filename in sorted(filenames):
+            file_path = os.path.join(directory, filename)
+            extension = os.path.splitext(filename)[1].lower()
+            if extension not in (".md", ".markdown", ".html", ".htm"):
+                continue
+            with open(file_path, "r", encoding="utf-8") as f:
+                text = f.read()
+            if extension in (".md", ".markdown"):
+                documents.append(parse_markdown_post(file_path, text, base_url))
+            else:
+                slug = os.path.splitext(filename)[0]
+                url = f"{base_url.rstrip('/')}/{slug}"
+                documents.append(parse_html_post(url, text))
+    return documents
+
+
+# --- Índice ---
+
+
+class BlogIndex:
+    """Índice invertido con puntuación BM25 sobre título, encabezados y cuerpo."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.docs: List[Dict[str, str]] = data["docs"]
+        self.postings: Dict[str, List[List[float]]] = data["postings"]
+        self.idf: Dict[str, float] = data["idf"]
+        self.doc_lengths: List[float] = data["doc_lengths"]
+        self.avg_length: float = data["avg_length"] or 1.0
+        self.version: str = data["version"]
+        self.built_at: float = data.get("built_at", 0.0)
+
+    @classmethod
+    def build(cls, documents: List[Dict[str, Any]]) -> "BlogIndex":
+        """Construye el índice a partir de documentos ya extraídos."""
+        unique: Dict[str, Dict[str, Any]] = {}
+        for document in documents:
+            if document.get("url"):
+                unique.setdefault(document["url"], document)
+
+        docs: List[Dict[str, str]] = []
+        postings: Dict[str, List[List[float]]] = {}
+        doc_lengths: List[float] = []
+        for doc_id, document in enumerate(unique.values()):
+            weighted_tf: Counter = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for term, count in Counter(tokenize(document.get(field, ""))).items():
+                    weighted_tf[term] += weight * count
+            for term, frequency in weighted_tf.items():
+                postings.setdefault(term, []).append([doc_id, frequency])
+            doc_lengths.append(sum(weighted_tf.values()))
+            docs.append(
+                {
+                    "url": document["url"],
+                    "title": document.get("title", ""),
+                    "description": document.get("description", ""),
+                    "published": document.get("published", ""),
+                }
+            )
+
+        total = len(docs)
+        idf = {
+            term: math.log(1 + (total - len(entries) + 0.5) / (len(entries) + 0.5))
+            for term, entries in postings.items()
+        }
+        version = hashlib.sha256(
+            json.dumps([docs, sorted(postings)], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        return cls(
+            {
+                "docs": docs,
+                "postings": postings,
+                "idf": idf,
+                "doc_lengths": doc_lengths,
+                "avg_length": sum(doc_lengths) / total if total else 0.0,
+                "version": version,
+                "built_at": time.time(),
+            }
+        )
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Devuelve los documentos más relevantes para la consulta, ordenados por score.
+        """
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            for doc_id, frequency in self.postings.get(term, ()):
+                doc_id = int(doc_id)
+                norm = BM25_K1 * (
+                    1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / self.avg_length
+                )
+                scores[doc_id] = scores.get(doc_id, 0.0) + self.idf[term] * (
+                    frequency * (BM25_K1 + 1) / (frequency + norm)
+                )
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            dict(self.docs[doc_id], score=round(score, 4)) for doc_id, score in ranked
+        ]
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": INDEX_FORMAT_VERSION,
+            "version": self.version,
+            "built_at": self.built_at,
+            "docs": self.docs,
+            "postings": self.postings,
+            "idf": self.idf,
+            "doc_lengths": self.doc_lengths,
+            "avg_length": self.avg_length,
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Guarda el índice de forma atómica (escritura a temporal + rename). Un índice
+        vacío (p. ej. sin red al construirlo) no se guarda: ocultaría la búsqueda en
+        Google.
+        """
+        if not self.docs:
+            raise ValueError("El índice del blog está vacío; no se guarda.")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BlogIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Formato de índice no soportado: {data.get('format')}")
+        return cls(data)
+
+
+# --- Carga Lazy ---
+_cached_index: Optional[BlogIndex] = None
+_index_loaded = False
+
+
+def get_blog_index() -> Optional[BlogIndex]:
+    """
+    Carga el índice una sola vez desde BLOG_INDEX_PATH. Devuelve None si no existe.
+    """
+    global _cached_index, _index_loaded
+    if not _index_loaded:
+        path = os.getenv("BLOG_INDEX_PATH", DEFAULT_INDEX_PATH)
+        try:
+            _cached_index = BlogIndex.load(path)
+            if len(_cached_index) == 0:
+                # Sin artículos equivale a no tener índice: se usa la búsqueda en
+                # Google.
+                logger.warning("El índice del blog está vacío", extra={"path": path})
+                _cached_index = None
+            else:
+                logger.info(
+                    "Índice del blog cargado",
+                    extra={"posts": len(_cached_index), "path": path},
+                )
+        except FileNotFoundError:
+            logger.warning("No existe el índice del blog", extra={"path": path})
+            _cached_index = None
+        except (ValueError, KeyError) as e:
+            logger.error(
+                "Error al cargar el índice del blog",
+                extra={"path": path, "error": str(e)},
+            )
+            _cached_index = None
+        _index_loaded = True
+    return _cached_index
+
+
+def reset_blog_index() -> None:
+    """Olvida el índice cargado para que la próxima llamada lo relea del disco."""
+    global _cached_index, _index_loaded
+    _cached_index = None
+    _index_loaded = False
+
+
+# --- CLI ---
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Índice local del blog (BM25).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Construye el índice.")
+    source = build_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--sitemap", help="URL del sitemap.xml del blog.")
+    source.add_argument("--rss", help="URL del feed RSS/Atom del blog.")
+    source.add_argument("--dir", help="Directorio local con posts (.md/.html).")
+    build_parser.add_argument("--base-url", default=BLOG_BASE_URL)
+    build_parser.add_argument(
+        "--output", default=os.getenv("BLOG_INDEX_PATH", DEFAULT_INDEX_PATH)
+    )
+
+    search_parser = subparsers.add_parser("search", help="Prueba una búsqueda.")
+    search_parser.add_argument("query")
+    search_parser.add_argument(
+        "--index", default=os.getenv("BLOG_INDEX_PATH", DEFAULT_INDEX_PATH)
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        start = time.perf_counter()
+        if args.sitemap:
+            documents = documents_from_sitemap(args.sitemap)
+        elif args.rss:
+            documents = documents_from_rss(args.rss)
+        else:
+            documents = documents_from_directory(args.dir, args.base_url)
+        index = BlogIndex.build(documents)
+        if len(index) == 0:
+            # Código de salida distinto de cero: el paso de construcción falla.
+            raise SystemExit(
+                "❌ No se ha podido extraer ningún artículo; no se guarda el índice."
+            )
+        index.save(args.output)
+        print(
+            f"✅ Índice construido: {len(index)} artículos, {len(index.postings)} términos "
+            f"en {time.perf_counter() - start:.2f}s -> {args.output}"
+        )
+    else:
+        index = BlogIndex.load(args.index)
+        for result in index.search(args.query):
+            print(f"{result['score']:.3f}  {result['title']}  {result['url']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+# blog_metadata.py
+# Enriquece los resultados de búsqueda del blog con el título, la descripción y la fecha
+# reales de cada artículo.
+#
+# La búsqueda en Google solo devuelve URLs, y el título se deducía del slug. Este módulo
+# descarga las páginas de los resultados a la vez, con un httpx.AsyncClient compartido
+# (pool de conexiones keep-alive), y extrae los metadatos con el mismo parser que el
+# índice del blog. Cada página se guarda en una caché persistente en disco:
+#   - dentro de BLOG_METADATA_TTL_SECONDS se sirve sin ir a la red,
+#   - después se revalida con If-None-Match / If-Modified-Since (un 304 no descarga
+#     nada),
+#   - si la página no responde se sirve lo último que se tenga de ella.
+#
+# Las herramientas son síncronas y corren en el pool de offload.py, y un AsyncClient
+# pertenece a un event loop. Por eso el cliente vive en un loop propio, en un hilo en
+# segundo plano, y enrich() le envía el trabajo y espera el resultado. Las descargas que
+# no terminan dentro del plazo siguen en segundo plano y llenan la caché para la próxima
+# vez.
+#
+# Variables de entorno:
+#   BLOG_METADATA_ENABLED            true | false (por defecto: true)
+#   BLOG_METADATA_CACHE_PATH         caché en disco (por defecto:
+#                                    data/blog_metadata.json)
+#   BLOG_METADATA_TTL_SECONDS        tiempo sin revalidar una página (por defecto:
+#                                    86400)
+#   BLOG_METADATA_DEADLINE_SECONDS   espera máxima del enriquecimiento (por defecto: 3)
+#   BLOG_METADATA_TIMEOUT_SECONDS    timeout de cada petición HTTP (por defecto: 5)
+#   BLOG_METADATA_MAX_CONNECTIONS    conexiones simultáneas del pool (por defecto: 8)
+#   BLOG_METADATA_CACHE_MAX_ENTRIES  páginas guardadas en la caché (por defecto: 1000)
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from assistant.blog_index import parse_html_post
+from assistant.logger import get_logger
+from assistant.metrics import registry
+
+logger = get_logger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "blog_metadata.json",
+)
+METADATA_FIELDS = ("title", "description", "published")
+# Las escrituras de la caché se agrupan: como mucho una cada SAVE_DELAY segundos.
+SAVE_DELAY = 1.0
+USER_AGENT = "Mozilla/5.0 (compatible; sergiomarquez-assistant)"
+
+_requests = registry.counter(
+    "assistant_blog_metadata_requests_total",
+    "Metadatos de artículos por origen (cached, fetched, not_modified, error).",
+    ("result",),
+)
+
+
+class MetadataCache:
+    """
+    Metadatos por URL con sus validadores HTTP (ETag y Last-Modified), persistidos en
+    JSON.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(url)
+
+    def set(self, url: str, entry: Dict[str, Any]) -> None:
+        self.entries[url] = entry
+        if len(self.entries) > self.max_entries:
+            # Se descartan las páginas comprobadas hace más tiempo.
+            oldest = sorted(
+                self.entries, key=lambda key: self.entries[key]["checked_at"]
+            )
+            for key in oldest[: len(self.entries) - self.max_entries]:
+                del self.entries[key]
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != CACHE_FORMAT_VERSION:
+                raise ValueError(f"formato {data.get('format')!r}")
+            self.entries = dict(data["entries"])
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            logger.warning(
+                "Caché de metadatos del blog no válida; se empieza vacía",
+                extra={"path": self.path, "error": str(e)},
+            )
+            self.entries = {}
+
+    def save(self) -> None:
+        """
+        Escritura atómica (fichero temporal + os.replace). Cada escritura usa su propio
+        temporal: varios workers comparten el fichero y no se pisan a medias.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=directory,
+            prefix=f"{os.path.basename(self.path)}.",
+            suffix=".tmp",
+            delete=False,
+        ) as f:
+            json.dump(
+                {"format": CACHE_FORMAT_VERSION, "entries": self.entries},
+                f,
+                ensure_ascii=False,
+            )
+        try:
+            os.replace(f.name, self.path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+
+def extract_metadata(url: str, html: str) -> Dict[str, str]:
+    """
+    Título, descripción y fecha de publicación de una página (vacíos si no los tiene).
+    """
+    document = parse_html_post(url, html)
+    metadata = {field: document.get(field) or "" for field in METADATA_FIELDS}
+    if metadata["title"] == url:
+        # parse_html_post usa la URL cuando la página no tiene título.
+        metadata["title"] = ""
+    return metadata
+
+
+def needs_metadata(result: Dict[str, Any]) -> bool:
+    """
+    Los resultados del índice local ya traen descripción y fecha; los de Google, no.
+    """
+    return not (result.get("description") and result.get("published"))
+
+
+class BlogMetadataEnricher:
+    """
+    Descarga concurrente de metadatos con un cliente HTTP y una caché compartidos. Todo
+    el estado (cliente, caché, descargas en curso) se usa solo desde el loop en segundo
+    plano.
+    """
+
+    def __init__(
+        self,
+        cache_path: str,
+        ttl: float = 86400.0,
+        deadline: float = 3.0,
+        timeout: float = 5.0,
+        max_connections: int = 8,
+        max_entries: int = 1000,
+    ):
+        self.ttl = ttl
+        self.deadline = deadline
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.cache = MetadataCache(cache_path, max_entries)
+        self._cache_loaded = False
+        self._client = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    # --- API síncrona (herramientas) ---
+
+    def enrich(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Devuelve los resultados con los metadatos reales de cada artículo, esperando
+        como mucho `deadline` segundos. Lo que no llegue a tiempo se queda como estaba.
+        """
+        if not any(needs_metadata(result) for result in results):
+            return results
+        future = asyncio.run_coroutine_threadsafe(
+            self.enrich_async(results), self._get_loop()
+        )
+        try:
+            # enrich_async ya respeta el plazo; el margen cubre la espera a que el loop
+            # la atienda.
+            return future.result(timeout=self.deadline + 1.0)
+        except TimeoutError:
+            future.cancel()
+            logger.warning("Enriquecimiento de resultados del blog fuera de plazo")
+            return results
+
+    def close(self) -> None:
+        """Cierra el cliente HTTP, guarda la caché y detiene el loop (tests)."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="blog-metadata", daemon=True
+                ).start()
+                self._loop = loop
+            return self._loop
+
+    # --- Loop en segundo plano ---
+
+    async def enrich_async(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not self._cache_loaded:
+            await asyncio.to_thread(self.cache.load)
+            self._cache_loaded = True
+        urls = {result["url"] for result in results if needs_metadata(result)}
+        tasks = {url: self._metadata_task(url) for url in urls}
+        pending = [task for task in tasks.values() if not task.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=self.deadline)
+
+        enriched = []
+        for result in results:
+            metadata = self.cache.get(result["url"]) if result["url"] in urls else None
+            if metadata:
+                result = dict(result)
+                for field in METADATA_FIELDS:
+                    if metadata.get(field):
+                        result[field] = metadata[field]
+            enriched.append(result)
+        return enriched
+
+    def _metadata_task(self, url: str) -> asyncio.Task:
+        """
+        Tarea que deja en la caché los metadatos de `url` (una sola por URL a la vez).
+        """
+        task = self._in_flight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(url))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        return task
+
+    async def _refresh(self, url: str) -> None:
+        entry = self.cache.get(url)
+        if entry and time.time() - entry["checked_at"] < self.ttl:
+            _requests.inc(result="cached")
+            return
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = await self._get_client().get(url, headers=headers)
+            if response.status_code == 304 and entry:
+                _requests.inc(result="not_modified")
+                self.cache.set(url, dict(entry, checked_at=time.time()))
+            else:
+                response.raise_for_status()
+                _requests.inc(result="fetched")
+                self.cache.set(
+                    url,
+                    {
+                        **extract_metadata(url, response.text),
+                        "etag": response.headers.get("etag"),
+                        "last_modified": response.headers.get("last-modified"),
+                        "checked_at": time.time(),
+                    },
+                )
+        except Exception as e:
+            # Una entrada caducada se sigue sirviendo hasta que la página vuelva a
+            # responder.
+            _requests.inc(result="error")
+            logger.warning(
+                "No se pudieron obtener los metadatos del artículo",
+                extra={"url": url, "error": repr(e)},
+            )
+            return
+        self._schedule_save()
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._client
+
+    def _schedule_save(self) -> None:
+        if self._save_handle is None:
+            self._save_handle = asyncio.get_running_loop().call_later(
+                SAVE_DELAY, self._save
+            )
+
+    def _save(self) -> None:
+        self._save_handle = None
+        try:
+            self.cache.save()
+        except OSError as e:
+            logger.warning(
+                "No se pudo guardar la caché de metadatos del blog",
+                extra={"path": self.cache.path, "error": str(e)},
+            )
+
+    async def _shutdown(self) -> None:
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def metadata_enabled() -> bool:
+    return os.getenv("BLOG_METADATA_ENABLED", "true").lower() == "true"
+
+
+def create_metadata_enricher() -> BlogMetadataEnricher:
+    return BlogMetadataEnricher(
+        cache_path=os.getenv("BLOG_METADATA_CACHE_PATH", DEFAULT_CACHE_PATH),
+        ttl=float(os.getenv("BLOG_METADATA_TTL_SECONDS", "86400")),
+        deadline=float(os.getenv("BLOG_METADATA_DEADLINE_SECONDS", "3")),
+        timeout=float(os.getenv("BLOG_METADATA_TIMEOUT_SECONDS", "5")),
+        max_connections=int(os.getenv("BLOG_METADATA_MAX_CONNECTIONS", "8")),
+        max_entries=int(os.getenv("BLOG_METADATA_CACHE_MAX_ENTRIES", "1000")),
+    )
+
+
+_enricher: Optional[BlogMetadataEnricher] = None
+_enricher_lock = threading.Lock()
+
+
+def get_metadata_enricher() -> BlogMetadataEnricher:
+    global _enricher
+    with _enricher_lock:
+        if _enricher is None:
+            _enricher = create_metadata_enricher()
+        return _enricher
+
+
+def set_metadata_enricher(enricher: Optional[BlogMetadataEnricher]) -> None:
+    """
+    Sustituye el enriquecedor del proceso (tests); None vuelve a crearlo desde el
+    entorno.
+    """
+    global _enricher
+    with _enricher_lock:
+        _enricher = enricher
+
+
+def enrich_blog_results(results: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Resultados con sus metadatos reales, o tal cual si el enriquecimiento está
+    desactivado.
+    """
+    if not metadata_enabled() or not results:
+        return list(results)
+    return get_metadata_enricher().enrich(list(results))
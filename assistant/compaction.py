@@ -0,0 +1,285 @@
+# compaction.py
+# Compactación del historial que se envía al modelo en conversaciones largas.
+#
+# ADK guarda cada evento en la sesión y, en cada llamada al modelo, reenvía el historial
+# completo: sin límite, cada turno es más lento y caro que el anterior. compact_history
+# (before_model_callback de los tres agentes) actúa sobre llm_request.contents, es
+# decir, sobre lo que se envía a Gemini en cada invocación; la sesión guardada no
+# cambia.
+#   1. Dentro del presupuesto (COMPACTION_MAX_TOKENS y COMPACTION_MAX_TURNS) no hace
+#      nada.
+#   2. Si se supera, recorta las salidas de herramientas (resultados de
+#      search_blog_posts, fragmentos de query_cv) de los turnos anteriores a los últimos
+#      COMPACTION_KEEP_TURNS.
+#   3. Si aún se supera, sustituye esos turnos antiguos por un resumen extractivo (cada
+#      pregunta y el comienzo de su respuesta), acotado a COMPACTION_SUMMARY_CHARS.
+# Los últimos COMPACTION_KEEP_TURNS turnos se envían siempre literalmente.
+#
+# Variables de entorno:
+#   COMPACTION_ENABLED            true | false (por defecto: true)
+#   COMPACTION_MAX_TOKENS         tokens estimados de historial permitidos (por defecto:
+#                                 3000)
+#   COMPACTION_MAX_TURNS          turnos permitidos (por defecto: 12)
+#   COMPACTION_KEEP_TURNS         turnos recientes enviados literalmente (por defecto:
+#                                 4)
+#   COMPACTION_TOOL_OUTPUT_CHARS  longitud de una salida de herramienta antigua (por
+#                                 defecto: 400)
+#   COMPACTION_SUMMARY_CHARS      longitud máxima del resumen (por defecto: 1500)
+
+import json
+import os
+import re
+from typing import Any, List, Optional, Tuple
+
+from google.genai import types
+
+from assistant.logger import get_logger
+from assistant.metrics import registry
+
+logger = get_logger(__name__)
+
+# Prefijo con el que ADK presenta a un agente lo que hicieron los demás.
+CONTEXT_PREFIX = "For context:"
+TRUNCATED_MARK = " … [recortado]"
+_TAG = re.compile(r"<[^>]+>")
+_MARKER_LINE = re.compile(r"^<<<[A-Z_]+>>>$")
+_SAID_PREFIX = re.compile(r"^\[[^\]]+\] said:\s*")
+
+_compactions = registry.counter(
+    "assistant_history_compactions_total",
+    "Historiales compactados antes de llamar al modelo por agente y acción.",
+    ("agent", "action"),
+)
+_history_tokens = registry.histogram(
+    "assistant_history_tokens",
+    "Tokens estimados del historial enviado al modelo, antes y después de compactar.",
+    ("agent", "stage"),
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+
+Turn = List[types.Content]
+
+
+def estimate_tokens(contents: List[types.Content]) -> int:
+    """
+    Tokens aproximados del historial (caracteres/4, la regla que documenta Google).
+    """
+    chars = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            if part.function_call:
+                chars += len(
+                    json.dumps(part.function_call.args or {}, ensure_ascii=False)
+                )
+            if part.function_response:
+                chars += len(
+                    json.dumps(
+                        part.function_response.response or {},
+                        ensure_ascii=False,
+                        default=str,
+                    )
+                )
+    return chars // 4
+
+
+def _is_user_message(content: types.Content) -> bool:
+    """
+    Mensaje escrito por el usuario (no contexto de otro agente ni respuesta de
+    herramienta).
+    """
+    if content.role != "user" or not content.parts:
+        return False
+    first = content.parts[0]
+    return (
+        first.text is not None
+        and not first.text.startswith(CONTEXT_PREFIX)
+        and not any(part.function_response for part in content.parts)
+    )
+
+
+def split_turns(
+    contents: List[types.Content],
+) -> Tuple[List[types.Content], List[Turn]]:
+    """
+    Divide el historial en (prefijo, turnos); cada turno empieza en un mensaje del
+    usuario.
+    """
+    prefix: List[types.Content] = []
+    turns: List[Turn] = []
+    for content in contents:
+        if _is_user_message(content):
+            turns.append([content])
+        elif turns:
+            turns[-1].append(content)
+        else:
+            prefix.append(content)
+    return prefix, turns
+
+
+def _shorten(text: str, limit: int) -> str:
+    """Recorta un texto conservando la línea final si es un marcador de cita de ADK."""
+    if len(text) <= limit:
+        return text
+    head, _, last_line = text.rpartition("\n")
+    if head and _MARKER_LINE.match(last_line):
+        return text[:limit] + TRUNCATED_MARK + "\n" + last_line
+    return text[:limit] + TRUNCATED_MARK
+
+
+def _visible_text(text: str) -> str:
+    """
+    Texto legible de una respuesta: sin marcadores de cita, prefijo de autor ni HTML.
+    """
+    lines = [line for line in text.splitlines() if not _MARKER_LINE.match(line.strip())]
+    text = _SAID_PREFIX.sub("", "\n".join(lines).strip())
+    return " ".join(_TAG.sub(" ", text).split())
+
+
+class HistoryCompactor:
+    """
+    Aplica el presupuesto de historial a la lista de contents de una llamada al modelo.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        max_turns: int = 12,
+        keep_turns: int = 4,
+        tool_output_chars: int = 400,
+        summary_chars: int = 1500,
+    ):
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.keep_turns = max(1, keep_turns)
+        self.tool_output_chars = tool_output_chars
+        self.summary_chars = summary_chars
+
+    def _within_budget(self, contents: List[types.Content], turns: int) -> bool:
+        return turns <= self.max_turns and estimate_tokens(contents) <= self.max_tokens
+
+    def _truncate_part(self, part: types.Part) -> types.Part:
+        limit = self.tool_output_chars
+        if part.function_response:
+            response = part.function_response.response or {}
+            serialized = json.dumps(response, ensure_ascii=False, default=str)
+            if len(serialized) <= limit:
+                return part
+            shortened = _shorten(str(response.get("result", serialized)), limit)
+            return part.model_copy(
+                update={
+                    "function_response": part.function_response.model_copy(
+                        update={"response": {"result": shortened}}
+                    )
+                }
+            )
+        if part.text and "tool returned result:" in part.text:
+            return part.model_copy(update={"text": _shorten(part.text, limit)})
+        return part
+
+    def _truncate(self, content: types.Content) -> types.Content:
+        parts = [self._truncate_part(part) for part in content.parts or []]
+        return content.model_copy(update={"parts": parts})
+
+    def _summarize(self, turns: List[Turn]) -> types.Content:
+        """
+        Resumen extractivo: pregunta y comienzo de la respuesta final de cada turno.
+        """
+        lines = []
+        for turn in turns:
+            question = " ".join((turn[0].parts[0].text or "").split())[:160]
+            answer = ""
+            for content in reversed(turn):
+                texts = [
+                    part.text
+                    for part in content.parts or []
+                    if part.text
+                    and not part.text.startswith(CONTEXT_PREFIX)
+                    and "tool returned result:" not in part.text
+                    and "called tool" not in part.text
+                ]
+                if content is not turn[0] and texts:
+                    answer = _visible_text(texts[-1])[:200]
+                    break
+            lines.append(
+                f"- Usuario: {question}" + (f" → Respuesta: {answer}" if answer else "")
+            )
+
+        # Si no cabe, se descartan primero los turnos más antiguos.
+        kept: List[str] = []
+        used = 0
+        for line in reversed(lines):
+            if used + len(line) > self.summary_chars and kept:
+                break
+            kept.insert(0, line)
+            used += len(line) + 1
+        omitted = len(lines) - len(kept)
+        header = f"Resumen de los {len(turns)} turnos anteriores de esta conversación"
+        if omitted:
+            header += f" (se omiten los {omitted} más antiguos)"
+        # Mismo prefijo que el contexto de otros agentes: el modelo lo trata como
+        # contexto y no como una pregunta nueva del usuario.
+        text = f"{CONTEXT_PREFIX} {header}:\n" + "\n".join(kept)
+        return types.Content(role="user", parts=[types.Part(text=text)])
+
+    def compact(self, contents: List[types.Content]) -> Tuple[List[types.Content], str]:
+        """Devuelve (contents, acción) con acción 'none', 'truncate' o 'summarize'."""
+        prefix, turns = split_turns(contents)
+        if self._within_budget(contents, len(turns)) or len(turns) <= self.keep_turns:
+            return contents, "none"
+
+        old, recent = turns[: -self.keep_turns], turns[-self.keep_turns :]
+        recent_contents = [content for turn in recent for content in turn]
+        truncated = [self._truncate(content) for turn in old for content in turn]
+        candidate = prefix + truncated + recent_contents
+        if self._within_budget(candidate, len(turns)):
+            return candidate, "truncate"
+        return prefix + [self._summarize(old)] + recent_contents, "summarize"
+
+
+def create_compactor() -> HistoryCompactor:
+    """Construye el compactador con la configuración del entorno."""
+    return HistoryCompactor(
+        max_tokens=int(os.getenv("COMPACTION_MAX_TOKENS", "3000")),
+        max_turns=int(os.getenv("COMPACTION_MAX_TURNS", "12")),
+        keep_turns=int(os.getenv("COMPACTION_KEEP_TURNS", "4")),
+        tool_output_chars=int(os.getenv("COMPACTION_TOOL_OUTPUT_CHARS", "400")),
+        summary_chars=int(os.getenv("COMPACTION_SUMMARY_CHARS", "1500")),
+    )
+
+
+def compaction_enabled() -> bool:
+    return os.getenv("COMPACTION_ENABLED", "true").lower() == "true"
+
+
+_compactor = create_compactor()
+
+
+def set_compactor(compactor: HistoryCompactor) -> None:
+    """Sustituye el compactador (p. ej. con otro presupuesto)."""
+    global _compactor
+    _compactor = compactor
+
+
+def compact_history(callback_context: Any, llm_request: Any) -> Optional[Any]:
+    """
+    before_model_callback: aplica el presupuesto de historial a llm_request.contents.
+    """
+    if not compaction_enabled():
+        return None
+    agent = callback_context.agent_name
+    _history_tokens.observe(
+        estimate_tokens(llm_request.contents), agent=agent, stage="before"
+    )
+    contents, action = _compactor.compact(llm_request.contents)
+    if action != "none":
+        llm_request.contents = contents
+        _compactions.inc(agent=agent, action=action)
+        logger.info(
+            "Historial compactado",
+            extra={"agent": agent, "action": action, "sampled": True},
+        )
+    _history_tokens.observe(estimate_tokens(contents), agent=agent, stage="after")
+    # None: la llamada al modelo continúa con el historial compactado.
+    return None
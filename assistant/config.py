@@ -0,0 +1,247 @@
+# config.py
+# Configuración central de los modelos: modelo por agente y niveles (tiers) por llamada.
+#
+# Cada agente tiene un modelo base, configurable por entorno, que es el de su nivel
+# "standard". Antes de cada llamada al modelo, la política de niveles
+# (select_model_tier, before_model_callback de los tres agentes) elige el modelo
+# concreto de esa llamada:
+#   - fast:     el orquestador (solo decide a quién transferir) y Blog_Expert (solo da
+#               formato a la salida de search_blog_posts),
+#   - standard: CV_Expert con preguntas sencillas,
+#   - strong:   CV_Expert con preguntas complejas: largas, con varias preguntas o que
+#               tocan a varios especialistas a la vez (el pre-router las considera
+#               ambiguas).
+# El nivel elegido se registra en el log, en la traza (atributo assistant.model_tier del
+# span llm) y en las métricas por nivel, para comparar latencia y tokens entre niveles.
+#
+# Variables de entorno:
+#   MODEL_DEFAULT              modelo base de los agentes (por defecto:
+#                              gemini-1.5-flash)
+#   MODEL_<AGENTE>             modelo base de un agente: MODEL_PERSONAL_ORCHESTRATOR,
+#                              MODEL_CV_EXPERT, MODEL_BLOG_EXPERT (por defecto:
+#                              MODEL_DEFAULT)
+#   MODEL_FAST                 modelo del nivel fast (por defecto: gemini-1.5-flash-8b)
+#   MODEL_STRONG               modelo del nivel strong (por defecto: gemini-1.5-pro)
+#   MODEL_TIER_POLICY          adaptive | off (por defecto: adaptive; off usa siempre el
+#                              modelo base)
+#   MODEL_ESCALATE_MIN_CHARS   longitud desde la que una pregunta al CV es compleja (por
+#                              defecto: 280)
+
+import os
+from typing import Any, Dict, NamedTuple, Optional, Protocol, Sequence
+
+from assistant.logger import get_logger
+from assistant.metrics import registry
+from assistant.resilience import last_user_text
+from assistant.routing import KeywordRouter
+
+logger = get_logger(__name__)
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+DEFAULT_FAST_MODEL = "gemini-1.5-flash-8b"
+DEFAULT_STRONG_MODEL = "gemini-1.5-pro"
+
+# Nivel de partida de cada agente en la política adaptativa.
+DEFAULT_AGENT_TIERS: Dict[str, str] = {
+    "Personal_Orchestrator": "fast",
+    "Blog_Expert": "fast",
+    "CV_Expert": "standard",
+}
+# Agentes que suben a strong con las preguntas complejas.
+DEFAULT_ESCALATING_AGENTS = ("CV_Expert",)
+
+# Claves de estado (temp: no se persisten en la sesión) con el nivel y el modelo de la
+# llamada en curso.
+TIER_STATE_KEY = "temp:model_tier"
+MODEL_STATE_KEY = "temp:model"
+
+_tier_calls = registry.counter(
+    "assistant_model_tier_calls_total",
+    "Llamadas al modelo por agente y nivel elegido (fast, standard, strong).",
+    ("agent", "tier"),
+)
+
+
+class TierDecision(NamedTuple):
+    """Nivel y modelo de una llamada, con el motivo de la elección."""
+
+    tier: str
+    model: str
+    reason: str
+
+
+class ModelConfig:
+    """Modelo base por agente y modelos de los niveles fast y strong."""
+
+    def __init__(
+        self,
+        base_models: Optional[Dict[str, str]] = None,
+        default_model: str = DEFAULT_MODEL,
+        fast_model: str = DEFAULT_FAST_MODEL,
+        strong_model: str = DEFAULT_STRONG_MODEL,
+    ):
+        self.base_models = dict(base_models or {})
+        self.default_model = default_model
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+
+    @classmethod
+    def from_env(cls) -> "ModelConfig":
+        default_model = os.getenv("MODEL_DEFAULT", DEFAULT_MODEL)
+        base_models = {}
+        for agent in DEFAULT_AGENT_TIERS:
+            model = os.getenv(f"MODEL_{agent.upper()}")
+            if model:
+                base_models[agent] = model
+        return cls(
+            base_models,
+            default_model=default_model,
+            fast_model=os.getenv("MODEL_FAST", DEFAULT_FAST_MODEL),
+            strong_model=os.getenv("MODEL_STRONG", DEFAULT_STRONG_MODEL),
+        )
+
+    def base_model(self, agent: str) -> str:
+        return self.base_models.get(agent, self.default_model)
+
+    def model_for(self, agent: str, tier: str) -> str:
+        if tier == "fast":
+            return self.fast_model
+        if tier == "strong":
+            return self.strong_model
+        return self.base_model(agent)
+
+
+class TierPolicy(Protocol):
+    """
+    Cualquier objeto con choose(agent, message) -> TierDecision puede elegir el nivel.
+    """
+
+    def choose(self, agent: str, message: str) -> TierDecision: ...
+
+
+class FixedTierPolicy:
+    """Política desactivada: cada agente usa siempre su modelo base."""
+
+    def __init__(self, config: ModelConfig):
+        self.config = config
+
+    def choose(self, agent: str, message: str) -> TierDecision:
+        return TierDecision("standard", self.config.base_model(agent), "fixed")
+
+
+class AdaptiveTierPolicy:
+    """
+    Nivel por agente (DEFAULT_AGENT_TIERS) y escalado a strong de las preguntas
+    complejas en los agentes de `escalating_agents`. Una pregunta es compleja si es
+    larga, contiene varias preguntas o el pre-router la asigna a más de un especialista.
+    """
+
+    def __init__(
+        self,
+        config: ModelConfig,
+        agent_tiers: Optional[Dict[str, str]] = None,
+        escalating_agents: Sequence[str] = DEFAULT_ESCALATING_AGENTS,
+        min_chars: int = 280,
+        router: Optional[KeywordRouter] = None,
+    ):
+        self.config = config
+        self.agent_tiers = dict(agent_tiers or DEFAULT_AGENT_TIERS)
+        self.escalating_agents = frozenset(escalating_agents)
+        self.min_chars = min_chars
+        self.router = router or KeywordRouter()
+
+    def complexity(self, message: str) -> Optional[str]:
+        """Motivo por el que la pregunta es compleja, o None si es sencilla."""
+        if len(message) >= self.min_chars:
+            return "long_message"
+        if message.count("?") >= 2:
+            return "multiple_questions"
+        if self.router.route(message).reason == "ambiguous":
+            return "ambiguous"
+        return None
+
+    def choose(self, agent: str, message: str) -> TierDecision:
+        tier = self.agent_tiers.get(agent, "standard")
+        reason = "agent_default"
+        if agent in self.escalating_agents and message:
+            complexity = self.complexity(message)
+            if complexity is not None:
+                tier, reason = "strong", complexity
+        return TierDecision(tier, self.config.model_for(agent, tier), reason)
+
+
+_model_config = ModelConfig.from_env()
+
+
+def get_model_config() -> ModelConfig:
+    return _model_config
+
+
+def agent_model(agent: str) -> str:
+    """Modelo base de un agente (el que ADK usa si la política no elige otro)."""
+    return _model_config.base_model(agent)
+
+
+def create_tier_policy(kind: Optional[str] = None) -> TierPolicy:
+    """Construye la política de niveles según MODEL_TIER_POLICY."""
+    kind = (kind or os.getenv("MODEL_TIER_POLICY", "adaptive")).lower()
+    if kind == "off":
+        return FixedTierPolicy(_model_config)
+    if kind != "adaptive":
+        raise ValueError(f"MODEL_TIER_POLICY no soportada: '{kind}'")
+    return AdaptiveTierPolicy(
+        _model_config, min_chars=int(os.getenv("MODEL_ESCALATE_MIN_CHARS", "280"))
+    )
+
+
+_tier_policy: TierPolicy = create_tier_policy()
+
+
+def get_tier_policy() -> TierPolicy:
+    return _tier_policy
+
+
+def set_tier_policy(policy: TierPolicy) -> None:
+    """Sustituye la política de niveles (p. ej. en tests)."""
+    global _tier_policy
+    _tier_policy = policy
+
+
+def select_model_tier(callback_context: Any, llm_request: Any) -> Optional[Any]:
+    """
+    before_model_callback: fija el modelo de la llamada según la política de niveles.
+    Va antes de cache_prompt_prefix, que registra un prefijo por modelo.
+    """
+    agent = callback_context.agent_name
+    decision = _tier_policy.choose(agent, last_user_text(llm_request))
+    llm_request.model = decision.model
+    callback_context.state[TIER_STATE_KEY] = decision.tier
+    callback_context.state[MODEL_STATE_KEY] = decision.model
+    _tier_calls.inc(agent=agent, tier=decision.tier)
+    logger.info(
+        "Nivel de modelo elegido",
+        extra={
+            "agent": agent,
+            "tier": decision.tier,
+            "model": decision.model,
+            "reason": decision.reason,
+        },
+    )
+    # None: la llamada al modelo continúa.
+    return None
+
+
+def record_model_tier(callback_context: Any, llm_response: Any) -> Optional[Any]:
+    """
+    after_model_callback: anota el nivel en la respuesta para que lo recoja la traza.
+    """
+    metadata = llm_response.custom_metadata or {}
+    tier = callback_context.state.get(TIER_STATE_KEY)
+    # Las respuestas degradadas no salen del modelo: no cuentan para ningún nivel.
+    if tier is not None and not metadata.get("degraded"):
+        llm_response.custom_metadata = {
+            **metadata,
+            "model_tier": tier,
+            "model": callback_context.state.get(MODEL_STATE_KEY),
+        }
+    return None
@@ -0,0 +1,442 @@
+# cv_index.py
+# Índice del CV por secciones y palabras clave para recuperar solo los fragmentos
+# relevantes.
+#
+# En lugar de enviar el CV completo en la instrucción de CV_Expert en cada pregunta, el
+# CV se divide en fragmentos direccionables (cada experiencia, formación, proyecto...
+# por separado) y la herramienta query_cv devuelve únicamente los que necesita la
+# respuesta.
+#
+# El índice en uso es una instantánea inmutable que se sustituye entera al recargar el
+# CV (vigilando el mtime de CV_PATH o desde el endpoint de administración): cada
+# petición fija la instantánea con la que empezó (use_cv_index) y la sigue usando aunque
+# haya otra nueva.
+#
+# Uso desde línea de comandos:
+#   python -m assistant.cv_index outline [--cv nginx/cv.json]
+#   python -m assistant.cv_index query --section experiencia --keywords "python"
+#
+# Variables de entorno:
+#   CV_PATH                     ruta del cv.json (por defecto, nginx/cv.json)
+#   CV_RELOAD_INTERVAL_SECONDS  cada cuánto se comprueba si el CV cambió (0 = no se
+#                               vigila)
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from assistant.logger import get_logger
+from assistant.metrics import registry
+from assistant.text_utils import normalize_text, tokenize
+
+logger = get_logger(__name__)
+
+_reloads = registry.counter(
+    "assistant_cv_reloads_total",
+    "Recargas del CV por resultado (changed, unchanged, error).",
+    ("result",),
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Sección canónica -> nombres de clave habituales (JSON Resume, español e inglés).
+SECTION_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "perfil": (
+        "perfil",
+        "basics",
+        "profile",
+        "about",
+        "summary",
+        "resumen",
+        "personal",
+        "contact",
+        "contacto",
+        "name",
+        "nombre",
+        "title",
+        "titulo",
+        "label",
+        "email",
+        "phone",
+        "telefono",
+        "location",
+        "ubicacion",
+        "url",
+        "profiles",
+    ),
+    "experiencia": (
+        "experiencia",
+        "experience",
+        "work",
+        "jobs",
+        "employment",
+        "trabajo",
+        "trabajos",
+        "empleos",
+        "laboral",
+    ),
+    "habilidades": (
+        "habilidades",
+        "skills",
+        "technologies",
+        "tecnologias",
+        "stack",
+        "competencias",
+        "tools",
+        "herramientas",
+    ),
+    "formacion": ("formacion", "education", "educacion", "estudios", "studies"),
+    "proyectos": ("proyectos", "projects", "portfolio", "portafolio"),
+    "certificaciones": (
+        "certificaciones",
+        "certificates",
+        "certifications",
+        "courses",
+        "cursos",
+    ),
+    "idiomas": ("idiomas", "languages", "lenguas"),
+}
+_ALIAS_TO_SECTION = {
+    alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases
+}
+
+
+def resolve_section(name: str) -> str:
+    """Traduce un nombre de sección o de clave del CV a su sección canónica."""
+    key = normalize_text(name).strip().replace(" ", "_")
+    return _ALIAS_TO_SECTION.get(key, key)
+
+
+def _compact(value: Any) -> str:
+    """JSON sin sangría ni espacios: mismo contenido, muchos menos tokens."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def split_cv(cv_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Divide el CV en fragmentos {"id", "section", "text"}.
+
+    - Los valores sueltos del nivel superior (nombre, título...) forman el perfil.
+    - Las listas de objetos dan un fragmento por elemento (cada puesto, cada
+      estudio...).
+    - Las listas de valores simples y los objetos forman un único fragmento.
+    """
+    fragments: List[Dict[str, Any]] = []
+    profile: Dict[str, Any] = {}
+
+    for key, value in cv_data.items():
+        section = resolve_section(key)
+        if not isinstance(value, (dict, list)):
+            profile[key] = value
+            continue
+        if section == "perfil" and isinstance(value, dict):
+            profile.update(value)
+            continue
+        if isinstance(value, list) and any(
+            isinstance(item, (dict, list)) for item in value
+        ):
+            for position, item in enumerate(value):
+                fragments.append(
+                    {
+                        "id": f"{section}/{position}",
+                        "section": section,
+                        "text": _compact(item),
+                    }
+                )
+        else:
+            fragments.append(
+                {"id": section, "section": section, "text": _compact(value)}
+            )
+
+    if profile:
+        fragments.insert(
+            0, {"id": "perfil", "section": "perfil", "text": _compact(profile)}
+        )
+    return fragments
+
+
+class CVIndex:
+    """Fragmentos del CV con un índice invertido BM25 precalculado."""
+
+    def __init__(self, fragments: List[Dict[str, Any]]):
+        self.fragments = fragments
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._lengths: List[int] = []
+        for position, fragment in enumerate(fragments):
+            # La sección forma parte del texto indexado: "experiencia python" puntúa
+            # ambos.
+            terms = Counter(tokenize(f"{fragment['section']} {fragment['text']}"))
+            self._lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                self._postings[term][position] = frequency
+        self._average_length = (
+            sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        )
+        # Cambia si cambia el contenido del CV (las cachés de respuestas la usan como
+        # clave).
+        self.version = hashlib.sha256(
+            json.dumps(fragments, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+    @classmethod
+    def build(cls, cv_data: Dict[str, Any]) -> "CVIndex":
+        return cls(split_cv(cv_data))
+
+    def sections(self) -> Dict[str, int]:
+        """
+        Secciones disponibles y número de fragmentos de cada una, en orden de aparición.
+        """
+        counts: Dict[str, int] = {}
+        for fragment in self.fragments:
+            counts[fragment["section"]] = counts.get(fragment["section"], 0) + 1
+        return counts
+
+    def outline(self) -> str:
+        """Resumen de una línea de las secciones, para la instrucción del agente."""
+        return ", ".join(
+            f"{section} ({count})" for section, count in self.sections().items()
+        )
+
+    def _scores(self, keywords: str, candidates: List[int]) -> Dict[int, float]:
+        total = len(self.fragments)
+        allowed = set(candidates)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(keywords)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings.items():
+                if position not in allowed:
+                    continue
+                norm = (
+                    1 - BM25_B + BM25_B * self._lengths[position] / self._average_length
+                )
+                scores[position] += (
+                    idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+                )
+        return scores
+
+    def query(
+        self, section: str = "", keywords: str = "", limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Devuelve los fragmentos relevantes.
+
+        - Solo sección: todos sus fragmentos.
+        - Solo palabras clave: los `limit` mejores de todo el CV.
+        - Ambas: los fragmentos de la sección ordenados por relevancia; si ninguno
+          coincide con las palabras clave, la sección completa.
+        """
+        candidates = list(range(len(self.fragments)))
+        if section:
+            wanted = resolve_section(section)
+            candidates = [
+                i for i in candidates if self.fragments[i]["section"] == wanted
+            ]
+            if not candidates:
+                return []
+
+        if keywords:
+            scores = self._scores(keywords, candidates)
+            if scores:
+                ranked = sorted(scores, key=lambda i: (-scores[i], i))[:limit]
+                return [
+                    dict(self.fragments[i], score=round(scores[i], 4)) for i in ranked
+                ]
+        return [dict(self.fragments[i]) for i in candidates] if section else []
+
+    def __len__(self) -> int:
+        return len(self.fragments)
+
+
+# --- Instantánea en uso, recarga y fijación por petición ---
+
+_cached_index: Optional[CVIndex] = None
+_pinned_index: ContextVar[Optional[CVIndex]] = ContextVar(
+    "pinned_cv_index", default=None
+)
+_reload_lock = threading.Lock()
+_reload_listeners: List[Callable[[CVIndex], None]] = []
+
+
+def cv_path() -> str:
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    return os.getenv("CV_PATH", os.path.join(project_root, "nginx", "cv.json"))
+
+
+def get_cv_index() -> CVIndex:
+    """
+    Índice de la petición en curso (el fijado con use_cv_index) o, si no hay, la
+    instantánea más reciente. La primera vez se construye a partir del CV local (con sus
+    fallbacks).
+    """
+    global _cached_index
+    pinned = _pinned_index.get()
+    if pinned is not None:
+        return pinned
+    if _cached_index is None:
+        from assistant.tools import load_cv_data
+
+        with _reload_lock:
+            if _cached_index is None:
+                _cached_index = CVIndex.build(json.loads(load_cv_data()))
+                logger.info(
+                    "Índice del CV construido", extra={"fragments": len(_cached_index)}
+                )
+    return _cached_index
+
+
+@contextmanager
+def use_cv_index(index: CVIndex) -> Iterator[CVIndex]:
+    """Fija `index` para el contexto actual (y las tareas que se creen dentro)."""
+    token = _pinned_index.set(index)
+    try:
+        yield index
+    finally:
+        _pinned_index.reset(token)
+
+
+def on_cv_reload(listener: Callable[[CVIndex], None]) -> None:
+    """Registra una función que recibe cada nueva instantánea tras una recarga."""
+    _reload_listeners.append(listener)
+
+
+def reload_cv_index() -> bool:
+    """
+    Relee el CV y, si su contenido cambió, sustituye la instantánea en uso. Un CV
+    ilegible (a medio escribir, JSON inválido) no sustituye a la anterior. Devuelve si
+    cambió.
+    """
+    global _cached_index
+    path = cv_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = CVIndex.build(json.load(f))
+    except (OSError, ValueError) as e:
+        _reloads.inc(result="error")
+        logger.error("No se pudo recargar el CV", extra={"path": path, "error": str(e)})
+        return False
+
+    with _reload_lock:
+        previous = _cached_index
+        if previous is not None and previous.version == index.version:
+            _reloads.inc(result="unchanged")
+            return False
+        _cached_index = index
+        for listener in _reload_listeners:
+            listener(index)
+    _reloads.inc(result="changed")
+    logger.info(
+        "CV recargado",
+        extra={
+            "path": path,
+            "fragments": len(index),
+            "version": index.version,
+            "previous_version": previous.version if previous is not None else None,
+        },
+    )
+    return True
+
+
+def reset_cv_index() -> None:
+    """Olvida el índice cargado (tests o tras actualizar el CV)."""
+    global _cached_index
+    _cached_index = None
+
+
+class CVWatcher:
+    """
+    Hilo que comprueba cada `interval` segundos el mtime del CV y lo recarga si cambia.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._signature = self._stat()
+
+    @staticmethod
+    def _stat() -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(cv_path())
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+        """Recarga el CV si su fichero cambió desde la última comprobación."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        return reload_cv_index()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.error("Error vigilando el CV", exc_info=True)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="cv-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+def start_cv_watcher() -> Optional[CVWatcher]:
+    """
+    Arranca la vigilancia del CV según CV_RELOAD_INTERVAL_SECONDS (None si está
+    desactivada).
+    """
+    interval = float(os.getenv("CV_RELOAD_INTERVAL_SECONDS", "30"))
+    if interval <= 0:
+        return None
+    watcher = CVWatcher(interval)
+    watcher.start()
+    return watcher
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Índice por secciones del CV.")
+    parser.add_argument(
+        "--cv", help="Ruta de un cv.json (por defecto, el del proyecto)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("outline", help="Muestra las secciones del CV")
+    query = subparsers.add_parser("query", help="Recupera fragmentos del CV")
+    query.add_argument("--section", default="")
+    query.add_argument("--keywords", default="")
+    query.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.cv:
+        with open(args.cv, "r", encoding="utf-8") as f:
+            index = CVIndex.build(json.load(f))
+    else:
+        index = get_cv_index()
+
+    if args.command == "outline":
+        print(index.outline())
+        return
+    for fragment in index.query(args.section, args.keywords, args.limit):
+        print(f"[{fragment['id']}] {fragment['text']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+# faq.py
+# Respuestas precalculadas para las preguntas más frecuentes, servidas sin llamar al
+# LLM.
+#
+# Preguntas como "¿Quién eres?" o "¿Tienes blog?" llegan constantemente como primer
+# mensaje y su respuesta solo cambia cuando cambia el contenido (CV o índice del blog).
+# Un paso offline las ejecuta por la cadena real de agentes y guarda el HTML de cada
+# respuesta junto con la versión del contenido. En ejecución, un primer turno cuya
+# pregunta normalizada coincide con una de ellas (o con una de sus variantes) se
+# responde con una búsqueda en un diccionario, siempre que la versión del almacén sea la
+# del contenido en uso.
+#
+# Uso (necesita GOOGLE_API_KEY: las respuestas las genera Gemini):
+#   python -m assistant.faq generate [--output data/faq_answers.json]
+#   python -m assistant.faq show [--output data/faq_answers.json]
+#
+# El proceso en marcha relee el fichero cuando cambia su mtime: tras regenerarlo no hace
+# falta reiniciar.
+#
+# Variables de entorno:
+#   FAQ_ENABLED      true | false (por defecto: true)
+#   FAQ_STORE_PATH   fichero del almacén (por defecto: data/faq_answers.json)
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from assistant.logger import get_logger
+from assistant.metrics import registry
+from assistant.text_utils import tokenize
+
+logger = get_logger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "data",
+    "faq_answers.json",
+)
+# Cada cuánto se comprueba, como mucho, si el fichero del almacén cambió.
+STORE_CHECK_INTERVAL = 5.0
+
+# Pregunta canónica (la que se envía a los agentes al generar) -> variantes que reciben
+# la misma respuesta. Las variantes deben pedir exactamente lo mismo, no algo parecido:
+# el resto de paráfrasis las cubre la caché semántica de respuestas.
+FAQ_QUESTIONS: Dict[str, Tuple[str, ...]] = {
+    "¿Quién eres?": (
+        "Quién eres",
+        "Hola, ¿quién eres?",
+        "Preséntate",
+        "¿Quién es Sergio?",
+    ),
+    "¿Cuál es tu experiencia?": (
+        "¿Cuál es tu experiencia profesional?",
+        "Háblame de tu experiencia",
+        "¿Qué experiencia tienes?",
+    ),
+    "¿Tienes blog?": ("¿Tienes un blog?", "¿Escribes en algún blog?"),
+    "¿Cuáles son tus habilidades?": (
+        "¿Qué habilidades tienes?",
+        "¿Qué tecnologías dominas?",
+    ),
+    "¿En qué proyectos has trabajado?": ("¿Qué proyectos has hecho?",),
+    "¿Qué formación tienes?": ("¿Qué has estudiado?", "¿Cuál es tu formación?"),
+}
+
+_lookups = registry.counter(
+    "assistant_faq_lookups_total",
+    "Búsquedas de primer turno en las respuestas precalculadas (hit, miss, stale).",
+    ("result",),
+)
+
+
+def faq_key(text: str) -> str:
+    """
+    Clave de una pregunta: minúsculas, sin tildes ni signos, conservando todas las
+    palabras.
+    """
+    return " ".join(tokenize(text, drop_stopwords=False))
+
+
+class FAQAnswer(NamedTuple):
+    question: str
+    answer: str
+    author: Optional[str]
+
+
+class FAQStore:
+    """
+    Respuestas precalculadas de una versión del contenido, indexadas por pregunta
+    normalizada.
+    """
+
+    def __init__(
+        self,
+        version: Optional[str],
+        answers: Sequence[FAQAnswer],
+        variants: Optional[Dict[str, Sequence[str]]] = None,
+        generated_at: Optional[str] = None,
+    ):
+        self.version = version
+        self.answers = list(answers)
+        self.variants = {
+            question: list((variants or {}).get(question, ()))
+            for question, _, _ in answers
+        }
+        self.generated_at = generated_at
+        self._by_key: Dict[str, FAQAnswer] = {}
+        for entry in self.answers:
+            for text in (entry.question, *self.variants[entry.question]):
+                self._by_key[faq_key(text)] = entry
+
+    def lookup(self, message: str, version: str) -> Optional[FAQAnswer]:
+        """
+        Respuesta de la pregunta si está en el almacén y es de la versión `version`.
+        """
+        entry = self._by_key.get(faq_key(message))
+        if entry is None:
+            _lookups.inc(result="miss")
+            return None
+        if version != self.version:
+            _lookups.inc(result="stale")
+            return None
+        _lookups.inc(result="hit")
+        return entry
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "version": self.version,
+            "generated_at": self.generated_at,
+            "answers": [
+                {
+                    "question": entry.question,
+                    "variants": self.variants[entry.question],
+                    "answer": entry.answer,
+                    "author": entry.author,
+                }
+                for entry in self.answers
+            ],
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Escribe el almacén de forma atómica (el proceso en marcha nunca lee uno a
+        medias).
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FAQStore":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        answers = [
+            FAQAnswer(item["question"], item["answer"], item.get("author"))
+            for item in data["answers"]
+        ]
+        variants = {
+            item["question"]: item.get("variants", []) for item in data["answers"]
+        }
+        return cls(data["version"], answers, variants, data.get("generated_at"))
+
+
+# --- Almacén del proceso (se relee si el fichero cambia) ---
+
+_EMPTY_STORE = FAQStore(None, [])
+_store: FAQStore = _EMPTY_STORE
+_store_signature: Optional[Tuple[int, int]] = None
+_store_checked_at = float("-inf")
+_store_lock = threading.Lock()
+
+
+def faq_enabled() -> bool:
+    return os.getenv("FAQ_ENABLED", "true").lower() == "true"
+
+
+def store_path() -> str:
+    return os.getenv("FAQ_STORE_PATH", DEFAULT_STORE_PATH)
+
+
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_faq_store() -> FAQStore:
+    """
+    Almacén de FAQ_STORE_PATH; comprueba si cambió como mucho cada STORE_CHECK_INTERVAL.
+    """
+    global _store, _store_signature, _store_checked_at
+    now = time.monotonic()
+    if now - _store_checked_at < STORE_CHECK_INTERVAL:
+        return _store
+    with _store_lock:
+        if now - _store_checked_at < STORE_CHECK_INTERVAL:
+            return _store
+        _store_checked_at = now
+        path = store_path()
+        signature = _stat(path)
+        if signature == _store_signature:
+            return _store
+        _store_signature = signature
+        if signature is None:
+            _store = _EMPTY_STORE
+            return _store
+        try:
+            _store = FAQStore.load(path)
+            logger.info(
+                "Respuestas precalculadas cargadas",
+                extra={"path": path, "answers": len(_store), "version": _store.version},
+            )
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(
+                "Error al cargar las respuestas precalculadas",
+                extra={"path": path, "error": str(e)},
+            )
+            _store = _EMPTY_STORE
+    return _store
+
+
+def reset_faq_store() -> None:
+    """Olvida el almacén cargado para que la próxima búsqueda relea el fichero."""
+    global _store, _store_signature, _store_checked_at
+    with _store_lock:
+        _store, _store_signature, _store_checked_at = _EMPTY_STORE, None, float("-inf")
+
+
+# --- Generación offline ---
+
+
+async def generate_store(
+    questions: Dict[str, Tuple[str, ...]] = FAQ_QUESTIONS,
+) -> FAQStore:
+    """
+    Ejecuta cada pregunta canónica por la cadena real de agentes (en una sesión nueva,
+    como un primer turno) y devuelve el almacén con la versión del contenido usada.
+    """
+    from assistant.answer_cache import content_version
+    from assistant.resilience import DEGRADED_ANSWER
+    from assistant.services import invoke_agent_async, session_author
+
+    version = content_version()
+    answers: List[FAQAnswer] = []
+    for question in questions:
+        started = time.perf_counter()
+        answer, session_id = await invoke_agent_async(question, None, "faq_generator")
+        # Los agentes responden en HTML; otra cosa es la respuesta por defecto o un
+        # error.
+        if answer == DEGRADED_ANSWER or not answer.strip().startswith("<"):
+            raise RuntimeError(
+                f"Respuesta no válida para {question!r}: {answer[:80]!r}"
+            )
+        author = await session_author(session_id, "faq_generator")
+        answers.append(FAQAnswer(question, answer, author))
+        logger.info(
+            "Respuesta precalculada",
+            extra={
+                "question": question,
+                "author": author,
+                "seconds": round(time.perf_counter() - started, 3),
+            },
+        )
+    if content_version() != version:
+        raise RuntimeError(
+            "El contenido cambió durante la generación; vuelve a generar."
+        )
+    return FAQStore(
+        version,
+        answers,
+        questions,
+        generated_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    )
+
+
+def _print_store(store: FAQStore, current_version: str) -> None:
+    state = "vigente" if store.version == current_version else "desactualizado"
+    print(f"Versión: {store.version} ({state}; contenido actual: {current_version})")
+    print(f"Generado: {store.generated_at}")
+    for entry in store.answers:
+        variants = ", ".join(store.variants[entry.question])
+        print(f"- {entry.question} [{entry.author}] ({len(entry.answer)} caracteres)")
+        if variants:
+            print(f"    variantes: {variants}")
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Respuestas precalculadas de las FAQ.")
+    # --output va detrás del subcomando (generate --output x.json), como en la ayuda.
+    store_option = argparse.ArgumentParser(add_help=False)
+    store_option.add_argument(
+        "--output",
+        default=None,
+        help="Fichero del almacén (por defecto: FAQ_STORE_PATH)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser(
+        "generate",
+        parents=[store_option],
+        help="Regenera las respuestas con los agentes",
+    )
+    subparsers.add_parser(
+        "show", parents=[store_option], help="Muestra el almacén y si está vigente"
+    )
+    args = parser.parse_args(argv)
+    path = args.output or store_path()
+
+    from assistant.answer_cache import content_version
+
+    if args.command == "show":
+        if not os.path.exists(path):
+            # Código de salida distinto de cero y una sola línea, sin traza.
+            raise SystemExit(
+                f"❌ No existe el almacén de FAQ {path}; genéralo con "
+                "`python -m assistant.faq generate`."
+            )
+        _print_store(FAQStore.load(path), content_version())
+        return
+
+    # Las respuestas deben salir de los agentes, no de este almacén ni de la caché.
+    os.environ["FAQ_ENABLED"] = "false"
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    store = asyncio.run(generate_store())
+    store.save(path)
+    print(f"{len(store)} respuestas guardadas en {path}")
+    _print_store(store, content_version())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# logger.py
+# Logging estructurado (JSON) y no bloqueante para el camino caliente.
+#
+# print() escribe de forma síncrona en stdout desde el event loop: con un driver de logs
+# de Docker lento, cada línea detiene todas las peticiones en curso. Aquí los registros
+# se encolan sin bloquear (QueueHandler) y un hilo aparte (QueueListener) los serializa
+# a JSON y los escribe. Si la cola se llena, los registros se descartan y se cuentan.
+#
+# - Correlación: cada línea lleva el trace_id de la petición y su request_id (el
+#   session_id de la conversación), tomados de la traza en curso.
+# - Muestreo: las líneas de alto volumen se marcan con extra={"sampled": True} y solo se
+#   registra la fracción LOG_SAMPLE_RATE (los WARNING y superiores nunca se muestrean).
+# - Privacidad: las consultas del usuario se registran como longitud + hash
+#   (query_fields) salvo que LOG_INCLUDE_QUERIES=true.
+#
+# Variables de entorno:
+#   LOG_LEVEL            DEBUG | INFO | WARNING | ERROR (por defecto: INFO)
+#   LOG_FORMAT           json | text (por defecto: json)
+#   LOG_SAMPLE_RATE      fracción de líneas de alto volumen registradas (por defecto:
+#                        0.1)
+#   LOG_QUEUE_SIZE       registros pendientes antes de descartar (por defecto: 10000)
+#   LOG_INCLUDE_QUERIES  registrar las consultas en claro (por defecto: false)
+
+import atexit
+import copy
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from assistant.metrics import registry
+from assistant.tracing import Trace, current_trace, use_trace
+
+ROOT_LOGGER = "assistant"
+# Atributos propios de LogRecord: el resto de campos de `extra` van al JSON.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "sampled",
+    "taskName",
+}
+
+_dropped = registry.counter(
+    "assistant_log_records_dropped_total",
+    "Registros de log descartados porque la cola estaba llena.",
+)
+
+
+def query_fields(text: str, name: str = "query") -> Dict[str, Any]:
+    """
+    Campos de log para un texto del usuario: longitud y hash (o el texto si se permite).
+    """
+    if os.getenv("LOG_INCLUDE_QUERIES", "false").lower() == "true":
+        return {name: text}
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+    return {f"{name}_chars": len(text), f"{name}_hash": digest}
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos de `extra` al nivel superior."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legible para desarrollo: nivel, logger, mensaje y campos clave=valor."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(
+            f"{key}={value}"
+            for key, value in record.__dict__.items()
+            if key not in _RESERVED and not key.startswith("_")
+        )
+        line = f"{record.levelname:<7} {record.name}: {record.getMessage()}"
+        line = f"{line} {fields}" if fields else line
+        return f"{line}\n{record.exc_text}" if record.exc_text else line
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Escribe en el sys.stdout vigente (uvicorn y pytest pueden sustituirlo)."""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    QueueHandler que nunca bloquea: muestrea, añade el contexto de la petición en el
+    hilo que registra (los contextvars no viajan al hilo del listener) y descarta si la
+    cola está llena.
+    """
+
+    def __init__(self, log_queue: "queue.Queue", sample_rate: float = 1.0):
+        super().__init__(log_queue)
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not super().filter(record):
+            return False
+        if getattr(record, "sampled", False) and record.levelno < logging.WARNING:
+            if random.random() >= self.sample_rate:
+                return False
+            record.sample_rate = self.sample_rate
+        return True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        trace = current_trace()
+        if trace is not None:
+            record.trace_id = trace.trace_id
+            request_id = trace.root.attributes.get("session.id")
+            if request_id:
+                record.request_id = request_id
+        # El mensaje y la traza de la excepción se resuelven aquí: los argumentos pueden
+        # no ser serializables ni seguros de usar desde otro hilo.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped.inc()
+
+
+_listener: Optional[QueueListener] = None
+_queue: Optional["queue.Queue"] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging() -> None:
+    """
+    Instala el handler con cola en el logger 'assistant' (una sola vez por proceso).
+    """
+    global _listener, _queue
+    with _configure_lock:
+        if _listener is not None:
+            return
+        _queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+        output = _StdoutHandler()
+        output.setFormatter(
+            TextFormatter()
+            if os.getenv("LOG_FORMAT", "json").lower() == "text"
+            else JsonFormatter()
+        )
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        root.addHandler(
+            AsyncQueueHandler(_queue, float(os.getenv("LOG_SAMPLE_RATE", "0.1")))
+        )
+        # El logger 'assistant' escribe por su cuenta: no duplicar en el logger raíz.
+        root.propagate = False
+        _listener = QueueListener(_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def flush_logs() -> None:
+    """Espera a que el listener haya escrito todos los registros encolados."""
+    if _queue is not None:
+        _queue.join()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger bajo 'assistant' (p. ej. get_logger(__name__) o get_logger("api"))."""
+    configure_logging()
+    if name != ROOT_LOGGER and not name.startswith(f"{ROOT_LOGGER}."):
+        name = f"{ROOT_LOGGER}.{name}"
+    return logging.getLogger(name)
+
+
+def log_request(trace: Trace) -> None:
+    """Una línea (muestreada) por petición con la duración y el estado de su traza."""
+    root = trace.root
+    with use_trace(trace):
+        get_logger("api").info(
+            "Petición atendida",
+            extra={
+                "route": root.attributes.get("http.route"),
+                "duration_ms": round(root.duration * 1000, 1),
+                "status": "error" if root.status_message else "ok",
+                "sampled": True,
+            },
+        )
@@ -0,0 +1,130 @@
+# offload.py
+# Ejecuta las herramientas síncronas en un pool de hilos acotado para no bloquear el
+# event loop.
+#
+# ADK invoca las herramientas desde _runner.run_async, dentro del event loop de uvicorn.
+# Una herramienta síncrona con I/O de red (p. ej. search_blog_posts) congelaría todas
+# las peticiones en curso, incluido /api/health. offload_tool la convierte en una
+# corrutina que:
+#   - se ejecuta en un ThreadPoolExecutor compartido y acotado,
+#   - respeta un límite de concurrencia propio de cada herramienta, que cuenta los hilos
+#     que siguen trabajando aunque quien los esperaba ya se haya rendido por timeout,
+#   - devuelve un mensaje de error si supera su timeout (espera en cola incluida).
+#
+# Límites configurables por variable de entorno (NOMBRE = nombre de la función en
+# mayúsculas):
+#   TOOL_THREAD_POOL_SIZE, TOOL_MAX_CONCURRENCY, TOOL_TIMEOUT_SECONDS,
+#   TOOL_<NOMBRE>_MAX_CONCURRENCY, TOOL_<NOMBRE>_TIMEOUT_SECONDS
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from assistant.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "20"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_THREAD_POOL_SIZE", "8")),
+    thread_name_prefix="tool-offload",
+)
+
+# Herramientas ejecutándose o esperando turno, por nombre.
+_in_flight: Dict[str, int] = {}
+
+
+def _env_override(tool_name: str, setting: str, default: Any, cast: Callable) -> Any:
+    value = os.getenv(f"TOOL_{tool_name.upper()}_{setting}")
+    return cast(value) if value else default
+
+
+def offload_tool(
+    func: Callable[..., Any],
+    *,
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Callable[..., Any]:
+    """
+    Envuelve una herramienta síncrona en una corrutina no bloqueante.
+
+    El wrapper conserva nombre, docstring y firma, así que ADK genera la misma
+    declaración de función para el modelo. Las herramientas que ya son asíncronas
+    se devuelven sin cambios.
+    """
+    if inspect.iscoroutinefunction(func) or getattr(func, "__offloaded__", False):
+        return func
+
+    name = func.__name__
+    limit = _env_override(
+        name, "MAX_CONCURRENCY", max_concurrency or DEFAULT_MAX_CONCURRENCY, int
+    )
+    deadline = _env_override(
+        name, "TIMEOUT_SECONDS", timeout or DEFAULT_TIMEOUT_SECONDS, float
+    )
+    # Los semáforos de asyncio pertenecen a un loop; se crea uno por loop (tests,
+    # workers).
+    semaphores: (
+        "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]"
+    ) = weakref.WeakKeyDictionary()
+
+    async def _run(loop: asyncio.AbstractEventLoop, args, kwargs) -> Any:
+        semaphore = semaphores.setdefault(loop, asyncio.Semaphore(limit))
+        await semaphore.acquire()
+        try:
+            # Copiamos el contexto para que los contextvars (request id, snapshots)
+            # lleguen al hilo.
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, func, *args, **kwargs)
+            future = loop.run_in_executor(_executor, call)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def _release(done: asyncio.Future) -> None:
+            # El turno se libera cuando el hilo termina, no cuando quien espera se
+            # rinde: con el upstream lento, los timeouts no deben dejar más llamadas
+            # bloqueadas que el límite. Se consulta la excepción para que no se registre
+            # como no recuperada.
+            if not done.cancelled():
+                done.exception()
+            semaphore.release()
+
+        future.add_done_callback(_release)
+        # shield: el timeout cancela la espera, no el futuro (ni, por tanto, el turno).
+        return await asyncio.shield(future)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        _in_flight[name] = _in_flight.get(name, 0) + 1
+        try:
+            return await asyncio.wait_for(_run(loop, args, kwargs), timeout=deadline)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "La herramienta superó su timeout",
+                extra={"tool": name, "timeout_seconds": deadline},
+            )
+            return (
+                "Lo siento, la consulta ha tardado demasiado. "
+                "Por favor, intenta de nuevo más tarde."
+            )
+        finally:
+            _in_flight[name] -= 1
+
+    wrapper.__offloaded__ = True
+    wrapper.max_concurrency = limit
+    wrapper.timeout = deadline
+    return wrapper
+
+
+def tools_in_flight() -> Dict[str, int]:
+    """Número de invocaciones en curso (ejecutándose o en cola) por herramienta."""
+    return dict(_in_flight)
@@ -0,0 +1,307 @@
+# prompt_cache.py
+# Caché del prefijo estático de los prompts: instrucción del agente y declaraciones de
+# herramientas.
+#
+# Cada llamada a Gemini reenvía la instrucción completa del agente (varios KB de texto
+# fijo; la de CV_Expert incluye además el resumen de la instantánea del CV) y las
+# declaraciones de sus herramientas. cache_prompt_prefix (before_model_callback de los
+# tres agentes) registra ese prefijo una vez en el backend de caché (la caché de
+# contexto explícita de Gemini) y en las llamadas siguientes envía solo su handle
+# (config.cached_content).
+#
+# El prefijo se identifica por un hash de su contenido (modelo, instrucción y
+# herramientas): cuando cambia el CV cambia la instrucción de CV_Expert y se registra un
+# prefijo nuevo. Cada handle se renueva antes de que caduque su TTL. Los handles
+# sustituidos no se borran: las llamadas en curso aún pueden usarlos, y caducan solos.
+#
+# Si el prefijo es demasiado corto para compensar (Gemini exige un mínimo de tokens por
+# modelo) o el backend falla, la llamada sale como siempre, con el prefijo completo.
+#
+# Variables de entorno:
+#   PROMPT_CACHE_BACKEND       off | gemini (por defecto: off)
+#   PROMPT_CACHE_TTL_SECONDS   vida de cada prefijo registrado (por defecto: 3600)
+#   PROMPT_CACHE_MIN_TOKENS    tokens estimados mínimos para registrar un prefijo (por
+#                              defecto: 1024)
+#   PROMPT_CACHE_RETRY_SECONDS espera tras un registro fallido antes de reintentarlo
+#                              (por defecto: 300)
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Protocol, Tuple
+
+from assistant.logger import get_logger
+from assistant.metrics import registry
+
+logger = get_logger(__name__)
+
+# Tiempo máximo para registrar un prefijo; después la llamada sigue sin caché.
+CREATE_TIMEOUT_SECONDS = 10.0
+
+_requests = registry.counter(
+    "assistant_prompt_cache_requests_total",
+    "Llamadas al modelo por agente y uso del prefijo en caché "
+    "(hit, created, refreshed, skipped, error).",
+    ("agent", "result"),
+)
+_saved_tokens = registry.counter(
+    "assistant_prompt_cache_saved_tokens_total",
+    "Tokens estimados de prefijo no reenviados gracias a la caché, por agente.",
+    ("agent",),
+)
+
+
+class PromptPrefix(NamedTuple):
+    """Parte estática de una petición al modelo y su versión (hash del contenido)."""
+
+    model: str
+    system_instruction: Any
+    tools: List[Any]
+    tool_config: Any
+    version: str
+    tokens: int
+
+
+class CachedPrefix(NamedTuple):
+    name: str
+    version: str
+    expires_at: float
+
+
+class PromptCacheBackend(Protocol):
+    """
+    Cualquier objeto que registre un prefijo y devuelva su handle puede actuar de
+    backend.
+    """
+
+    async def create(
+        self, prefix: PromptPrefix, ttl: float, display_name: str
+    ) -> str: ...
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    return value
+
+
+def prompt_prefix(llm_request: Any) -> Optional[PromptPrefix]:
+    """
+    Prefijo estático de la petición, o None si no tiene instrucción o ya usa una caché.
+    """
+    config = llm_request.config
+    if config is None or not config.system_instruction or config.cached_content:
+        return None
+    if not llm_request.model:
+        return None
+    tools = list(config.tools or [])
+    serialized = json.dumps(
+        {
+            "model": llm_request.model,
+            "system_instruction": _jsonable(config.system_instruction),
+            "tools": [_jsonable(tool) for tool in tools],
+            "tool_config": _jsonable(config.tool_config),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return PromptPrefix(
+        model=llm_request.model,
+        system_instruction=config.system_instruction,
+        tools=tools,
+        tool_config=config.tool_config,
+        version=hashlib.sha256(serialized.encode("utf-8")).hexdigest()[:16],
+        # caracteres/4, como en compaction.estimate_tokens
+        tokens=len(serialized) // 4,
+    )
+
+
+def use_cached_prefix(llm_request: Any, name: str) -> None:
+    """
+    Sustituye el prefijo por su handle: Gemini no admite ambos en la misma petición.
+    """
+    config = llm_request.config
+    config.cached_content = name
+    config.system_instruction = None
+    config.tools = None
+    config.tool_config = None
+
+
+class GeminiPromptCacheBackend:
+    """Caché de contexto explícita de Gemini (client.caches)."""
+
+    def __init__(self, client: Any = None):
+        self._client = client
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            from google import genai
+
+            # Misma configuración que los agentes (GOOGLE_API_KEY o Vertex AI por
+            # entorno).
+            self._client = genai.Client()
+        return self._client
+
+    async def create(self, prefix: PromptPrefix, ttl: float, display_name: str) -> str:
+        from google.genai import types
+
+        cached = await self.client.aio.caches.create(
+            model=prefix.model,
+            config=types.CreateCachedContentConfig(
+                display_name=display_name,
+                system_instruction=prefix.system_instruction,
+                tools=prefix.tools or None,
+                tool_config=prefix.tool_config,
+                ttl=f"{int(ttl)}s",
+            ),
+        )
+        return cached.name
+
+
+class PromptCache:
+    """
+    Handles de prefijo por (agente, modelo). Un prefijo nuevo o a punto de caducar se
+    registra una sola vez aunque lleguen varias llamadas a la vez.
+    """
+
+    def __init__(
+        self,
+        backend: PromptCacheBackend,
+        ttl: float = 3600.0,
+        min_tokens: int = 1024,
+        retry_after: float = 300.0,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.retry_after = retry_after
+        self._handles: Dict[Tuple[str, str], CachedPrefix] = {}
+        self._creating: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        self._failed_until: Dict[Tuple[str, str, str], float] = {}
+
+    def _usable(self, handle: Optional[CachedPrefix], version: str) -> bool:
+        # Se renueva con margen para no enviar un handle que caduca durante la llamada.
+        margin = min(60.0, self.ttl * 0.1)
+        return (
+            handle is not None
+            and handle.version == version
+            and time.monotonic() < handle.expires_at - margin
+        )
+
+    async def apply(self, agent: str, llm_request: Any) -> str:
+        """
+        Usa (registrándolo si hace falta) el prefijo en caché; devuelve el resultado.
+        """
+        prefix = prompt_prefix(llm_request)
+        if prefix is None or prefix.tokens < self.min_tokens:
+            return "skipped"
+        key = (agent, prefix.model)
+        handle = self._handles.get(key)
+        if self._usable(handle, prefix.version):
+            result = "hit"
+        else:
+            result = (
+                "created"
+                if handle is None or handle.version != prefix.version
+                else "refreshed"
+            )
+            handle = await self._register(agent, prefix)
+            if handle is None:
+                _requests.inc(agent=agent, result="error")
+                return "error"
+        use_cached_prefix(llm_request, handle.name)
+        _requests.inc(agent=agent, result=result)
+        _saved_tokens.inc(prefix.tokens, agent=agent)
+        return result
+
+    async def _register(
+        self, agent: str, prefix: PromptPrefix
+    ) -> Optional[CachedPrefix]:
+        flight_key = (agent, prefix.model, prefix.version)
+        if time.monotonic() < self._failed_until.get(flight_key, float("-inf")):
+            return None
+        loop = asyncio.get_running_loop()
+        future = self._creating.get(flight_key)
+        if future is not None and future.get_loop() is loop:
+            return await asyncio.shield(future)
+
+        future = loop.create_future()
+        self._creating[flight_key] = future
+        handle = None
+        try:
+            name = await asyncio.wait_for(
+                self.backend.create(
+                    prefix, self.ttl, display_name=f"{agent}-{prefix.version}"
+                ),
+                CREATE_TIMEOUT_SECONDS,
+            )
+            handle = CachedPrefix(name, prefix.version, time.monotonic() + self.ttl)
+            self._handles[(agent, prefix.model)] = handle
+            self._failed_until.pop(flight_key, None)
+            logger.info(
+                "Prefijo de prompt registrado en caché",
+                extra={
+                    "agent": agent,
+                    "version": prefix.version,
+                    "tokens": prefix.tokens,
+                },
+            )
+        except Exception as e:
+            self._failed_until[flight_key] = time.monotonic() + self.retry_after
+            logger.warning(
+                "No se pudo registrar el prefijo de prompt; se envía completo",
+                extra={"agent": agent, "version": prefix.version, "error": repr(e)},
+            )
+        finally:
+            # También si se cancela: quien espera en el shield no debe quedarse colgado.
+            self._creating.pop(flight_key, None)
+            future.set_result(handle)
+        return handle
+
+
+def create_prompt_cache(kind: Optional[str] = None) -> Optional[PromptCache]:
+    """
+    Construye la caché de prefijos según PROMPT_CACHE_BACKEND (None si está
+    desactivada).
+    """
+    kind = (kind or os.getenv("PROMPT_CACHE_BACKEND", "off")).lower()
+    if kind == "off":
+        return None
+    if kind != "gemini":
+        raise ValueError(f"PROMPT_CACHE_BACKEND no soportado: '{kind}'")
+    return PromptCache(
+        GeminiPromptCacheBackend(),
+        ttl=float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600")),
+        min_tokens=int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024")),
+        retry_after=float(os.getenv("PROMPT_CACHE_RETRY_SECONDS", "300")),
+    )
+
+
+_prompt_cache: Optional[PromptCache] = create_prompt_cache()
+
+
+def get_prompt_cache() -> Optional[PromptCache]:
+    return _prompt_cache
+
+
+def set_prompt_cache(prompt_cache: Optional[PromptCache]) -> None:
+    """
+    Sustituye la caché de prefijos (p. ej. con un backend local); None la desactiva.
+    """
+    global _prompt_cache
+    _prompt_cache = prompt_cache
+
+
+async def cache_prompt_prefix(callback_context: Any, llm_request: Any) -> Optional[Any]:
+    """
+    before_model_callback: envía el prefijo estático de la petición por su handle en
+    caché.
+    """
+    if _prompt_cache is not None:
+        await _prompt_cache.apply(callback_context.agent_name, llm_request)
+    # None: la llamada al modelo continúa.
+    return None
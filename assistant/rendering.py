@@ -0,0 +1,497 @@
+# rendering.py
+# Normalización y sanitización en el servidor del HTML que generan los agentes.
+#
+# Los agentes deben responder con HTML de un conjunto cerrado de etiquetas, pero el
+# modelo a veces envuelve la respuesta en bloques ```html, mezcla Markdown (**negrita**,
+# ## títulos, listas con "-", [texto](url)) o usa etiquetas y atributos fuera de ese
+# conjunto. HtmlNormalizer convierte su salida en HTML con solo h2, h3, p, ul, li,
+# strong, em, code y a (con un href http, https, mailto o relativo):
+#   - quita las vallas de código; un bloque de otro lenguaje queda como <p><code>,
+#   - traduce el Markdown a esas etiquetas y envuelve en <p> el texto suelto,
+#   - cambia las etiquetas equivalentes (h1 -> h2, b -> strong, ol -> ul...), descarta
+#     las demás (scripts y estilos con su contenido) y todos los atributos salvo el href
+#     de <a>,
+#   - escapa el texto y cierra las etiquetas que queden abiertas.
+# El frontend inserta el resultado tal cual.
+#
+# Es incremental: feed() devuelve la parte ya decidida y retiene solo lo que aún puede
+# cambiar de significado (una etiqueta a medias, un "**" sin pareja, el comienzo de una
+# línea), así que cada fragmento del streaming se procesa una sola vez. La concatenación
+# de lo emitido es idéntica a normalize_html() sobre el texto completo.
+
+import html
+import re
+from typing import List, Optional, Tuple
+
+ALLOWED_TAGS = frozenset(("h2", "h3", "p", "ul", "li", "strong", "em", "code", "a"))
+# Etiquetas fuera del conjunto que tienen una equivalente permitida.
+TAG_ALIASES = {
+    "h1": "h2",
+    "h4": "h3",
+    "h5": "h3",
+    "h6": "h3",
+    "b": "strong",
+    "i": "em",
+    "ol": "ul",
+}
+# Etiquetas que se descartan junto con su contenido.
+DROPPED_CONTENT_TAGS = frozenset(
+    (
+        "script",
+        "style",
+        "iframe",
+        "object",
+        "embed",
+        "template",
+        "svg",
+        "math",
+        "noscript",
+        "textarea",
+        "select",
+        "head",
+        "title",
+    )
+)
+# Lenguajes de las vallas cuyo contenido es la propia respuesta (se quita solo la
+# valla).
+HTML_FENCE_LANGUAGES = frozenset(("", "html", "htm"))
+
+_BLOCKS = frozenset(("h2", "h3", "p", "ul"))
+# Elementos que contienen texto directamente.
+_CONTAINERS = frozenset(("h2", "h3", "p", "li"))
+# Elementos que un bloque nuevo cierra: un bloque no puede ir dentro de ellos.
+_PHRASING = frozenset(("h2", "h3", "p", "strong", "em", "code", "a"))
+# Bloques de Markdown que terminan con la línea.
+_LINE_BLOCKS = frozenset(("h2", "h3", "li"))
+
+# Lo que se espera, como mucho, a que se complete una construcción antes de tomarla por
+# texto.
+_MAX_TAG = 2048
+_MAX_LINK = 1024
+_MAX_ENTITY = 12
+# Caracteres del comienzo de una línea necesarios para reconocer un bloque de Markdown.
+_LINE_LOOKAHEAD = 8
+
+_TAG = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>")
+_PARTIAL_TAG = re.compile(
+    r"</?(?:[a-zA-Z][a-zA-Z0-9]*(?:[^>\"']|\"[^\"]*\"|'[^']*')*(?:\"[^\"]*|'[^']*)?)?"
+)
+_ATTRIBUTE = re.compile(r"([^\s=/>]+)(?:\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s>]+))?")
+_ENTITY = re.compile(
+    r"&(?:#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[a-zA-Z][a-zA-Z0-9]{1,31});"
+)
+_PARTIAL_ENTITY = re.compile(r"&(?:#[xX]?[0-9a-fA-F]*|[a-zA-Z][a-zA-Z0-9]*)?")
+_LINK = re.compile(r"\[([^\]\n]{0,300})\]\(\s*([^)\s]{1,1000})\s*\)")
+_PARTIAL_LINK = re.compile(r"\[[^\]\n]*(?:\](?:\(\s*[^)\s]*\s*)?)?")
+_FENCE = re.compile(r"[ \t]*```([\w+-]*)[ \t]*(\n)?")
+_HEADING = re.compile(r"(#{1,6})[ \t]+")
+_LIST_ITEM = re.compile(r"(?:[-*+]|\d{1,3}[.)])[ \t]+")
+_RULE = re.compile(r"([-*_])(?:[ \t]*\1){2,}[ \t]*")
+_RULE_PREFIX = re.compile(r"[-*_][-*_ \t]*")
+_TEXT = re.compile(r"[^\n<&`*\[]+")
+_CODE_TEXT = re.compile(r"[^\n<&`]+")
+_SAFE_URL = re.compile(r"(?:https?:|mailto:|/|#)", re.IGNORECASE)
+_URL_IGNORED = re.compile(r"[\x00-\x20\x7f]+")
+
+
+def safe_href(url: str) -> Optional[str]:
+    """
+    URL de un enlace si su esquema es seguro (http, https, mailto o relativa), o None.
+    """
+    value = _URL_IGNORED.sub("", html.unescape(url))
+    return value if value and _SAFE_URL.match(value) else None
+
+
+class HtmlNormalizer:
+    """Convierte la salida del modelo, fragmento a fragmento, en HTML permitido."""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._out: List[str] = []
+        # Elementos abiertos: (etiqueta, abierta por Markdown o implícitamente).
+        self._stack: List[Tuple[str, bool]] = []
+        self._line_start = True
+        # None, "html" (valla que envuelve la respuesta) o "code" (bloque de código).
+        self._fence: Optional[str] = None
+        # Etiqueta cuyo contenido se está descartando (script, style...).
+        self._skip: Optional[re.Pattern] = None
+        self._prev = ""
+
+    def feed(self, text: str) -> str:
+        """Añade un fragmento y devuelve el HTML que ya no puede cambiar."""
+        self._buffer = self._buffer[self._pos :] + text.replace("\r", "")
+        self._pos = 0
+        self._process(final=False)
+        return self._take()
+
+    def close(self) -> str:
+        """
+        Procesa lo retenido, cierra las etiquetas abiertas y devuelve el resto del HTML.
+        """
+        self._process(final=True)
+        self._close_to(0)
+        return self._take()
+
+    # --- Salida y elementos abiertos ---
+
+    def _take(self) -> str:
+        out = "".join(self._out)
+        self._out.clear()
+        return out
+
+    def _consume(self, length: int) -> None:
+        if length > 0:
+            self._pos += length
+            self._prev = self._buffer[self._pos - 1]
+
+    def _find(self, tag: str, markdown: Optional[bool] = None) -> int:
+        for index in range(len(self._stack) - 1, -1, -1):
+            name, implicit = self._stack[index]
+            if name == tag and (markdown is None or implicit == markdown):
+                return index
+        return -1
+
+    def _open(self, tag: str, markdown: bool, attributes: str = "") -> None:
+        self._out.append(f"<{tag}{attributes}>")
+        self._stack.append((tag, markdown))
+
+    def _close_to(self, depth: int) -> None:
+        while len(self._stack) > depth:
+            tag, _ = self._stack.pop()
+            self._out.append(f"</{tag}>")
+
+    def _close(self, tag: str, markdown: Optional[bool] = None) -> None:
+        index = self._find(tag, markdown)
+        if index >= 0:
+            self._close_to(index)
+
+    def _close_top_while(self, tags: frozenset) -> None:
+        while self._stack and self._stack[-1][0] in tags:
+            self._close_to(len(self._stack) - 1)
+
+    def _open_block(self, tag: str, markdown: bool) -> None:
+        if tag == "li":
+            while self._stack and self._stack[-1][0] != "ul":
+                self._close_to(len(self._stack) - 1)
+            if not self._stack:
+                self._open("ul", markdown)
+        else:
+            self._close_top_while(_PHRASING)
+        self._open(tag, markdown)
+
+    def _open_inline(self, tag: str, markdown: bool, attributes: str = "") -> None:
+        if tag == "a":
+            self._close("a")
+        if not any(name in _CONTAINERS for name, _ in self._stack):
+            self._open_block("p", True)
+        self._open(tag, markdown, attributes)
+
+    def _close_markdown_blocks(self) -> None:
+        for index, (name, markdown) in enumerate(self._stack):
+            if markdown and (name in _BLOCKS or name == "li"):
+                self._close_to(index)
+                return
+
+    def _in_code(self) -> bool:
+        return self._find("code") >= 0
+
+    def _markdown_context(self) -> bool:
+        """
+        Fuera de los bloques HTML del modelo, el comienzo de línea puede ser Markdown.
+        """
+        return not any(
+            not markdown and (name in _BLOCKS or name == "li")
+            for name, markdown in self._stack
+        )
+
+    def _text(self, text: str) -> None:
+        if not text:
+            return
+        content = text.lstrip()
+        if content and not any(name in _CONTAINERS for name, _ in self._stack):
+            # El espacio previo queda fuera del párrafo, llegue en el mismo fragmento o
+            # no.
+            self._out.append(text[: len(text) - len(content)])
+            self._open_block("p", True)
+            text = content
+        self._out.append(html.escape(text, quote=False))
+
+    # --- Análisis ---
+
+    def _process(self, final: bool) -> None:
+        while self._pos < len(self._buffer) and self._step(final):
+            pass
+
+    def _step(self, final: bool) -> bool:
+        """
+        Procesa la siguiente construcción; False si hace falta más texto para decidir.
+        """
+        buf, pos = self._buffer, self._pos
+        if self._skip is not None:
+            return self._skip_content(final)
+        if self._line_start:
+            return self._line(final)
+        char = buf[pos]
+        if char == "\n":
+            self._consume(1)
+            self._newline()
+            return True
+        if self._fence == "code":
+            end = buf.find("\n", pos)
+            end = len(buf) if end < 0 else end
+            self._text(buf[pos:end])
+            self._consume(end - pos)
+            return True
+        if char == "<":
+            if self._find("code", True) >= 0:
+                # Dentro de `código` Markdown, '<' es texto: `List<String>`, `<div>`.
+                self._text("<")
+                self._consume(1)
+                return True
+            return self._tag(final)
+        if char == "&":
+            return self._entity(final)
+        if char == "`":
+            return self._backticks(final)
+        in_code = self._in_code()
+        if not in_code and char == "*":
+            return self._asterisks(final)
+        if not in_code and char == "[":
+            return self._link(final)
+        match = (_CODE_TEXT if in_code else _TEXT).match(buf, pos)
+        self._text(match.group())
+        self._consume(match.end() - pos)
+        return True
+
+    def _skip_content(self, final: bool) -> bool:
+        buf, pos = self._buffer, self._pos
+        match = self._skip.search(buf, pos)
+        if match is not None:
+            self._skip = None
+            self._consume(match.end() - pos)
+            return True
+        # Se conserva lo justo para reconocer la etiqueta de cierre cuando llegue.
+        keep = 0 if final else 32
+        if len(buf) - pos <= keep:
+            return False
+        self._consume(len(buf) - pos - keep)
+        return True
+
+    def _line(self, final: bool) -> bool:
+        buf, pos = self._buffer, self._pos
+        newline = buf.find("\n", pos)
+        complete = newline >= 0 or final
+        line = buf[pos:newline] if newline >= 0 else buf[pos:]
+        stripped = line.lstrip(" \t")
+        if not complete and len(stripped) < _LINE_LOOKAHEAD:
+            return False
+
+        fence = _FENCE.match(buf, pos)
+        if fence is not None and (fence.group(2) or fence.end() < len(buf) or final):
+            self._toggle_fence(fence.group(1))
+            self._consume(fence.end() - pos)
+            self._line_start = fence.group(2) is not None
+            return True
+        if fence is not None:
+            return False
+        self._line_start = False
+        if self._fence == "code" or not self._markdown_context():
+            return True
+
+        indent = len(line) - len(stripped)
+        if complete and (not stripped or _RULE.fullmatch(stripped)):
+            # Línea en blanco o separador: cierra los párrafos y listas de Markdown.
+            self._close_markdown_blocks()
+            self._consume(len(line))
+            return True
+        if not complete and _RULE_PREFIX.fullmatch(stripped):
+            self._line_start = True
+            return False
+        heading = _HEADING.match(stripped)
+        if heading is not None:
+            self._close_markdown_blocks()
+            self._open_block("h2" if len(heading.group(1)) <= 2 else "h3", True)
+            self._consume(indent + heading.end())
+            return True
+        item = _LIST_ITEM.match(stripped)
+        if item is not None:
+            self._close("p", True)
+            if self._find("ul", True) < 0:
+                self._open_block("ul", True)
+            self._open_block("li", True)
+            self._consume(indent + item.end())
+            return True
+        # Cualquier otra línea termina la lista de Markdown.
+        self._close("ul", True)
+        self._consume(indent)
+        return True
+
+    def _newline(self) -> None:
+        if self._fence != "code":
+            for index in range(len(self._stack) - 1, -1, -1):
+                name, markdown = self._stack[index]
+                if markdown and name in _LINE_BLOCKS:
+                    self._close_to(index)
+                    break
+        self._out.append("\n")
+        self._line_start = True
+
+    def _toggle_fence(self, language: str) -> None:
+        if self._fence is None:
+            if language.lower() in HTML_FENCE_LANGUAGES:
+                self._fence = "html"
+            else:
+                self._fence = "code"
+                self._open_block("p", True)
+                self._open("code", True)
+            return
+        if self._fence == "code":
+            self._close("p", True)
+        self._fence = None
+
+    def _tag(self, final: bool) -> bool:
+        buf, pos = self._buffer, self._pos
+        match = _TAG.match(buf, pos)
+        if match is None:
+            if buf.startswith("<!--", pos):
+                end = buf.find("-->", pos + 4)
+                if end >= 0:
+                    self._consume(end + 3 - pos)
+                    return True
+                return self._literal_or_wait(final, len(buf) - pos < _MAX_TAG)
+            if buf.startswith(("<!", "<?"), pos):
+                end = buf.find(">", pos)
+                if end >= 0:
+                    self._consume(end + 1 - pos)
+                    return True
+                return self._literal_or_wait(final, len(buf) - pos < _MAX_TAG)
+            partial = _PARTIAL_TAG.fullmatch(buf, pos) is not None
+            return self._literal_or_wait(final, partial and len(buf) - pos < _MAX_TAG)
+
+        self._consume(match.end() - pos)
+        closing, attributes = match.group(1) == "/", match.group(3)
+        name = match.group(2).lower()
+        name = TAG_ALIASES.get(name, name)
+        if name in DROPPED_CONTENT_TAGS:
+            if not closing and not attributes.rstrip().endswith("/"):
+                self._skip = re.compile(rf"</{name}\s*>", re.IGNORECASE)
+            return True
+        if name not in ALLOWED_TAGS:
+            if name == "br":
+                self._text(" ")
+            return True
+        if closing:
+            self._close(name)
+        elif name in _BLOCKS or name == "li":
+            self._open_block(name, False)
+        elif name == "a":
+            self._open_inline(name, False, self._href_attribute(attributes))
+        else:
+            self._open_inline(name, False)
+        return True
+
+    def _literal_or_wait(self, final: bool, incomplete: bool) -> bool:
+        if incomplete and not final:
+            return False
+        self._text(self._buffer[self._pos])
+        self._consume(1)
+        return True
+
+    @staticmethod
+    def _href_attribute(attributes: str) -> str:
+        for name, value in _ATTRIBUTE.findall(attributes):
+            if name.lower() == "href" and value:
+                if value[0] in "\"'":
+                    value = value[1:-1]
+                href = safe_href(value)
+                if href is not None:
+                    return f' href="{html.escape(href, quote=True)}"'
+        return ""
+
+    def _entity(self, final: bool) -> bool:
+        buf, pos = self._buffer, self._pos
+        match = _ENTITY.match(buf, pos)
+        if match is not None:
+            self._text(html.unescape(match.group()))
+            self._consume(match.end() - pos)
+            return True
+        partial = _PARTIAL_ENTITY.fullmatch(buf, pos) is not None
+        return self._literal_or_wait(final, partial and len(buf) - pos < _MAX_ENTITY)
+
+    def _run(self, char: str, final: bool) -> Optional[int]:
+        """
+        Longitud de la racha de `char` en la posición actual (None si puede seguir
+        creciendo).
+        """
+        buf, pos = self._buffer, self._pos
+        end = pos
+        while end < len(buf) and buf[end] == char:
+            end += 1
+        if end == len(buf) and not final:
+            return None
+        return end - pos
+
+    def _backticks(self, final: bool) -> bool:
+        run = self._run("`", final)
+        if run is None:
+            return False
+        if run >= 3:
+            # Valla en mitad de una línea: ```html<h2>...
+            fence = _FENCE.match(self._buffer, self._pos)
+            if fence.end() == len(self._buffer) and not fence.group(2) and not final:
+                return False
+            self._toggle_fence(fence.group(1))
+            self._consume(fence.end() - self._pos)
+            self._line_start = fence.group(2) is not None
+            return True
+        if self._find("code", True) >= 0:
+            self._close("code", True)
+        elif self._in_code():
+            self._text("`" * run)
+        else:
+            self._open_inline("code", True)
+        self._consume(run)
+        return True
+
+    def _asterisks(self, final: bool) -> bool:
+        run = self._run("*", final)
+        if run is None:
+            return False
+        buf, pos = self._buffer, self._pos
+        following = buf[pos + run] if pos + run < len(buf) else ""
+        tag = {1: "em", 2: "strong"}.get(run)
+        if tag is not None:
+            if self._find(tag, True) >= 0 and self._prev and not self._prev.isspace():
+                self._close(tag, True)
+                self._consume(run)
+                return True
+            if following and not following.isspace() and self._find(tag, True) < 0:
+                self._open_inline(tag, True)
+                self._consume(run)
+                return True
+        self._text("*" * run)
+        self._consume(run)
+        return True
+
+    def _link(self, final: bool) -> bool:
+        buf, pos = self._buffer, self._pos
+        match = _LINK.match(buf, pos)
+        if match is None:
+            partial = _PARTIAL_LINK.fullmatch(buf, pos) is not None
+            return self._literal_or_wait(final, partial and len(buf) - pos < _MAX_LINK)
+        label, url = match.groups()
+        href = safe_href(url)
+        self._open_inline(
+            "a", True, f' href="{html.escape(href, quote=True)}"' if href else ""
+        )
+        self._text(label)
+        self._close("a", True)
+        self._consume(match.end() - pos)
+        return True
+
+
+def normalize_html(text: str) -> str:
+    """Versión de una sola vez de HtmlNormalizer, para respuestas completas."""
+    normalizer = HtmlNormalizer()
+    return normalizer.feed(text) + normalizer.close()
@@ -0,0 +1,452 @@
+# resilience.py
+# Plazos, reintentos con backoff, circuit breaker y peticiones "hedged" hacia los
+# upstreams.
+#
+# Un upstream lento o caído (Gemini, la búsqueda en Google) no debe retener peticiones
+# indefinidamente ni convertir cada fallo en un 500:
+#   - Plazo (deadline) por llamada, reintentos incluidos.
+#   - Reintentos acotados con backoff exponencial y jitter, solo para errores
+#     reintentables (timeouts, conexión, HTTP 408/429/5xx). El resto se propaga tal
+#     cual.
+#   - Circuit breaker: tras N llamadas fallidas seguidas el upstream se da por caído y
+#     se falla al instante (respuesta degradada o de caché) durante un tiempo; después
+#     se deja pasar una llamada de prueba (half-open) y, si va bien, se cierra de nuevo.
+#   - Hedging opcional: si la primera llamada no ha respondido tras un retardo, se lanza
+#     una segunda en paralelo y se usa la primera respuesta. Solo para upstreams
+#     idempotentes.
+#
+# Upstream envuelve llamadas síncronas (p. ej. _search_google, ya fuera del event loop).
+# Las llamadas a Gemini las hace ADK: los reintentos y el plazo por intento se
+# configuran en el cliente de google-genai (gemini_content_config) y el circuit breaker
+# se aplica con los callbacks de ModelGuard.
+#
+# Variables de entorno (NOMBRE = nombre del upstream en mayúsculas: GEMINI,
+# GOOGLE_SEARCH):
+#   UPSTREAM_<NOMBRE>_DEADLINE_SECONDS     plazo por llamada (Gemini: por intento)
+#   UPSTREAM_<NOMBRE>_RETRY_ATTEMPTS       intentos en total (1 = sin reintentos)
+#   UPSTREAM_<NOMBRE>_FAILURE_THRESHOLD    fallos seguidos que abren el circuito
+#   UPSTREAM_<NOMBRE>_RESET_SECONDS        tiempo con el circuito abierto antes de
+#                                          probar
+#   UPSTREAM_<NOMBRE>_HEDGE_DELAY_SECONDS  retardo de la petición hedged (0 =
+#                                          desactivado)
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional, Tuple
+
+import requests
+
+from assistant.logger import get_logger
+from assistant.metrics import registry
+
+if TYPE_CHECKING:
+    # google.genai tarda en importarse; main importa este módulo antes del
+    # calentamiento.
+    from google.genai import types
+
+try:
+    import httpx
+
+    _TRANSPORT_ERRORS: tuple = (httpx.TransportError,)
+except ImportError:  # google-genai depende de httpx; por si cambia.
+    _TRANSPORT_ERRORS = ()
+
+logger = get_logger(__name__)
+
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_calls = registry.counter(
+    "assistant_upstream_calls_total",
+    "Llamadas a upstreams por resultado (ok, error, timeout, retry, short_circuit, hedge).",
+    ("upstream", "outcome"),
+)
+_circuit_state = registry.gauge(
+    "assistant_circuit_state",
+    "Estado del circuit breaker de cada upstream (0 cerrado, 1 half-open, 2 abierto).",
+    ("upstream",),
+)
+
+# Hilos en los que se ejecutan las llamadas con plazo o hedged. Un hilo que supera el
+# plazo no se puede interrumpir: sigue hasta terminar, pero la petición ya no lo espera.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("UPSTREAM_THREAD_POOL_SIZE", "8")),
+    thread_name_prefix="upstream",
+)
+
+
+class UpstreamUnavailable(Exception):
+    """
+    El upstream no respondió a tiempo, falló tras los reintentos o tiene el circuito
+    abierto.
+    """
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} no disponible ({reason})")
+        self.upstream = upstream
+        self.reason = reason
+
+
+class UpstreamTimeout(TimeoutError):
+    """Un intento superó el tiempo que le quedaba al plazo de la llamada."""
+
+
+def unavailable_detail(exc: Exception) -> Tuple[int, str]:
+    """
+    503 (upstream caído) o 504 (plazo agotado) y su mensaje, en lugar de un 500
+    genérico.
+    """
+    if isinstance(exc, UpstreamUnavailable):
+        return (
+            503,
+            "El asistente no está disponible en este momento; inténtalo de nuevo en unos minutos.",
+        )
+    return 504, "El asistente ha tardado demasiado en responder; inténtalo de nuevo."
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, errores de conexión y respuestas HTTP 408/429/5xx."""
+    if isinstance(
+        error,
+        (TimeoutError, ConnectionError, requests.ConnectionError, requests.Timeout)
+        + _TRANSPORT_ERRORS,
+    ):
+        return True
+    # google.genai.errors.APIError expone `code`; requests.HTTPError,
+    # `response.status_code`.
+    status = getattr(error, "code", None)
+    if not isinstance(status, int):
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and status in RETRYABLE_STATUS
+
+
+class RetryPolicy:
+    """Intentos totales y retardos con backoff exponencial (con jitter) entre ellos."""
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base_delay: float = 0.25,
+        max_delay: float = 4.0,
+        multiplier: float = 2.0,
+        jitter: bool = True,
+    ):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def delays(self) -> Iterator[float]:
+        """Retardo antes de cada reintento (attempts - 1 valores)."""
+        for retry in range(self.attempts - 1):
+            delay = min(self.max_delay, self.base_delay * self.multiplier**retry)
+            # "Full jitter": evita que todas las peticiones reintenten a la vez.
+            yield random.uniform(0, delay) if self.jitter else delay
+
+
+class CircuitBreaker:
+    """Circuit breaker clásico (cerrado → abierto → half-open) y thread-safe."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+        _circuit_state.set(0, upstream=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            logger.warning(
+                "Cambio de estado del circuit breaker",
+                extra={"upstream": self.name, "from": self._state, "to": state},
+            )
+        self._state = state
+        _circuit_state.set(_STATE_VALUES[state], upstream=self.name)
+
+    def allow(self) -> bool:
+        """¿Puede pasar esta llamada? Con el circuito abierto solo pasa la de prueba."""
+        with self._lock:
+            now = self._clock()
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if now - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(HALF_OPEN)
+            # Una sola prueba a la vez; si no informa (p. ej. se canceló), se permite
+            # otra.
+            if (
+                self._probe_started is not None
+                and now - self._probe_started < self.reset_timeout
+            ):
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probe_started = None
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._set_state(OPEN)
+
+
+class Upstream:
+    """
+    Llamadas síncronas a un upstream con plazo, reintentos, circuit breaker y hedging.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        deadline: float = 10.0,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge_delay: float = 0.0,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+    ):
+        self.name = name
+        self.deadline = deadline
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker(name)
+        self.hedge_delay = hedge_delay
+        self.retryable = retryable
+
+    def _attempt(self, func: Callable[[], Any], remaining: float) -> Any:
+        """Un intento (con su petición hedged, si procede) dentro del plazo restante."""
+        futures = {_executor.submit(func)}
+        if 0 < self.hedge_delay < remaining:
+            done, _ = wait(futures, timeout=self.hedge_delay)
+            if not done:
+                _calls.inc(upstream=self.name, outcome="hedge")
+                futures.add(_executor.submit(func))
+        deadline = time.monotonic() + remaining
+        error: Optional[BaseException] = None
+        while futures:
+            done, futures = wait(
+                futures,
+                timeout=max(0.0, deadline - time.monotonic()),
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        if error is not None and not futures:
+            raise error
+        raise UpstreamTimeout(f"{self.name} no respondió en {remaining:.1f}s")
+
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Ejecuta func(*args, **kwargs). Lanza UpstreamUnavailable si el circuito está
+        abierto, se agota el plazo o fallan todos los intentos; los errores no
+        reintentables se propagan sin cambios.
+        """
+        if not self.breaker.allow():
+            _calls.inc(upstream=self.name, outcome="short_circuit")
+            raise UpstreamUnavailable(self.name, "circuito abierto")
+
+        started = time.monotonic()
+        delays = self.retry.delays()
+        while True:
+            remaining = self.deadline - (time.monotonic() - started)
+            try:
+                result = self._attempt(lambda: func(*args, **kwargs), remaining)
+            except Exception as e:
+                if not self.retryable(e):
+                    # El upstream respondió (p. ej. un 400): no dice nada de su salud.
+                    self.breaker.record_success()
+                    _calls.inc(upstream=self.name, outcome="error")
+                    raise
+                delay = next(delays, None)
+                remaining = self.deadline - (time.monotonic() - started)
+                if delay is None or delay >= remaining:
+                    outcome = "timeout" if isinstance(e, TimeoutError) else "error"
+                    _calls.inc(upstream=self.name, outcome=outcome)
+                    self.breaker.record_failure()
+                    logger.warning(
+                        "Upstream no disponible",
+                        extra={"upstream": self.name, "error": repr(e)},
+                    )
+                    raise UpstreamUnavailable(self.name, outcome) from e
+                _calls.inc(upstream=self.name, outcome="retry")
+                time.sleep(delay)
+            else:
+                _calls.inc(upstream=self.name, outcome="ok")
+                self.breaker.record_success()
+                return result
+
+
+def _env(name: str, setting: str, default: Any, cast: Callable) -> Any:
+    value = os.getenv(f"UPSTREAM_{name.upper()}_{setting}")
+    return cast(value) if value else default
+
+
+def create_upstream(
+    name: str,
+    deadline: float,
+    attempts: int = 3,
+    failure_threshold: int = 5,
+    reset_timeout: float = 30.0,
+    hedge_delay: float = 0.0,
+) -> Upstream:
+    """
+    Construye un Upstream; cada parámetro admite UPSTREAM_<NOMBRE>_* en el entorno.
+    """
+    return Upstream(
+        name,
+        deadline=_env(name, "DEADLINE_SECONDS", deadline, float),
+        retry=RetryPolicy(attempts=_env(name, "RETRY_ATTEMPTS", attempts, int)),
+        breaker=CircuitBreaker(
+            name,
+            failure_threshold=_env(name, "FAILURE_THRESHOLD", failure_threshold, int),
+            reset_timeout=_env(name, "RESET_SECONDS", reset_timeout, float),
+        ),
+        hedge_delay=_env(name, "HEDGE_DELAY_SECONDS", hedge_delay, float),
+    )
+
+
+# --- Gemini (llamadas hechas por ADK) ---
+
+GEMINI = "gemini"
+DEGRADED_ANSWER = (
+    "<p>Ahora mismo no puedo responder con normalidad: uno de mis servicios no está "
+    "disponible. Por favor, inténtalo de nuevo en unos minutos.</p>"
+)
+
+
+def gemini_content_config() -> "types.GenerateContentConfig":
+    """
+    Configuración de generación de los agentes: plazo por intento y reintentos con
+    backoff del cliente de google-genai ante errores reintentables.
+    """
+    from google.genai import types
+
+    return types.GenerateContentConfig(
+        http_options=types.HttpOptions(
+            timeout=int(_env(GEMINI, "DEADLINE_SECONDS", 30.0, float) * 1000),
+            retry_options=types.HttpRetryOptions(
+                attempts=_env(GEMINI, "RETRY_ATTEMPTS", 3, int),
+                initial_delay=1.0,
+                max_delay=8.0,
+                exp_base=2.0,
+                jitter=1.0,
+                http_status_codes=list(RETRYABLE_STATUS),
+            ),
+        )
+    )
+
+
+def last_user_text(llm_request: Any) -> str:
+    """
+    Último mensaje del usuario en la petición (sin los "For context:" de las
+    transferencias).
+    """
+    for content in reversed(llm_request.contents or []):
+        if content.role != "user":
+            continue
+        for part in content.parts or []:
+            if part.text and not part.text.startswith("For context:"):
+                return part.text
+    return ""
+
+
+class ModelGuard:
+    """
+    Circuit breaker de las llamadas al modelo como callbacks de ADK. Con el circuito
+    abierto (o si la llamada falla por un error reintentable) la respuesta es degradada:
+    la de la caché de respuestas para una pregunta parecida, si la hay, o
+    DEGRADED_ANSWER.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        fallback: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        self.breaker = breaker
+        self.fallback = fallback
+
+    def _degraded(self, llm_request: Any) -> Any:
+        from google.adk.models.llm_response import LlmResponse
+        from google.genai import types
+
+        answer = None
+        if self.fallback is not None:
+            answer = self.fallback(last_user_text(llm_request))
+        return LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(text=answer or DEGRADED_ANSWER)]
+            ),
+            # after_model también la recibe: no debe contar como éxito de Gemini.
+            custom_metadata={"degraded": True},
+        )
+
+    def before_model(self, callback_context: Any, llm_request: Any) -> Optional[Any]:
+        if self.breaker.allow():
+            return None
+        _calls.inc(upstream=self.breaker.name, outcome="short_circuit")
+        return self._degraded(llm_request)
+
+    def after_model(self, callback_context: Any, llm_response: Any) -> Optional[Any]:
+        degraded = (llm_response.custom_metadata or {}).get("degraded")
+        if not llm_response.partial and not degraded:
+            self.breaker.record_success()
+            _calls.inc(upstream=self.breaker.name, outcome="ok")
+        return None
+
+    def on_model_error(
+        self, callback_context: Any, llm_request: Any, error: Exception
+    ) -> Optional[Any]:
+        if not is_retryable(error):
+            self.breaker.record_success()
+            _calls.inc(upstream=self.breaker.name, outcome="error")
+            return None
+        # El cliente de google-genai ya agotó sus reintentos.
+        self.breaker.record_failure()
+        _calls.inc(upstream=self.breaker.name, outcome="error")
+        logger.warning(
+            "Gemini no disponible; respuesta degradada",
+            extra={"agent": callback_context.agent_name, "error": repr(error)},
+        )
+        return self._degraded(llm_request)
+
+
+gemini_guard = ModelGuard(
+    CircuitBreaker(
+        GEMINI,
+        failure_threshold=_env(GEMINI, "FAILURE_THRESHOLD", 5, int),
+        reset_timeout=_env(GEMINI, "RESET_SECONDS", 30.0, float),
+    )
+)
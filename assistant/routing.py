@@ -0,0 +1,118 @@
+# routing.py
+# Pre-enrutado determinista: envía los mensajes obvios directamente al especialista.
+#
+# El orquestador gasta una llamada completa a Gemini solo para decidir si transfiere a
+# CV_Expert o a Blog_Expert. Cuando el mensaje deja clara la intención ("experiencia",
+# "habilidades", "blog", "artículo"...), el pre-router elige el especialista sin LLM.
+# Si hay dudas (ninguna regla, reglas de ambos especialistas o confianza baja), el
+# mensaje sigue yendo al orquestador.
+#
+# Variables de entorno:
+#   PRE_ROUTER               keyword | off (por defecto: keyword)
+#   PRE_ROUTER_MIN_CONFIDENCE  confianza mínima para el atajo (por defecto: 0.8)
+
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Protocol, Sequence, Tuple
+
+from assistant.text_utils import normalize_text
+
+# Reglas por agente: (expresión regular sobre el texto sin tildes, peso).
+# Las palabras inequívocas pesan 1.0; las que también aparecen en charla general, menos.
+DEFAULT_RULES: Dict[str, Sequence[Tuple[str, float]]] = {
+    "CV_Expert": (
+        (r"\b(cv|curriculum|curriculo|resume)\b", 1.0),
+        (r"\bexperiencia(s)?\b", 0.8),
+        (r"\b(habilidad(es)?|skills?|competencias?)\b", 0.8),
+        (r"\btrayectoria\b", 0.8),
+        (r"\b(formacion|estudios|certificacion(es)?|titulacion(es)?)\b", 0.8),
+        (r"\b(empresas?|empleos?|trabajos?|puestos?|roles?)\b", 0.5),
+        (r"\b(tecnologias|stack)\b", 0.5),
+    ),
+    "Blog_Expert": (
+        (r"\bblog\b", 1.0),
+        (r"\barticulos?\b", 1.0),
+        (r"\bposts?\b", 1.0),
+        (r"\b(has|hayas) (escrito|publicado)\b|\bescribiste\b", 1.0),
+        (r"\bpublicacion(es)?\b", 0.8),
+    ),
+}
+
+
+class RouteDecision(NamedTuple):
+    """Resultado del pre-enrutado. agent=None significa 'usar el orquestador'."""
+
+    agent: Optional[str]
+    confidence: float
+    reason: str
+
+
+class Router(Protocol):
+    """
+    Cualquier objeto con route(message) -> RouteDecision puede actuar de pre-router.
+    """
+
+    def route(self, message: str) -> RouteDecision: ...
+
+
+class NullRouter:
+    """Pre-router desactivado: todo pasa por el orquestador."""
+
+    def route(self, message: str) -> RouteDecision:
+        return RouteDecision(None, 0.0, "disabled")
+
+
+class KeywordRouter:
+    """
+    Pre-router basado en expresiones regulares ponderadas.
+
+    La confianza de un agente es la suma (hasta 1.0) de los pesos de sus reglas que
+    coinciden. Solo se toma el atajo si coincide un único agente y su confianza
+    alcanza `min_confidence`; un mensaje que toca a varios especialistas es ambiguo.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Dict[str, Sequence[Tuple[str, float]]]] = None,
+        min_confidence: float = 0.8,
+    ):
+        self.min_confidence = min_confidence
+        self._rules: Dict[str, List[Tuple[re.Pattern, float]]] = {
+            agent: [(re.compile(pattern), weight) for pattern, weight in agent_rules]
+            for agent, agent_rules in (rules or DEFAULT_RULES).items()
+        }
+
+    def scores(self, message: str) -> Dict[str, float]:
+        """Confianza por agente (solo los agentes con alguna coincidencia)."""
+        text = normalize_text(message)
+        scores = {}
+        for agent, agent_rules in self._rules.items():
+            score = sum(
+                weight for pattern, weight in agent_rules if pattern.search(text)
+            )
+            if score > 0:
+                scores[agent] = min(1.0, score)
+        return scores
+
+    def route(self, message: str) -> RouteDecision:
+        scores = self.scores(message)
+        if not scores:
+            return RouteDecision(None, 0.0, "no_match")
+        if len(scores) > 1:
+            return RouteDecision(None, max(scores.values()), "ambiguous")
+        agent, confidence = next(iter(scores.items()))
+        if confidence < self.min_confidence:
+            return RouteDecision(None, confidence, "low_confidence")
+        return RouteDecision(agent, confidence, "keyword")
+
+
+def create_router(kind: Optional[str] = None) -> Router:
+    """Construye el pre-router según PRE_ROUTER."""
+    kind = (kind or os.getenv("PRE_ROUTER", "keyword")).lower()
+    if kind == "off":
+        return NullRouter()
+    if kind != "keyword":
+        raise ValueError(f"PRE_ROUTER no soportado: '{kind}'")
+    return KeywordRouter(
+        min_confidence=float(os.getenv("PRE_ROUTER_MIN_CONFIDENCE", "0.8"))
+    )
@@ -1,57 +1,479 @@
 # services.py
 # Contiene la lógica de negocio para invocar al agente y gestionar sesiones.
 
+import time
 import uuid
-from typing import Optional, Tuple
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
+from google.adk.agents.invocation_context import new_invocation_context_id
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.events import Event
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
 
-from assistant.agents import root_agent
+from assistant.agents import blog_agent, cv_agent, root_agent
+from assistant.answer_cache import (
+    answer_cache_enabled,
+    cached_answers_bypassed,
+    content_version,
+    create_answer_cache,
+)
+from assistant.cv_index import CVIndex, get_cv_index, use_cv_index
+from assistant.faq import faq_enabled, get_faq_store
+from assistant.logger import get_logger
+from assistant.metrics import registry
+from assistant.rendering import HtmlNormalizer, normalize_html
+from assistant.resilience import DEGRADED_ANSWER, gemini_guard
+from assistant.routing import RouteDecision, Router, create_router
+from assistant.sessions import create_session_service
+from assistant.tracing import EventSpanRecorder, Trace, ensure_trace
 
-_session_service = InMemorySessionService()
+logger = get_logger(__name__)
+
+# Sesiones acotadas (TTL, límite por usuario, LRU); backend elegido con SESSION_BACKEND.
+_session_service = create_session_service()
 _APP_NAME = "assistant_app"
 _runner = Runner(agent=root_agent, app_name=_APP_NAME, session_service=_session_service)
 
+# Runners de los especialistas para el atajo del pre-router. Comparten servicio de
+# sesiones y app_name con el orquestador, así que la conversación es la misma.
+_specialist_runners: Dict[str, Runner] = {
+    agent.name: Runner(
+        agent=agent, app_name=_APP_NAME, session_service=_session_service
+    )
+    for agent in (cv_agent, blog_agent)
+}
+_router: Router = create_router()
 
-async def invoke_agent_async(
-    message: str, session_id: Optional[str], user_id: str
-) -> Tuple[str, str]:
+# --- Métricas del pre-router ---
+_route_decisions = registry.counter(
+    "assistant_route_decisions_total",
+    "Decisiones del pre-router por destino y motivo.",
+    ("route", "reason"),
+)
+_orchestrator_hop = registry.histogram(
+    "assistant_orchestrator_hop_seconds",
+    "Tiempo que tarda el orquestador en decidir la transferencia a un especialista.",
+)
+_router_saved = registry.counter(
+    "assistant_router_saved_seconds_total",
+    "Tiempo estimado ahorrado al saltarse el orquestador.",
+)
+_hop_estimate = registry.gauge(
+    "assistant_orchestrator_hop_estimate_seconds",
+    "Media móvil del salto del orquestador, usada para estimar el ahorro.",
+)
+# Peso de la última observación en la media móvil exponencial.
+_HOP_EWMA_ALPHA = 0.2
+_hop_estimate_seconds: Optional[float] = None
+
+# --- Caché de respuestas de primer turno ---
+_answer_lookups = registry.counter(
+    "assistant_answer_cache_lookups_total",
+    "Búsquedas en la caché de respuestas por resultado (exact, semantic, miss).",
+    ("result",),
+)
+_answer_saved = registry.counter(
+    "assistant_answer_cache_saved_seconds_total",
+    "Latencia del agente ahorrada al servir respuestas desde la caché.",
+)
+_answer_similarity = registry.histogram(
+    "assistant_answer_cache_similarity",
+    "Mejor similitud encontrada en cada búsqueda semántica (para ajustar el umbral).",
+    buckets=(0.3, 0.4, 0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0),
+)
+_answer_cache = create_answer_cache(similarity_observer=_answer_similarity.observe)
+registry.gauge(
+    "assistant_answer_cache_entries", "Respuestas guardadas en la caché."
+).set_function(lambda: {(): len(_answer_cache)})
+
+_DEFAULT_RESPONSE = "El agente no produjo una respuesta final."
+
+
+def _degraded_answer(message: str) -> Optional[str]:
+    """
+    Respuesta cacheada de una pregunta parecida, para cuando Gemini no está disponible.
+    """
+    if not answer_cache_enabled() or cached_answers_bypassed() or not message:
+        return None
+    cached = _answer_cache.lookup(message, content_version())
+    return cached.answer if cached else None
+
+
+# Con el circuito de Gemini abierto, la respuesta degradada sale de la caché si es
+# posible.
+gemini_guard.fallback = _degraded_answer
+# Con SSE el modelo emite eventos parciales (partial=True) a medida que genera texto.
+_STREAMING_RUN_CONFIG = RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+async def _ensure_session(
+    session_id: Optional[str], user_id: str, trace: Trace
+) -> Tuple[str, bool]:
     """
-    Invoca al agente orquestador, gestionando la sesión del usuario.
-    Crea una nueva sesión si no se proporciona una válida.
+    Valida la sesión existente o crea una nueva si no se proporciona una válida.
+    Devuelve (session_id, creada); una sesión recién creada implica primer turno.
     """
-    # Valida la sesión existente o asigna None para crear una nueva.
     if session_id:
         try:
-            await _session_service.get_session(
-                app_name=_APP_NAME, user_id=user_id, session_id=session_id
-            )
+            with trace.span("session.get", kind="session"):
+                session = await _session_service.get_session(
+                    app_name=_APP_NAME, user_id=user_id, session_id=session_id
+                )
         except KeyError:
-            print(
-                f"WARN: session_id '{session_id}' no encontrado. Se creará uno nuevo."
+            session = None
+        if session is None:
+            logger.warning(
+                "session_id no encontrado; se creará uno nuevo",
+                extra={"session_id": session_id},
             )
             session_id = None
 
-    # Crea una nueva sesión si es necesario.
-    if not session_id:
-        session_id = f"session_{uuid.uuid4().hex}"
+    if session_id:
+        return session_id, False
+    session_id = f"session_{uuid.uuid4().hex}"
+    with trace.span("session.create", kind="session"):
         await _session_service.create_session(
             app_name=_APP_NAME, user_id=user_id, session_id=session_id
         )
+    return session_id, True
 
-    # Ejecuta el agente y procesa la respuesta.
-    content = types.Content(role="user", parts=[types.Part(text=message)])
-    final_response_text: str = "El agente no produjo una respuesta final."
 
-    async for event in _runner.run_async(
-        user_id=user_id, session_id=session_id, new_message=content
+async def _record_turn(
+    message: str, answer: str, author: Optional[str], session_id: str, user_id: str
+) -> None:
+    """
+    Registra en la sesión la pregunta y una respuesta que no generó el agente (FAQ o
+    caché) como si la hubiera generado `author`, para que la conversación pueda
+    continuar.
+    """
+    session = await _session_service.get_session(
+        app_name=_APP_NAME, user_id=user_id, session_id=session_id
+    )
+    invocation_id = new_invocation_context_id()
+    for event_author, role, text in (
+        ("user", "user", message),
+        (author or root_agent.name, "model", answer),
     ):
-        if event.is_final_response() and event.content and event.content.parts:
-            response_text = event.content.parts[0].text
-            if response_text is not None:
-                final_response_text = response_text
-            break
+        await _session_service.append_event(
+            session,
+            Event(
+                invocation_id=invocation_id,
+                author=event_author,
+                content=types.Content(role=role, parts=[types.Part(text=text)]),
+            ),
+        )
+
+
+async def _cached_answer(
+    message: str, session_id: str, user_id: str, trace: Trace, cv_index: CVIndex
+) -> Optional[str]:
+    """
+    Busca una respuesta de primer turno: primero entre las precalculadas de las FAQ y
+    después en la caché de respuestas. Si la hay, la registra en la sesión.
+    """
+    if cached_answers_bypassed():
+        return None
+    with use_cv_index(cv_index):
+        version = content_version()
+
+    if faq_enabled():
+        with trace.span("faq.lookup") as span:
+            faq = get_faq_store().lookup(message, version)
+            span.attributes["faq.result"] = "hit" if faq else "miss"
+        if faq is not None:
+            await _record_turn(message, faq.answer, faq.author, session_id, user_id)
+            return faq.answer
+
+    if not answer_cache_enabled():
+        return None
+    with trace.span("answer_cache.lookup") as span:
+        cached = _answer_cache.lookup(message, version)
+        span.attributes["cache.result"] = cached.match if cached else "miss"
+    if cached is None:
+        _answer_lookups.inc(result="miss")
+        return None
+    _answer_lookups.inc(result=cached.match)
+    _answer_saved.inc(cached.latency)
+    await _record_turn(message, cached.answer, cached.author, session_id, user_id)
+    return cached.answer
+
+
+def _remember_answer(
+    message: str, answer: str, author: Any, latency: float, cv_index: CVIndex
+) -> None:
+    """
+    Guarda la respuesta de un primer turno (las por defecto y las degradadas no se
+    cachean) con la versión del contenido con la que se generó, aunque el CV se haya
+    recargado.
+    """
+    if answer_cache_enabled() and answer not in (_DEFAULT_RESPONSE, DEGRADED_ANSWER):
+        author = author if isinstance(author, str) else None
+        with use_cv_index(cv_index):
+            version = content_version()
+        _answer_cache.store(message, answer, version, latency, author)
+
+
+async def session_author(session_id: str, user_id: str) -> Optional[str]:
+    """
+    Agente que escribió la última respuesta de la sesión (el que seguiría la
+    conversación).
+    """
+    session = await _session_service.get_session(
+        app_name=_APP_NAME, user_id=user_id, session_id=session_id
+    )
+    for event in reversed(session.events if session else []):
+        if event.author != "user" and _event_text(event):
+            return event.author
+    return None
+
+
+def get_answer_cache_stats() -> Dict[str, Any]:
+    """
+    Aciertos (exactos y semánticos), tasa de acierto y latencia ahorrada de la caché.
+    """
+    return _answer_cache.stats()
+
+
+def set_router(router: Router) -> None:
+    """Sustituye el pre-router (p. ej. por un clasificador propio o NullRouter)."""
+    global _router
+    _router = router
 
-    return final_response_text, session_id
+
+def _select_runner(message: str) -> Tuple[Runner, RouteDecision]:
+    """
+    Elige el runner del especialista si el pre-router está seguro; si no, el
+    orquestador.
+    """
+    decision = _router.route(message)
+    runner = _specialist_runners.get(decision.agent) if decision.agent else None
+    if runner is None:
+        _route_decisions.inc(route=root_agent.name, reason=decision.reason)
+        return _runner, decision
+    _route_decisions.inc(route=decision.agent, reason=decision.reason)
+    if _hop_estimate_seconds is not None:
+        _router_saved.inc(_hop_estimate_seconds)
+    return runner, decision
+
+
+def _record_orchestrator_hop(seconds: float) -> None:
+    """Registra cuánto tardó el orquestador en transferir y actualiza la estimación."""
+    global _hop_estimate_seconds
+    _orchestrator_hop.observe(seconds)
+    if _hop_estimate_seconds is None:
+        _hop_estimate_seconds = seconds
+    else:
+        _hop_estimate_seconds += _HOP_EWMA_ALPHA * (seconds - _hop_estimate_seconds)
+    _hop_estimate.set(_hop_estimate_seconds)
+
+
+async def _run_agent(
+    message: str,
+    session_id: str,
+    user_id: str,
+    trace: Trace,
+    cv_index: CVIndex,
+    run_config: Optional[RunConfig] = None,
+) -> AsyncIterator[Any]:
+    """
+    Ejecuta el mensaje en el runner elegido por el pre-router y reenvía sus eventos.
+    Cada paso del runner ve `cv_index`: si el CV se recarga a mitad de la ejecución, la
+    petición termina con la instantánea con la que empezó.
+    """
+    runner, decision = _select_runner(message)
+    span = trace.start_span(
+        "agent.run",
+        **{
+            "agent.name": decision.agent if runner is not _runner else root_agent.name,
+            "route.reason": decision.reason,
+        },
+    )
+    recorder = EventSpanRecorder(trace, span)
+    content = types.Content(role="user", parts=[types.Part(text=message)])
+    options: Dict[str, Any] = {"run_config": run_config} if run_config else {}
+    started = time.perf_counter()
+    hop_measured = runner is not _runner
+
+    # aclosing garantiza que, si quien consume deja de iterar (respuesta final, cliente
+    # desconectado, cancelación), el generador del runner se cierra y no sigue
+    # trabajando.
+    try:
+        async with aclosing(
+            runner.run_async(
+                user_id=user_id, session_id=session_id, new_message=content, **options
+            )
+        ) as events:
+            while True:
+                # Se fija en cada paso: quien consume puede reanudar el generador desde
+                # otra tarea (streaming), con otro contexto.
+                with use_cv_index(cv_index):
+                    event = await anext(events, None)
+                if event is None:
+                    break
+                recorder.record(event)
+                actions = getattr(event, "actions", None)
+                if (
+                    not hop_measured
+                    and actions is not None
+                    and actions.transfer_to_agent
+                ):
+                    # Coste del salto que el atajo evita: del inicio a la decisión de
+                    # transferir.
+                    _record_orchestrator_hop(time.perf_counter() - started)
+                    hop_measured = True
+                yield event
+    except GeneratorExit:
+        # Quien consume dejó de iterar (respuesta final recibida): no es un error.
+        raise
+    except BaseException as exc:
+        span.end(error=exc)
+        raise
+    finally:
+        recorder.close()
+        span.end()
+
+
+def _event_text(event: Any) -> Optional[str]:
+    """
+    Extrae el texto visible de un evento del runner (ignora 'thoughts' y llamadas a
+    herramientas).
+    """
+    if not event.content or not event.content.parts:
+        return None
+    texts = [
+        part.text
+        for part in event.content.parts
+        if part.text is not None and not getattr(part, "thought", False)
+    ]
+    return "".join(texts) if texts else None
+
+
+async def invoke_agent_async(
+    message: str, session_id: Optional[str], user_id: str
+) -> Tuple[str, str]:
+    """
+    Invoca al agente, gestionando la sesión del usuario.
+    Crea una nueva sesión si no se proporciona una válida. Los mensajes obvios van
+    directos al especialista; el resto, al orquestador. Los spans se añaden a la traza
+    en curso (si no hay, se crea y se cierra una propia).
+    """
+    # Instantánea del CV con la que se atiende toda la petición.
+    cv_index = get_cv_index()
+    with ensure_trace("invoke_agent_async") as trace:
+        session_id, first_turn = await _ensure_session(session_id, user_id, trace)
+        trace.root.attributes["session.id"] = session_id
+        if first_turn:
+            cached = await _cached_answer(message, session_id, user_id, trace, cv_index)
+            if cached is not None:
+                return cached, session_id
+
+        # Ejecuta el agente y procesa la respuesta.
+        final_response_text: str = _DEFAULT_RESPONSE
+        author = None
+        started = time.perf_counter()
+
+        async with aclosing(
+            _run_agent(message, session_id, user_id, trace, cv_index)
+        ) as events:
+            async for event in events:
+                if event.is_final_response() and event.content and event.content.parts:
+                    response_text = event.content.parts[0].text
+                    if response_text is not None:
+                        final_response_text = normalize_html(response_text)
+                        author = event.author
+                    break
+
+        if first_turn:
+            _remember_answer(
+                message,
+                final_response_text,
+                author,
+                time.perf_counter() - started,
+                cv_index,
+            )
+        return final_response_text, session_id
+
+
+async def stream_agent_async(
+    message: str, session_id: Optional[str], user_id: str
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Invoca al agente en modo streaming (con el mismo pre-enrutado que
+    invoke_agent_async).
+
+    Emite diccionarios con la forma:
+    - {"type": "session", "session_id": ...} en cuanto la sesión está lista.
+    - {"type": "delta", "text": ...} por cada fragmento parcial de texto.
+    - {"type": "done", "response": ..., "session_id": ...} con la respuesta final
+      completa.
+
+    El texto sale ya normalizado (ver rendering.py): los deltas concatenados forman HTML
+    permitido, igual a `response` salvo que el modelo corrija el texto en el evento
+    final.
+    """
+    # Instantánea del CV con la que se atiende toda la petición.
+    cv_index = get_cv_index()
+    with ensure_trace("stream_agent_async") as trace:
+        session_id, first_turn = await _ensure_session(session_id, user_id, trace)
+        trace.root.attributes["session.id"] = session_id
+        yield {"type": "session", "session_id": session_id}
+
+        if first_turn:
+            cached = await _cached_answer(message, session_id, user_id, trace, cv_index)
+            if cached is not None:
+                yield {"type": "delta", "text": cached}
+                yield {"type": "done", "response": cached, "session_id": session_id}
+                return
+
+        final_response_text: str = _DEFAULT_RESPONSE
+        author = None
+        started = time.perf_counter()
+        normalizer = HtmlNormalizer()
+        streamed, emitted = [], []
+
+        async with aclosing(
+            _run_agent(
+                message, session_id, user_id, trace, cv_index, _STREAMING_RUN_CONFIG
+            )
+        ) as events:
+            async for event in events:
+                text = _event_text(event)
+                if event.partial:
+                    if text:
+                        streamed.append(text)
+                        chunk = normalizer.feed(text)
+                        if chunk:
+                            emitted.append(chunk)
+                            yield {"type": "delta", "text": chunk}
+                    continue
+                if event.is_final_response():
+                    if text is not None:
+                        author = event.author
+                        tail = normalizer.close()
+                        if tail:
+                            emitted.append(tail)
+                            yield {"type": "delta", "text": tail}
+                        # Normalmente el evento final repite lo ya emitido: no se
+                        # procesa dos veces.
+                        final_response_text = (
+                            "".join(emitted)
+                            if text == "".join(streamed)
+                            else normalize_html(text)
+                        )
+                    break
+
+        if first_turn:
+            _remember_answer(
+                message,
+                final_response_text,
+                author,
+                time.perf_counter() - started,
+                cv_index,
+            )
+        yield {
+            "type": "done",
+            "response": final_response_text,
+            "session_id": session_id,
+        }
@@ -0,0 +1,378 @@
+# sessions.py
+# Servicio de sesiones acotado: expiración por inactividad, límite por usuario y
+# desalojo LRU.
+#
+# Envuelve un servicio de sesiones de ADK (en memoria o SQLite) y lleva un registro de
+# último acceso por sesión. Con SQLite, tanto las sesiones como el registro viven en el
+# mismo fichero (modo WAL), por lo que sobreviven a los redespliegues. Las consultas al
+# registro SQLite pueden esperar al cerrojo de escritura de otro proceso, así que se
+# hacen en un hilo (asyncio.to_thread) y nunca bloquean el bucle de eventos.
+#
+# Variables de entorno:
+#   SESSION_BACKEND            memory | sqlite (por defecto: memory)
+#   SESSION_DB_PATH            fichero SQLite (por defecto: data/sessions.db)
+#   SESSION_IDLE_TTL_SECONDS   inactividad tras la que caduca una sesión (por defecto:
+#                              6h)
+#   SESSION_MAX_PER_USER       sesiones vivas por usuario (por defecto: 5)
+#   SESSION_MAX_TOTAL          sesiones vivas en total (por defecto: 10000)
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import (
+    BaseSessionService,
+    InMemorySessionService,
+    Session,
+)
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+
+from assistant.logger import get_logger
+
+logger = get_logger(__name__)
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_DB_PATH = os.path.join(_PROJECT_ROOT, "data", "sessions.db")
+
+SessionKey = Tuple[str, str, str]  # (app_name, user_id, session_id)
+
+
+# --- Registro de accesos ---
+
+
+class _MemoryLedger:
+    """Registro de último acceso en memoria, ordenado de menos a más reciente."""
+
+    blocking = False
+
+    def __init__(self):
+        self._entries: "OrderedDict[SessionKey, float]" = OrderedDict()
+        # Índice por usuario para aplicar el límite sin recorrer todas las sesiones.
+        self._by_user: "dict[Tuple[str, str], OrderedDict[SessionKey, None]]" = {}
+        self._lock = threading.Lock()
+
+    def touch(self, key: SessionKey, now: float) -> None:
+        with self._lock:
+            self._entries[key] = now
+            self._entries.move_to_end(key)
+            user_entries = self._by_user.setdefault(key[:2], OrderedDict())
+            user_entries[key] = None
+            user_entries.move_to_end(key)
+
+    def last_access(self, key: SessionKey) -> Optional[float]:
+        return self._entries.get(key)
+
+    def remove(self, key: SessionKey) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            user_entries = self._by_user.get(key[:2])
+            if user_entries is not None:
+                user_entries.pop(key, None)
+                if not user_entries:
+                    del self._by_user[key[:2]]
+
+    def idle_since(self, cutoff: float) -> List[SessionKey]:
+        expired = []
+        with self._lock:
+            for key, seen in self._entries.items():
+                if seen >= cutoff:
+                    break
+                expired.append(key)
+        return expired
+
+    def user_sessions(self, app_name: str, user_id: str) -> List[SessionKey]:
+        with self._lock:
+            return list(self._by_user.get((app_name, user_id), ()))
+
+    def oldest(self, limit: int) -> List[SessionKey]:
+        with self._lock:
+            return [key for key, _ in zip(self._entries, range(limit))]
+
+    def count(self) -> int:
+        return len(self._entries)
+
+
+class _SqliteLedger:
+    """
+    Registro de último acceso en una tabla SQLite.
+
+    Las operaciones son escrituras indexadas de microsegundos sobre una conexión
+    compartida en modo WAL; al vivir en disco, lo comparten todos los procesos. Una
+    escritura puede esperar hasta 30 s al cerrojo de otro proceso: el servicio las llama
+    desde un hilo.
+    """
+
+    blocking = True
+
+    def __init__(self, db_path: str):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_access (
+                    app_name TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (app_name, user_id, session_id)
+                )
+                """)
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_session_access_last "
+                "ON session_access (last_access)"
+            )
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).fetchall()
+
+    def touch(self, key: SessionKey, now: float) -> None:
+        self._query(
+            "INSERT INTO session_access VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (app_name, user_id, session_id) "
+            "DO UPDATE SET last_access = excluded.last_access",
+            (*key, now),
+        )
+
+    def last_access(self, key: SessionKey) -> Optional[float]:
+        rows = self._query(
+            "SELECT last_access FROM session_access "
+            "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            key,
+        )
+        return rows[0][0] if rows else None
+
+    def remove(self, key: SessionKey) -> None:
+        self._query(
+            "DELETE FROM session_access "
+            "WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            key,
+        )
+
+    def idle_since(self, cutoff: float) -> List[SessionKey]:
+        return [
+            tuple(row)
+            for row in self._query(
+                "SELECT app_name, user_id, session_id FROM session_access "
+                "WHERE last_access < ? ORDER BY last_access",
+                (cutoff,),
+            )
+        ]
+
+    def user_sessions(self, app_name: str, user_id: str) -> List[SessionKey]:
+        return [
+            tuple(row)
+            for row in self._query(
+                "SELECT app_name, user_id, session_id FROM session_access "
+                "WHERE app_name = ? AND user_id = ? ORDER BY last_access",
+                (app_name, user_id),
+            )
+        ]
+
+    def oldest(self, limit: int) -> List[SessionKey]:
+        return [
+            tuple(row)
+            for row in self._query(
+                "SELECT app_name, user_id, session_id FROM session_access "
+                "ORDER BY last_access LIMIT ?",
+                (limit,),
+            )
+        ]
+
+    def count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM session_access")[0][0]
+
+
+# --- Servicio acotado ---
+
+
+class BoundedSessionService(BaseSessionService):
+    """
+    Servicio de sesiones con memoria acotada.
+
+    - Las sesiones inactivas más de `idle_ttl` segundos caducan.
+    - Cada usuario conserva como máximo `max_per_user` sesiones; al crear una nueva
+      se desaloja la que lleva más tiempo sin usarse.
+    - En total se conservan como máximo `max_total` sesiones (desalojo LRU global).
+    """
+
+    def __init__(
+        self,
+        inner: BaseSessionService,
+        ledger: Any,
+        idle_ttl: float,
+        max_per_user: int,
+        max_total: int,
+        sweep_interval: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.inner = inner
+        self.ledger = ledger
+        self.idle_ttl = idle_ttl
+        self.max_per_user = max_per_user
+        self.max_total = max_total
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._last_sweep = 0.0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def _ledger(self, method: str, *args: Any) -> Any:
+        """
+        Llama al registro; si puede bloquear (SQLite), en un hilo fuera del bucle de
+        eventos.
+        """
+        call = getattr(self.ledger, method)
+        if self.ledger.blocking:
+            return await asyncio.to_thread(call, *args)
+        return call(*args)
+
+    async def _drop(self, key: SessionKey) -> None:
+        app_name, user_id, session_id = key
+        await self._ledger("remove", key)
+        try:
+            await self.inner.delete_session(
+                app_name=app_name, user_id=user_id, session_id=session_id
+            )
+        except (KeyError, ValueError):
+            pass
+
+    async def sweep(self) -> int:
+        """Elimina las sesiones caducadas. Devuelve cuántas se han eliminado."""
+        now = self._clock()
+        self._last_sweep = now
+        expired = await self._ledger("idle_since", now - self.idle_ttl)
+        for key in expired:
+            await self._drop(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    async def _make_room(self, app_name: str, user_id: str) -> None:
+        if self._clock() - self._last_sweep >= self.sweep_interval:
+            await self.sweep()
+
+        user_sessions = await self._ledger("user_sessions", app_name, user_id)
+        for key in user_sessions[: max(0, len(user_sessions) - self.max_per_user + 1)]:
+            await self._drop(key)
+            self.evictions += 1
+
+        overflow = await self._ledger("count") - self.max_total + 1
+        if overflow > 0:
+            for key in await self._ledger("oldest", overflow):
+                await self._drop(key)
+                self.evictions += 1
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        await self._make_room(app_name, user_id)
+        session = await self.inner.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        await self._ledger("touch", (app_name, user_id, session.id), self._clock())
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        now = self._clock()
+        last_access = await self._ledger("last_access", key)
+        if last_access is not None and now - last_access > self.idle_ttl:
+            await self._drop(key)
+            self.expirations += 1
+            return None
+
+        session = await self.inner.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is None:
+            await self._ledger("remove", key)
+        else:
+            await self._ledger("touch", key, now)
+        return session
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: Optional[str] = None
+    ) -> ListSessionsResponse:
+        return await self.inner.list_sessions(app_name=app_name, user_id=user_id)
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        await self._drop((app_name, user_id, session_id))
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> dict[str, Any]:
+        return await self.inner.get_user_state(app_name=app_name, user_id=user_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await self.inner.append_event(session, event)
+        if not event.partial:
+            key = (session.app_name, session.user_id, session.id)
+            await self._ledger("touch", key, self._clock())
+        return event
+
+    async def flush(self) -> None:
+        await self.inner.flush()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sessions": self.ledger.count(),
+            "max_total": self.max_total,
+            "max_per_user": self.max_per_user,
+            "idle_ttl_seconds": self.idle_ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def _enable_wal(db_path: str) -> None:
+    """
+    Activa WAL en el fichero (persistente): lectores y escritor no se bloquean entre sí.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+
+
+def create_session_service(backend: Optional[str] = None) -> BoundedSessionService:
+    """Construye el servicio de sesiones según SESSION_BACKEND."""
+    backend = (backend or os.getenv("SESSION_BACKEND", "memory")).lower()
+    options = dict(
+        idle_ttl=float(os.getenv("SESSION_IDLE_TTL_SECONDS", str(6 * 60 * 60))),
+        max_per_user=int(os.getenv("SESSION_MAX_PER_USER", "5")),
+        max_total=int(os.getenv("SESSION_MAX_TOTAL", "10000")),
+    )
+
+    if backend == "sqlite":
+        from google.adk.sessions.sqlite_session_service import SqliteSessionService
+
+        db_path = os.getenv("SESSION_DB_PATH", DEFAULT_DB_PATH)
+        _enable_wal(db_path)
+        logger.info("Sesiones persistentes en SQLite (WAL)", extra={"db_path": db_path})
+        return BoundedSessionService(
+            SqliteSessionService(db_path), _SqliteLedger(db_path), **options
+        )
+    if backend != "memory":
+        raise ValueError(f"SESSION_BACKEND no soportado: '{backend}'")
+    return BoundedSessionService(InMemorySessionService(), _MemoryLedger(), **options)
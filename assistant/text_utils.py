@@ -0,0 +1,97 @@
+# text_utils.py
+# Utilidades de normalización de texto compartidas por los índices y cachés.
+
+import re
+import unicodedata
+from typing import List
+
+# Palabras vacías en español e inglés que no aportan nada a la búsqueda.
+STOPWORDS = frozenset("""
+    a al algo algun alguna algunas alguno algunos ante antes aqui asi aun bajo
+    bien cada como con contra cual cuales cuando de del desde donde dos el ella
+    ellas ellos en entre era eres es esa esas ese eso esos esta estas este esto
+    estos fue ha has hay hace haces hacia han hasta la las le les lo los mas me
+    mi mis mucho muy nada ni no nos nuestra nuestro o os otra otro para pero poco
+    por porque que quien quienes se sea ser si sin sobre solo son su sus tambien
+    te tener tengo tiene tienes tu tus un una unas uno unos vos y ya yo
+    articulo articulos post posts blog escrito escrita escribiste
+    cuentame dime hablame explicame podrias puedes quiero saber favor
+    a an and are as at be by do does for from have how i in is it of on or that
+    the this to was what with you your
+    """.split())
+
+# Negaciones: no aportan a una búsqueda, pero cambian el sentido de una pregunta
+# ('¿has trabajado con X?' frente a '¿no has trabajado con X?').
+NEGATIONS = frozenset("no ni nunca sin tampoco not never".split())
+
+# Interrogativos: tampoco aportan a una búsqueda, pero distinguen preguntas sobre lo
+# mismo ('¿dónde estudiaste?' frente a '¿cuándo estudiaste?'). Se conservan junto con
+# la preposición que los precede ('¿con quién...?' frente a '¿para quién...?').
+QUESTION_WORDS = frozenset("""
+    que quien quienes cual cuales cuando donde adonde como cuanto cuanta cuantos cuantas
+    what who whom whose which when where why how
+    """.split())
+_PREPOSITIONS = frozenset("a con de desde en hacia hasta para por sobre".split())
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[+#.][a-z0-9]+)*[+#]*")
+
+
+def fold_accents(text: str) -> str:
+    """Elimina tildes y diacríticos ('artículo' -> 'articulo')."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize_text(text: str) -> str:
+    """Pasa el texto a minúsculas y sin tildes."""
+    return fold_accents(text.lower())
+
+
+def _stem(token: str) -> str:
+    """
+    Stemming mínimo: unifica plurales simples ('llms' -> 'llm', 'agentes' -> 'agente').
+    """
+    if len(token) > 4 and token.endswith("es") and token[-3] not in "aeiou":
+        return token[:-1]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str, drop_stopwords: bool = True) -> List[str]:
+    """Divide el texto normalizado en términos indexables."""
+    tokens = _TOKEN_PATTERN.findall(normalize_text(text))
+    if drop_stopwords:
+        tokens = [token for token in tokens if token not in STOPWORDS]
+    return [_stem(token) for token in tokens]
+
+
+def query_terms(text: str) -> List[str]:
+    """Términos de una pregunta: como tokenize, pero conservando las negaciones."""
+    tokens = _TOKEN_PATTERN.findall(normalize_text(text))
+    return [
+        _stem(token) for token in tokens if token not in STOPWORDS or token in NEGATIONS
+    ]
+
+
+def question_words(text: str) -> List[str]:
+    """Interrogativos con su preposición: '¿Con quién trabajas?' -> ['con quien']."""
+    tokens = _TOKEN_PATTERN.findall(normalize_text(text))
+    return [
+        f"{tokens[i - 1]} {token}" if i and tokens[i - 1] in _PREPOSITIONS else token
+        for i, token in enumerate(tokens)
+        if token in QUESTION_WORDS
+    ]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Clave canónica de una consulta: minúsculas, sin tildes ni palabras vacías (salvo las
+    negaciones), sin duplicados y en orden alfabético:
+    '¿Tienes artículos sobre LLMs?' -> 'llm'.
+    """
+    terms = sorted(set(query_terms(query)))
+    if terms:
+        return " ".join(terms)
+    # Consultas formadas solo por palabras vacías: basta con normalizar el texto.
+    return " ".join(normalize_text(query).split())
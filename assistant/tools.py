@@ -1,15 +1,104 @@
 # tools.py
 # Herramientas que los agentes especialistas pueden utilizar.
 
+import functools
 import json
 import os
+from typing import Dict, List
 
 from googlesearch import search
 
+from assistant.blog_index import get_blog_index
+from assistant.blog_metadata import enrich_blog_results
+from assistant.cache import TTLCache
+from assistant.cv_index import cv_path, get_cv_index
+from assistant.logger import get_logger, query_fields
+from assistant.resilience import UpstreamUnavailable, create_upstream
+from assistant.text_utils import normalize_query
+
+logger = get_logger(__name__)
+
+# Caché de resultados de búsqueda: las mismas preguntas se repiten constantemente.
+_search_cache = TTLCache(
+    ttl=float(os.getenv("BLOG_SEARCH_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("BLOG_SEARCH_CACHE_MAX_ENTRIES", "256")),
+)
+# Últimos resultados buenos de Google, más duraderos: se sirven si Google no está
+# disponible.
+_stale_search_cache = TTLCache(
+    ttl=float(os.getenv("BLOG_SEARCH_STALE_TTL_SECONDS", "86400")),
+    max_entries=int(os.getenv("BLOG_SEARCH_CACHE_MAX_ENTRIES", "256")),
+)
+# Plazo por debajo del timeout de la herramienta (offload_tool) para que los reintentos
+# y la respuesta degradada lleguen antes de que ADK la dé por perdida.
+_google_search = create_upstream("google_search", deadline=8.0, attempts=3)
+
+
+def _search_google(query: str) -> List[Dict[str, str]]:
+    """
+    Fallback: busca en Google con el operador site: (lento y sujeto a rate limiting).
+    """
+    google_query = f"site:blog.sergiomarquez.dev {query}"
+    logger.info("Buscando en Google", extra=query_fields(query))
+
+    results = []
+    for url in search(google_query, num_results=10, lang="es"):
+        # Título provisional a partir del slug; enrich_blog_results lo cambia por el
+        # real.
+        article_title = (
+            url.replace("https://blog.sergiomarquez.dev/", "").replace("-", " ").title()
+        )
+        results.append({"title": article_title, "url": url})
+    return results
+
+
+def _google_fallback_enabled() -> bool:
+    return os.getenv("BLOG_SEARCH_GOOGLE_FALLBACK", "true").lower() == "true"
+
+
+def _find_blog_posts(query: str) -> List[Dict[str, str]]:
+    """
+    Resuelve la búsqueda en el índice local o, si no existe, en Google (con caché).
+    Las cachés guardan los resultados de Google tal cual y el enriquecimiento se hace
+    después: un artículo que no llegó a tiempo esta vez sale con su título real en la
+    siguiente búsqueda, cuando su descarga en segundo plano ya ha terminado.
+    """
+    index = get_blog_index()
+    if index is not None:
+        source = f"index:{index.version}"
+        compute = functools.partial(index.search, query, limit=10)
+    elif _google_fallback_enabled():
+        source = "google"
+        compute = functools.partial(_google_search.call, _search_google, query)
+    else:
+        return []
+    # La versión del índice forma parte de la clave: reconstruirlo invalida la caché.
+    key = (source, normalize_query(query))
+    try:
+        results = _search_cache.get_or_compute(key, compute)
+    except UpstreamUnavailable:
+        found, stale = _stale_search_cache.get(key)
+        if not found:
+            raise
+        logger.warning("Google no disponible; se sirven resultados anteriores")
+        return enrich_blog_results(stale)
+    if source == "google":
+        _stale_search_cache.set(key, results)
+        return enrich_blog_results(results)
+    return results
+
+
+def get_search_cache_stats() -> Dict[str, object]:
+    """
+    Estadísticas (hits, misses, coalescencias...) de la caché de búsquedas del blog.
+    """
+    return _search_cache.stats()
+
 
 def search_blog_posts(query: str) -> str:
     """
-    Busca artículos en el blog de Sergio usando Google Search con el operador site:.
+    Busca artículos en el blog de Sergio usando el índice local del blog
+    (o Google Search con el operador site: si el índice no está disponible).
 
     Args:
         query: El tema que el usuario quiere buscar en el blog.
@@ -17,52 +106,47 @@ def search_blog_posts(query: str) -> str:
     Returns:
         Una cadena con los artículos encontrados o un mensaje indicando que no se encontraron.
     """
-    print(f"--- Ejecutando herramienta: search_blog_posts con query: '{query}' ---")
-
-    # Construir la query de búsqueda con el operador site:
-    google_query = f"site:blog.sergiomarquez.dev {query}"
-    print(f"Buscando en Google: {google_query}")
+    # Una línea por llamada: se muestrea (LOG_SAMPLE_RATE) y la consulta no va en claro.
+    logger.info(
+        "Ejecutando herramienta",
+        extra={"tool": "search_blog_posts", "sampled": True, **query_fields(query)},
+    )
 
     try:
-        # Realizar búsqueda en Google (limitamos a 10 resultados)
-        search_results = []
-        for url in search(google_query, num_results=10, lang="es"):
-            search_results.append(url)
+        search_results = _find_blog_posts(query)
 
         if not search_results:
             return f"Lo siento, pero no he encontrado ningún artículo sobre '{query}' en mi blog."
 
         # Formatear los resultados
         results_text = f"He encontrado {len(search_results)} artículo(s) sobre '{query}' en mi blog:\n\n"
-        for i, url in enumerate(search_results, 1):
-            # Extraer el título del artículo de la URL si es posible
-            article_title = (
-                url.replace("https://blog.sergiomarquez.dev/", "")
-                .replace("-", " ")
-                .title()
-            )
-            results_text += f"{i}. {article_title}\n   {url}\n\n"
+        for i, result in enumerate(search_results, 1):
+            results_text += f"{i}. {result['title']}\n   {result['url']}\n"
+            if result.get("published"):
+                results_text += f"   Publicado: {result['published'][:10]}\n"
+            if result.get("description"):
+                results_text += f"   Resumen: {result['description']}\n"
+            results_text += "\n"
 
         return results_text.strip()
 
-    except Exception as e:
-        print(f"Error al buscar en Google: {e}")
+    except UpstreamUnavailable:
+        # Google caído o lento, sin resultados anteriores que servir: respuesta
+        # degradada.
         return "Lo siento, pero no he podido buscar en mi blog en este momento. Por favor, intenta de nuevo más tarde."
 
 
 def load_cv_data() -> str:
     """Carga y devuelve el contenido del CV desde el archivo local."""
-    # Calcular la raíz del proyecto de forma robusta
-    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    cv_path = os.path.join(project_root, "nginx", "cv.json")
+    path = cv_path()
 
     try:
-        print(f"Cargando CV desde archivo local: {cv_path}")
-        with open(cv_path, "r", encoding="utf-8") as f:
+        logger.info("Cargando CV desde archivo local", extra={"path": path})
+        with open(path, "r", encoding="utf-8") as f:
             cv_data = json.load(f)
             return json.dumps(cv_data, indent=2, ensure_ascii=False)
     except FileNotFoundError:
-        print(f"Error: No se encontró el archivo CV en {cv_path}.")
+        logger.error("No se encontró el archivo CV", extra={"path": path})
         return json.dumps(
             {
                 "name": "Sergio Márquez",
@@ -73,9 +157,45 @@ def load_cv_data() -> str:
             ensure_ascii=False,
         )
     except json.JSONDecodeError as e:
-        print(f"❌ Error al parsear JSON del CV: {e}")
+        logger.error(
+            "Error al parsear JSON del CV", extra={"path": path, "error": str(e)}
+        )
         return json.dumps(
             {"name": "Sergio Márquez", "error": "Error en formato del CV"},
             indent=2,
             ensure_ascii=False,
         )
+
+
+def query_cv(section: str = "", keywords: str = "") -> str:
+    """
+    Consulta el CV de Sergio y devuelve solo los fragmentos relevantes.
+
+    Args:
+        section: Sección del CV (perfil, experiencia, habilidades, formacion, proyectos,
+            certificaciones, idiomas...). Vacío para buscar en todo el CV.
+        keywords: Palabras clave de la pregunta (tecnologías, empresas, roles...).
+            Vacío para devolver la sección completa.
+
+    Returns:
+        Los fragmentos del CV encontrados, uno por línea, o un mensaje con las
+        secciones disponibles si no hay coincidencias.
+    """
+    logger.info(
+        "Ejecutando herramienta",
+        extra={
+            "tool": "query_cv",
+            "section": section,
+            "sampled": True,
+            **query_fields(keywords, "keywords"),
+        },
+    )
+    index = get_cv_index()
+    fragments = index.query(section=section, keywords=keywords)
+
+    if not fragments:
+        return (
+            f"No hay información en el CV para section='{section}', keywords='{keywords}'. "
+            f"Secciones disponibles: {index.outline()}."
+        )
+    return "\n".join(f"[{fragment['id']}] {fragment['text']}" for fragment in fragments)
@@ -0,0 +1,528 @@
+# tracing.py
+# Trazas por petición: árbol de spans construido a partir de los eventos del runner.
+#
+# Cada petición produce una traza con esta forma:
+#   POST /api/invoke                      (raíz)
+#   ├── session.get / session.create
+#   ├── answer_cache.lookup               (solo en el primer turno)
+#   └── agent.run                         (runner elegido por el pre-router)
+#       ├── llm Personal_Orchestrator     (cada llamada al modelo)
+#       ├── tool transfer_to_agent
+#       ├── llm CV_Expert
+#       ├── tool query_cv
+#       └── llm CV_Expert
+# Los spans llm/tool se deducen de los eventos que emite el runner: una llamada al
+# modelo va desde el paso anterior hasta el evento que produce, y una herramienta desde
+# su function_call hasta su function_response. Los tiempos incluyen el trabajo interno
+# de ADK entre eventos, así que son aproximados (del orden de milisegundos).
+#
+# Las trazas terminadas se exportan en JSON compatible con OTLP (resourceSpans): las más
+# recientes quedan en memoria para /api/traces y, opcionalmente, se añaden a un fichero
+# JSON Lines. Sus duraciones y tokens se agregan en las métricas de /api/metrics.
+# La escritura en el fichero se hace en un hilo aparte, como los logs (ver logger.py):
+# finish() se llama desde el event loop y solo encola la línea ya serializada.
+#
+# Variables de entorno:
+#   TRACE_BUFFER_SIZE        trazas recientes en memoria (por defecto: 100; 0 las
+#                            desactiva)
+#   TRACE_EXPORT_PATH        fichero JSON Lines al que añadir cada traza (por defecto:
+#                            ninguno)
+#   TRACE_EXPORT_QUEUE_SIZE  trazas pendientes de escribir antes de descartar (por
+#                            defecto: 1000)
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from assistant.metrics import registry
+
+SERVICE_NAME = "assistant"
+# SpanKind de OTLP: INTERNAL=1, SERVER=2, CLIENT=3.
+_OTLP_KIND = {"request": 2, "llm": 3}
+_STATUS_UNSET, _STATUS_OK, _STATUS_ERROR = 0, 1, 2
+
+# --- Métricas agregadas a partir de los spans ---
+_request_seconds = registry.histogram(
+    "assistant_request_duration_seconds",
+    "Duración total de cada petición por operación.",
+    ("operation", "status"),
+)
+_session_seconds = registry.histogram(
+    "assistant_session_operation_seconds",
+    "Duración de las operaciones del servicio de sesiones.",
+    ("operation",),
+)
+_llm_seconds = registry.histogram(
+    "assistant_llm_call_seconds",
+    "Duración de cada llamada al modelo por agente.",
+    ("agent",),
+)
+_llm_first_token = registry.histogram(
+    "assistant_llm_time_to_first_token_seconds",
+    "Tiempo hasta el primer fragmento de texto en streaming por agente.",
+    ("agent",),
+)
+_llm_tokens = registry.counter(
+    "assistant_llm_tokens_total",
+    "Tokens consumidos por agente y tipo (prompt, completion).",
+    ("agent", "type"),
+)
+_tier_seconds = registry.histogram(
+    "assistant_model_tier_call_seconds",
+    "Duración de cada llamada al modelo por nivel (ver config.py) y modelo.",
+    ("tier", "model"),
+)
+_tier_tokens = registry.counter(
+    "assistant_model_tier_tokens_total",
+    "Tokens consumidos por nivel del modelo y tipo (prompt, completion).",
+    ("tier", "type"),
+)
+_tool_seconds = registry.histogram(
+    "assistant_tool_call_seconds",
+    "Duración de cada herramienta (incluida transfer_to_agent).",
+    ("tool", "status"),
+)
+_dropped_traces = registry.counter(
+    "assistant_traces_dropped_total",
+    "Trazas no escritas en TRACE_EXPORT_PATH porque la cola estaba llena.",
+)
+
+
+class Span:
+    """Un tramo de trabajo dentro de una traza."""
+
+    __slots__ = (
+        "name",
+        "kind",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status",
+        "status_message",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        parent_id: Optional[str],
+        start_ns: int,
+        attributes: Dict[str, Any],
+    ):
+        self.name = name
+        self.kind = kind
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = _STATUS_UNSET
+        self.status_message = ""
+
+    @property
+    def duration(self) -> float:
+        """Duración en segundos (hasta ahora si sigue abierto)."""
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    def set_error(self, error: Any) -> None:
+        self.status = _STATUS_ERROR
+        self.status_message = str(error) or type(error).__name__
+
+    def end(self, end_ns: Optional[int] = None, error: Any = None) -> None:
+        if self.end_ns is not None:
+            return
+        if error is not None:
+            self.set_error(error)
+        elif self.status == _STATUS_UNSET:
+            self.status = _STATUS_OK
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+
+    def to_otlp(self, trace_id: str) -> Dict[str, Any]:
+        span = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": _OTLP_KIND.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+class Trace:
+    """Spans de una petición. La cierra (finish) quien la crea."""
+
+    def __init__(self, name: str, **attributes: Any):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.root = self.start_span(name, kind="request", parent=None, **attributes)
+        self.finished = False
+
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        parent: Optional[Span] = None,
+        start_ns: Optional[int] = None,
+        **attributes: Any,
+    ) -> Span:
+        """Abre un span hijo de `parent` (por defecto, de la raíz)."""
+        if parent is None and self.spans:
+            parent = self.root
+        span = Span(
+            name,
+            kind,
+            parent.span_id if parent else None,
+            start_ns if start_ns is not None else time.time_ns(),
+            attributes,
+        )
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = "internal",
+        parent: Optional[Span] = None,
+        **attributes: Any,
+    ) -> Iterator[Span]:
+        """Span que abarca el bloque `with`; una excepción lo marca como error."""
+        span = self.start_span(name, kind=kind, parent=parent, **attributes)
+        try:
+            yield span
+        except GeneratorExit:
+            raise
+        except BaseException as exc:
+            span.end(error=exc)
+            raise
+        finally:
+            span.end()
+
+    def finish(self, error: Any = None) -> None:
+        """
+        Cierra la raíz y los spans abiertos, agrega las métricas y exporta la traza.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        now = time.time_ns()
+        for span in self.spans:
+            if span is not self.root and span.end_ns is None:
+                span.end(now, error="no terminado")
+        self.root.end(now, error=error)
+        _record_metrics(self)
+        _exporter.export(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """La traza en formato JSON de OTLP (una petición de exportación completa)."""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes({"service.name": SERVICE_NAME})
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "assistant.tracing"},
+                            "spans": [
+                                span.to_otlp(self.trace_id) for span in self.spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+# Traza de la petición en curso; la fija la capa HTTP alrededor de la llamada al
+# servicio.
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def start_trace(name: str, **attributes: Any) -> Trace:
+    """Empieza una traza nueva; quien la crea es responsable de llamar a finish()."""
+    return Trace(name, **attributes)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def use_trace(trace: Trace) -> Iterator[Trace]:
+    """
+    Hace de `trace` la traza en curso dentro del bloque. Las tareas creadas dentro
+    copian el contexto, así que el servicio la encuentra aunque se ejecute en otra
+    tarea.
+    """
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def ensure_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    """
+    Usa la traza en curso o, si no hay, crea una que se cierra al salir del bloque.
+    """
+    trace = current_trace()
+    if trace is not None:
+        yield trace
+        return
+    trace = start_trace(name, **attributes)
+    try:
+        yield trace
+    except GeneratorExit:
+        # Un generador cerrado antes de terminar (el cliente dejó de leer) no es un
+        # error.
+        raise
+    except BaseException as exc:
+        trace.finish(error=exc)
+        raise
+    finally:
+        trace.finish()
+
+
+class EventSpanRecorder:
+    """Convierte los eventos del runner en spans llm/tool a medida que llegan."""
+
+    def __init__(self, trace: Trace, parent: Span):
+        self.trace = trace
+        self.parent = parent
+        # Fin del último paso observado: la siguiente llamada al modelo empieza aquí.
+        self._cursor = time.time_ns()
+        self._first_token_ns: Optional[int] = None
+        self._open_tools: Dict[str, Span] = {}
+
+    def record(self, event: Any) -> None:
+        if getattr(event, "author", None) == "user":
+            return
+        now = time.time_ns()
+        if event.partial:
+            if self._first_token_ns is None:
+                self._first_token_ns = now
+            return
+
+        responses = event.get_function_responses()
+        if responses:
+            for response in responses:
+                span = self._open_tools.pop(response.id or response.name, None)
+                if span is not None:
+                    error = (response.response or {}).get("error")
+                    span.end(now, error=error)
+            self._cursor = now
+            return
+
+        self._record_llm_call(event, now)
+        for call in event.get_function_calls():
+            attributes: Dict[str, Any] = {"tool.name": call.name}
+            if call.name == "transfer_to_agent":
+                attributes["transfer.target"] = (call.args or {}).get("agent_name")
+            self._open_tools[call.id or call.name] = self.trace.start_span(
+                f"tool {call.name}",
+                kind="tool",
+                parent=self.parent,
+                start_ns=now,
+                **attributes,
+            )
+        self._cursor = now
+
+    def _record_llm_call(self, event: Any, now: int) -> None:
+        attributes: Dict[str, Any] = {"gen_ai.agent.name": event.author}
+        metadata = getattr(event, "custom_metadata", None) or {}
+        if metadata.get("model_tier"):
+            attributes["assistant.model_tier"] = metadata["model_tier"]
+            attributes["gen_ai.request.model"] = metadata.get("model")
+        usage = getattr(event, "usage_metadata", None)
+        if usage is not None:
+            attributes["gen_ai.usage.input_tokens"] = usage.prompt_token_count
+            attributes["gen_ai.usage.output_tokens"] = usage.candidates_token_count
+        if self._first_token_ns is not None:
+            attributes["gen_ai.time_to_first_token_ms"] = round(
+                (self._first_token_ns - self._cursor) / 1e6, 3
+            )
+            self._first_token_ns = None
+        span = self.trace.start_span(
+            f"llm {event.author}",
+            kind="llm",
+            parent=self.parent,
+            start_ns=self._cursor,
+            **attributes,
+        )
+        span.end(now)
+
+    def close(self) -> None:
+        """Marca como interrumpidas las herramientas que no llegaron a responder."""
+        for span in self._open_tools.values():
+            span.end(error="interrumpida")
+        self._open_tools.clear()
+
+
+def _record_metrics(trace: Trace) -> None:
+    root = trace.root
+    status = "error" if root.status == _STATUS_ERROR else "ok"
+    _request_seconds.observe(root.duration, operation=root.name, status=status)
+    for span in trace.spans:
+        if span.kind == "session":
+            _session_seconds.observe(span.duration, operation=span.name)
+        elif span.kind == "llm":
+            agent = span.attributes["gen_ai.agent.name"]
+            _llm_seconds.observe(span.duration, agent=agent)
+            first_token = span.attributes.get("gen_ai.time_to_first_token_ms")
+            if first_token is not None:
+                _llm_first_token.observe(first_token / 1000, agent=agent)
+            for attribute, kind in (
+                ("gen_ai.usage.input_tokens", "prompt"),
+                ("gen_ai.usage.output_tokens", "completion"),
+            ):
+                if span.attributes.get(attribute):
+                    _llm_tokens.inc(span.attributes[attribute], agent=agent, type=kind)
+            tier = span.attributes.get("assistant.model_tier")
+            if tier is not None:
+                _tier_seconds.observe(
+                    span.duration,
+                    tier=tier,
+                    model=span.attributes.get("gen_ai.request.model"),
+                )
+                for attribute, kind in (
+                    ("gen_ai.usage.input_tokens", "prompt"),
+                    ("gen_ai.usage.output_tokens", "completion"),
+                ):
+                    if span.attributes.get(attribute):
+                        _tier_tokens.inc(
+                            span.attributes[attribute], tier=tier, type=kind
+                        )
+        elif span.kind == "tool":
+            tool_status = "error" if span.status == _STATUS_ERROR else "ok"
+            _tool_seconds.observe(
+                span.duration, tool=span.attributes["tool.name"], status=tool_status
+            )
+
+
+class _Exporter:
+    """
+    Guarda las trazas recientes en memoria y, si se configura, en un fichero JSON Lines.
+
+    El fichero lo escribe un hilo dedicado que se arranca con la primera traza: export()
+    solo serializa y encola, sin bloquear. Si la cola se llena, la traza se descarta del
+    fichero (sigue en memoria) y se cuenta.
+    """
+
+    def __init__(self, buffer_size: int, path: str = "", queue_size: int = 1000):
+        self.buffer_size = buffer_size
+        self.path = path
+        self._recent: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+
+    def export(self, trace: Trace) -> None:
+        with self._lock:
+            if self.buffer_size > 0:
+                self._recent[trace.trace_id] = trace
+                while len(self._recent) > self.buffer_size:
+                    self._recent.popitem(last=False)
+            if not self.path:
+                return
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_forever, name="trace-exporter", daemon=True
+                )
+                self._writer.start()
+                atexit.register(self.flush)
+        try:
+            self._queue.put_nowait(json.dumps(trace.to_otlp(), ensure_ascii=False))
+        except queue.Full:
+            _dropped_traces.inc()
+
+    def flush(self) -> None:
+        """Espera a que el hilo haya escrito todas las trazas encoladas."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def _write_forever(self) -> None:
+        while True:
+            lines = [self._queue.get()]
+            # Agrupa lo que se haya acumulado en una sola apertura del fichero.
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(line + "\n" for line in lines)
+            except OSError:
+                _dropped_traces.inc(len(lines))
+            finally:
+                for _ in lines:
+                    self._queue.task_done()
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._recent.get(trace_id)
+
+    def recent(self, limit: int) -> List[Trace]:
+        with self._lock:
+            traces = list(self._recent.values())
+        return traces[-limit:][::-1] if limit > 0 else []
+
+
+_exporter = _Exporter(
+    buffer_size=int(os.getenv("TRACE_BUFFER_SIZE", "100")),
+    path=os.getenv("TRACE_EXPORT_PATH", ""),
+    queue_size=int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "1000")),
+)
+
+
+def get_trace(trace_id: str) -> Optional[Dict[str, Any]]:
+    """Traza reciente en formato OTLP, o None si ya no está en memoria."""
+    trace = _exporter.get(trace_id)
+    return trace.to_otlp() if trace is not None else None
+
+
+def recent_traces(limit: int = 20) -> Dict[str, Any]:
+    """
+    Las `limit` trazas más recientes (la última primero) en un único documento OTLP.
+    """
+    resource_spans = []
+    for trace in _exporter.recent(limit):
+        resource_spans.extend(trace.to_otlp()["resourceSpans"])
+    return {"resourceSpans": resource_spans}
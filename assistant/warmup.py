@@ -0,0 +1,180 @@
+# warmup.py
+# Calentamiento en segundo plano: carga ADK, construye los agentes y el Runner y
+# precarga cachés.
+#
+# main.py no importa assistant.services al arrancar, así que uvicorn empieza a escuchar
+# sin esperar a google.adk ni al CV. Al arrancar la aplicación se lanza el calentamiento
+# en un hilo y /api/ready responde 503 hasta que termina. Las peticiones que llegan
+# antes esperan al mismo calentamiento (sin bloquear el bucle de eventos) en lugar de
+# repetirlo.
+#
+# Variables de entorno:
+#   WARMUP_ENABLED  "false" para no calentar al arrancar: la primera petición hace la
+#                   carga
+
+import asyncio
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from assistant.logger import get_logger
+from assistant.metrics import registry
+
+logger = get_logger(__name__)
+
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+_ready = registry.gauge(
+    "assistant_ready",
+    "1 cuando el calentamiento ha terminado y el proceso puede atender peticiones.",
+)
+_step_seconds = registry.gauge(
+    "assistant_warmup_seconds",
+    "Duración de cada paso del calentamiento (step=total para el conjunto).",
+    ("step",),
+)
+
+Step = Tuple[str, Callable[[], Any]]
+
+
+class Warmup:
+    """
+    Ejecuta una vez, en un hilo, los pasos de calentamiento. start() es idempotente y,
+    si el calentamiento falló, lo reintenta; wait() espera a que termine desde asyncio.
+    """
+
+    def __init__(self, steps: Sequence[Step]):
+        self.steps = list(steps)
+        self.status = PENDING
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.step_seconds: Dict[str, float] = {}
+        self._future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def start(self) -> Future:
+        """Lanza el calentamiento si no está en marcha ni terminado con éxito."""
+        with self._lock:
+            if self._future is None or (self._future.done() and self.status == FAILED):
+                self._future = Future()
+                self.status = WARMING
+                threading.Thread(
+                    target=self._run, args=(self._future,), name="warmup", daemon=True
+                ).start()
+            return self._future
+
+    async def wait(self) -> None:
+        """
+        Espera al calentamiento (lanzándolo si hace falta). Propaga su error si falla.
+        """
+        if not self.ready:
+            await asyncio.wrap_future(self.start())
+
+    def _run(self, future: Future) -> None:
+        started = time.perf_counter()
+        try:
+            for name, step in self.steps:
+                step_started = time.perf_counter()
+                step()
+                self.step_seconds[name] = time.perf_counter() - step_started
+                _step_seconds.set(self.step_seconds[name], step=name)
+        except BaseException as e:
+            self.status, self.error = FAILED, repr(e)
+            logger.error("Error en el calentamiento", exc_info=True)
+            future.set_exception(e)
+            return
+        self.seconds = time.perf_counter() - started
+        _step_seconds.set(self.seconds, step="total")
+        self.status, self.error = READY, None
+        logger.info(
+            "Calentamiento completado",
+            extra={"seconds": round(self.seconds, 3), "steps": self.step_seconds},
+        )
+        future.set_result(None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado para /api/ready."""
+        state: Dict[str, Any] = {"status": self.status}
+        if self.seconds is not None:
+            state["warmup_seconds"] = round(self.seconds, 3)
+        if self.step_seconds:
+            state["steps"] = {
+                name: round(value, 3) for name, value in self.step_seconds.items()
+            }
+        if self.error:
+            state["error"] = self.error
+        return state
+
+
+# --- Pasos por defecto ---
+
+
+def _load_services() -> None:
+    """
+    google.adk, los agentes (y con ellos el CV y su índice), el Runner y las sesiones.
+    """
+    importlib.import_module("assistant.services")
+
+
+def _load_blog_index() -> None:
+    from assistant.blog_index import get_blog_index
+
+    get_blog_index()
+
+
+def _load_faq_store() -> None:
+    from assistant.faq import get_faq_store
+
+    get_faq_store()
+
+
+def _prime_gemini_client() -> None:
+    """Crea el cliente de google-genai del orquestador (importa sus módulos HTTP)."""
+    from assistant.agents import root_agent
+
+    if not (os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_GENAI_USE_VERTEXAI")):
+        # Sin credenciales el cliente no se puede crear; la primera llamada dará el
+        # error.
+        return
+    model = root_agent.canonical_model
+    getattr(model, "api_client", None)
+
+
+DEFAULT_STEPS: Sequence[Step] = (
+    ("services", _load_services),
+    ("blog_index", _load_blog_index),
+    ("faq", _load_faq_store),
+    ("gemini_client", _prime_gemini_client),
+)
+
+
+def create_warmup(steps: Sequence[Step] = DEFAULT_STEPS) -> Warmup:
+    return Warmup(steps)
+
+
+def warmup_enabled() -> bool:
+    return os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+
+
+_warmup = create_warmup()
+_ready.set_function(lambda: {(): 1.0 if _warmup.ready else 0.0})
+
+
+def get_warmup() -> Warmup:
+    return _warmup
+
+
+def set_warmup(warmup: Warmup) -> None:
+    """Sustituye el calentamiento del proceso (tests)."""
+    global _warmup
+    _warmup = warmup
@@ -0,0 +1,307 @@
+# ws.py
+# Canal de conversación por WebSocket (/api/ws).
+#
+# Una conexión por visitante: el usuario (cookie) y la sesión se resuelven una vez al
+# conectar (la ruta, en main.py) y cada mensaje recibe, como JSON, los mismos eventos
+# que el stream SSE (session, delta, done, error). Protocolo:
+#   cliente  -> {"type": "message", "message": "..."} | {"type": "pong"}
+#               | {"type": "ping"}
+#   servidor -> eventos del agente | {"type": "ping"} | {"type": "pong"}
+#
+# Variables de entorno:
+#   WS_HEARTBEAT_SECONDS     intervalo de ping; sin respuesta en dos se cierra (por
+#                            defecto: 20)
+#   WS_IDLE_TIMEOUT_SECONDS  tiempo sin mensajes tras el que se cierra (por defecto:
+#                            600)
+#   WS_MAX_PENDING_MESSAGES  mensajes esperando a la respuesta en curso (por defecto: 2)
+#   WS_SEND_TIMEOUT_SECONDS  plazo para entregar un frame (por defecto: 10)
+
+import asyncio
+import json
+import os
+import time
+from contextlib import aclosing, suppress
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from fastapi import WebSocket
+
+from assistant.admission import AdmissionRejected, get_admission_controller
+from assistant.logger import get_logger, log_request
+from assistant.metrics import registry
+from assistant.resilience import UpstreamUnavailable, unavailable_detail
+from assistant.tracing import Trace, start_trace, use_trace
+
+logger = get_logger(__name__)
+
+# Eventos del agente para un mensaje (stream_agent_async de main.py).
+Stream = Callable[..., AsyncIterator[Dict[str, Any]]]
+
+# Cada cuánto se envía un ping si la conexión está en silencio. Sin ningún frame del
+# cliente durante dos intervalos, la conexión se da por muerta.
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "20"))
+# Tiempo sin mensajes del visitante (ni respuestas en curso) tras el que se cierra.
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "600"))
+# Mensajes que pueden esperar a que termine la respuesta en curso; el resto se rechazan.
+WS_MAX_PENDING_MESSAGES = int(os.getenv("WS_MAX_PENDING_MESSAGES", "2"))
+# Plazo para entregar un frame: un cliente que no lee en ese tiempo se desconecta.
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+
+# Motivo del cierre -> (código de cierre WebSocket, texto).
+_WS_CLOSE_CODES = {
+    "idle": (1000, "Conexión cerrada por inactividad"),
+    "heartbeat": (1001, "Sin respuesta al heartbeat"),
+    "error": (1011, "Error interno"),
+    "slow_consumer": (1013, "El cliente no lee los mensajes a tiempo"),
+}
+
+_ws_connections = registry.gauge(
+    "assistant_ws_connections", "Conexiones WebSocket abiertas en /api/ws."
+)
+_ws_closed = registry.counter(
+    "assistant_ws_closed_total",
+    "Conexiones WebSocket cerradas por motivo (client, idle, heartbeat, slow_consumer, error).",
+    ("reason",),
+)
+
+
+class _ChannelClosed(Exception):
+    """La conexión ya no admite envíos; `reason` es el motivo para _WS_CLOSE_CODES."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class ConversationChannel:
+    """
+    Conversación de un visitante sobre un WebSocket ya aceptado. Un receptor lee los
+    frames y mantiene el heartbeat mientras un trabajador responde los mensajes de uno
+    en uno, en orden, con `stream` y un plazo de `timeout` segundos por respuesta.
+
+    Contrapresión: el agente solo avanza cuando el frame anterior se ha entregado, así
+    que un cliente lento frena la generación en lugar de acumular frames en memoria; si
+    un envío no termina en WS_SEND_TIMEOUT_SECONDS se cierra la conexión. En la entrada,
+    como mucho WS_MAX_PENDING_MESSAGES mensajes esperan turno y los demás reciben un
+    error "busy".
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        admission_key: str,
+        session_id: Optional[str],
+        stream: Stream,
+        timeout: float,
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.admission_key = admission_key
+        self.session_id = session_id
+        self.stream = stream
+        self.timeout = timeout
+        self.inbox: asyncio.Queue[str] = asyncio.Queue(
+            maxsize=max(1, WS_MAX_PENDING_MESSAGES)
+        )
+        self.busy = False
+        self.last_seen = self.last_activity = time.monotonic()
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, payload: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            try:
+                await asyncio.wait_for(
+                    self.websocket.send_text(json.dumps(payload, ensure_ascii=False)),
+                    WS_SEND_TIMEOUT_SECONDS,
+                )
+            except TimeoutError as e:
+                raise _ChannelClosed("slow_consumer") from e
+            except Exception as e:
+                # Envío tras la desconexión (el receptor aún no la ha visto).
+                raise _ChannelClosed("client") from e
+
+    async def run(self) -> str:
+        """Atiende la conexión hasta que termina y devuelve el motivo del cierre."""
+        worker = asyncio.create_task(self._work())
+        receiver = asyncio.create_task(self._receive())
+        try:
+            done, _ = await asyncio.wait(
+                {worker, receiver}, return_when=asyncio.FIRST_COMPLETED
+            )
+            try:
+                return done.pop().result()
+            except Exception:
+                logger.error("Error en el canal WebSocket", exc_info=True)
+                return "error"
+        finally:
+            # Una desconexión cancela la respuesta en curso (llamadas al LLM y
+            # herramientas).
+            for task in (worker, receiver):
+                task.cancel()
+            await asyncio.gather(worker, receiver, return_exceptions=True)
+
+    def _expired(self) -> Optional[str]:
+        now = time.monotonic()
+        if now - self.last_seen >= 2 * WS_HEARTBEAT_SECONDS:
+            return "heartbeat"
+        if (
+            not self.busy
+            and self.inbox.empty()
+            and now - self.last_activity >= WS_IDLE_TIMEOUT_SECONDS
+        ):
+            return "idle"
+        return None
+
+    async def _receive(self) -> str:
+        while True:
+            try:
+                frame = await asyncio.wait_for(
+                    self.websocket.receive(), WS_HEARTBEAT_SECONDS
+                )
+            except TimeoutError:
+                reason = self._expired()
+                if reason:
+                    return reason
+                try:
+                    await self.send({"type": "ping"})
+                except _ChannelClosed as e:
+                    return e.reason
+                continue
+            if frame["type"] == "websocket.disconnect":
+                return "client"
+            self.last_seen = time.monotonic()
+            try:
+                await self._handle(frame.get("text"))
+            except _ChannelClosed as e:
+                return e.reason
+
+    async def _handle(self, text: Optional[str]) -> None:
+        try:
+            data = json.loads(text) if text else None
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            await self.send(
+                {"type": "error", "reason": "invalid", "detail": "Mensaje no válido."}
+            )
+            return
+        kind = data.get("type", "message")
+        if kind == "pong":
+            return
+        if kind == "ping":
+            await self.send({"type": "pong"})
+            return
+        message = data.get("message")
+        if kind != "message" or not isinstance(message, str) or not message.strip():
+            await self.send(
+                {
+                    "type": "error",
+                    "reason": "invalid",
+                    "detail": "El mensaje no puede estar vacío.",
+                }
+            )
+            return
+        try:
+            self.inbox.put_nowait(message)
+        except asyncio.QueueFull:
+            await self.send(
+                {
+                    "type": "error",
+                    "reason": "busy",
+                    "detail": "Espera a que termine la respuesta en curso.",
+                }
+            )
+            return
+        self.last_activity = time.monotonic()
+
+    async def _work(self) -> str:
+        while True:
+            message = await self.inbox.get()
+            self.busy = True
+            try:
+                await self._answer(message)
+            except _ChannelClosed as e:
+                return e.reason
+            finally:
+                self.busy = False
+                self.last_activity = time.monotonic()
+
+    async def _answer(self, message: str) -> None:
+        """Un turno: admisión, plazo y traza como en /api/invoke/stream."""
+        trace = start_trace("WS /api/ws", **{"http.route": "/api/ws"})
+        try:
+            with use_trace(trace):
+                async with get_admission_controller().slot(self.admission_key):
+                    async with asyncio.timeout(self.timeout):
+                        events = self.stream(
+                            message=message,
+                            session_id=self.session_id,
+                            user_id=self.user_id,
+                        )
+                        async with aclosing(events):
+                            async for event in events:
+                                if "session_id" in event:
+                                    self.session_id = event["session_id"]
+                                if event["type"] == "done":
+                                    event = {**event, "trace_id": trace.trace_id}
+                                await self.send(event)
+        except _ChannelClosed as e:
+            trace.finish(error=f"conexión cerrada ({e.reason})")
+            raise
+        except asyncio.CancelledError:
+            trace.finish(error="cliente desconectado")
+            logger.warning(
+                "El cliente cerró el WebSocket; ejecución del agente cancelada"
+            )
+            raise
+        except AdmissionRejected as e:
+            trace.finish(error=e)
+            await self._send_error(
+                trace, e.detail, reason=e.reason, retry_after=e.retry_after
+            )
+        except (UpstreamUnavailable, TimeoutError) as e:
+            trace.finish(error=e)
+            logger.warning(
+                "Turno WebSocket sin respuesta a tiempo", extra={"error": repr(e)}
+            )
+            await self._send_error(trace, unavailable_detail(e)[1])
+        except Exception as e:
+            trace.finish(error=e)
+            logger.error("Error en el turno WebSocket", exc_info=True)
+            await self._send_error(trace, f"Ha ocurrido un error en el agente: {e}")
+        finally:
+            trace.finish()
+            log_request(trace)
+
+    async def _send_error(self, trace: Trace, detail: str, **extra: Any) -> None:
+        # El error cierra el turno, no la conexión: el visitante puede seguir
+        # escribiendo.
+        await self.send(
+            {"type": "error", "detail": detail, "trace_id": trace.trace_id, **extra}
+        )
+
+
+def same_origin(websocket: WebSocket) -> bool:
+    """
+    El navegador envía la cookie de usuario en cualquier WebSocket, también desde otras
+    webs: solo se aceptan los de la propia página (Origin igual a Host) o sin Origin (no
+    navegador).
+    """
+    origin = websocket.headers.get("origin")
+    return not origin or urlsplit(origin).netloc == websocket.headers.get("host")
+
+
+async def serve_conversation(channel: ConversationChannel) -> None:
+    """Atiende el canal hasta que termina y cierra la conexión con su motivo."""
+    _ws_connections.inc()
+    try:
+        reason = await channel.run()
+    finally:
+        _ws_connections.dec()
+    _ws_closed.inc(reason=reason)
+    if reason != "client":
+        code, text = _WS_CLOSE_CODES[reason]
+        logger.info("Conexión WebSocket cerrada", extra={"reason": reason})
+        with suppress(Exception):
+            await channel.websocket.close(code=code, reason=text)
@@ -0,0 +1,115 @@
+# bench_compaction.py
+# Crecimiento del prompt en una conversación larga, con y sin compactación del
+# historial.
+#
+# Uso:
+#   python -m benchmarks.bench_compaction [--turns 50] [--latency 0] [--every 5]
+#
+# Mantiene una conversación de --turns mensajes (preguntas sobre el CV y el blog, con
+# sus herramientas) contra los agentes reales con StandInLlm y búsqueda simulada. Los
+# tokens de prompt de cada turno son la suma de gen_ai.usage.input_tokens de los spans
+# `llm` de su traza (StandInLlm los estima como caracteres/4 del prompt que recibe, ya
+# compactado). La misma conversación se ejecuta con COMPACTION_ENABLED=false y true; con
+# compactación, los tokens por turno deben estabilizarse en lugar de crecer linealmente.
+
+import argparse
+import asyncio
+import os
+import time
+from typing import Dict, List
+
+from benchmarks.fake_gemini import FIXTURE_CV, install, restore, stub_search
+
+QUESTIONS = [
+    "¿Cuál es tu experiencia profesional?",
+    "¿Has escrito en el blog sobre agentes?",
+    "Háblame de tus habilidades con Python",
+    "¿Tienes artículos sobre RAG en el blog?",
+    "¿Qué proyectos has liderado?",
+    "¿Algún post sobre Kubernetes?",
+]
+
+
+async def run_conversation(turns: int) -> List[Dict[str, float]]:
+    """
+    Una conversación de `turns` mensajes; devuelve tokens de prompt y latencia por
+    turno.
+    """
+    from assistant.services import invoke_agent_async
+    from assistant.tracing import start_trace, use_trace
+
+    session_id = None
+    results = []
+    for turn in range(turns):
+        message = f"{QUESTIONS[turn % len(QUESTIONS)]} ({turn + 1})"
+        trace = start_trace("bench_compaction")
+        started = time.perf_counter()
+        with use_trace(trace):
+            _, session_id = await invoke_agent_async(
+                message=message, session_id=session_id, user_id="bench_compaction"
+            )
+        elapsed = time.perf_counter() - started
+        trace.finish()
+        llm_spans = [span for span in trace.spans if span.name.startswith("llm ")]
+        results.append(
+            {
+                "prompt_tokens": sum(
+                    span.attributes.get("gen_ai.usage.input_tokens", 0)
+                    for span in llm_spans
+                ),
+                "llm_calls": len(llm_spans),
+                "seconds": elapsed,
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Prompt por turno con y sin compactación."
+    )
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Segundos hasta el primer token"
+    )
+    parser.add_argument(
+        "--every", type=int, default=5, help="Mostrar un turno de cada N"
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("CV_PATH", FIXTURE_CV)
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    originals = install(latency=args.latency, tokens_per_second=100000.0)
+    stub_search(latency=0.0)
+
+    runs = {}
+    try:
+        for enabled in ("false", "true"):
+            os.environ["COMPACTION_ENABLED"] = enabled
+            runs[enabled] = asyncio.run(run_conversation(args.turns))
+    finally:
+        restore(originals)
+
+    off, on = runs["false"], runs["true"]
+    print(
+        f"{'turno':>6} {'tokens sin':>11} {'tokens con':>11} {'ms sin':>8} {'ms con':>8}"
+    )
+    shown = [0] + list(range(args.every - 1, args.turns, args.every))
+    for i in shown:
+        print(
+            f"{i + 1:>6} {off[i]['prompt_tokens']:>11} {on[i]['prompt_tokens']:>11} "
+            f"{off[i]['seconds'] * 1000:>8.1f} {on[i]['seconds'] * 1000:>8.1f}"
+        )
+
+    reference = min(9, args.turns - 1)
+    for label, run in (("sin compactación", off), ("con compactación", on)):
+        ratio = run[-1]["prompt_tokens"] / max(1, run[reference]["prompt_tokens"])
+        total = sum(turn["prompt_tokens"] for turn in run)
+        print(
+            f"{label}: turno {args.turns}/turno {reference + 1} = {ratio:.2f}x, "
+            f"{total} tokens de prompt en total"
+        )
+
+
+if __name__ == "__main__":
+    main()
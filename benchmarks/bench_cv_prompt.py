@@ -0,0 +1,127 @@
+# bench_cv_prompt.py
+# Tokens de prompt por pregunta: CV completo en la instrucción vs. recuperación con
+# query_cv.
+#
+# Uso:
+#   python -m benchmarks.bench_cv_prompt [--cv benchmarks/fixtures/cv.json]
+#
+# - cv-completo: la instrucción de CV_Expert con el CV entero (json indent=2), una
+#   llamada.
+# - query_cv: instrucción con el índice de secciones + declaración de la herramienta.
+#   Son dos llamadas al modelo (la que pide la herramienta y la que responde con los
+#   fragmentos), y ambas se cuentan.
+# Sin acceso al tokenizador de Gemini se dan dos estimaciones: caracteres/4 (la regla
+# que documenta Google) y piezas (palabras, signos y rachas de espacios, un token cada
+# una).
+
+import argparse
+import json
+import os
+import re
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "cv.json")
+
+# (pregunta, section, keywords) tal y como las pediría el modelo a query_cv.
+QUERIES = [
+    ("¿Cuál es tu experiencia profesional?", "experiencia", ""),
+    ("¿Has trabajado con Kubernetes?", "", "kubernetes"),
+    ("¿Qué estudiaste?", "formacion", ""),
+    ("¿Qué certificaciones tienes?", "certificaciones", ""),
+    ("¿Sabes Python y FastAPI?", "", "python fastapi"),
+    ("¿Qué idiomas hablas?", "idiomas", ""),
+    ("Háblame de tus proyectos con RAG", "proyectos", "rag"),
+    ("¿Qué hacías en TechCorp?", "experiencia", "techcorp"),
+]
+
+_PIECES = re.compile(r"\w+|[^\w\s]|\s+")
+
+
+def estimate_tokens(text: str) -> dict:
+    return {"chars4": len(text) / 4, "pieces": len(_PIECES.findall(text))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cv", default=FIXTURE)
+    args = parser.parse_args()
+
+    # El CV se fija antes de importar los agentes: su instrucción incluye el índice de
+    # secciones.
+    os.environ["CV_PATH"] = os.path.abspath(args.cv)
+    from google.adk.tools import FunctionTool
+
+    from assistant.agents import cv_agent
+    from assistant.tools import load_cv_data, query_cv
+
+    retrieval_instruction = cv_agent.instruction
+    base_instruction = retrieval_instruction.split("**Consulta del CV:**")[0]
+    full_instruction = f"{base_instruction}**CV Data:**\n    {load_cv_data()}\n"
+    declaration = (
+        FunctionTool(query_cv)._get_declaration().model_dump_json(exclude_none=True)
+    )
+
+    retrieval_tail = retrieval_instruction[len(base_instruction) :]
+    full_cv = full_instruction[len(base_instruction) :]
+
+    rows = []
+    for question, section, keywords in QUERIES:
+        fragments = query_cv(section=section, keywords=keywords)
+        call = json.dumps(
+            {"name": "query_cv", "args": {"section": section, "keywords": keywords}}
+        )
+        first = retrieval_instruction + declaration + question
+        second = first + call + fragments
+        rows.append(
+            {
+                "question": question,
+                "full": estimate_tokens(full_instruction + question),
+                "rag": _sum(estimate_tokens(first), estimate_tokens(second)),
+                # Solo la parte del prompt que depende del CV, en cada llamada.
+                "cv_full": estimate_tokens(full_cv),
+                "cv_rag": _sum(
+                    estimate_tokens(retrieval_tail + declaration),
+                    estimate_tokens(retrieval_tail + declaration + call + fragments),
+                ),
+            }
+        )
+
+    print(f"\nCV: {args.cv} ({len(json.loads(load_cv_data()))} claves de primer nivel)")
+    print(
+        f"{'pregunta':<40}{'prompt':>9}{'query_cv':>10}{'ahorro':>8}"
+        f"{'CV':>8}{'query_cv':>10}{'ahorro':>8}{'ahorro*':>9}"
+    )
+    for row in rows + [_mean(rows)]:
+        print(
+            f"{row['question'][:38]:<40}"
+            f"{row['full']['chars4']:>9.0f}{row['rag']['chars4']:>10.0f}"
+            f"{_saving(row['full'], row['rag'], 'chars4'):>8.0%}"
+            f"{row['cv_full']['chars4']:>8.0f}{row['cv_rag']['chars4']:>10.0f}"
+            f"{_saving(row['cv_full'], row['cv_rag'], 'chars4'):>8.0%}"
+            f"{_saving(row['full'], row['rag'], 'pieces'):>9.0%}"
+        )
+    print(
+        "prompt = tokens totales por pregunta (caracteres/4); CV = solo la parte que depende del CV.\n"
+        "query_cv suma sus dos llamadas al modelo. ahorro* = ahorro del prompt contando piezas."
+    )
+
+
+def _sum(first: dict, second: dict) -> dict:
+    return {key: first[key] + second[key] for key in first}
+
+
+def _saving(before: dict, after: dict, key: str) -> float:
+    return 1 - after[key] / before[key]
+
+
+def _mean(rows: list) -> dict:
+    mean = {"question": "media"}
+    for column in ("full", "rag", "cv_full", "cv_rag"):
+        mean[column] = {
+            key: sum(row[column][key] for row in rows) / len(rows)
+            for key in ("chars4", "pieces")
+        }
+    return mean
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+# bench_load.py
+# Carga concurrente contra /api/invoke con Gemini simulado: latencia p50/p95/p99, rps
+# y RSS.
+#
+# Uso:
+#   python -m benchmarks.bench_load [--requests 400] [--concurrency 16] [--turns 3]
+#   python -m benchmarks.bench_load --latency 0.8 --tokens-per-second 40 --transfer cv
+#   python -m benchmarks.bench_load --max-p95 3 --max-rss-growth 50 \
+#       --json resultados.json
+#
+# Por defecto lanza `python -m benchmarks.fake_gemini` en otro proceso (uvicorn real,
+# mismo código que producción salvo el modelo y la búsqueda) y mide su RSS antes y
+# después de la carga. Con --url se ataca un servidor ya lanzado (sin RSS) y con
+# --in-process se usa httpx.ASGITransport en el mismo proceso (rápido, pero cliente y
+# servidor comparten CPU).
+#
+# Cada usuario virtual tiene su cookie y mantiene conversaciones de --turns mensajes. La
+# mezcla de preguntas incluye atajos del pre-router, transferencias del orquestador y
+# repeticiones que acierta la caché de respuestas (--no-answer-cache la desactiva).
+# Con --max-p95, --max-error-rate o --max-rss-growth termina con código 1 si se superan:
+# pensado para ejecutarse antes de cada despliegue.
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fake_gemini import (
+    add_backend_arguments,
+    backend_arguments,
+    setup_backend,
+)
+
+# Primeros mensajes de conversación: pre-router (CV/blog), orquestador y parafraseos.
+FIRST_MESSAGES = [
+    "¿Cuál es tu experiencia profesional?",
+    "Háblame de tus habilidades técnicas",
+    "¿Tienes artículos sobre agentes en el blog?",
+    "Hola, ¿quién eres?",
+    "¿Qué estudiaste?",
+    "¿Has escrito algo sobre RAG?",
+    "¿En qué empresas has trabajado?",
+    "¿Qué te interesa fuera del trabajo?",
+]
+FOLLOW_UPS = [
+    "¿Y con Kubernetes?",
+    "Cuéntame más",
+    "¿Qué tecnologías usabas allí?",
+    "¿Algún post reciente sobre eso?",
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentil por rango más cercano (q entre 0 y 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Memoria residente de un proceso (Linux); None si no se puede leer."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def run_load(
+    client_factory: Callable[[], httpx.AsyncClient],
+    requests: int,
+    concurrency: int,
+    turns: int = 3,
+) -> Dict[str, object]:
+    """Lanza `requests` peticiones repartidas entre `concurrency` usuarios virtuales."""
+    tickets = iter(range(requests))
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    messages = itertools.count()
+
+    async def user() -> None:
+        async with client_factory() as client:
+            session_id, turn = None, 0
+            for _ in tickets:
+                position = next(messages)
+                if turn == 0:
+                    message = FIRST_MESSAGES[position % len(FIRST_MESSAGES)]
+                else:
+                    message = FOLLOW_UPS[position % len(FOLLOW_UPS)]
+                start = time.perf_counter()
+                try:
+                    response = await client.post(
+                        "/api/invoke",
+                        json={"message": message, "session_id": session_id},
+                    )
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 0
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+                if status == 200:
+                    session_id = response.json()["session_id"]
+                    turn = (turn + 1) % turns
+                else:
+                    session_id, turn = None, 0
+                if turn == 0:
+                    session_id = None
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": errors / len(latencies) if latencies else 0.0,
+        "statuses": statuses,
+        "elapsed": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "max": max(latencies, default=0.0),
+    }
+
+
+def _start_server(args: argparse.Namespace) -> subprocess.Popen:
+    """Lanza el servidor con el backend simulado y espera a que responda."""
+    command = [sys.executable, "-m", "benchmarks.fake_gemini", "--port", str(args.port)]
+    server = subprocess.Popen(
+        command + backend_arguments(args),
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{args.port}/api/metrics"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"El servidor terminó con código {server.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("El servidor no respondió en 30s")
+
+
+def _check_thresholds(result: Dict[str, object], args: argparse.Namespace) -> List[str]:
+    failures = []
+    if args.max_p95 is not None and result["p95"] > args.max_p95:
+        failures.append(f"p95 {result['p95']:.3f}s > {args.max_p95}s")
+    if args.max_error_rate is not None and result["error_rate"] > args.max_error_rate:
+        failures.append(
+            f"errores {result['error_rate']:.1%} > {args.max_error_rate:.1%}"
+        )
+    growth = result.get("rss_growth_mb")
+    if (
+        args.max_rss_growth is not None
+        and growth is not None
+        and growth > args.max_rss_growth
+    ):
+        failures.append(f"RSS +{growth:.1f} MB > {args.max_rss_growth} MB")
+    return failures
+
+
+async def _measure(
+    args: argparse.Namespace, base_url: str, transport, pid: Optional[int]
+) -> dict:
+    def client_factory() -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url, transport=transport, timeout=args.timeout
+        )
+
+    if args.warmup:
+        await run_load(client_factory, args.warmup, args.concurrency, args.turns)
+    rss_before = rss_mb(pid) if pid else None
+    result = await run_load(client_factory, args.requests, args.concurrency, args.turns)
+    rss_after = rss_mb(pid) if pid else None
+    result["rss_before_mb"] = rss_before
+    result["rss_after_mb"] = rss_after
+    result["rss_growth_mb"] = (
+        rss_after - rss_before
+        if rss_before is not None and rss_after is not None
+        else None
+    )
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Carga concurrente contra /api/invoke."
+    )
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--turns", type=int, default=3, help="Mensajes por conversación"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=32, help="Peticiones previas sin medir"
+    )
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--url", help="Servidor ya lanzado (no se mide su RSS)")
+    parser.add_argument("--in-process", action="store_true")
+    parser.add_argument("--no-answer-cache", action="store_true")
+    parser.add_argument(
+        "--verbose", action="store_true", help="Muestra los errores del servidor"
+    )
+    parser.add_argument("--json", help="Guarda los resultados en este fichero")
+    parser.add_argument("--max-p95", type=float, help="Umbral de p95 en segundos")
+    parser.add_argument(
+        "--max-error-rate", type=float, help="Fracción máxima de errores"
+    )
+    parser.add_argument(
+        "--max-rss-growth", type=float, help="Crecimiento máximo de RSS en MB"
+    )
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.no_answer_cache:
+        # Lo heredan el servidor lanzado aquí y el modo en proceso.
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+
+    server = None
+    if args.url:
+        base_url, transport, pid = args.url, None, None
+    elif args.in_process:
+        setup_backend(args)
+        from main import app
+
+        base_url, transport, pid = (
+            "http://bench",
+            httpx.ASGITransport(app=app),
+            os.getpid(),
+        )
+    else:
+        server = _start_server(args)
+        base_url, transport, pid = f"http://127.0.0.1:{args.port}", None, server.pid
+
+    try:
+        result = asyncio.run(_measure(args, base_url, transport, pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(
+        f"\n{result['requests']} peticiones, concurrencia {args.concurrency}, "
+        f"{args.turns} turnos por conversación (latencia LLM {args.latency}s, "
+        f"{args.tokens_per_second:.0f} tok/s, {args.answer_tokens} tokens, transfer={args.transfer})"
+    )
+    print(
+        f"{'p50':>8}{'p95':>8}{'p99':>8}{'media':>8}{'max':>8}{'rps':>8}{'errores':>9}{'RSS MB':>16}"
+    )
+    rss = (
+        f"{result['rss_before_mb']:.0f}->{result['rss_after_mb']:.0f}"
+        if result["rss_growth_mb"] is not None
+        else "n/d"
+    )
+    print(
+        f"{result['p50']:>8.3f}{result['p95']:>8.3f}{result['p99']:>8.3f}"
+        f"{result['mean']:>8.3f}{result['max']:>8.3f}{result['rps']:>8.1f}"
+        f"{result['errors']:>9}{rss:>16}"
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    failures = _check_thresholds(result, args)
+    for failure in failures:
+        print(f"REGRESIÓN: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
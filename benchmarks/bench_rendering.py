@@ -0,0 +1,130 @@
+# bench_rendering.py
+# Coste de la normalización del HTML de los agentes (assistant/rendering.py) en
+# respuestas grandes.
+#
+# Uso:
+#   python -m benchmarks.bench_rendering [--sizes 4,16,256] [--chunk 40] [--runs 5]
+#
+# Genera respuestas de --sizes KB con la forma que produce el modelo (HTML correcto,
+# HTML envuelto en ```html con Markdown mezclado y Markdown puro) y mide, para cada una:
+#   - una vez:     normalize_html() sobre la respuesta completa (/api/invoke),
+#   - streaming:   HtmlNormalizer.feed() con fragmentos de --chunk caracteres
+#                  (SSE/WebSocket),
+#                  con el peor tiempo por fragmento,
+#   - reprocesar:  normalizar de nuevo todo lo acumulado en cada fragmento, la
+#                  alternativa
+#                  sin estado incremental (cuadrática; solo hasta 16 KB).
+
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from assistant.rendering import HtmlNormalizer, normalize_html
+
+SECTIONS = {
+    "html": (
+        "<h2>Experiencia en {n}</h2><p>Trabajé con <strong>Python</strong>, <code>FastAPI</code> "
+        "y <em>Google ADK</em> en proyectos de IA &amp; datos.</p><ul><li>Agentes "
+        '<a href="https://sergiomarquez.dev/{n}">multi-agente</a></li><li>RAG en producción</li></ul>\n'
+    ),
+    "mixto": (
+        '```html\n<h1 class="t">Experiencia en {n}</h1>\n<p>Trabajé con **Python** y '
+        "<b>FastAPI</b> en <i>IA</i> &amp; datos.</p>\n```\n- Agentes [multi-agente]"
+        "(https://sergiomarquez.dev/{n})\n- RAG en `producción`\n\n"
+    ),
+    "markdown": (
+        "## Experiencia en {n}\n\nTrabajé con **Python**, `FastAPI` y *Google ADK* en "
+        "proyectos de IA y datos.\n\n- Agentes [multi-agente](https://sergiomarquez.dev/{n})\n"
+        "- RAG en producción\n\n"
+    ),
+}
+
+
+def build_response(kind: str, size_kb: int) -> str:
+    """Respuesta de unos `size_kb` KB repitiendo una sección del tipo `kind`."""
+    parts: List[str] = []
+    length, n = 0, 0
+    while length < size_kb * 1024:
+        section = SECTIONS[kind].format(n=n)
+        parts.append(section)
+        length += len(section)
+        n += 1
+    return "".join(parts)
+
+
+def best_of(runs: int, func: Callable[[], float]) -> float:
+    return min(func() for _ in range(runs))
+
+
+def once(text: str) -> float:
+    started = time.perf_counter()
+    normalize_html(text)
+    return time.perf_counter() - started
+
+
+def streaming(text: str, chunk: int) -> Dict[str, float]:
+    normalizer = HtmlNormalizer()
+    per_chunk = []
+    started = time.perf_counter()
+    for i in range(0, len(text), chunk):
+        chunk_started = time.perf_counter()
+        normalizer.feed(text[i : i + chunk])
+        per_chunk.append(time.perf_counter() - chunk_started)
+    normalizer.close()
+    return {
+        "total": time.perf_counter() - started,
+        "max_chunk": max(per_chunk),
+        "median_chunk": statistics.median(per_chunk),
+    }
+
+
+def reprocessing(text: str, chunk: int) -> float:
+    started = time.perf_counter()
+    for end in range(chunk, len(text) + chunk, chunk):
+        normalize_html(text[:end])
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Coste de normalizar respuestas grandes."
+    )
+    parser.add_argument(
+        "--sizes", default="4,16,256", help="Tamaños en KB separados por comas"
+    )
+    parser.add_argument(
+        "--chunk", type=int, default=40, help="Caracteres por fragmento"
+    )
+    parser.add_argument(
+        "--runs", type=int, default=5, help="Repeticiones (se toma la mejor)"
+    )
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    print(
+        f"{'tipo':>9} {'KB':>5} {'una vez ms':>11} {'MB/s':>7} {'stream ms':>10} "
+        f"{'máx/frag µs':>12} {'med/frag µs':>12} {'reprocesar ms':>14}"
+    )
+    for kind in SECTIONS:
+        for size in sizes:
+            text = build_response(kind, size)
+            whole = best_of(args.runs, lambda: once(text))
+            stream = min(
+                (streaming(text, args.chunk) for _ in range(args.runs)),
+                key=lambda result: result["total"],
+            )
+            again = (
+                f"{reprocessing(text, args.chunk) * 1000:>14.1f}"
+                if size <= 16
+                else f"{'-':>14}"
+            )
+            print(
+                f"{kind:>9} {size:>5} {whole * 1000:>11.2f} {len(text) / whole / 1e6:>7.2f} "
+                f"{stream['total'] * 1000:>10.2f} {stream['max_chunk'] * 1e6:>12.1f} "
+                f"{stream['median_chunk'] * 1e6:>12.1f} {again}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# bench_sessions.py
+# Compara memoria y throughput de los servicios de sesiones con 10k sesiones.
+#
+# Uso:
+#   python -m benchmarks.bench_sessions [--sessions 10000] [--events 4]
+#
+# Cada sesión recibe `--events` eventos (pregunta/respuesta) como en una conversación
+# real. La memoria se mide con tracemalloc (asignaciones Python vivas al terminar y
+# pico), lo que también penaliza el throughput por igual en los tres casos; RSS es la
+# del proceso acumulada.
+# - adk-inmemory: InMemorySessionService tal cual (sin límites, crece indefinidamente).
+# - bounded-memory: BoundedSessionService en memoria con SESSION_MAX_TOTAL aplicado.
+# - bounded-sqlite: BoundedSessionService sobre SQLite (WAL); la memoria no depende del
+#   nº de sesiones.
+
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from assistant.sessions import (
+    BoundedSessionService,
+    _MemoryLedger,
+    create_session_service,
+)
+
+APP = "assistant_app"
+ANSWER = (
+    "<p>" + "Respuesta de ejemplo del agente con algo de contenido HTML. " * 10 + "</p>"
+)
+
+
+def _event(role: str, text: str) -> Event:
+    author = "user" if role == "user" else "CV_Expert"
+    return Event(
+        author=author, content=types.Content(role=role, parts=[types.Part(text=text)])
+    )
+
+
+def _rss_mb() -> float:
+    """Memoria residente del proceso (Linux)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def _run(service, sessions: int, events: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(sessions):
+        user_id = f"user_{i % (sessions // 2 or 1)}"
+        session = await service.create_session(
+            app_name=APP, user_id=user_id, session_id=f"session_{i}"
+        )
+        for turn in range(events // 2):
+            await service.append_event(session, _event("user", f"Pregunta {turn}"))
+            await service.append_event(session, _event("model", ANSWER))
+    write_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, sessions, 10):
+        await service.get_session(
+            app_name=APP,
+            user_id=f"user_{i % (sessions // 2 or 1)}",
+            session_id=f"session_{i}",
+        )
+    read_time = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "create_per_s": sessions / write_time,
+        "get_per_s": (sessions / 10) / read_time,
+        "mem_mb": current / 1024 / 1024,
+        "peak_mb": peak / 1024 / 1024,
+        "rss_mb": _rss_mb(),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=4)
+    parser.add_argument("--max-total", type=int, default=2_000)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SESSION_MAX_PER_USER", "5")
+    os.environ["SESSION_MAX_TOTAL"] = str(args.max_total)
+    results = {}
+
+    results["adk-inmemory"] = await _run(
+        InMemorySessionService(), args.sessions, args.events
+    )
+    results["bounded-memory"] = await _run(
+        BoundedSessionService(
+            InMemorySessionService(),
+            _MemoryLedger(),
+            idle_ttl=3600,
+            max_per_user=5,
+            max_total=args.max_total,
+        ),
+        args.sessions,
+        args.events,
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SESSION_DB_PATH"] = os.path.join(tmp, "sessions.db")
+        results["bounded-sqlite"] = await _run(
+            create_session_service("sqlite"), args.sessions, args.events
+        )
+
+    print(
+        f"\n{args.sessions} sesiones x {args.events} eventos (SESSION_MAX_TOTAL={args.max_total})"
+    )
+    print(
+        f"{'backend':<16}{'create/s':>12}{'get/s':>12}"
+        f"{'mem MB':>10}{'peak MB':>10}{'RSS MB':>10}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<16}{result['create_per_s']:>12.0f}{result['get_per_s']:>12.0f}"
+            f"{result['mem_mb']:>10.1f}{result['peak_mb']:>10.1f}{result['rss_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
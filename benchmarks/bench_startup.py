@@ -0,0 +1,135 @@
+# bench_startup.py
+# Tiempo de arranque: importación de main y tiempo hasta /api/health y /api/ready.
+#
+# Uso:
+#   python -m benchmarks.bench_startup [--runs 5] [--port 8002] [--json resultados.json]
+#
+# Cada medida se toma en un intérprete nuevo (sin módulos ya cargados ni cachés
+# calientes del proceso). "import main" es lo que uvicorn hace antes de escuchar;
+# "import assistant.services" es la carga completa (google.adk, CV, agentes y Runner)
+# que hace el calentamiento, y que antes ocurría al importar main. Para el servidor se
+# lanza uvicorn con main:app y se consulta cada 20 ms: "health" es cuándo escucha y
+# "ready" cuándo termina el calentamiento. Se usa el CV de ejemplo de los benchmarks y
+# no se llama a Gemini.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.fake_gemini import FIXTURE_CV
+
+POLL_INTERVAL = 0.02
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def _environment() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("CV_PATH", FIXTURE_CV)
+    return env
+
+
+def import_seconds(module: str) -> float:
+    """Segundos que tarda `import module` en un intérprete nuevo."""
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        capture_output=True,
+        text=True,
+        env=_environment(),
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def server_startup(port: int, timeout: float = 60.0) -> Dict[str, float]:
+    """Lanza uvicorn con main:app y mide cuándo responden /api/health y /api/ready."""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=_environment(),
+    )
+    base_url = f"http://127.0.0.1:{port}/api"
+    times: Dict[str, float] = {}
+    try:
+        while "ready" not in times:
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError(f"El servidor no estuvo listo en {timeout:.0f}s")
+            if server.poll() is not None:
+                raise RuntimeError(
+                    f"El servidor terminó con código {server.returncode}"
+                )
+            for name in ("health", "ready"):
+                if name in times:
+                    continue
+                try:
+                    if httpx.get(f"{base_url}/{name}", timeout=1).status_code == 200:
+                        times[name] = time.perf_counter() - started
+                except httpx.HTTPError:
+                    break
+            time.sleep(POLL_INTERVAL)
+    finally:
+        server.terminate()
+        server.wait()
+    return times
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Tiempo de arranque del servidor.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--json", help="Guarda los resultados en este fichero")
+    args = parser.parse_args(argv)
+
+    samples: Dict[str, List[float]] = {
+        "import main": [],
+        "import assistant.services": [],
+        "health": [],
+        "ready": [],
+    }
+    for _ in range(args.runs):
+        samples["import main"].append(import_seconds("main"))
+        samples["import assistant.services"].append(
+            import_seconds("assistant.services")
+        )
+        times = server_startup(args.port)
+        samples["health"].append(times["health"])
+        samples["ready"].append(times["ready"])
+
+    results = {name: _summary(values) for name, values in samples.items()}
+    print(f"\nArranque ({args.runs} ejecuciones, intérprete nuevo en cada una)")
+    print(f"{'':<28}{'mediana':>10}{'min':>10}{'max':>10}")
+    for name, summary in results.items():
+        print(
+            f"{name:<28}{summary['median']:>10.3f}{summary['min']:>10.3f}{summary['max']:>10.3f}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# fake_gemini.py
+# Backend sin red para los benchmarks: un LLM local en lugar de Gemini y una búsqueda
+# simulada.
+#
+# Sustituye el modelo de root_agent, cv_agent y blog_agent por StandInLlm, que reproduce
+# el patrón de llamadas real sin gastar cuota ni depender de la red:
+#   - Orquestador: una llamada que transfiere a CV_Expert o Blog_Expert (o responde él).
+#   - Especialista: una llamada que pide su herramienta (query_cv / search_blog_posts) y
+#     otra que redacta la respuesta tras recibir el resultado.
+# Cada llamada espera `latency` segundos (tiempo hasta el primer token) y genera la
+# respuesta a `tokens_per_second`. La búsqueda en Google se sustituye por stub_search.
+#
+# Servidor con el backend simulado (lo usa benchmarks.bench_load):
+#   python -m benchmarks.fake_gemini --port 8001 --latency 0.4 --tokens-per-second 80
+
+import argparse
+import asyncio
+import os
+import time
+from typing import AsyncGenerator, Dict, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+FIXTURE_CV = os.path.join(os.path.dirname(__file__), "fixtures", "cv.json")
+ORCHESTRATOR = "Personal_Orchestrator"
+BLOG_KEYWORDS = ("blog", "artículo", "articulo", "post", "escrito")
+# Herramienta que pide cada especialista y argumento en el que va la pregunta.
+SPECIALIST_TOOLS = {
+    "CV_Expert": ("query_cv", "keywords"),
+    "Blog_Expert": ("search_blog_posts", "query"),
+}
+TRANSFER_MODES = ("keyword", "cv", "blog", "none")
+_FILLER = (
+    "Sergio tiene experiencia construyendo sistemas de IA aplicada en producción con "
+    "Python, agentes conversacionales y plataformas de datos escalables"
+).split()
+
+
+def _last_user_text(llm_request: LlmRequest) -> str:
+    for content in reversed(llm_request.contents):
+        if content.role != "user":
+            continue
+        for part in content.parts or []:
+            if part.text and not part.text.startswith("For context:"):
+                return part.text
+    return ""
+
+
+def _prompt_tokens(llm_request: LlmRequest) -> int:
+    """
+    Estimación de los tokens del prompt (caracteres/4), como haría el recuento de
+    Gemini.
+    """
+    chars = len(str(llm_request.config.system_instruction or ""))
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            chars += len(part.text or "") + len(str(part.function_response or ""))
+    return chars // 4
+
+
+def _usage(
+    prompt_tokens: int, completion_tokens: int
+) -> types.GenerateContentResponseUsageMetadata:
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=completion_tokens,
+        total_token_count=prompt_tokens + completion_tokens,
+    )
+
+
+def _function_call(name: str, args: Dict[str, str], prompt_tokens: int) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))],
+        ),
+        usage_metadata=_usage(prompt_tokens, 10),
+    )
+
+
+def _text(text: str, partial: bool = False, usage=None) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=text)]),
+        partial=partial,
+        usage_metadata=usage,
+    )
+
+
+class StandInLlm(BaseLlm):
+    """
+    LLM simulado con latencia, velocidad de generación y transferencias configurables.
+
+    transfer: "keyword" (Blog_Expert si la pregunta habla del blog, si no CV_Expert),
+    "cv", "blog" o "none" (el orquestador responde sin transferir).
+    """
+
+    model: str = "stand-in-llm"
+    agent_name: str = ORCHESTRATOR
+    latency: float = 0.4
+    tokens_per_second: float = 80.0
+    answer_tokens: int = 120
+    transfer: str = "keyword"
+    use_tools: bool = True
+
+    async def _generate(
+        self, stream: bool, prompt_tokens: int
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """Respuesta HTML de `answer_tokens` palabras emitida a `tokens_per_second`."""
+        words = [_FILLER[i % len(_FILLER)] for i in range(self.answer_tokens)]
+        delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        if not stream:
+            await asyncio.sleep(delay * len(words))
+        else:
+            for word in words:
+                await asyncio.sleep(delay)
+                yield _text(word + " ", partial=True)
+        yield _text(
+            f"<p>{' '.join(words)}</p>", usage=_usage(prompt_tokens, len(words))
+        )
+
+    def _transfer_target(self, message: str) -> Optional[str]:
+        if self.transfer == "none":
+            return None
+        if self.transfer == "cv":
+            return "CV_Expert"
+        if self.transfer == "blog":
+            return "Blog_Expert"
+        lowered = message.lower()
+        return (
+            "Blog_Expert"
+            if any(word in lowered for word in BLOG_KEYWORDS)
+            else "CV_Expert"
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.latency)
+        last_content = llm_request.contents[-1] if llm_request.contents else None
+        answered_tool = last_content is not None and any(
+            part.function_response for part in last_content.parts or []
+        )
+        message = _last_user_text(llm_request)
+        prompt_tokens = _prompt_tokens(llm_request)
+
+        if not answered_tool:
+            if self.agent_name == ORCHESTRATOR:
+                target = self._transfer_target(message)
+                if target:
+                    yield _function_call(
+                        "transfer_to_agent", {"agent_name": target}, prompt_tokens
+                    )
+                    return
+            elif self.use_tools and self.agent_name in SPECIALIST_TOOLS:
+                tool, argument = SPECIALIST_TOOLS[self.agent_name]
+                yield _function_call(tool, {argument: message}, prompt_tokens)
+                return
+
+        async for response in self._generate(stream, prompt_tokens):
+            yield response
+
+
+def install(**options) -> List[Optional[object]]:
+    """
+    Sustituye el modelo de los tres agentes por StandInLlm. Devuelve los originales.
+    """
+    from assistant.agents import blog_agent, cv_agent, root_agent
+
+    originals = []
+    for agent in (root_agent, cv_agent, blog_agent):
+        originals.append(agent.model)
+        agent.model = StandInLlm(agent_name=agent.name, **options)
+    return originals
+
+
+def restore(originals: List[Optional[object]]) -> None:
+    """Restaura los modelos devueltos por install."""
+    from assistant.agents import blog_agent, cv_agent, root_agent
+
+    for agent, model in zip((root_agent, cv_agent, blog_agent), originals):
+        agent.model = model
+
+
+def stub_search(latency: float = 0.3, results: int = 5):
+    """
+    Sustituye la búsqueda en Google por resultados fijos tras `latency` segundos.
+
+    Fuerza el camino de Google (sin índice local) para medir el peor caso; la caché de
+    búsquedas sigue activa como en producción. Devuelve la función original.
+    """
+    import assistant.tools as tools
+    from assistant.blog_index import reset_blog_index
+
+    os.environ["BLOG_INDEX_PATH"] = os.devnull
+    os.environ["BLOG_SEARCH_GOOGLE_FALLBACK"] = "true"
+    reset_blog_index()
+
+    def _search_google(query: str) -> List[Dict[str, str]]:
+        time.sleep(latency)
+        slug = "-".join(query.lower().split()[:4]) or "post"
+        return [
+            {
+                "title": f"{query.title()} ({i})",
+                "url": f"https://blog.sergiomarquez.dev/{slug}-{i}",
+            }
+            for i in range(1, results + 1)
+        ]
+
+    original = tools._search_google
+    tools._search_google = _search_google
+    return original
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser) -> None:
+    """Opciones del backend simulado (compartidas con bench_load)."""
+    group = parser.add_argument_group("backend simulado")
+    group.add_argument(
+        "--latency", type=float, default=0.4, help="Segundos hasta el primer token"
+    )
+    group.add_argument("--tokens-per-second", type=float, default=80.0)
+    group.add_argument("--answer-tokens", type=int, default=120)
+    group.add_argument("--transfer", choices=TRANSFER_MODES, default="keyword")
+    group.add_argument(
+        "--no-tools", action="store_true", help="Los especialistas no usan herramientas"
+    )
+    group.add_argument("--search-latency", type=float, default=0.3)
+
+
+def backend_arguments(args: argparse.Namespace) -> List[str]:
+    """Reconstruye la línea de comandos del backend (para lanzarlo en otro proceso)."""
+    argv = [
+        "--latency",
+        str(args.latency),
+        "--tokens-per-second",
+        str(args.tokens_per_second),
+        "--answer-tokens",
+        str(args.answer_tokens),
+        "--transfer",
+        args.transfer,
+        "--search-latency",
+        str(args.search_latency),
+    ]
+    return argv + (["--no-tools"] if args.no_tools else [])
+
+
+def setup_backend(args: argparse.Namespace) -> None:
+    """Prepara el entorno e instala el LLM y la búsqueda simulados."""
+    # Sin cv.json en el repositorio: se usa el CV de ejemplo de los benchmarks.
+    os.environ.setdefault("CV_PATH", FIXTURE_CV)
+    # Cada usuario virtual envía más peticiones por segundo que una persona: sin límite
+    # por usuario salvo que se pida (el límite global y la cola de admisión siguen
+    # activos).
+    os.environ.setdefault("ADMISSION_USER_RATE", "0")
+    install(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        transfer=args.transfer,
+        use_tools=not args.no_tools,
+    )
+    stub_search(latency=args.search_latency)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Servidor del asistente con Gemini simulado."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    add_backend_arguments(parser)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    setup_backend(args)
+    from main import app
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
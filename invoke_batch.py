@@ -0,0 +1,174 @@
+# invoke_batch.py
+# Ejecuta un lote de preguntas contra el asistente: evaluación offline y
+# precalentamiento de cachés.
+#
+# Uso:
+#   python invoke_batch.py preguntas.txt --url https://chat.sergiomarquez.dev
+#   python invoke_batch.py preguntas.jsonl --output resultados.ndjson
+#   python invoke_batch.py - --concurrency 2 < preguntas.txt
+#   python invoke_batch.py preguntas.txt --no-cache
+#
+# La entrada tiene una pregunta por línea o un objeto JSON {"message": ..., "id": ...}
+# por línea (las vacías y las que empiezan por # se ignoran). Con --url el lote se envía
+# a /api/invoke/batch de ese servidor (cabecera X-Admin-Token con ADMIN_TOKEN), que es
+# lo que precalienta su caché de respuestas. Sin --url los agentes se ejecutan en este
+# proceso, para evaluar un cambio antes de desplegarlo. Los resultados (NDJSON, en orden
+# de finalización) van a stdout o a --output y el progreso, a stderr. Termina con código
+# 1 si alguna falla. Para evaluar regresiones, --no-cache hace que ninguna respuesta
+# salga de las FAQ ni de la caché de respuestas: todas las preguntas pasan por los
+# agentes.
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, TextIO
+
+from assistant.batch import BATCH_MAX_CONCURRENCY, BatchItem, run_batch
+
+
+def read_items(source: TextIO) -> List[BatchItem]:
+    """Preguntas de `source`: texto plano o JSON por línea."""
+    items = []
+    for line in source:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            data = json.loads(line)
+            item_id = data.get("id")
+            items.append(
+                BatchItem(data["message"], None if item_id is None else str(item_id))
+            )
+        else:
+            items.append(BatchItem(line))
+    return items
+
+
+async def remote_results(
+    url: str, items: List[BatchItem], concurrency: int, use_cache: bool = True
+) -> AsyncIterator[Dict[str, Any]]:
+    """Resultados de /api/invoke/batch de un servidor en marcha, según van llegando."""
+    import httpx
+
+    payload = {
+        "messages": [{"message": item.message, "id": item.id} for item in items],
+        "concurrency": concurrency,
+        "use_cache": use_cache,
+    }
+    headers = {"X-Admin-Token": os.getenv("ADMIN_TOKEN", "")}
+    # Sin plazo de lectura: entre dos resultados puede pasar lo que tarde una pregunta.
+    async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=None)) as client:
+        async with client.stream(
+            "POST", f"{url.rstrip('/')}/api/invoke/batch", json=payload, headers=headers
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise SystemExit(
+                    f"❌ El servidor respondió {response.status_code}: {response.text}"
+                )
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
+
+
+async def local_results(
+    items: List[BatchItem], concurrency: int, use_cache: bool = True
+) -> AsyncIterator[Dict[str, Any]]:
+    """Resultados de los agentes ejecutados en este proceso."""
+    if not use_cache:
+        # Como en `python -m assistant.faq generate`: ni FAQ ni caché en todo el
+        # proceso.
+        os.environ["FAQ_ENABLED"] = "false"
+        os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    from assistant import services
+
+    deadline = float(os.getenv("AGENT_DEADLINE_SECONDS", "60"))
+    results = run_batch(
+        items,
+        services.invoke_agent_async,
+        concurrency,
+        timeout=deadline,
+        use_cache=use_cache,
+    )
+    async with aclosing(results):
+        async for result in results:
+            yield result
+
+
+async def run(args: argparse.Namespace, items: List[BatchItem], output: TextIO) -> int:
+    if args.url:
+        results = remote_results(args.url, items, args.concurrency, not args.no_cache)
+    else:
+        results = local_results(items, args.concurrency, not args.no_cache)
+
+    done, failed = 0, 0
+    async with aclosing(results):
+        async for result in results:
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            if result["type"] == "summary":
+                latency = result["latency_ms"]
+                print(
+                    f"{result['ok']}/{result['total']} correctas "
+                    f"en {result['elapsed_ms'] / 1000:.1f}s "
+                    f"(p50 {latency['p50']:.0f} ms, p95 {latency['p95']:.0f} ms, "
+                    f"máx {latency['max']:.0f} ms) {result['errors'] or ''}",
+                    file=sys.stderr,
+                )
+                continue
+            done += 1
+            failed += not result["ok"]
+            status = "✅" if result["ok"] else f"❌ {result['error']}"
+            label = result["id"] if result["id"] is not None else result["index"]
+            print(
+                f"[{done}/{len(items)}] {status} {label} ({result['latency_ms']:.0f} ms)",
+                file=sys.stderr,
+            )
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Ejecuta un lote de preguntas contra el asistente."
+    )
+    parser.add_argument(
+        "input", help="Fichero de preguntas (una por línea o JSON); - para stdin"
+    )
+    parser.add_argument(
+        "--url", help="Servidor con /api/invoke/batch; sin --url, en este proceso"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BATCH_MAX_CONCURRENCY,
+        help="Preguntas en marcha a la vez (el servidor la limita a BATCH_MAX_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--output", help="Fichero NDJSON de resultados (por defecto: stdout)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Sin FAQ ni caché de respuestas: todas las preguntas pasan por los agentes",
+    )
+    args = parser.parse_args(argv)
+
+    if args.input == "-":
+        items = read_items(sys.stdin)
+    else:
+        with open(args.input, encoding="utf-8") as source:
+            items = read_items(source)
+    if not items:
+        parser.error("el fichero no contiene preguntas")
+
+    if not args.output:
+        return asyncio.run(run(args, items, sys.stdout))
+    with open(args.output, "w", encoding="utf-8") as output:
+        return asyncio.run(run(args, items, output))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
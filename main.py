@@ -1,16 +1,51 @@
 # main.py
 # Define la API web con FastAPI y gestiona las peticiones/respuestas HTTP.
 
+import argparse
+import asyncio
+import json
 import os
+import secrets
 import uuid
-from typing import Optional
+from contextlib import aclosing, asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import uvicorn
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, Response
+from fastapi import (
+    APIRouter,
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    WebSocket,
+)
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.requests import ClientDisconnect, HTTPConnection
 
-# Importamos la lógica de invocación desde la nueva capa de servicios.
-from assistant.services import invoke_agent_async
+from assistant.admission import AdmissionRejected, get_admission_controller
+from assistant.batch import BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS, BatchItem, run_batch
+from assistant.cv_index import get_cv_index, reload_cv_index, start_cv_watcher
+from assistant.logger import get_logger, log_request
+from assistant.metrics import registry
+from assistant.resilience import UpstreamUnavailable, unavailable_detail
+from assistant.tracing import Trace, get_trace, recent_traces, start_trace, use_trace
+from assistant.warmup import get_warmup, warmup_enabled
+from assistant.ws import ConversationChannel, same_origin, serve_conversation
+
+logger = get_logger("api")
 
 # --- Modelos de Datos y Gestión de Cookies ---
 
@@ -25,23 +60,151 @@ class InvokeResponse(BaseModel):
     session_id: str
 
 
+class BatchInvokeItem(BaseModel):
+    message: str
+    id: Optional[str] = None
+
+
+class BatchInvokeRequest(BaseModel):
+    # Cada pregunta puede ser un texto o un objeto con un id para casar los resultados.
+    messages: List[Union[str, BatchInvokeItem]]
+    concurrency: Optional[int] = None
+    # false en las evaluaciones: cada respuesta sale de los agentes, no de las FAQ ni la
+    # caché.
+    use_cache: bool = True
+
+
 USER_COOKIE_NAME = "assistant_user_id"
 
 
+def _set_user_cookie(response: Response, user_id: str) -> None:
+    response.set_cookie(
+        key=USER_COOKIE_NAME,
+        value=user_id,
+        max_age=60 * 60 * 24 * 365,  # 1 año
+        httponly=True,
+    )
+
+
 async def get_user_id(request: Request, response: Response) -> str:
     """Obtiene el ID de usuario de la cookie o crea uno nuevo si no existe."""
     user_id = request.cookies.get(USER_COOKIE_NAME)
     if not user_id:
         user_id = f"user_{uuid.uuid4().hex}"
-        response.set_cookie(
-            key=USER_COOKIE_NAME,
-            value=user_id,
-            max_age=60 * 60 * 24 * 365,  # 1 año
-            httponly=True,
-        )
+        _set_user_cookie(response, user_id)
     return user_id
 
 
+def _admission_key(http_request: HTTPConnection, user_id: str) -> str:
+    """
+    Identidad para el control de admisión: el usuario de la cookie si el cliente la
+    envía. Sin cookie (p. ej. un crawler) cada petición estrenaría un user_id, así que
+    se usa la IP (X-Real-IP de nginx o la del socket).
+    """
+    if http_request.cookies.get(USER_COOKIE_NAME):
+        return user_id
+    client_ip = http_request.headers.get("x-real-ip") or (
+        http_request.client.host if http_request.client else "desconocida"
+    )
+    return f"ip:{client_ip}"
+
+
+def _rejected_response(exc: AdmissionRejected) -> JSONResponse:
+    """
+    429/503 con Retry-After para una petición que el control de admisión no acepta.
+    """
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail, "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+# Plazo total de una ejecución del agente (sin contar la espera en la cola de admisión).
+AGENT_DEADLINE_SECONDS = float(os.getenv("AGENT_DEADLINE_SECONDS", "60"))
+
+
+def _unavailable_response(exc: Exception) -> JSONResponse:
+    status_code, detail = unavailable_detail(exc)
+    headers = {"Retry-After": "30"} if status_code == 503 else None
+    return JSONResponse(
+        status_code=status_code, content={"detail": detail}, headers=headers
+    )
+
+
+# --- Cancelación al desconectarse el cliente ---
+
+# Cada cuánto se comprueba si el cliente sigue conectado mientras trabaja el agente.
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.25"))
+# Código no estándar (nginx) para "el cliente cerró la petición".
+CLIENT_CLOSED_REQUEST = 499
+
+T = TypeVar("T")
+
+
+async def _await_unless_disconnected(
+    http_request: Request, awaitable: Awaitable[T]
+) -> T:
+    """
+    Espera a `awaitable` vigilando la conexión. Si el cliente se desconecta antes,
+    cancela el trabajo en curso (llamadas al LLM y a herramientas) y lanza
+    ClientDisconnect.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnect()
+    finally:
+        if not task.done():
+            task.cancel()
+            # Esperamos a que la cancelación termine de propagarse (cierre de
+            # generadores).
+            await asyncio.gather(task, return_exceptions=True)
+
+
+# Cabecera con el identificador de la traza de cada petición (ver /api/traces).
+TRACE_HEADER = "X-Trace-Id"
+
+
+# --- Capa de servicios (carga bajo demanda) --- assistant.services importa google.adk y
+# construye los agentes y el Runner: no se importa al arrancar, sino en el
+# calentamiento, al que esperan las peticiones que llegan antes.
+
+
+async def invoke_agent_async(
+    message: str, session_id: Optional[str], user_id: str
+) -> Tuple[str, str]:
+    """
+    Invoca al agente (ver services.invoke_agent_async) cuando el calentamiento ha
+    terminado.
+    """
+    await get_warmup().wait()
+    from assistant import services
+
+    return await services.invoke_agent_async(
+        message=message, session_id=session_id, user_id=user_id
+    )
+
+
+async def stream_agent_async(
+    message: str, session_id: Optional[str], user_id: str
+) -> AsyncIterator[Dict[str, Any]]:
+    """Eventos del agente (ver services.stream_agent_async) tras el calentamiento."""
+    await get_warmup().wait()
+    from assistant import services
+
+    events = services.stream_agent_async(
+        message=message, session_id=session_id, user_id=user_id
+    )
+    async with aclosing(events):
+        async for event in events:
+            yield event
+
+
 # --- Definición de Rutas de la API ---
 
 api_router = APIRouter(prefix="/api")
@@ -49,22 +212,265 @@ api_router = APIRouter(prefix="/api")
 
 @api_router.post("/invoke", response_model=InvokeResponse)
 async def invoke_agent_endpoint(
-    request: InvokeRequest, user_id: str = Depends(get_user_id)
+    request: InvokeRequest,
+    http_request: Request,
+    response: Response,
+    user_id: str = Depends(get_user_id),
 ):
     """Endpoint principal para interactuar con el agente."""
     if not request.message:
         raise HTTPException(status_code=400, detail="El mensaje no puede estar vacío.")
 
+    trace = start_trace("POST /api/invoke", **{"http.route": "/api/invoke"})
+    response.headers[TRACE_HEADER] = trace.trace_id
+
+    async def admitted_invoke():
+        # La espera en la cola también se cancela si el cliente se desconecta.
+        async with get_admission_controller().slot(
+            _admission_key(http_request, user_id)
+        ):
+            async with asyncio.timeout(AGENT_DEADLINE_SECONDS):
+                return await invoke_agent_async(
+                    message=request.message,
+                    session_id=request.session_id,
+                    user_id=user_id,
+                )
+
     try:
-        agent_response, session_id = await invoke_agent_async(
-            message=request.message, session_id=request.session_id, user_id=user_id
-        )
+        with use_trace(trace):
+            agent_response, session_id = await _await_unless_disconnected(
+                http_request, admitted_invoke()
+            )
         return InvokeResponse(response=agent_response, session_id=session_id)
+    except AdmissionRejected as e:
+        trace.finish(error=e)
+        rejected = _rejected_response(e)
+        rejected.headers[TRACE_HEADER] = trace.trace_id
+        for cookie in response.headers.getlist("set-cookie"):
+            rejected.headers.append("set-cookie", cookie)
+        return rejected
+    except ClientDisconnect:
+        trace.finish(error="cliente desconectado")
+        logger.warning("El cliente se desconectó; ejecución del agente cancelada")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except (UpstreamUnavailable, TimeoutError) as e:
+        trace.finish(error=e)
+        logger.warning(
+            "Ejecución del agente sin respuesta a tiempo", extra={"error": repr(e)}
+        )
+        unavailable = _unavailable_response(e)
+        unavailable.headers[TRACE_HEADER] = trace.trace_id
+        return unavailable
     except Exception as e:
-        print(f"Error en el endpoint del agente: {e}")
+        trace.finish(error=e)
+        logger.error("Error en el endpoint del agente", exc_info=True)
         raise HTTPException(
             status_code=500, detail=f"Ha ocurrido un error en el agente: {e}"
         )
+    finally:
+        trace.finish()
+        log_request(trace)
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    """Serializa un evento del servicio como frame Server-Sent Events."""
+    payload = {key: value for key, value in event.items() if key != "type"}
+    return (
+        f"event: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    )
+
+
+async def _sse_stream(
+    request: InvokeRequest, user_id: str, http_request: Request, trace: Trace
+) -> AsyncIterator[str]:
+    """
+    Frames SSE de la petición con un turno de admisión retenido durante todo el stream.
+    El primer elemento (vacío) indica que el turno se concedió; el endpoint lo consume.
+    """
+    async with get_admission_controller().slot(_admission_key(http_request, user_id)):
+        yield ""
+        async with aclosing(
+            _sse_events(request, user_id, http_request, trace)
+        ) as frames:
+            async for frame in frames:
+                yield frame
+
+
+async def _sse_events(
+    request: InvokeRequest, user_id: str, http_request: Request, trace: Trace
+) -> AsyncIterator[str]:
+    """Traduce los eventos de stream_agent_async a frames SSE."""
+    events = stream_agent_async(
+        message=request.message, session_id=request.session_id, user_id=user_id
+    )
+    deadline = asyncio.get_running_loop().time() + AGENT_DEADLINE_SECONDS
+    try:
+        async with aclosing(events):
+            while True:
+                # Mientras el agente piensa no se envía nada, así que la desconexión no
+                # se detectaría al escribir: se vigila en cada espera. Cada paso corre
+                # en su propia tarea, que hereda la traza de la petición.
+                remaining = deadline - asyncio.get_running_loop().time()
+                with use_trace(trace):
+                    event = await _await_unless_disconnected(
+                        http_request, asyncio.wait_for(anext(events, None), remaining)
+                    )
+                if event is None:
+                    break
+                yield _format_sse(event)
+    except ClientDisconnect:
+        trace.finish(error="cliente desconectado")
+        logger.warning("El cliente cerró el stream; ejecución del agente cancelada")
+    except (UpstreamUnavailable, TimeoutError) as e:
+        trace.finish(error=e)
+        logger.warning(
+            "Stream del agente sin respuesta a tiempo", extra={"error": repr(e)}
+        )
+        yield _format_sse({"type": "error", "detail": unavailable_detail(e)[1]})
+    except Exception as e:
+        trace.finish(error=e)
+        # Las cabeceras ya se enviaron: el error viaja como un evento más.
+        logger.error("Error en el stream del agente", exc_info=True)
+        yield _format_sse(
+            {"type": "error", "detail": f"Ha ocurrido un error en el agente: {e}"}
+        )
+    finally:
+        trace.finish()
+        log_request(trace)
+
+
+@api_router.post("/invoke/stream")
+async def invoke_agent_stream_endpoint(
+    request: InvokeRequest,
+    http_request: Request,
+    response: Response,
+    user_id: str = Depends(get_user_id),
+):
+    """
+    Endpoint de streaming (SSE) que reenvía el texto del agente a medida que se genera.
+    """
+    if not request.message:
+        raise HTTPException(status_code=400, detail="El mensaje no puede estar vacío.")
+
+    trace = start_trace(
+        "POST /api/invoke/stream", **{"http.route": "/api/invoke/stream"}
+    )
+    frames = _sse_stream(request, user_id, http_request, trace)
+    # Se espera el turno antes de responder: un rechazo aún puede ser un 429/503.
+    try:
+        with use_trace(trace):
+            await _await_unless_disconnected(http_request, anext(frames))
+    except AdmissionRejected as e:
+        trace.finish(error=e)
+        log_request(trace)
+        stream = _rejected_response(e)
+    except ClientDisconnect:
+        trace.finish(error="cliente desconectado")
+        log_request(trace)
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    else:
+        stream = StreamingResponse(
+            frames,
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                # Evita que nginx acumule la respuesta antes de enviarla al cliente.
+                "X-Accel-Buffering": "no",
+            },
+        )
+    stream.headers[TRACE_HEADER] = trace.trace_id
+    # Al devolver una Response propia, FastAPI no copia la cookie fijada en get_user_id.
+    for cookie in response.headers.getlist("set-cookie"):
+        stream.headers.append("set-cookie", cookie)
+    return stream
+
+
+@api_router.post("/invoke/batch")
+async def invoke_batch_endpoint(
+    request: BatchInvokeRequest, x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Ejecuta un lote de preguntas (evaluación offline, precalentamiento de la caché) con
+    concurrencia acotada y devuelve un resultado NDJSON por pregunta, en orden de
+    finalización, y un resumen al final (ver assistant/batch.py). Es una ruta de
+    administración (X-Admin-Token): no pasa por el control de admisión de los
+    visitantes, su límite es BATCH_MAX_CONCURRENCY.
+    """
+    _require_admin(x_admin_token)
+    items = [
+        BatchItem(item) if isinstance(item, str) else BatchItem(item.message, item.id)
+        for item in request.messages
+    ]
+    if not items:
+        raise HTTPException(status_code=400, detail="El lote no contiene preguntas.")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote supera el máximo de {BATCH_MAX_ITEMS} preguntas.",
+        )
+    if not all(item.message for item in items):
+        raise HTTPException(status_code=400, detail="El mensaje no puede estar vacío.")
+    if request.concurrency is not None and request.concurrency < 1:
+        raise HTTPException(
+            status_code=400, detail="La concurrencia debe ser al menos 1."
+        )
+    concurrency = min(
+        request.concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY
+    )
+
+    async def lines() -> AsyncIterator[str]:
+        results = run_batch(
+            items,
+            invoke_agent_async,
+            concurrency,
+            timeout=AGENT_DEADLINE_SECONDS,
+            use_cache=request.use_cache,
+        )
+        # Si el cliente se desconecta, aclosing cancela las preguntas en curso.
+        async with aclosing(results):
+            async for result in results:
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- Canal WebSocket (ver assistant/ws.py) ---
+
+
+@api_router.websocket("/ws")
+async def conversation_websocket(
+    websocket: WebSocket, session_id: Optional[str] = None
+):
+    """Canal de conversación persistente (ver assistant/ws.py)."""
+    if not same_origin(websocket):
+        await websocket.close(code=1008)
+        return
+
+    user_id = websocket.cookies.get(USER_COOKIE_NAME)
+    headers = []
+    if not user_id:
+        user_id = f"user_{uuid.uuid4().hex}"
+        cookie = Response()
+        _set_user_cookie(cookie, user_id)
+        headers = [
+            (key, value) for key, value in cookie.raw_headers if key == b"set-cookie"
+        ]
+    await websocket.accept(headers=headers)
+
+    await serve_conversation(
+        ConversationChannel(
+            websocket,
+            user_id,
+            _admission_key(websocket, user_id),
+            session_id,
+            stream=stream_agent_async,
+            timeout=AGENT_DEADLINE_SECONDS,
+        )
+    )
 
 
 @api_router.get("/health")
@@ -73,22 +479,138 @@ async def health_check():
     return {"status": "OK"}
 
 
+@api_router.get("/ready")
+async def readiness_check():
+    """
+    Readiness: 200 solo cuando el calentamiento ha terminado (agentes, Runner y cachés).
+    """
+    warmup = get_warmup()
+    return JSONResponse(warmup.snapshot(), status_code=200 if warmup.ready else 503)
+
+
+def _require_admin(x_admin_token: Optional[str]) -> None:
+    """
+    Las rutas de administración exigen X-Admin-Token igual a ADMIN_TOKEN; sin él, no
+    existen.
+    """
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(
+            status_code=403, detail="Token de administración no válido."
+        )
+
+
+@api_router.post("/admin/reload-cv")
+async def reload_cv_endpoint(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Relee el CV sin reiniciar el proceso (p. ej. tras actualizar nginx/cv.json).
+    Requiere la cabecera X-Admin-Token con el valor de ADMIN_TOKEN; sin ADMIN_TOKEN, no
+    existe.
+    """
+    _require_admin(x_admin_token)
+    changed = await asyncio.to_thread(reload_cv_index)
+    return {"changed": changed, "cv_version": get_cv_index().version}
+
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Métricas del proceso en formato de texto de Prometheus."""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@api_router.get("/traces")
+async def traces_endpoint(
+    limit: int = 20, x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Trazas recientes (la última primero) en formato JSON de OpenTelemetry (OTLP). Son de
+    todos los visitantes e incluyen sus session_id: requiere X-Admin-Token.
+    """
+    _require_admin(x_admin_token)
+    return recent_traces(limit)
+
+
+@api_router.get("/traces/{trace_id}")
+async def trace_endpoint(
+    trace_id: str, x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Una traza concreta, a partir de la cabecera X-Trace-Id; requiere X-Admin-Token.
+    """
+    _require_admin(x_admin_token)
+    trace = get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Traza no encontrada.")
+    return trace
+
+
 # --- Creación de la Aplicación FastAPI ---
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Lanza el calentamiento en segundo plano (uvicorn escucha sin esperar a que termine)
+    y la vigilancia de cambios en el CV.
+    """
+    if warmup_enabled():
+        get_warmup().start()
+    cv_watcher = start_cv_watcher()
+    try:
+        yield
+    finally:
+        if cv_watcher is not None:
+            cv_watcher.stop()
+
+
 app = FastAPI(
     title="API del Asistente Personal de Sergio",
     description="Un servidor para interactuar con un sistema multi-agente basado en ADK.",
     version="2.0.0",
+    lifespan=lifespan,
 )
 app.include_router(api_router)
 
+
+def _configure_workers(workers: int) -> None:
+    """
+    Con varios workers las sesiones deben vivir en un almacén compartido entre procesos.
+    """
+    if workers > 1 and os.getenv("SESSION_BACKEND", "memory").lower() == "memory":
+        logger.warning(
+            "Con varios workers, las sesiones en memoria perderían la continuidad de "
+            "session_id entre procesos. Se usará SESSION_BACKEND=sqlite.",
+            extra={"workers": workers},
+        )
+        # Los workers se lanzan como procesos nuevos y heredan el entorno.
+        os.environ["SESSION_BACKEND"] = "sqlite"
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor del asistente personal.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WEB_CONCURRENCY", "1")),
+        help="Número de procesos worker (por defecto: WEB_CONCURRENCY o 1).",
+    )
+    args = parser.parse_args()
+
     # Control de modo desarrollo vs producción
     is_development = os.getenv("DEVELOPMENT", "false").lower() == "true"
+    workers = 1 if is_development else max(1, args.workers)
+    _configure_workers(workers)
 
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=args.host,
+        port=args.port,
         reload=is_development,  # Solo reload en desarrollo
+        workers=workers,
     )
@@ -25,7 +25,6 @@ log "🚀 Iniciando despliegue completo..."
 # 1. Mover archivos desde el subdirectorio de nginx
 log "1️⃣  Moviendo archivos de configuración y frontend..."
 sudo mv "$NGINX_SUBDIR/index.html" /var/www/chat.sergiomarquez.dev/
-sudo mv "$NGINX_SUBDIR/enhanced_rendering.js" /var/www/chat.sergiomarquez.dev/
 sudo mv "$NGINX_SUBDIR/docker-compose.yml" ./docker-compose.yml
 sudo mv "$NGINX_SUBDIR/nginx.conf" /etc/nginx/sites-available/chat.sergiomarquez.dev
 log "✅ Archivos movidos a sus destinos finales."
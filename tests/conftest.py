@@ -2,6 +2,7 @@
 Configuración y fixtures compartidas para tests de pytest.
 """
 
+import json
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -25,6 +26,45 @@ def mock_cv_data():
     }
 
 
+@pytest.fixture
+def mock_cv_resume():
+    """CV de ejemplo con el formato JSON Resume (secciones con varias entradas)."""
+    return {
+        "basics": {"name": "Sergio Márquez", "label": "Desarrollador IA/ML"},
+        "work": [
+            {
+                "name": "DataLabs AI",
+                "position": "Lead AI Engineer",
+                "highlights": ["Agentes con Google ADK y Gemini"],
+            },
+            {
+                "name": "TechCorp",
+                "position": "Backend Developer",
+                "highlights": ["APIs en Python con Django", "Despliegues con Docker"],
+            },
+        ],
+        "education": [{"institution": "Universidad de Sevilla", "area": "Informática"}],
+        "skills": [
+            {"name": "Backend", "keywords": ["Python", "FastAPI", "PostgreSQL"]},
+            {"name": "Cloud", "keywords": ["Kubernetes", "Docker"]},
+        ],
+        "languages": [{"language": "Inglés", "fluency": "C1"}],
+    }
+
+
+@pytest.fixture
+def cv_index_file(tmp_path, monkeypatch, mock_cv_resume):
+    """Escribe un CV temporal, lo activa vía CV_PATH y reinicia el índice del CV."""
+    from assistant.cv_index import reset_cv_index
+
+    path = tmp_path / "cv.json"
+    path.write_text(json.dumps(mock_cv_resume), encoding="utf-8")
+    monkeypatch.setenv("CV_PATH", str(path))
+    reset_cv_index()
+    yield path
+    reset_cv_index()
+
+
 @pytest.fixture
 def mock_search_results():
     """Resultados de búsqueda de ejemplo para tests."""
@@ -34,6 +74,81 @@ def mock_search_results():
     ]
 
 
+@pytest.fixture
+def mock_blog_documents():
+    """Documentos de blog de ejemplo ya extraídos para construir un índice."""
+    return [
+        {
+            "url": "https://blog.sergiomarquez.dev/agentes-llm-con-adk",
+            "title": "Agentes LLM con Google ADK",
+            "headings": "Arquitectura multi-agente Herramientas",
+            "body": "Cómo construir agentes con modelos de lenguaje y delegación.",
+            "published": "2024-05-10T09:00:00+00:00",
+        },
+        {
+            "url": "https://blog.sergiomarquez.dev/docker-para-python",
+            "title": "Docker para proyectos Python",
+            "headings": "Imágenes multi-stage",
+            "body": "Contenedores ligeros para desplegar FastAPI y modelos de IA.",
+        },
+        {
+            "url": "https://blog.sergiomarquez.dev/fastapi-tutorial",
+            "title": "Tutorial de FastAPI",
+            "headings": "Endpoints asíncronos",
+            "body": "APIs rápidas con Python. Incluye un ejemplo con Docker.",
+        },
+    ]
+
+
+@pytest.fixture
+def blog_index_file(tmp_path, monkeypatch, mock_blog_documents):
+    """Construye un índice del blog temporal y lo activa vía BLOG_INDEX_PATH."""
+    from assistant.blog_index import BlogIndex, reset_blog_index
+
+    path = tmp_path / "blog_index.json"
+    BlogIndex.build(mock_blog_documents).save(str(path))
+    monkeypatch.setenv("BLOG_INDEX_PATH", str(path))
+    reset_blog_index()
+    yield path
+    reset_blog_index()
+
+
+@pytest.fixture(autouse=True)
+def clear_search_cache():
+    """Vacía la caché de búsquedas del blog para aislar cada test."""
+    from assistant.tools import _search_cache
+
+    _search_cache.clear()
+    yield
+    _search_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def disable_blog_metadata(monkeypatch):
+    """Sin descargas de los artículos del blog salvo en los tests que lo activan."""
+    monkeypatch.setenv("BLOG_METADATA_ENABLED", "false")
+
+
+@pytest.fixture(autouse=True)
+def clear_answer_cache():
+    """Vacía la caché de respuestas de primer turno para aislar cada test."""
+    from assistant.services import _answer_cache
+
+    _answer_cache.clear()
+    yield
+    _answer_cache.clear()
+
+
+@pytest.fixture
+def fake_llm():
+    """Sustituye Gemini por el LLM de prueba en los tres agentes."""
+    from tests.fakes import install_fake_llm, restore_llm
+
+    originals = install_fake_llm()
+    yield
+    restore_llm(originals)
+
+
 @pytest.fixture
 def mock_googlesearch(mocker):
     """Mock para googlesearch.search - usando el path correcto."""
@@ -0,0 +1,122 @@
+"""
+Dobles de prueba compartidos: un LLM local que sustituye a Gemini en los agentes.
+"""
+
+from typing import AsyncGenerator, List, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+BLOG_KEYWORDS = ("blog", "artículo", "articulo", "post", "escrito")
+
+
+def user_messages(llm_request: LlmRequest) -> List[str]:
+    """
+    Textos de los mensajes del usuario presentes en el historial enviado al modelo.
+    """
+    texts = []
+    for content in llm_request.contents:
+        if content.role != "user":
+            continue
+        for part in content.parts or []:
+            if part.text and not part.text.startswith("For context:"):
+                texts.append(part.text)
+    return texts
+
+
+class FakeLlm(BaseLlm):
+    """
+    LLM de prueba determinista.
+
+    - Como orquestador, transfiere a Blog_Expert o CV_Expert según palabras clave.
+    - Como especialista, responde con un HTML que enumera los mensajes del usuario
+      vistos en el historial (permite comprobar la continuidad de la sesión).
+    """
+
+    model: str = "fake-llm"
+    agent_name: str = "Personal_Orchestrator"
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        history = user_messages(llm_request)
+        last_content = llm_request.contents[-1] if llm_request.contents else None
+        answered_tool = last_content is not None and any(
+            part.function_response for part in last_content.parts or []
+        )
+
+        if self.agent_name == "Personal_Orchestrator" and not answered_tool:
+            last = history[-1].lower() if history else ""
+            target = (
+                "Blog_Expert"
+                if any(word in last for word in BLOG_KEYWORDS)
+                else "CV_Expert"
+            )
+            yield LlmResponse(
+                content=types.Content(
+                    role="model",
+                    parts=[
+                        types.Part(
+                            function_call=types.FunctionCall(
+                                name="transfer_to_agent", args={"agent_name": target}
+                            )
+                        )
+                    ],
+                )
+            )
+            return
+
+        text = f"<p>{self.agent_name}: {' | '.join(history)}</p>"
+        if stream:
+            for word in text.split(" "):
+                yield LlmResponse(
+                    content=types.Content(
+                        role="model", parts=[types.Part(text=word + " ")]
+                    ),
+                    partial=True,
+                )
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)])
+        )
+
+
+def install_fake_llm(llm_class=FakeLlm, **options) -> List[Optional[object]]:
+    """Sustituye el modelo de los tres agentes. Devuelve los modelos originales."""
+    from assistant.agents import blog_agent, cv_agent, root_agent
+
+    originals = []
+    for agent in (root_agent, cv_agent, blog_agent):
+        originals.append(agent.model)
+        agent.model = llm_class(agent_name=agent.name, **options)
+    return originals
+
+
+def restore_llm(originals: List[Optional[object]]) -> None:
+    """Restaura los modelos devueltos por install_fake_llm."""
+    from assistant.agents import blog_agent, cv_agent, root_agent
+
+    for agent, model in zip((root_agent, cv_agent, blog_agent), originals):
+        agent.model = model
+
+
+class LocalPromptCacheBackend:
+    """
+    Sustituto local de la caché de contexto de Gemini para assistant.prompt_cache:
+    guarda cada prefijo registrado para que un LLM de prueba lo resuelva a partir de su
+    handle.
+    """
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.prefixes = {}
+        self.created: List[str] = []
+
+    async def create(self, prefix, ttl, display_name):
+        if self.fail:
+            raise RuntimeError("caché no disponible")
+        name = f"cachedContents/local-{len(self.created)}"
+        self.prefixes[name] = prefix
+        self.created.append(display_name)
+        return name
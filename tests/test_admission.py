@@ -0,0 +1,253 @@
+"""
+Tests para el módulo assistant.admission
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from assistant.admission import AdmissionController, AdmissionRejected
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _hold(controller, user_id, order, release: asyncio.Event):
+    """Pide turno, lo anota en `order` y lo retiene hasta que se active `release`."""
+    async with controller.slot(user_id):
+        order.append(user_id)
+        await release.wait()
+
+
+class TestTokenBucket:
+    """Tests del límite por usuario."""
+
+    @pytest.mark.asyncio
+    async def test_burst_then_rate_limited_with_retry_after(self):
+        """
+        Test que agotada la ráfaga se rechaza con 429 hasta que se recarga un token.
+        """
+        # Arrange
+        clock = FakeClock()
+        controller = AdmissionController(user_rate=0.5, user_burst=2, clock=clock)
+
+        # Act
+        for _ in range(2):
+            async with controller.slot("user_a"):
+                pass
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("user_a")
+        clock.now += 2
+        async with controller.slot("user_a"):
+            pass
+
+        # Assert
+        assert rejected.value.status_code == 429
+        assert rejected.value.reason == "rate_limited"
+        assert rejected.value.retry_after == 2
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_users_have_independent_buckets(self):
+        """Test que el límite de un usuario no afecta a otro."""
+        # Arrange
+        controller = AdmissionController(user_rate=0.1, user_burst=1, clock=FakeClock())
+        async with controller.slot("user_a"):
+            pass
+
+        # Act & Assert
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("user_a")
+        async with controller.slot("user_b"):
+            pass
+
+
+class TestQueue:
+    """Tests del límite global, la cola y el reparto entre usuarios."""
+
+    @pytest.mark.asyncio
+    async def test_full_queue_is_rejected_with_503(self):
+        """Test que con los turnos ocupados y la cola llena se responde 503."""
+        # Arrange
+        controller = AdmissionController(max_concurrent=1, max_queue=1, user_rate=0)
+        release = asyncio.Event()
+        order = []
+        tasks = [
+            asyncio.create_task(_hold(controller, user, order, release))
+            for user in ("user_a", "user_b")
+        ]
+        await asyncio.sleep(0)
+
+        # Act
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("user_c")
+        release.set()
+        await asyncio.gather(*tasks)
+
+        # Assert
+        assert rejected.value.status_code == 503
+        assert rejected.value.reason == "queue_full"
+        assert rejected.value.retry_after >= 1
+        assert order == ["user_a", "user_b"]
+        assert controller.in_flight == 0 and controller.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_waiting_users_are_served_round_robin(self):
+        """Test que quien encola muchas peticiones no adelanta a los demás usuarios."""
+        # Arrange
+        controller = AdmissionController(
+            max_concurrent=1, max_queue=10, max_queued_per_user=5, user_rate=0
+        )
+        order = []
+        holder = asyncio.Event()
+        first = asyncio.create_task(_hold(controller, "holder", order, holder))
+        await asyncio.sleep(0)
+        done = asyncio.Event()
+        done.set()
+        waiting = []
+        for user in ("heavy", "heavy", "heavy", "light"):
+            waiting.append(asyncio.create_task(_hold(controller, user, order, done)))
+            await asyncio.sleep(0)
+
+        # Act
+        holder.set()
+        await asyncio.gather(first, *waiting)
+
+        # Assert
+        assert order == ["holder", "heavy", "light", "heavy", "heavy"]
+
+    @pytest.mark.asyncio
+    async def test_per_user_queue_limit(self):
+        """Test que un usuario no puede ocupar la cola más allá de su cupo."""
+        # Arrange
+        controller = AdmissionController(
+            max_concurrent=1, max_queue=10, max_queued_per_user=1, user_rate=0
+        )
+        release = asyncio.Event()
+        tasks = [
+            asyncio.create_task(_hold(controller, "user_a", [], release))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+
+        # Act
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("user_a")
+        release.set()
+        await asyncio.gather(*tasks)
+
+        # Assert
+        assert rejected.value.status_code == 429
+        assert rejected.value.reason == "user_queue_full"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_and_timed_out_waiters_free_their_place(self):
+        """
+        Test que una espera cancelada o caducada sale de la cola sin perder turnos.
+        """
+        # Arrange
+        controller = AdmissionController(
+            max_concurrent=1, max_queue=10, queue_timeout=0.05, user_rate=0
+        )
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, "holder", [], release))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(controller.acquire("user_a"))
+        await asyncio.sleep(0)
+
+        # Act
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("user_b")
+        queued_after = controller.queued
+        release.set()
+        await holder
+
+        # Assert
+        assert rejected.value.reason == "queue_timeout"
+        assert rejected.value.status_code == 503
+        assert queued_after == 0
+        assert controller.in_flight == 0
+
+
+class TestAdmissionEndpoints:
+    """Tests de las respuestas HTTP del control de admisión."""
+
+    @pytest.fixture
+    def strict_admission(self):
+        import assistant.admission as admission
+
+        original = admission.get_admission_controller()
+        admission.set_admission_controller(
+            AdmissionController(user_rate=0.01, user_burst=1)
+        )
+        yield
+        admission.set_admission_controller(original)
+
+    def test_invoke_returns_429_with_retry_after(self, fake_llm, strict_admission):
+        """
+        Test que /api/invoke responde 429 con Retry-After al superar el límite del
+        usuario.
+        """
+        from main import app
+
+        # Arrange
+        client = TestClient(app, cookies={"assistant_user_id": "user_limitado"})
+
+        # Act
+        first = client.post("/api/invoke", json={"message": "Hola, ¿quién eres?"})
+        second = client.post("/api/invoke", json={"message": "¿Y tu experiencia?"})
+        metrics = client.get("/api/metrics").text
+
+        # Assert
+        assert first.status_code == 200
+        assert second.status_code == 429
+        assert int(second.headers["Retry-After"]) >= 1
+        assert second.json()["reason"] == "rate_limited"
+        assert "X-Trace-Id" in second.headers
+        assert 'assistant_admission_rejections_total{reason="rate_limited"}' in metrics
+        assert "assistant_admission_queue_depth 0" in metrics
+
+    def test_stream_is_rejected_before_streaming(self, fake_llm, strict_admission):
+        """Test que el stream rechazado es un 429 normal y no un stream SSE."""
+        from main import app
+
+        # Arrange
+        client = TestClient(app, cookies={"assistant_user_id": "user_stream"})
+        client.post("/api/invoke/stream", json={"message": "Hola"}).read()
+
+        # Act
+        response = client.post("/api/invoke/stream", json={"message": "Hola otra vez"})
+
+        # Assert
+        assert response.status_code == 429
+        assert response.headers["content-type"].startswith("application/json")
+        assert "Retry-After" in response.headers
+
+    def test_requests_without_cookie_share_the_client_ip_limit(
+        self, fake_llm, strict_admission
+    ):
+        """Test que un cliente sin cookie no esquiva el límite estrenando usuario."""
+        from main import app
+
+        # Arrange
+        headers = {"X-Real-IP": "203.0.113.7"}
+
+        # Act
+        first = TestClient(app).post(
+            "/api/invoke", json={"message": "Hola"}, headers=headers
+        )
+        second = TestClient(app).post(
+            "/api/invoke", json={"message": "Hola"}, headers=headers
+        )
+
+        # Assert
+        assert first.status_code == 200
+        assert second.status_code == 429
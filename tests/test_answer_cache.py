@@ -0,0 +1,240 @@
+"""
+Tests para la caché de respuestas de primer turno (assistant.answer_cache).
+"""
+
+import pytest
+
+from assistant.answer_cache import SemanticAnswerCache
+
+
+class FakeClock:
+    """Reloj manual para controlar la caducidad."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSemanticAnswerCache:
+    """Tests de la búsqueda exacta y semántica."""
+
+    def setup_method(self):
+        """Setup para cada test."""
+        self.clock = FakeClock()
+        self.cache = SemanticAnswerCache(threshold=0.75, ttl=60, clock=self.clock)
+        self.cache.store(
+            "¿Cuál es tu experiencia profesional?",
+            "<p>Experiencia</p>",
+            "v1",
+            2.5,
+            "CV_Expert",
+        )
+        self.cache.store("¿Has trabajado con Python?", "<p>Python</p>", "v1", 1.5)
+
+    def test_normalized_exact_match(self):
+        """
+        Test que mayúsculas, tildes, signos y orden de palabras no impiden el acierto.
+        """
+        # Act
+        cached = self.cache.lookup("cual es tu EXPERIENCIA profesional", "v1")
+
+        # Assert
+        assert cached.answer == "<p>Experiencia</p>"
+        assert cached.author == "CV_Expert"
+        assert cached.match == "exact"
+        assert cached.latency == 2.5
+
+    def test_semantic_match_for_paraphrase(self):
+        """Test que una variante de la pregunta supera el umbral de similitud."""
+        # Act
+        cached = self.cache.lookup("¿Cuál es tu experiencia profesional previa?", "v1")
+
+        # Assert
+        assert cached is not None
+        assert cached.match == "semantic"
+        assert 0.75 <= cached.similarity < 1.0
+
+    def test_filler_words_do_not_change_the_question(self):
+        """
+        Test que las muletillas ('cuéntame', 'dime'...) se ignoran en la coincidencia
+        exacta.
+        """
+        # Act
+        cached = self.cache.lookup("Cuéntame tu experiencia profesional", "v1")
+
+        # Assert
+        assert cached.match == "exact"
+
+    def test_different_question_is_a_miss(self):
+        """
+        Test que una pregunta parecida pero con otra intención no reutiliza la
+        respuesta.
+        """
+        # Act & Assert
+        assert self.cache.lookup("¿Has trabajado con Java?", "v1") is None
+
+    def test_hits_do_not_misalign_the_semantic_matrix(self):
+        """
+        Test que un acierto (que reordena el LRU) no hace que otra pregunta reciba su
+        respuesta.
+        """
+        # Arrange
+        cache = SemanticAnswerCache(ttl=60, clock=self.clock)
+        cache.store("¿Has escrito sobre Docker en el blog?", "<p>Docker</p>", "v1", 1.0)
+        cache.store("¿Qué proyectos personales tienes?", "<p>Proyectos</p>", "v1", 1.0)
+        cache.store("¿Dónde vives actualmente?", "<p>Madrid</p>", "v1", 1.0)
+        cache.lookup(
+            "¿Qué proyectos personales tienes hoy?", "v1"
+        )  # construye la matriz
+
+        # Act
+        cache.lookup("¿Has escrito sobre Docker en el blog?", "v1")
+        cached = cache.lookup("¿Qué proyectos personales tienes hoy?", "v1")
+
+        # Assert
+        assert cached.match == "semantic"
+        assert cached.answer == "<p>Proyectos</p>"
+
+    @pytest.mark.parametrize(
+        "cached_question, question",
+        [
+            ("¿Cuál es tu experiencia con Docker?", "¿Cuál es tu experiencia?"),
+            ("¿Qué proyectos de IA tienes?", "¿Qué proyectos tienes?"),
+            (
+                "¿Has trabajado con Python en machine learning?",
+                "¿Has trabajado con Python?",
+            ),
+        ],
+    )
+    def test_generic_question_does_not_reuse_a_specific_answer(
+        self, cached_question, question
+    ):
+        """
+        Test que una pregunta genérica no recibe la respuesta de una más específica.
+        """
+        # Arrange
+        cache = SemanticAnswerCache()
+        cache.store(cached_question, "<p>Específica</p>", "v1", 1.0)
+
+        # Act & Assert
+        assert cache.lookup(question, "v1") is None
+
+    def test_default_threshold_keeps_paraphrases(self):
+        """
+        Test que con el umbral por defecto las paráfrasis siguen acertando (calibración
+        del umbral).
+        """
+        # Arrange
+        cache = SemanticAnswerCache()
+        cache.store(
+            "¿Cuál es tu experiencia profesional?", "<p>Experiencia</p>", "v1", 1.0
+        )
+
+        # Act
+        previous = cache.lookup("¿Cuál es tu experiencia profesional previa?", "v1")
+        so_far = cache.lookup("¿Cuál ha sido tu experiencia profesional?", "v1")
+
+        # Assert
+        assert previous.match == so_far.match == "semantic"
+        assert previous.answer == so_far.answer == "<p>Experiencia</p>"
+
+    def test_negation_changes_the_question(self):
+        """
+        Test que '¿no has trabajado con X?' no reutiliza la respuesta de '¿has trabajado
+        con X?'.
+        """
+        # Act
+        negated = self.cache.lookup("¿No has trabajado con Python?", "v1")
+        never = self.cache.lookup("¿Nunca has trabajado con Python?", "v1")
+
+        # Assert
+        assert negated is None
+        assert never is None
+
+    @pytest.mark.parametrize(
+        "cached_question, question",
+        [
+            ("¿Dónde estudiaste?", "¿Cuándo estudiaste?"),
+            ("¿Con quién trabajas ahora?", "¿Para quién trabajas ahora?"),
+            ("¿Cómo usas Docker?", "¿Dónde usas Docker?"),
+        ],
+    )
+    def test_other_question_word_is_another_question(self, cached_question, question):
+        """
+        Test que preguntas que solo se distinguen por el interrogativo (y su
+        preposición) no comparten respuesta, aunque su clave normalizada coincida.
+        """
+        # Arrange
+        cache = SemanticAnswerCache()
+        cache.store(cached_question, "<p>Primera</p>", "v1", 1.0)
+
+        # Act
+        other = cache.lookup(question, "v1")
+        same = cache.lookup(cached_question.upper(), "v1")
+
+        # Assert
+        assert other is None
+        assert same.match == "exact"
+        assert same.answer == "<p>Primera</p>"
+
+    def test_content_version_change_invalidates(self):
+        """Test que un cambio de versión del CV o del blog vacía la caché."""
+        # Act
+        cached = self.cache.lookup("¿Has trabajado con Python?", "v2")
+
+        # Assert
+        assert cached is None
+        assert len(self.cache) == 0
+        assert self.cache.stats()["invalidations"] == 1
+
+    def test_entries_expire_after_ttl(self):
+        """Test que las respuestas caducan tras el TTL."""
+        # Arrange
+        self.clock.now = 61
+
+        # Act & Assert
+        assert self.cache.lookup("¿Has trabajado con Python?", "v1") is None
+        assert len(self.cache) == 0
+
+    def test_lru_eviction(self):
+        """
+        Test que al superar el máximo se desaloja la pregunta usada hace más tiempo.
+        """
+        # Arrange
+        cache = SemanticAnswerCache(max_entries=2)
+        cache.store("¿Sabes Docker?", "docker", "v", 1.0)
+        cache.store("¿Sabes Kubernetes?", "kubernetes", "v", 1.0)
+        cache.lookup("¿Sabes Docker?", "v")
+
+        # Act
+        cache.store("¿Sabes Terraform?", "terraform", "v", 1.0)
+
+        # Assert
+        assert cache.lookup("¿Sabes Docker?", "v").answer == "docker"
+        assert cache.lookup("¿Sabes Kubernetes?", "v") is None
+
+    def test_stats_and_similarity_observer(self):
+        """
+        Test que se cuentan aciertos, fallos y latencia ahorrada, y se observa la
+        similitud.
+        """
+        # Arrange
+        observed = []
+        cache = SemanticAnswerCache(threshold=0.75, similarity_observer=observed.append)
+        cache.store("¿Cuál es tu experiencia profesional?", "A", "v", 2.0)
+
+        # Act
+        cache.lookup("¿Cuál es tu experiencia profesional?", "v")
+        cache.lookup("¿Cuál es tu experiencia profesional previa?", "v")
+        cache.lookup("¿Sabes Docker?", "v")
+
+        # Assert
+        stats = cache.stats()
+        assert stats["hits_exact"] == 1
+        assert stats["hits_semantic"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3, abs=1e-4)
+        assert stats["saved_seconds"] == 4.0
+        assert len(observed) == 2
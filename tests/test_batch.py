@@ -0,0 +1,208 @@
+"""
+Tests para el módulo assistant.batch (lotes de preguntas con concurrencia acotada)
+"""
+
+import asyncio
+import io
+import json
+import os
+
+import pytest
+
+from assistant.answer_cache import cached_answers_bypassed
+from assistant.batch import BatchItem, run_batch
+from assistant.resilience import UpstreamUnavailable
+
+
+async def _collect(results):
+    return [result async for result in results]
+
+
+class TestRunBatch:
+    """Tests de la ejecución de un lote."""
+
+    @pytest.mark.asyncio
+    async def test_results_arrive_in_completion_order_with_bounded_concurrency(self):
+        """
+        Test que nunca hay más de `concurrency` preguntas en marcha y que cada una sale
+        al terminar.
+        """
+        # Arrange
+        delays = {"lenta": 0.3, "media": 0.05, "rápida": 0.0, "otra": 0.01}
+        running, peak, users = 0, 0, set()
+
+        async def invoke(message, session_id, user_id):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            users.add(user_id)
+            await asyncio.sleep(delays[message])
+            running -= 1
+            return f"<p>{message}</p>", f"session_{message}"
+
+        items = [BatchItem(message, id=str(i)) for i, message in enumerate(delays)]
+
+        # Act
+        results = await _collect(run_batch(items, invoke, concurrency=2))
+
+        # Assert
+        assert peak == 2
+        assert len(users) == len(items)  # cada pregunta es una conversación nueva
+        # "lenta" ocupa un hueco todo el rato; las demás pasan por el otro una tras
+        # otra.
+        assert [result["id"] for result in results[:-1]] == ["1", "2", "3", "0"]
+        assert results[0]["response"] == "<p>media</p>"
+        assert all(
+            result["ok"] and result["latency_ms"] >= 0 for result in results[:-1]
+        )
+        assert results[-1]["type"] == "summary"
+        assert (results[-1]["total"], results[-1]["ok"], results[-1]["failed"]) == (
+            4,
+            4,
+            0,
+        )
+
+    @pytest.mark.asyncio
+    async def test_failures_are_reported_per_item_without_stopping_the_batch(self):
+        """
+        Test que un error, una caída del upstream o un plazo agotado se informan en su
+        resultado.
+        """
+
+        # Arrange
+        async def invoke(message, session_id, user_id):
+            if message == "falla":
+                raise ValueError("respuesta inválida")
+            if message == "caído":
+                raise UpstreamUnavailable("gemini", "circuit_open")
+            if message == "lenta":
+                await asyncio.sleep(1)
+            return "<p>ok</p>", "session"
+
+        items = [BatchItem(message) for message in ("falla", "caído", "lenta", "bien")]
+
+        # Act
+        results = await _collect(run_batch(items, invoke, concurrency=4, timeout=0.05))
+
+        # Assert
+        by_index = {result["index"]: result for result in results[:-1]}
+        assert (by_index[0]["error"], by_index[0]["detail"]) == (
+            "error",
+            "respuesta inválida",
+        )
+        assert by_index[1]["error"] == "unavailable"
+        assert by_index[2]["error"] == "timeout"
+        assert by_index[3]["ok"] is True
+        assert results[-1]["errors"] == {"error": 1, "unavailable": 1, "timeout": 1}
+        assert results[-1]["failed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_closing_the_results_cancels_running_items(self):
+        """
+        Test que dejar de leer (cliente desconectado) cancela las preguntas en curso.
+        """
+        # Arrange
+        cancelled = []
+
+        async def invoke(message, session_id, user_id):
+            try:
+                if message != "primera":
+                    await asyncio.sleep(10)
+                return "<p>ok</p>", "session"
+            except asyncio.CancelledError:
+                cancelled.append(message)
+                raise
+
+        results = run_batch(
+            [BatchItem(m) for m in ("primera", "b", "c")], invoke, concurrency=3
+        )
+
+        # Act
+        first = await anext(results)
+        await results.aclose()
+
+        # Assert
+        assert first["ok"] is True
+        assert sorted(cancelled) == ["b", "c"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("use_cache", [True, False])
+    async def test_use_cache_false_bypasses_cached_answers(self, use_cache):
+        """
+        Test que con use_cache=False cada pregunta se ejecuta sin FAQ ni caché de
+        respuestas.
+        """
+        # Arrange
+        bypassed = []
+
+        async def invoke(message, session_id, user_id):
+            bypassed.append(cached_answers_bypassed())
+            return "<p>ok</p>", "session"
+
+        # Act
+        results = await _collect(
+            run_batch(
+                [BatchItem("a"), BatchItem("b")],
+                invoke,
+                concurrency=2,
+                use_cache=use_cache,
+            )
+        )
+
+        # Assert
+        assert bypassed == [not use_cache] * 2
+        assert results[-1]["use_cache"] is use_cache
+        assert cached_answers_bypassed() is False
+
+
+class TestBatchCli:
+    """Tests de la lectura de preguntas de invoke_batch.py."""
+
+    def test_reads_plain_lines_and_json_objects(self):
+        """Test que acepta texto o JSON por línea e ignora vacías y comentarios."""
+        from invoke_batch import read_items
+
+        # Arrange
+        source = io.StringIO(
+            "# preguntas frecuentes\n¿Cuál es tu experiencia?\n\n"
+            '{"message": "¿Has escrito sobre Docker?", "id": 7}\n'
+        )
+
+        # Act
+        items = read_items(source)
+
+        # Assert
+        assert items == [
+            BatchItem("¿Cuál es tu experiencia?"),
+            BatchItem("¿Has escrito sobre Docker?", "7"),
+        ]
+
+    def test_no_cache_disables_faq_and_answer_cache_locally(
+        self, mocker, monkeypatch, tmp_path
+    ):
+        """Test que --no-cache sin --url desactiva las FAQ y la caché en el proceso."""
+        import invoke_batch
+        from assistant import services
+
+        # Arrange
+        monkeypatch.setenv("FAQ_ENABLED", "true")
+        monkeypatch.setenv("ANSWER_CACHE_ENABLED", "true")
+        questions = tmp_path / "preguntas.txt"
+        questions.write_text("¿Qué estudiaste?\n", encoding="utf-8")
+        seen = []
+
+        async def invoke(message, session_id, user_id):
+            seen.append((os.environ["FAQ_ENABLED"], os.environ["ANSWER_CACHE_ENABLED"]))
+            return "<p>ok</p>", "session"
+
+        mocker.patch.object(services, "invoke_agent_async", side_effect=invoke)
+        output = io.StringIO()
+        mocker.patch.object(invoke_batch.sys, "stdout", output)
+
+        # Act
+        code = invoke_batch.main([str(questions), "--no-cache"])
+
+        # Assert
+        assert code == 0
+        assert seen == [("false", "false")]
+        assert json.loads(output.getvalue().splitlines()[-1])["use_cache"] is False
@@ -0,0 +1,118 @@
+"""
+Tests para el arnés de benchmarks (benchmarks.fake_gemini y benchmarks.bench_load)
+"""
+
+import httpx
+import pytest
+
+from benchmarks import fake_gemini
+from benchmarks.bench_load import percentile, run_load
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Gemini y la búsqueda simulados, sin latencia, restaurados al terminar."""
+    import assistant.services as services
+    import assistant.tools as tools
+    from assistant.blog_index import reset_blog_index
+    from assistant.routing import NullRouter
+
+    monkeypatch.setenv("BLOG_INDEX_PATH", "")
+    monkeypatch.setenv("BLOG_SEARCH_GOOGLE_FALLBACK", "true")
+    originals = fake_gemini.install(latency=0, tokens_per_second=0, answer_tokens=6)
+    original_search = fake_gemini.stub_search(latency=0)
+    router = services._router
+    # Sin atajo: todas las peticiones pasan por la transferencia del orquestador.
+    services.set_router(NullRouter())
+    yield
+    services.set_router(router)
+    tools._search_google = original_search
+    reset_blog_index()
+    fake_gemini.restore(originals)
+
+
+class TestPercentile:
+    """Tests del cálculo de percentiles."""
+
+    def test_percentile_uses_nearest_rank(self):
+        """Test que los percentiles devuelven valores observados."""
+        # Arrange
+        values = [float(value) for value in range(1, 101)]
+
+        # Assert
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 95) == 95.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 95) == 0.0
+
+
+class TestStandInLlm:
+    """Tests del LLM simulado."""
+
+    @pytest.mark.asyncio
+    async def test_blog_question_transfers_and_uses_stub_search(self, stand_in, mocker):
+        """
+        Test que el orquestador transfiere a Blog_Expert y este usa la búsqueda
+        simulada.
+        """
+        import assistant.tools as tools
+        from assistant.services import invoke_agent_async
+
+        # Arrange
+        search = mocker.spy(tools, "_search_google")
+
+        # Act
+        response, _ = await invoke_agent_async(
+            message="¿Tienes artículos sobre agentes?",
+            session_id=None,
+            user_id="user_bench",
+        )
+
+        # Assert
+        assert response.startswith("<p>Sergio tiene experiencia")
+        assert len(response[3:-4].split()) == 6
+        search.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_transfer_none_answers_from_orchestrator(self, stand_in):
+        """Test que con transfer='none' el orquestador responde sin transferir."""
+        import assistant.services as services
+        from assistant.agents import root_agent
+
+        # Arrange
+        root_agent.model.transfer = "none"
+        hops_before = services._orchestrator_hop.count()
+
+        # Act
+        response, _ = await services.invoke_agent_async(
+            message="Hola", session_id=None, user_id="user_bench"
+        )
+
+        # Assert
+        assert response.startswith("<p>")
+        assert services._orchestrator_hop.count() == hops_before
+
+
+class TestLoadGenerator:
+    """Tests del generador de carga."""
+
+    @pytest.mark.asyncio
+    async def test_run_load_reports_latency_and_throughput(self, stand_in):
+        """Test que run_load reparte las peticiones y calcula las estadísticas."""
+        from main import app
+
+        # Arrange
+        def client_factory():
+            return httpx.AsyncClient(
+                base_url="http://bench", transport=httpx.ASGITransport(app=app)
+            )
+
+        # Act
+        result = await run_load(client_factory, requests=8, concurrency=2, turns=2)
+
+        # Assert
+        assert result["requests"] == 8
+        assert result["errors"] == 0
+        assert result["statuses"] == {200: 8}
+        assert result["rps"] > 0
+        assert 0 < result["p50"] <= result["p95"] <= result["p99"] <= result["max"]
@@ -0,0 +1,175 @@
+"""
+Tests para el módulo assistant.blog_index
+"""
+
+import json
+import time
+
+import pytest
+
+from assistant.blog_index import (
+    BlogIndex,
+    documents_from_directory,
+    get_blog_index,
+    parse_html_post,
+)
+
+
+class TestBlogIndexSearch:
+    """Tests de construcción y búsqueda del índice BM25."""
+
+    def test_search_ranks_title_matches_first(self, mock_blog_documents):
+        """Test que un término en el título puntúa más que en el cuerpo."""
+        # Arrange
+        index = BlogIndex.build(mock_blog_documents)
+
+        # Act
+        results = index.search("docker")
+
+        # Assert
+        assert len(results) == 2
+        assert results[0]["url"].endswith("docker-para-python")
+
+    def test_search_ignores_accents_case_and_plurals(self, mock_blog_documents):
+        """Test que la consulta se normaliza igual que los documentos."""
+        # Arrange
+        index = BlogIndex.build(mock_blog_documents)
+
+        # Act
+        results = index.search("¿Tienes ARTÍCULOS sobre LLMs?")
+
+        # Assert
+        assert results[0]["title"] == "Agentes LLM con Google ADK"
+
+    def test_search_without_matches_returns_empty(self, mock_blog_documents):
+        """Test que una consulta sin términos conocidos no devuelve nada."""
+        # Arrange
+        index = BlogIndex.build(mock_blog_documents)
+
+        # Act & Assert
+        assert index.search("kubernetes") == []
+        assert index.search("") == []
+
+    def test_save_and_load_roundtrip(self, tmp_path, mock_blog_documents):
+        """Test que el formato en disco conserva resultados y versión."""
+        # Arrange
+        index = BlogIndex.build(mock_blog_documents)
+        path = tmp_path / "index.json"
+
+        # Act
+        index.save(str(path))
+        loaded = BlogIndex.load(str(path))
+
+        # Assert
+        assert loaded.version == index.version
+        assert loaded.search("fastapi") == index.search("fastapi")
+
+    def test_search_is_fast(self, mock_blog_documents):
+        """Test que una búsqueda sobre cientos de posts tarda milisegundos."""
+        # Arrange
+        documents = [
+            dict(doc, url=f"{doc['url']}-{i}")
+            for i in range(200)
+            for doc in mock_blog_documents
+        ]
+        index = BlogIndex.build(documents)
+
+        # Act
+        start = time.perf_counter()
+        index.search("agentes docker fastapi")
+        elapsed = time.perf_counter() - start
+
+        # Assert
+        assert elapsed < 0.05
+
+
+class TestBlogIndexSources:
+    """Tests de extracción de documentos."""
+
+    def test_parse_html_post_extracts_fields(self):
+        """Test que se extraen título, encabezados, cuerpo y fecha del HTML."""
+        # Arrange
+        html = """
+        <html><head><title>RAG en producción | Blog de Sergio</title>
+        <meta name="description" content="Lecciones aprendidas">
+        <meta property="article:published_time" content="2024-02-01"></head>
+        <body><nav>Menú</nav><h1>RAG en producción</h1><h2>Chunking</h2>
+        <p>Texto del <a href="#">artículo</a>.</p><script>var x = 1;</script></body></html>
+        """
+
+        # Act
+        document = parse_html_post("https://blog.sergiomarquez.dev/rag", html)
+
+        # Assert
+        assert document["title"] == "RAG en producción"
+        assert "Chunking" in document["headings"]
+        assert "artículo" in document["body"]
+        assert "Menú" not in document["body"]
+        assert "var x" not in document["body"]
+        assert document["description"] == "Lecciones aprendidas"
+        assert document["published"] == "2024-02-01"
+
+    def test_documents_from_directory_reads_markdown(self, tmp_path):
+        """Test que los posts Markdown con front matter se indexan."""
+        # Arrange
+        (tmp_path / "mlops-basico.md").write_text(
+            "---\ntitle: MLOps básico\ndate: 2023-11-02\n---\n# Intro\nPipelines de MLOps.",
+            encoding="utf-8",
+        )
+
+        # Act
+        documents = documents_from_directory(str(tmp_path))
+
+        # Assert
+        assert documents[0]["title"] == "MLOps básico"
+        assert documents[0]["url"] == "https://blog.sergiomarquez.dev/mlops-basico"
+        assert documents[0]["published"] == "2023-11-02"
+
+
+class TestGetBlogIndex:
+    """Tests de la carga lazy del índice."""
+
+    def test_empty_index_is_not_saved_nor_used(self, tmp_path, monkeypatch):
+        """
+        Test que un índice sin artículos no se guarda y, si existe en disco, no se usa.
+        """
+        from assistant.blog_index import main, reset_blog_index
+
+        # Arrange
+        empty = BlogIndex.build([])
+        path = tmp_path / "index.json"
+        path.write_text(json.dumps(empty.to_dict()), encoding="utf-8")
+        monkeypatch.setenv("BLOG_INDEX_PATH", str(path))
+        reset_blog_index()
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            empty.save(str(tmp_path / "otro.json"))
+        with pytest.raises(SystemExit):
+            main(
+                ["build", "--dir", str(tmp_path), "--output", str(tmp_path / "b.json")]
+            )
+        assert not (tmp_path / "b.json").exists()
+        assert get_blog_index() is None
+        reset_blog_index()
+
+    def test_get_blog_index_loads_from_env_path(self, blog_index_file):
+        """Test que el índice se carga desde BLOG_INDEX_PATH."""
+        # Act
+        index = get_blog_index()
+
+        # Assert
+        assert index is not None
+        assert len(index) == 3
+
+    def test_get_blog_index_missing_file_returns_none(self, tmp_path, monkeypatch):
+        """Test que la ausencia del índice no rompe la carga."""
+        from assistant.blog_index import reset_blog_index
+
+        # Arrange
+        monkeypatch.setenv("BLOG_INDEX_PATH", str(tmp_path / "no-existe.json"))
+        reset_blog_index()
+
+        # Act & Assert
+        assert get_blog_index() is None
+        reset_blog_index()
@@ -0,0 +1,333 @@
+"""
+Tests para el módulo assistant.blog_metadata (metadatos reales de los resultados del
+blog)
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from assistant.blog_metadata import BlogMetadataEnricher, extract_metadata
+
+PAGE = """<html><head>
+<title>{title} | Blog de Sergio Márquez</title>
+<meta name="description" content="Resumen de {title}">
+<meta property="article:published_time" content="2024-03-0{day}T10:00:00+00:00">
+</head><body><h1>{title}</h1><p>Contenido del artículo.</p></body></html>"""
+
+
+class _BlogHandler(BaseHTTPRequestHandler):
+    """Sirve las páginas de `server.pages` con ETag y registra cada petición."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(
+            {
+                "path": self.path,
+                "if_none_match": self.headers.get("If-None-Match"),
+                "client_port": self.client_address[1],
+            }
+        )
+        time.sleep(server.delay)
+        page = server.pages.get(self.path)
+        if page is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{hash(page)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = page.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def blog_server():
+    """Servidor HTTP local que hace de blog, con seis artículos."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BlogHandler)
+    server.daemon_threads = True
+    server.pages = {
+        f"/post-{i}": PAGE.format(title=f"Artículo {i}", day=i) for i in range(1, 7)
+    }
+    server.requests = []
+    server.delay = 0.0
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_enricher(tmp_path):
+    """Crea enriquecedores sobre una caché temporal y los cierra al terminar."""
+    enrichers = []
+
+    def make(**kwargs):
+        kwargs.setdefault("cache_path", str(tmp_path / "blog_metadata.json"))
+        enricher = BlogMetadataEnricher(**kwargs)
+        enrichers.append(enricher)
+        return enricher
+
+    yield make
+    for enricher in enrichers:
+        enricher.close()
+
+
+def _results(server, paths):
+    return [
+        {
+            "title": path.strip("/").replace("-", " ").title(),
+            "url": server.base_url + path,
+        }
+        for path in paths
+    ]
+
+
+class TestBlogMetadata:
+    """Tests del enriquecimiento de resultados con los metadatos de cada artículo."""
+
+    def test_extract_metadata_reads_title_description_and_date(self):
+        """Test que se extraen título (sin el sufijo del blog), descripción y fecha."""
+        # Act
+        metadata = extract_metadata(
+            "https://blog/x", PAGE.format(title="Docker", day=1)
+        )
+
+        # Assert
+        assert metadata == {
+            "title": "Docker",
+            "description": "Resumen de Docker",
+            "published": "2024-03-01T10:00:00+00:00",
+        }
+
+    def test_pages_are_fetched_concurrently_over_pooled_connections(
+        self, blog_server, make_enricher
+    ):
+        """
+        Test que las páginas se piden a la vez, reutilizando las conexiones del pool.
+        """
+        # Arrange
+        blog_server.delay = 0.2
+        enricher = make_enricher(max_connections=3)
+        paths = [f"/post-{i}" for i in range(1, 7)]
+        started = time.perf_counter()
+
+        # Act
+        results = enricher.enrich(_results(blog_server, paths))
+
+        # Assert
+        elapsed = time.perf_counter() - started
+        assert [result["title"] for result in results] == [
+            f"Artículo {i}" for i in range(1, 7)
+        ]
+        assert results[0]["description"] == "Resumen de Artículo 1"
+        assert results[5]["published"].startswith("2024-03-06")
+        # 6 páginas de 0,2 s con 3 conexiones: dos tandas, no seis.
+        assert elapsed < 0.2 * 6 * 0.75
+        assert len({request["client_port"] for request in blog_server.requests}) <= 3
+
+    def test_cache_is_persisted_and_served_without_requests(
+        self, blog_server, make_enricher
+    ):
+        """
+        Test que dentro del TTL los metadatos salen de la caché en disco, también tras
+        reiniciar.
+        """
+        # Arrange
+        results = _results(blog_server, ["/post-1", "/post-2"])
+        first = make_enricher()
+        first.enrich(results)
+        first.enrich(results)
+        first.close()  # guarda la caché en disco
+
+        # Act
+        enriched = make_enricher().enrich(results)
+
+        # Assert
+        assert len(blog_server.requests) == 2
+        assert enriched[1]["title"] == "Artículo 2"
+
+    def test_expired_entries_are_revalidated_with_etag(
+        self, blog_server, make_enricher
+    ):
+        """
+        Test que una entrada caducada se revalida con If-None-Match y un 304 la renueva.
+        """
+        # Arrange
+        enricher = make_enricher(ttl=0.0)
+        results = _results(blog_server, ["/post-3"])
+        enricher.enrich(results)
+
+        # Act
+        enriched = enricher.enrich(results)
+
+        # Assert
+        assert [
+            request["if_none_match"] is not None for request in blog_server.requests
+        ] == [
+            False,
+            True,
+        ]
+        assert enriched[0]["title"] == "Artículo 3"
+
+    def test_failed_or_slow_pages_keep_the_original_result(
+        self, blog_server, make_enricher
+    ):
+        """Test que un 404 o una página fuera de plazo no rompen la búsqueda."""
+        # Arrange
+        enricher = make_enricher(deadline=0.3)
+        missing = _results(blog_server, ["/no-existe"])
+
+        # Act
+        not_found = enricher.enrich(missing)
+        blog_server.delay = 1.0
+        slow = enricher.enrich(_results(blog_server, ["/post-4"]))
+
+        # Assert
+        assert not_found == missing
+        assert slow[0]["title"] == "Post 4"
+
+    def test_results_with_metadata_are_not_fetched(self, blog_server, make_enricher):
+        """
+        Test que los resultados del índice local (con descripción y fecha) no se
+        descargan.
+        """
+        # Arrange
+        results = [
+            {
+                "title": "Docker",
+                "url": blog_server.base_url + "/post-1",
+                "description": "Del índice",
+                "published": "2024-01-01",
+            }
+        ]
+
+        # Act
+        enriched = make_enricher().enrich(results)
+
+        # Assert
+        assert enriched == results
+        assert blog_server.requests == []
+
+    def test_google_results_are_enriched_in_search_blog_posts(
+        self, blog_server, tmp_path, monkeypatch, mock_googlesearch
+    ):
+        """
+        Test que search_blog_posts muestra el título y el resumen reales de Google.
+        """
+        from assistant.blog_index import reset_blog_index
+        from assistant.blog_metadata import set_metadata_enricher
+        from assistant.tools import search_blog_posts
+
+        # Arrange
+        monkeypatch.setenv("BLOG_INDEX_PATH", str(tmp_path / "sin_indice.json"))
+        monkeypatch.setenv("BLOG_METADATA_ENABLED", "true")
+        monkeypatch.setenv("BLOG_METADATA_CACHE_PATH", str(tmp_path / "metadata.json"))
+        reset_blog_index()
+        set_metadata_enricher(None)
+        mock_googlesearch.return_value = [blog_server.base_url + "/post-2"]
+
+        # Act
+        try:
+            result = search_blog_posts("artículo")
+        finally:
+            from assistant.blog_metadata import get_metadata_enricher
+
+            get_metadata_enricher().close()
+            set_metadata_enricher(None)
+            reset_blog_index()
+
+        # Assert
+        assert "1. Artículo 2" in result
+        assert "Publicado: 2024-03-02" in result
+        assert "Resumen: Resumen de Artículo 2" in result
+
+    def test_late_metadata_reaches_the_next_cached_search(
+        self, blog_server, tmp_path, monkeypatch, mock_googlesearch
+    ):
+        """
+        Test que un artículo que no llegó a tiempo sale con su título real en la
+        siguiente búsqueda, aunque los resultados de Google vengan de la caché.
+        """
+        from assistant.blog_index import reset_blog_index
+        from assistant.blog_metadata import get_metadata_enricher, set_metadata_enricher
+        from assistant.tools import search_blog_posts
+
+        # Arrange
+        monkeypatch.setenv("BLOG_INDEX_PATH", str(tmp_path / "sin_indice.json"))
+        monkeypatch.setenv("BLOG_METADATA_ENABLED", "true")
+        monkeypatch.setenv("BLOG_METADATA_CACHE_PATH", str(tmp_path / "metadata.json"))
+        monkeypatch.setenv("BLOG_METADATA_DEADLINE_SECONDS", "0.1")
+        reset_blog_index()
+        set_metadata_enricher(None)
+        mock_googlesearch.return_value = [blog_server.base_url + "/post-5"]
+        blog_server.delay = 0.3
+
+        # Act
+        try:
+            first = search_blog_posts("artículo lento")
+            time.sleep(0.5)  # la descarga termina en segundo plano
+            second = search_blog_posts("artículo lento")
+        finally:
+            get_metadata_enricher().close()
+            set_metadata_enricher(None)
+            reset_blog_index()
+
+        # Assert
+        assert "Artículo 5" not in first
+        assert "1. Artículo 5" in second
+        assert mock_googlesearch.call_count == 1
+
+    def test_concurrent_saves_do_not_share_a_temporary_file(self, tmp_path):
+        """
+        Test que varios procesos guardando la misma caché a la vez no se pisan el
+        temporal.
+        """
+        from assistant.blog_metadata import MetadataCache
+
+        # Arrange
+        path = str(tmp_path / "blog_metadata.json")
+        caches = [MetadataCache(path) for _ in range(4)]
+        for i, cache in enumerate(caches):
+            cache.set(f"https://blog/{i}", {"title": str(i), "checked_at": 0.0})
+        errors = []
+
+        def save_many(cache):
+            try:
+                for _ in range(25):
+                    cache.save()
+            except OSError as e:
+                errors.append(e)
+
+        # Act
+        threads = [threading.Thread(target=save_many, args=(c,)) for c in caches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        loaded = MetadataCache(path)
+        loaded.load()
+
+        # Assert
+        assert errors == []
+        assert len(loaded.entries) == 1
+        assert [p.name for p in tmp_path.iterdir()] == ["blog_metadata.json"]
@@ -0,0 +1,145 @@
+"""
+Tests para el módulo assistant.cache
+"""
+
+import threading
+import time
+
+import pytest
+
+from assistant.cache import TTLCache
+from assistant.text_utils import normalize_query
+
+
+class FakeClock:
+    """Reloj manual para controlar la expiración."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Tests de expiración, desalojo y contadores."""
+
+    def test_hit_and_miss_counters(self):
+        """Test que se cuentan aciertos y fallos."""
+        # Arrange
+        cache = TTLCache(ttl=60, max_entries=10)
+
+        # Act
+        cache.get("a")
+        cache.set("a", 1)
+        found, value = cache.get("a")
+
+        # Assert
+        assert (found, value) == (True, 1)
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+        assert cache.stats()["hit_rate"] == 0.5
+
+    def test_entries_expire_after_ttl(self):
+        """Test que una entrada caducada ya no se devuelve."""
+        # Arrange
+        clock = FakeClock()
+        cache = TTLCache(ttl=10, max_entries=10, clock=clock)
+        cache.set("a", 1)
+
+        # Act
+        clock.now = 11
+
+        # Assert
+        assert cache.get("a") == (False, None)
+        assert len(cache) == 0
+
+    def test_lru_eviction_keeps_recently_used(self):
+        """Test que al llenarse se desaloja la entrada menos usada recientemente."""
+        # Arrange
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        # Act
+        cache.set("c", 3)
+
+        # Assert
+        assert cache.get("b") == (False, None)
+        assert cache.get("a") == (True, 1)
+        assert cache.stats()["evictions"] == 1
+
+    def test_get_or_compute_caches_value(self):
+        """Test que el cálculo solo se ejecuta en el primer acceso."""
+        # Arrange
+        cache = TTLCache(ttl=60, max_entries=10)
+        calls = []
+
+        # Act
+        for _ in range(3):
+            cache.get_or_compute("k", lambda: calls.append(1) or "valor")
+
+        # Assert
+        assert len(calls) == 1
+
+    def test_concurrent_identical_keys_are_coalesced(self):
+        """Test single-flight: peticiones concurrentes provocan una sola llamada."""
+        # Arrange
+        cache = TTLCache(ttl=60, max_entries=10)
+        calls = []
+        barrier = threading.Barrier(8)
+        results = []
+
+        def slow_compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return ["resultado"]
+
+        def worker():
+            barrier.wait()
+            results.append(cache.get_or_compute("llm", slow_compute))
+
+        # Act
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert len(calls) == 1
+        assert results == [["resultado"]] * 8
+        assert cache.stats()["coalesced"] == 7
+
+    def test_errors_are_not_cached(self):
+        """Test que un fallo del backend se propaga y no se guarda."""
+        # Arrange
+        cache = TTLCache(ttl=60, max_entries=10)
+
+        def failing():
+            raise RuntimeError("backend caído")
+
+        # Act & Assert
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("k", failing)
+        assert cache.get_or_compute("k", lambda: "ok") == "ok"
+
+
+class TestNormalizeQuery:
+    """Tests de la clave normalizada de consultas."""
+
+    def test_equivalent_queries_share_key(self):
+        """
+        Test que mayúsculas, tildes, plurales y palabras vacías no cambian la clave.
+        """
+        # Assert
+        assert normalize_query("¿Tienes artículos sobre LLMs?") == normalize_query(
+            "llm"
+        )
+        assert normalize_query("Python y Docker") == normalize_query("docker python")
+
+    def test_stopword_only_query_is_not_empty(self):
+        """Test que una consulta solo de palabras vacías conserva una clave."""
+        # Assert
+        assert normalize_query("¿Qué es?") != ""
@@ -0,0 +1,238 @@
+"""
+Tests para el módulo assistant.compaction
+"""
+
+import pytest
+from google.genai import types
+
+from assistant.compaction import (
+    TRUNCATED_MARK,
+    HistoryCompactor,
+    estimate_tokens,
+    split_turns,
+)
+
+QUOTE_END = "<<<END_QUOTED_AGENT_CONTENT>>>"
+
+
+def _user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def _model(text):
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+def _tool_turn(question, result, answer):
+    """Turno completo: pregunta, llamada a search_blog_posts, resultado y respuesta."""
+    return [
+        _user(question),
+        types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    function_call=types.FunctionCall(
+                        name="search_blog_posts", args={"query": question}
+                    )
+                )
+            ],
+        ),
+        types.Content(
+            role="user",
+            parts=[
+                types.Part(
+                    function_response=types.FunctionResponse(
+                        name="search_blog_posts", response={"result": result}
+                    )
+                )
+            ],
+        ),
+        _model(answer),
+    ]
+
+
+def _history(turns, result_chars=2000):
+    contents = []
+    for i in range(turns):
+        contents += _tool_turn(
+            f"Pregunta {i}", "x" * result_chars, f"<h2>Respuesta {i}</h2><p>Detalle</p>"
+        )
+    return contents
+
+
+class TestSplitTurns:
+    """Tests de la división del historial en turnos."""
+
+    def test_foreign_agent_context_does_not_start_a_turn(self):
+        """
+        Test que el contexto de otro agente ('For context:') pertenece al turno en
+        curso.
+        """
+        # Arrange
+        foreign = types.Content(
+            role="user",
+            parts=[
+                types.Part(text="For context: below is a transcript"),
+                types.Part(
+                    text="[CV_Expert] said:\n<<<BEGIN_QUOTED_AGENT_CONTENT>>>\nHola\n"
+                    + QUOTE_END
+                ),
+            ],
+        )
+
+        # Act
+        prefix, turns = split_turns(
+            [_user("Hola"), foreign, _model("Adiós"), _user("Otra")]
+        )
+
+        # Assert
+        assert prefix == []
+        assert [len(turn) for turn in turns] == [3, 1]
+
+
+class TestHistoryCompactor:
+    """Tests del presupuesto de historial."""
+
+    def test_history_within_budget_is_unchanged(self):
+        """Test que un historial corto se envía tal cual."""
+        # Arrange
+        contents = _history(3, result_chars=100)
+
+        # Act
+        compacted, action = HistoryCompactor().compact(contents)
+
+        # Assert
+        assert action == "none"
+        assert compacted is contents
+
+    def test_old_tool_outputs_are_truncated_and_recent_turns_kept(self):
+        """
+        Test que se recortan las salidas de herramientas antiguas y no las recientes.
+        """
+        # Arrange
+        contents = _history(6)
+        compactor = HistoryCompactor(
+            max_tokens=2000, keep_turns=2, tool_output_chars=100
+        )
+
+        # Act
+        compacted, action = compactor.compact(contents)
+
+        # Assert
+        assert action == "truncate"
+        assert len(compacted) == len(contents)
+        old_result = compacted[2].parts[0].function_response.response["result"]
+        assert old_result == "x" * 100 + TRUNCATED_MARK
+        assert compacted[-8:] == contents[-8:]
+        assert contents[2].parts[0].function_response.response["result"] == "x" * 2000
+        assert estimate_tokens(compacted) <= 2000
+
+    def test_quoted_tool_result_keeps_end_marker(self):
+        """
+        Test que recortar un resultado citado de otro agente conserva el cierre de la
+        cita.
+        """
+        # Arrange
+        quoted = (
+            "[Blog_Expert] `search_blog_posts` tool returned result:\n"
+            "<<<BEGIN_QUOTED_AGENT_CONTENT>>>\n" + "y" * 1000 + "\n" + QUOTE_END
+        )
+        foreign = types.Content(
+            role="user",
+            parts=[types.Part(text="For context:"), types.Part(text=quoted)],
+        )
+        contents = [_user("Pregunta"), foreign, _model("<p>Respuesta</p>")] + _history(
+            1, 50
+        )
+        compactor = HistoryCompactor(
+            max_tokens=150, keep_turns=1, tool_output_chars=100
+        )
+
+        # Act
+        compacted, action = compactor.compact(contents)
+
+        # Assert
+        assert action == "truncate"
+        text = compacted[1].parts[1].text
+        assert text.endswith(TRUNCATED_MARK + "\n" + QUOTE_END)
+        assert len(text) < 200
+
+    def test_too_many_turns_are_summarized(self):
+        """Test que los turnos antiguos se resumen y el resumen queda acotado."""
+        # Arrange
+        contents = _history(30, result_chars=50)
+        compactor = HistoryCompactor(max_turns=10, keep_turns=3, summary_chars=500)
+
+        # Act
+        compacted, action = compactor.compact(contents)
+
+        # Assert
+        assert action == "summarize"
+        summary = compacted[0]
+        text = summary.parts[0].text
+        assert text.startswith("For context:")
+        assert len(text) < 700
+        assert "Pregunta 26 → Respuesta: Respuesta 26 Detalle" in text
+        assert "más antiguos" in text
+        assert compacted[1:] == contents[-12:]
+
+    def test_turns_before_first_user_message_are_kept(self):
+        """Test que el contenido previo al primer mensaje del usuario no se toca."""
+        # Arrange
+        prefix = _model("<p>Bienvenida</p>")
+        contents = [prefix] + _history(5, result_chars=50)
+
+        # Act
+        compacted, action = HistoryCompactor(max_turns=2, keep_turns=1).compact(
+            contents
+        )
+
+        # Assert
+        assert action == "summarize"
+        assert compacted[0] is prefix
+
+
+class TestCompactionIntegration:
+    """Tests del callback en los agentes."""
+
+    @pytest.mark.asyncio
+    async def test_long_conversation_sends_bounded_history(self, fake_llm, monkeypatch):
+        """
+        Test que el modelo solo recibe los turnos recientes y la sesión no se modifica.
+        """
+        import assistant.compaction as compaction
+        from assistant.services import _APP_NAME, _session_service, invoke_agent_async
+
+        # Arrange
+        monkeypatch.setattr(
+            compaction,
+            "_compactor",
+            compaction.HistoryCompactor(max_turns=3, keep_turns=2),
+        )
+        summarized_before = compaction._compactions.value(
+            agent="CV_Expert", action="summarize"
+        )
+        session_id = None
+
+        # Act
+        for i in range(5):
+            response, session_id = await invoke_agent_async(
+                message=f"Experiencia {i}", session_id=session_id, user_id="user_long"
+            )
+        session = await _session_service.get_session(
+            app_name=_APP_NAME, user_id="user_long", session_id=session_id
+        )
+
+        # Assert
+        assert response.endswith("Experiencia 3 | Experiencia 4</p>")
+        assert "Experiencia 0 | Experiencia 1" not in response
+        assert (
+            compaction._compactions.value(agent="CV_Expert", action="summarize")
+            > summarized_before
+        )
+        stored = [
+            event.content.parts[0].text
+            for event in session.events
+            if event.author == "user"
+        ]
+        assert stored == [f"Experiencia {i}" for i in range(5)]
@@ -0,0 +1,177 @@
+"""
+Tests para el módulo assistant.config (modelo por agente y niveles por llamada)
+"""
+
+import pytest
+
+from assistant.config import (
+    AdaptiveTierPolicy,
+    FixedTierPolicy,
+    ModelConfig,
+    create_tier_policy,
+)
+
+
+@pytest.fixture
+def config():
+    return ModelConfig(
+        {"CV_Expert": "modelo-cv"},
+        default_model="modelo-base",
+        fast_model="modelo-rapido",
+        strong_model="modelo-grande",
+    )
+
+
+class TestModelConfig:
+    """Tests del modelo base por agente."""
+
+    def test_agent_overrides_fall_back_to_the_default_model(self, monkeypatch):
+        """Test que MODEL_<AGENTE> tiene prioridad sobre MODEL_DEFAULT."""
+        # Arrange
+        monkeypatch.setenv("MODEL_DEFAULT", "modelo-base")
+        monkeypatch.setenv("MODEL_CV_EXPERT", "modelo-cv")
+        monkeypatch.setenv("MODEL_FAST", "modelo-rapido")
+
+        # Act
+        config = ModelConfig.from_env()
+
+        # Assert
+        assert config.base_model("CV_Expert") == "modelo-cv"
+        assert config.base_model("Blog_Expert") == "modelo-base"
+        assert config.model_for("Blog_Expert", "fast") == "modelo-rapido"
+        assert config.model_for("Blog_Expert", "standard") == "modelo-base"
+
+    def test_unknown_policy_raises(self):
+        """Test que una MODEL_TIER_POLICY desconocida es un error de configuración."""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            create_tier_policy("aleatoria")
+
+
+class TestTierPolicies:
+    """Tests de la elección del nivel de cada llamada."""
+
+    def test_router_and_blog_turns_use_the_fast_tier(self, config):
+        """
+        Test que el orquestador y Blog_Expert usan el modelo rápido aunque la pregunta
+        sea larga.
+        """
+        # Arrange
+        policy = AdaptiveTierPolicy(config)
+        message = "¿Has escrito sobre Docker? ¿Y sobre Kubernetes? " * 10
+
+        # Act
+        decisions = [
+            policy.choose(agent, message)
+            for agent in ("Personal_Orchestrator", "Blog_Expert")
+        ]
+
+        # Assert
+        assert [(d.tier, d.model) for d in decisions] == [("fast", "modelo-rapido")] * 2
+
+    @pytest.mark.parametrize(
+        "message, reason",
+        [
+            (
+                "Cuéntame tu experiencia con Python en proyectos de datos. " * 6,
+                "long_message",
+            ),
+            ("¿Dónde trabajas? ¿Qué stack usas?", "multiple_questions"),
+            (
+                "¿Tu experiencia con Docker aparece en algún artículo del blog",
+                "ambiguous",
+            ),
+        ],
+    )
+    def test_complex_cv_questions_escalate_to_strong(self, config, message, reason):
+        """
+        Test que las preguntas complejas al CV suben al modelo grande con su motivo.
+        """
+        # Act
+        decision = AdaptiveTierPolicy(config).choose("CV_Expert", message)
+
+        # Assert
+        assert decision == ("strong", "modelo-grande", reason)
+
+    def test_simple_cv_questions_use_the_agent_model(self, config):
+        """Test que una pregunta sencilla al CV usa el modelo base del agente."""
+        # Act
+        adaptive = AdaptiveTierPolicy(config).choose(
+            "CV_Expert", "¿Cuál es tu experiencia?"
+        )
+        fixed = FixedTierPolicy(config).choose("Personal_Orchestrator", "Hola")
+
+        # Assert
+        assert (adaptive.tier, adaptive.model) == ("standard", "modelo-cv")
+        assert (fixed.tier, fixed.model) == ("standard", "modelo-base")
+
+
+class TestTierInAgents:
+    """Tests del nivel elegido en las llamadas reales de los agentes."""
+
+    @pytest.fixture
+    def adaptive_policy(self, monkeypatch):
+        from assistant.config import get_tier_policy, set_tier_policy
+
+        monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+        monkeypatch.setenv("FAQ_ENABLED", "false")
+        previous = get_tier_policy()
+        set_tier_policy(
+            AdaptiveTierPolicy(
+                ModelConfig(fast_model="modelo-rapido", strong_model="modelo-grande"),
+                min_chars=60,
+            )
+        )
+        yield
+        set_tier_policy(previous)
+
+    @pytest.mark.asyncio
+    async def test_each_call_uses_its_tier_model_and_the_trace_records_it(
+        self, adaptive_policy
+    ):
+        """
+        Test que cada llamada sale con el modelo de su nivel y el span llm lo anota.
+        """
+        from assistant.services import invoke_agent_async
+        from assistant.tracing import start_trace, use_trace
+        from tests.fakes import FakeLlm, install_fake_llm, restore_llm
+
+        seen = []
+
+        class RecordingFakeLlm(FakeLlm):
+            async def generate_content_async(self, llm_request, stream=False):
+                seen.append((self.agent_name, llm_request.model))
+                async for response in super().generate_content_async(
+                    llm_request, stream
+                ):
+                    yield response
+
+        originals = install_fake_llm(RecordingFakeLlm)
+        trace = start_trace("test")
+        # Sin palabras clave: pasa por el orquestador antes de llegar a CV_Expert.
+        message = (
+            "Cuéntame con detalle todo lo que has hecho estos últimos años, por favor"
+        )
+
+        # Act
+        try:
+            with use_trace(trace):
+                await invoke_agent_async(message, None, "user_tiers")
+        finally:
+            restore_llm(originals)
+        trace.finish()
+
+        # Assert
+        assert seen == [
+            ("Personal_Orchestrator", "modelo-rapido"),
+            ("CV_Expert", "modelo-grande"),
+        ]
+        tiers = [
+            (span.name, span.attributes.get("assistant.model_tier"))
+            for span in trace.spans
+            if span.kind == "llm"
+        ]
+        assert tiers == [
+            ("llm Personal_Orchestrator", "fast"),
+            ("llm CV_Expert", "strong"),
+        ]
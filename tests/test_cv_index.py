@@ -0,0 +1,351 @@
+"""
+Tests para el índice del CV por secciones (assistant.cv_index).
+"""
+
+import json
+
+import pytest
+
+from assistant.cv_index import CVIndex, get_cv_index, resolve_section, split_cv
+
+
+class TestSplitCv:
+    """Tests de la división del CV en fragmentos direccionables."""
+
+    def test_list_sections_become_one_fragment_per_entry(self, mock_cv_resume):
+        """Test que cada puesto y cada estudio es un fragmento propio."""
+        # Act
+        fragments = split_cv(mock_cv_resume)
+
+        # Assert
+        ids = [fragment["id"] for fragment in fragments]
+        assert ids == [
+            "perfil",
+            "experiencia/0",
+            "experiencia/1",
+            "formacion/0",
+            "habilidades/0",
+            "habilidades/1",
+            "idiomas/0",
+        ]
+
+    def test_fragments_are_compact_json(self, mock_cv_resume):
+        """Test que los fragmentos no llevan sangría ni espacios de relleno."""
+        # Act
+        fragments = split_cv(mock_cv_resume)
+
+        # Assert
+        work = fragments[1]["text"]
+        assert json.loads(work)["name"] == "DataLabs AI"
+        assert "\n" not in work and ": " not in work
+
+    def test_flat_cv_groups_scalars_into_profile(self, mock_cv_data):
+        """Test que un CV plano agrupa los valores sueltos en el perfil."""
+        # Act
+        fragments = split_cv(mock_cv_data)
+
+        # Assert
+        assert fragments[0]["section"] == "perfil"
+        assert "Sergio Márquez" in fragments[0]["text"]
+        # Una lista de valores simples es un único fragmento.
+        assert [f["id"] for f in fragments if f["section"] == "habilidades"] == [
+            "habilidades"
+        ]
+
+    @pytest.mark.parametrize(
+        "name,expected",
+        [
+            ("work", "experiencia"),
+            ("Educación", "formacion"),
+            ("skills", "habilidades"),
+            ("hobbies", "hobbies"),
+        ],
+    )
+    def test_resolve_section_aliases(self, name, expected):
+        """
+        Test que los nombres de clave habituales se traducen a la sección canónica.
+        """
+        # Act & Assert
+        assert resolve_section(name) == expected
+
+
+class TestCVIndexQuery:
+    """Tests de la recuperación de fragmentos."""
+
+    @pytest.fixture(autouse=True)
+    def _index(self, mock_cv_resume):
+        """Índice construido a partir del CV de ejemplo para cada test."""
+        self.index = CVIndex.build(mock_cv_resume)
+
+    def test_section_returns_all_its_entries(self):
+        """Test que pedir una sección devuelve todas sus entradas y nada más."""
+        # Act
+        fragments = self.index.query(section="experiencia")
+
+        # Assert
+        assert [f["id"] for f in fragments] == ["experiencia/0", "experiencia/1"]
+
+    def test_keywords_rank_across_sections(self):
+        """Test que las palabras clave encuentran fragmentos de cualquier sección."""
+        # Act
+        fragments = self.index.query(keywords="kubernetes")
+
+        # Assert
+        assert [f["id"] for f in fragments] == ["habilidades/1"]
+
+    def test_keywords_within_section(self):
+        """Test que sección y palabras clave combinadas filtran y ordenan."""
+        # Act
+        fragments = self.index.query(section="work", keywords="docker")
+
+        # Assert
+        assert fragments[0]["id"] == "experiencia/1"
+        assert all(f["section"] == "experiencia" for f in fragments)
+
+    def test_section_without_keyword_match_returns_whole_section(self):
+        """
+        Test que si las palabras clave no aparecen se devuelve la sección completa.
+        """
+        # Act
+        fragments = self.index.query(section="idiomas", keywords="francés")
+
+        # Assert
+        assert [f["id"] for f in fragments] == ["idiomas/0"]
+
+    def test_unknown_section_or_keywords_return_nothing(self):
+        """
+        Test que una sección inexistente o palabras sin coincidencias no devuelven nada.
+        """
+        # Act & Assert
+        assert self.index.query(section="premios") == []
+        assert self.index.query(keywords="cobol") == []
+        assert self.index.query() == []
+
+    def test_outline_lists_sections_with_counts(self):
+        """Test que el resumen de secciones indica cuántas entradas tiene cada una."""
+        # Act
+        outline = self.index.outline()
+
+        # Assert
+        assert outline.startswith("perfil (1), experiencia (2)")
+
+
+class TestGetCvIndex:
+    """Tests de la carga perezosa del índice."""
+
+    def test_builds_index_from_cv_path(self, cv_index_file):
+        """Test que el índice se construye una vez desde CV_PATH."""
+        # Act
+        index = get_cv_index()
+
+        # Assert
+        assert len(index) == 7
+        assert get_cv_index() is index
+
+
+def _rewrite_cv(path, cv_data, company):
+    """Cambia la empresa del primer puesto del CV en disco y añade un proyecto."""
+    updated = json.loads(json.dumps(cv_data))
+    updated["work"][0]["name"] = company
+    updated["projects"] = [{"name": f"Proyecto en {company}"}]
+    path.write_text(json.dumps(updated), encoding="utf-8")
+
+
+class TestCvReload:
+    """Tests de la recarga del CV sin reiniciar el proceso."""
+
+    @pytest.fixture
+    def reloadable_cv(self, cv_index_file):
+        """
+        CV temporal ya cargado; al terminar, la instrucción de CV_Expert vuelve a la
+        original.
+        """
+        from assistant.agents import cv_agent, cv_instruction
+
+        instruction = cv_agent.instruction
+        cv_agent.instruction = cv_instruction(get_cv_index())
+        yield cv_index_file
+        cv_agent.instruction = instruction
+
+    def test_reload_swaps_snapshot_and_bumps_content_version(
+        self, reloadable_cv, mock_cv_resume
+    ):
+        """
+        Test que un CV distinto sustituye la instantánea y cambia la versión del
+        contenido.
+        """
+        from assistant.answer_cache import content_version
+        from assistant.cv_index import reload_cv_index
+
+        # Arrange
+        old_index = get_cv_index()
+        old_version = content_version()
+        _rewrite_cv(reloadable_cv, mock_cv_resume, "NuevaEmpresa")
+
+        # Act
+        changed = reload_cv_index()
+        unchanged = reload_cv_index()
+
+        # Assert
+        assert changed and not unchanged
+        assert get_cv_index() is not old_index
+        assert get_cv_index().query("experiencia", "NuevaEmpresa")
+        assert content_version() != old_version
+
+    def test_unreadable_cv_keeps_previous_snapshot(self, reloadable_cv):
+        """Test que un CV a medio escribir no sustituye al anterior."""
+        from assistant.cv_index import reload_cv_index
+
+        # Arrange
+        old_index = get_cv_index()
+        reloadable_cv.write_text('{"work": [', encoding="utf-8")
+
+        # Act
+        changed = reload_cv_index()
+
+        # Assert
+        assert not changed
+        assert get_cv_index() is old_index
+
+    def test_pinned_snapshot_survives_reload(self, reloadable_cv, mock_cv_resume):
+        """Test que quien fijó una instantánea la sigue viendo tras la recarga."""
+        from assistant.agents import cv_agent, cv_instruction
+        from assistant.cv_index import reload_cv_index, use_cv_index
+
+        # Arrange
+        old_index = get_cv_index()
+        _rewrite_cv(reloadable_cv, mock_cv_resume, "NuevaEmpresa")
+
+        # Act
+        with use_cv_index(old_index):
+            reload_cv_index()
+            pinned = get_cv_index()
+        current = get_cv_index()
+
+        # Assert
+        assert pinned is old_index
+        assert current is not old_index
+        assert cv_agent.instruction == cv_instruction(current)
+        assert "proyectos (1)" in cv_agent.instruction
+
+    def test_watcher_reloads_when_the_file_changes(self, reloadable_cv, mock_cv_resume):
+        """Test que la vigilancia por mtime detecta el CV actualizado."""
+        import os
+
+        from assistant.cv_index import CVWatcher
+
+        # Arrange
+        get_cv_index()
+        watcher = CVWatcher(interval=60)
+        untouched = watcher.check()
+        _rewrite_cv(reloadable_cv, mock_cv_resume, "NuevaEmpresa")
+        stat = os.stat(reloadable_cv)
+        os.utime(reloadable_cv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        # Act
+        reloaded = watcher.check()
+
+        # Assert
+        assert not untouched
+        assert reloaded
+        assert get_cv_index().query("experiencia", "NuevaEmpresa")
+
+    @pytest.mark.asyncio
+    async def test_in_flight_request_keeps_its_snapshot(
+        self, reloadable_cv, mock_cv_resume, monkeypatch
+    ):
+        """Test que una petición en curso termina con el CV con el que empezó."""
+        from google.genai import types
+
+        from assistant.cv_index import reload_cv_index
+        from assistant.services import invoke_agent_async
+        from tests.fakes import FakeLlm, install_fake_llm, restore_llm
+
+        seen = {}
+
+        class ReloadingLlm(FakeLlm):
+            """
+            CV_Expert: recarga el CV a mitad de la petición y devuelve lo que le llega.
+            """
+
+            async def generate_content_async(self, llm_request, stream=False):
+                if self.agent_name != "CV_Expert":
+                    async for response in super().generate_content_async(
+                        llm_request, stream
+                    ):
+                        yield response
+                    return
+                last = llm_request.contents[-1]
+                results = [
+                    part.function_response
+                    for part in last.parts
+                    if part.function_response
+                ]
+                if not results:
+                    _rewrite_cv(reloadable_cv, mock_cv_resume, "NuevaEmpresa")
+                    seen["reloaded"] = reload_cv_index()
+                    call = types.FunctionCall(
+                        name="query_cv", args={"section": "experiencia", "keywords": ""}
+                    )
+                    yield self._reply(types.Part(function_call=call))
+                    return
+                seen["instruction"] = llm_request.config.system_instruction
+                yield self._reply(types.Part(text=f"<p>{results[0].response}</p>"))
+
+            def _reply(self, part):
+                from google.adk.models.llm_response import LlmResponse
+
+                return LlmResponse(content=types.Content(role="model", parts=[part]))
+
+        monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+        old_outline = get_cv_index().outline()
+        originals = install_fake_llm(ReloadingLlm)
+
+        # Act
+        try:
+            answer, _ = await invoke_agent_async(
+                "Háblame de tu experiencia", None, "user_cv"
+            )
+        finally:
+            restore_llm(originals)
+
+        # Assert
+        assert seen["reloaded"]
+        assert "DataLabs AI" in answer and "NuevaEmpresa" not in answer
+        assert old_outline in seen["instruction"]
+        assert "proyectos (1)" not in seen["instruction"]
+        assert get_cv_index().query("experiencia", "NuevaEmpresa")
+
+
+class TestReloadEndpoint:
+    """Tests del endpoint de administración que recarga el CV."""
+
+    def test_requires_admin_token(self, cv_index_file, monkeypatch, mock_cv_resume):
+        """Test que sin ADMIN_TOKEN no existe y que con un token erróneo se rechaza."""
+        from fastapi.testclient import TestClient
+
+        from main import app
+
+        # Arrange
+        client = TestClient(app)
+        get_cv_index()
+
+        # Act
+        disabled = client.post("/api/admin/reload-cv")
+        monkeypatch.setenv("ADMIN_TOKEN", "secreto")
+        forbidden = client.post(
+            "/api/admin/reload-cv", headers={"X-Admin-Token": "otro"}
+        )
+        _rewrite_cv(cv_index_file, mock_cv_resume, "NuevaEmpresa")
+        reloaded = client.post(
+            "/api/admin/reload-cv", headers={"X-Admin-Token": "secreto"}
+        )
+
+        # Assert
+        assert disabled.status_code == 404
+        assert forbidden.status_code == 403
+        assert reloaded.status_code == 200
+        assert reloaded.json() == {
+            "changed": True,
+            "cv_version": get_cv_index().version,
+        }
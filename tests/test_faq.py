@@ -0,0 +1,202 @@
+"""
+Tests para el módulo assistant.faq (respuestas precalculadas de las preguntas
+frecuentes)
+"""
+
+import time
+
+import pytest
+
+from assistant.faq import FAQAnswer, FAQStore, faq_key
+
+
+def _store(version="v1"):
+    return FAQStore(
+        version,
+        [FAQAnswer("¿Quién eres?", "<p>Soy Sergio.</p>", "CV_Expert")],
+        {"¿Quién eres?": ["Preséntate"]},
+    )
+
+
+class TestFaqStore:
+    """Tests del almacén de respuestas precalculadas."""
+
+    def test_key_ignores_case_accents_and_punctuation(self):
+        """Test que la clave normaliza la pregunta sin eliminar palabras."""
+        # Act & Assert
+        assert faq_key("¿Quién eres?") == faq_key("quien eres") == "quien ere"
+        assert faq_key("¿Tienes blog?") != faq_key("¿Tienes un blog sobre IA?")
+
+    def test_lookup_matches_question_and_variants_of_the_same_version(self):
+        """
+        Test que se sirven la pregunta y sus variantes solo con la versión del almacén.
+        """
+        # Arrange
+        store = _store()
+
+        # Act & Assert
+        assert store.lookup("quién eres", "v1").answer == "<p>Soy Sergio.</p>"
+        assert store.lookup("¡Preséntate!", "v1").author == "CV_Expert"
+        assert store.lookup("¿Quién eres?", "v2") is None
+        assert store.lookup("¿Qué es RAG?", "v1") is None
+
+    def test_lookup_is_sub_millisecond(self):
+        """Test que una búsqueda tarda menos de un milisegundo."""
+        # Arrange
+        store = _store()
+        started = time.perf_counter()
+
+        # Act
+        for _ in range(1000):
+            store.lookup("¿Quién eres?", "v1")
+
+        # Assert
+        assert (time.perf_counter() - started) / 1000 < 0.001
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        """Test que el almacén guardado se vuelve a cargar igual."""
+        # Arrange
+        path = tmp_path / "faq.json"
+
+        # Act
+        _store().save(str(path))
+        loaded = FAQStore.load(str(path))
+
+        # Assert
+        assert loaded.version == "v1"
+        assert loaded.lookup("Preséntate", "v1").question == "¿Quién eres?"
+        assert not (tmp_path / "faq.json.tmp").exists()
+
+    @pytest.mark.parametrize("command", ["generate", "show"])
+    def test_cli_accepts_output_after_each_subcommand(
+        self, command, tmp_path, mocker, capsys
+    ):
+        """
+        Test que `generate --output` y `show --output` usan ese fichero, como dice la
+        ayuda.
+        """
+        import assistant.faq as faq
+
+        # Arrange
+        path = tmp_path / "faq.json"
+        _store().save(str(path))
+        mocker.patch("assistant.answer_cache.content_version", return_value="v1")
+        generate = mocker.patch.object(
+            faq, "generate_store", mocker.AsyncMock(return_value=_store())
+        )
+        mocker.patch.dict("os.environ")
+
+        # Act
+        faq.main([command, "--output", str(path)])
+
+        # Assert
+        assert "Versión: v1 (vigente" in capsys.readouterr().out
+        assert generate.await_count == (command == "generate")
+
+    def test_show_without_store_exits_with_a_message(self, tmp_path):
+        """Test que `show` sin almacén termina con un mensaje y código distinto de 0."""
+        import assistant.faq as faq
+
+        # Arrange
+        path = tmp_path / "faq.json"
+
+        # Act
+        with pytest.raises(SystemExit) as exit_info:
+            faq.main(["show", "--output", str(path)])
+
+        # Assert
+        assert isinstance(exit_info.value.code, str)
+        assert str(path) in exit_info.value.code
+
+
+class TestFaqServing:
+    """Tests del uso de las respuestas precalculadas en los primeros turnos."""
+
+    @pytest.fixture
+    def faq_file(self, tmp_path, monkeypatch, cv_index_file):
+        """Almacén vacío en un fichero temporal, releído en cada búsqueda."""
+        import assistant.faq as faq
+
+        path = tmp_path / "faq_answers.json"
+        monkeypatch.setenv("FAQ_STORE_PATH", str(path))
+        monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+        monkeypatch.setattr(faq, "STORE_CHECK_INTERVAL", 0)
+        faq.reset_faq_store()
+        yield path
+        faq.reset_faq_store()
+
+    @pytest.mark.asyncio
+    async def test_generate_runs_questions_through_the_agents(self, faq_file, fake_llm):
+        """Test que la generación pregunta a los agentes y guarda versión y autor."""
+        from assistant.answer_cache import content_version
+        from assistant.faq import generate_store
+
+        # Act
+        store = await generate_store(
+            {"¿Cuál es tu experiencia?": ("Háblame de tu experiencia",)}
+        )
+
+        # Assert
+        entry = store.lookup("Háblame de tu experiencia", content_version())
+        assert entry.answer.startswith("<p>CV_Expert:")
+        assert entry.author == "CV_Expert"
+
+    @pytest.mark.asyncio
+    async def test_first_turn_is_served_without_llm_and_session_continues(
+        self, faq_file
+    ):
+        """
+        Test que la FAQ se sirve sin llamar al modelo y la conversación puede seguir.
+        """
+        from assistant.answer_cache import content_version
+        from assistant.services import invoke_agent_async
+        from tests.fakes import FakeLlm, install_fake_llm, restore_llm
+
+        calls = []
+
+        class CountingFakeLlm(FakeLlm):
+            async def generate_content_async(self, llm_request, stream=False):
+                calls.append(self.agent_name)
+                async for response in super().generate_content_async(
+                    llm_request, stream
+                ):
+                    yield response
+
+        _store(content_version()).save(str(faq_file))
+        originals = install_fake_llm(CountingFakeLlm)
+
+        # Act
+        try:
+            answer, session_id = await invoke_agent_async(
+                "¿Quién eres?", None, "user_faq"
+            )
+            calls_after_faq = len(calls)
+            follow_up, same_session = await invoke_agent_async(
+                "¿Y tu experiencia?", session_id, "user_faq"
+            )
+        finally:
+            restore_llm(originals)
+
+        # Assert
+        assert answer == "<p>Soy Sergio.</p>"
+        assert calls_after_faq == 0
+        assert same_session == session_id
+        # La FAQ quedó en el historial: el especialista ve ambas preguntas.
+        assert "¿Quién eres? | ¿Y tu experiencia?" in follow_up
+
+    @pytest.mark.asyncio
+    async def test_store_of_another_content_version_is_not_served(
+        self, faq_file, fake_llm
+    ):
+        """Test que unas respuestas generadas con otro CV no se sirven."""
+        from assistant.services import invoke_agent_async
+
+        # Arrange
+        _store("cv:antiguo|blog:none").save(str(faq_file))
+
+        # Act
+        answer, _ = await invoke_agent_async("¿Quién eres?", None, "user_stale")
+
+        # Assert
+        assert answer != "<p>Soy Sergio.</p>"
+        assert answer.startswith("<p>")
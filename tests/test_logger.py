@@ -0,0 +1,151 @@
+"""
+Tests para el módulo assistant.logger
+"""
+
+import json
+import logging
+import queue
+
+from assistant.logger import (
+    AsyncQueueHandler,
+    JsonFormatter,
+    flush_logs,
+    get_logger,
+    query_fields,
+)
+from assistant.tracing import start_trace, use_trace
+
+
+def _record(level=logging.INFO, msg="mensaje", args=None, **extra):
+    record = logging.LogRecord("assistant.test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestQueryFields:
+    """Tests de la redacción de consultas del usuario."""
+
+    def test_query_is_redacted_by_default(self, monkeypatch):
+        """Test que la consulta se registra como longitud y hash."""
+        # Arrange
+        monkeypatch.delenv("LOG_INCLUDE_QUERIES", raising=False)
+
+        # Act
+        fields = query_fields("¿Dónde trabajas?")
+
+        # Assert
+        assert fields["query_chars"] == 16
+        assert len(fields["query_hash"]) == 12
+        assert "query" not in fields
+
+    def test_query_can_be_logged_in_clear(self, monkeypatch):
+        """Test que LOG_INCLUDE_QUERIES=true registra la consulta tal cual."""
+        # Arrange
+        monkeypatch.setenv("LOG_INCLUDE_QUERIES", "true")
+
+        # Act & Assert
+        assert query_fields("python", "keywords") == {"keywords": "python"}
+
+
+class TestJsonFormatter:
+    """Tests del formato JSON."""
+
+    def test_extra_fields_are_top_level(self):
+        """Test que los campos de extra aparecen en el JSON junto al mensaje."""
+        # Arrange
+        record = _record(msg="Herramienta %s", args=("query_cv",), tool="query_cv")
+
+        # Act
+        entry = json.loads(JsonFormatter().format(record))
+
+        # Assert
+        assert entry["level"] == "INFO"
+        assert entry["logger"] == "assistant.test"
+        assert entry["message"] == "Herramienta query_cv"
+        assert entry["tool"] == "query_cv"
+        assert entry["ts"].endswith("+00:00")
+
+
+class TestAsyncQueueHandler:
+    """Tests del handler con cola no bloqueante."""
+
+    def test_sampled_lines_are_filtered_but_warnings_are_kept(self):
+        """
+        Test que el muestreo descarta líneas de alto volumen salvo avisos y errores.
+        """
+        # Arrange
+        handler = AsyncQueueHandler(queue.Queue(), sample_rate=0.0)
+
+        # Act & Assert
+        assert handler.filter(_record(sampled=True)) is False
+        assert handler.filter(_record(logging.WARNING, sampled=True)) is True
+        assert handler.filter(_record()) is True
+
+    def test_kept_sampled_lines_carry_the_rate(self):
+        """Test que las líneas muestreadas que se registran indican la tasa aplicada."""
+        # Arrange
+        handler = AsyncQueueHandler(queue.Queue(), sample_rate=1.0)
+        record = _record(sampled=True)
+
+        # Act
+        kept = handler.filter(record)
+
+        # Assert
+        assert kept is True
+        assert record.sample_rate == 1.0
+
+    def test_prepare_adds_trace_and_request_id(self):
+        """
+        Test que cada registro lleva el trace_id y el session_id de la petición en
+        curso.
+        """
+        # Arrange
+        handler = AsyncQueueHandler(queue.Queue())
+        trace = start_trace("test")
+        trace.root.attributes["session.id"] = "session_123"
+
+        # Act
+        with use_trace(trace):
+            prepared = handler.prepare(_record(msg="hola %s", args=("mundo",)))
+
+        # Assert
+        assert prepared.trace_id == trace.trace_id
+        assert prepared.request_id == "session_123"
+        assert prepared.msg == "hola mundo" and prepared.args is None
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test que con la cola llena el registro se descarta y se cuenta."""
+        from assistant.logger import _dropped
+
+        # Arrange
+        handler = AsyncQueueHandler(queue.Queue(maxsize=1))
+        dropped_before = _dropped.value()
+
+        # Act
+        handler.handle(_record())
+        handler.handle(_record())
+
+        # Assert
+        assert handler.queue.qsize() == 1
+        assert _dropped.value() == dropped_before + 1
+
+
+class TestGetLogger:
+    """Tests del logger configurado."""
+
+    def test_logger_writes_json_lines_from_listener_thread(self, capsys):
+        """Test que get_logger escribe líneas JSON en stdout a través de la cola."""
+        # Arrange
+        logger = get_logger("test")
+
+        # Act
+        logger.warning("Aviso de prueba", extra={"tool": "query_cv"})
+        flush_logs()
+
+        # Assert
+        line = capsys.readouterr().out.strip().splitlines()[-1]
+        entry = json.loads(line)
+        assert logger.name == "assistant.test"
+        assert entry["message"] == "Aviso de prueba"
+        assert entry["level"] == "WARNING"
+        assert entry["tool"] == "query_cv"
@@ -2,6 +2,11 @@
 Tests para el módulo main.py (endpoints de FastAPI)
 """
 
+import asyncio
+import json
+import time
+
+import pytest
 from fastapi.testclient import TestClient
 
 from main import app
@@ -127,3 +132,487 @@ class TestAPIConfiguration:
         assert "openapi" in schema
         assert "info" in schema
         assert schema["info"]["title"] == "API del Asistente Personal de Sergio"
+
+
+class TestInvokeStreamEndpoint:
+    """Tests para el endpoint de streaming SSE."""
+
+    def setup_method(self):
+        """Setup para cada test."""
+        self.client = TestClient(app)
+
+    def test_stream_endpoint_empty_message(self):
+        """Test del endpoint de streaming con mensaje vacío."""
+        # Act
+        response = self.client.post("/api/invoke/stream", json={"message": ""})
+
+        # Assert
+        assert response.status_code == 400
+
+    def test_stream_endpoint_returns_sse_frames(self, mocker):
+        """Test que el endpoint devuelve frames SSE y fija la cookie de usuario."""
+
+        # Arrange
+        async def fake_stream(**kwargs):
+            yield {"type": "session", "session_id": "session_1"}
+            yield {"type": "delta", "text": "<p>Hola</p>"}
+            yield {"type": "done", "response": "<p>Hola</p>", "session_id": "session_1"}
+
+        mocker.patch("main.stream_agent_async", side_effect=fake_stream)
+
+        # Act
+        response = self.client.post("/api/invoke/stream", json={"message": "Hola"})
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "assistant_user_id" in response.cookies
+        assert 'event: delta\ndata: {"text": "<p>Hola</p>"}' in response.text
+        assert response.text.index("event: session") < response.text.index(
+            "event: done"
+        )
+
+    def test_stream_endpoint_reports_errors_as_events(self, mocker):
+        """Test que un fallo a mitad del stream se envía como evento 'error'."""
+
+        # Arrange
+        async def failing_stream(**kwargs):
+            yield {"type": "session", "session_id": "session_1"}
+            raise RuntimeError("boom")
+
+        mocker.patch("main.stream_agent_async", side_effect=failing_stream)
+
+        # Act
+        response = self.client.post("/api/invoke/stream", json={"message": "Hola"})
+
+        # Assert
+        assert response.status_code == 200
+        assert "event: error" in response.text
+
+
+class TestInvokeBatchEndpoint:
+    """Tests para el endpoint de lotes (NDJSON)."""
+
+    def setup_method(self):
+        """Setup para cada test."""
+        self.client = TestClient(app)
+
+    def test_batch_endpoint_requires_the_admin_token(self, monkeypatch):
+        """Test que sin ADMIN_TOKEN no existe y que con un token erróneo se rechaza."""
+        # Arrange
+        payload = {"messages": ["Hola"]}
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+
+        # Act
+        disabled = self.client.post("/api/invoke/batch", json=payload)
+        monkeypatch.setenv("ADMIN_TOKEN", "secreto")
+        forbidden = self.client.post(
+            "/api/invoke/batch", json=payload, headers={"X-Admin-Token": "otro"}
+        )
+        empty = self.client.post(
+            "/api/invoke/batch",
+            json={"messages": []},
+            headers={"X-Admin-Token": "secreto"},
+        )
+
+        # Assert
+        assert disabled.status_code == 404
+        assert forbidden.status_code == 403
+        assert empty.status_code == 400
+
+    def test_batch_endpoint_streams_ndjson_results_and_summary(
+        self, mocker, monkeypatch
+    ):
+        """
+        Test que devuelve una línea JSON por pregunta (con su latencia o su error) y un
+        resumen.
+        """
+        # Arrange
+        monkeypatch.setenv("ADMIN_TOKEN", "secreto")
+        calls = []
+
+        async def fake_invoke(message, session_id, user_id):
+            calls.append(message)
+            if message == "falla":
+                raise RuntimeError("boom")
+            return f"<p>{message}</p>", "session_1"
+
+        mocker.patch("main.invoke_agent_async", side_effect=fake_invoke)
+        payload = {
+            "messages": ["Hola", {"message": "falla", "id": "q2"}],
+            "concurrency": 50,
+        }
+
+        # Act
+        response = self.client.post(
+            "/api/invoke/batch", json=payload, headers={"X-Admin-Token": "secreto"}
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        results = {line["index"]: line for line in lines[:-1]}
+        assert results[0]["ok"] is True and results[0]["response"] == "<p>Hola</p>"
+        assert (results[1]["id"], results[1]["ok"], results[1]["detail"]) == (
+            "q2",
+            False,
+            "boom",
+        )
+        assert all("latency_ms" in line for line in lines[:-1])
+        assert lines[-1]["type"] == "summary"
+        assert (lines[-1]["ok"], lines[-1]["failed"]) == (1, 1)
+        assert lines[-1]["concurrency"] == 2
+        assert sorted(calls) == ["Hola", "falla"]
+
+    def test_batch_endpoint_can_bypass_cached_answers(self, mocker, monkeypatch):
+        """
+        Test que con use_cache=false las preguntas no se sirven desde las FAQ ni la
+        caché.
+        """
+        from assistant.answer_cache import cached_answers_bypassed
+
+        # Arrange
+        monkeypatch.setenv("ADMIN_TOKEN", "secreto")
+        bypassed = []
+
+        async def fake_invoke(message, session_id, user_id):
+            bypassed.append(cached_answers_bypassed())
+            return "<p>ok</p>", "session_1"
+
+        mocker.patch("main.invoke_agent_async", side_effect=fake_invoke)
+
+        # Act
+        response = self.client.post(
+            "/api/invoke/batch",
+            json={"messages": ["Hola"], "use_cache": False},
+            headers={"X-Admin-Token": "secreto"},
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert bypassed == [True]
+        assert json.loads(response.text.splitlines()[-1])["use_cache"] is False
+
+
+class TestMetricsEndpoint:
+    """Tests para el endpoint de métricas."""
+
+    def test_metrics_endpoint_exposes_prometheus_text(self):
+        """Test que /api/metrics devuelve las métricas del pre-router en texto plano."""
+        # Arrange
+        client = TestClient(app)
+
+        # Act
+        response = client.get("/api/metrics")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE assistant_route_decisions_total counter" in response.text
+        assert "# TYPE assistant_orchestrator_hop_seconds histogram" in response.text
+
+
+class SlowRunner:
+    """Runner de prueba que tarda mucho en responder y registra si lo cancelan."""
+
+    def __init__(self, delay=30.0):
+        self.delay = delay
+        self.started = asyncio.Event()
+        self.closed_at = None
+        self.completed = False
+
+    async def run_async(self, **kwargs):
+        self.started.set()
+        try:
+            await asyncio.sleep(self.delay)
+            self.completed = True
+            yield _final_event("<p>Demasiado tarde</p>")
+        finally:
+            self.closed_at = time.perf_counter()
+
+
+def _final_event(text):
+    from google.adk.events import Event
+    from google.genai import types
+
+    return Event(
+        author="Personal_Orchestrator",
+        content=types.Content(role="model", parts=[types.Part(text=text)]),
+    )
+
+
+async def _call_and_disconnect(path, payload, disconnect_after):
+    """Llama a la app ASGI directamente y simula que el cliente cierra la conexión."""
+    disconnected = asyncio.Event()
+    body_sent = False
+    statuses = []
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("test", 80),
+    }
+    call = asyncio.create_task(app(scope, receive, send))
+    await asyncio.sleep(disconnect_after)
+    disconnected.set()
+    disconnected_at = time.perf_counter()
+    await asyncio.wait_for(call, timeout=5)
+    return disconnected_at, statuses
+
+
+class TestClientDisconnect:
+    """Tests de la cancelación del agente cuando el cliente se desconecta."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("path", ["/api/invoke", "/api/invoke/stream"])
+    async def test_run_is_cancelled_after_disconnect(self, mocker, path):
+        """
+        Test que la ejecución del agente se cancela poco después de la desconexión.
+        """
+        # Arrange
+        runner = SlowRunner()
+        mocker.patch("assistant.services._runner", runner)
+        payload = json.dumps({"message": "Hola"}).encode()
+
+        # Act
+        disconnected_at, statuses = await _call_and_disconnect(
+            path, payload, disconnect_after=0.3
+        )
+
+        # Assert
+        assert runner.started.is_set()
+        assert not runner.completed
+        assert runner.closed_at is not None
+        assert runner.closed_at - disconnected_at < 1.0
+        if path == "/api/invoke":
+            assert statuses == [499]
+
+    @pytest.mark.asyncio
+    async def test_invoke_closes_runner_after_final_response(self, mocker):
+        """Test que invoke_agent_async cierra el generador del runner al terminar."""
+        from assistant.services import invoke_agent_async
+
+        # Arrange
+        state = {"closed": False, "extra": False}
+
+        async def events(**kwargs):
+            try:
+                yield _final_event("<p>Hola</p>")
+                state["extra"] = True
+                yield _final_event("<p>Sobra</p>")
+            finally:
+                state["closed"] = True
+
+        mocker.patch("assistant.services._runner").run_async.side_effect = events
+
+        # Act
+        response, _ = await invoke_agent_async(
+            message="Hola", session_id=None, user_id="user_close"
+        )
+
+        # Assert
+        assert response == "<p>Hola</p>"
+        assert state == {"closed": True, "extra": False}
+
+
+class TestWebSocketChannel:
+    """Tests del canal de conversación por WebSocket (/api/ws)."""
+
+    def setup_method(self):
+        """Setup para cada test."""
+        self.client = TestClient(app)
+
+    def test_session_is_bound_once_per_connection(self, mocker):
+        """Test que varios mensajes por la misma conexión comparten la sesión."""
+        # Arrange
+        calls = []
+
+        async def fake_stream(message, session_id, user_id):
+            calls.append((message, session_id, user_id))
+            yield {"type": "session", "session_id": session_id or "session_1"}
+            yield {"type": "delta", "text": f"<p>{message}</p>"}
+            yield {
+                "type": "done",
+                "response": f"<p>{message}</p>",
+                "session_id": "session_1",
+            }
+
+        mocker.patch("main.stream_agent_async", side_effect=fake_stream)
+
+        # Act
+        with self.client.websocket_connect("/api/ws") as ws:
+            events = []
+            for text in ("Hola", "¿Y tu experiencia?"):
+                ws.send_json({"type": "message", "message": text})
+                while not events or events[-1]["type"] != "done":
+                    events.append(ws.receive_json())
+                events.append({"type": "turn"})
+
+        # Assert
+        assert [call[1] for call in calls] == [None, "session_1"]
+        assert calls[0][2] == calls[1][2]
+        assert [event["type"] for event in events].count("delta") == 2
+        assert events[1] == {"type": "delta", "text": "<p>Hola</p>"}
+        assert "trace_id" in events[2]
+
+    def test_errors_end_the_turn_but_not_the_connection(self, mocker):
+        """
+        Test que un fallo del agente llega como evento y la conexión sigue abierta.
+        """
+
+        # Arrange
+        async def failing_stream(message, session_id, user_id):
+            if message == "falla":
+                raise RuntimeError("boom")
+            yield {"type": "done", "response": "<p>ok</p>", "session_id": "session_1"}
+
+        mocker.patch("main.stream_agent_async", side_effect=failing_stream)
+
+        # Act
+        with self.client.websocket_connect("/api/ws") as ws:
+            ws.send_json({"message": "falla"})
+            error = ws.receive_json()
+            ws.send_json({"message": ""})
+            invalid = ws.receive_json()
+            ws.send_json({"message": "otra vez"})
+            done = ws.receive_json()
+
+        # Assert
+        assert error["type"] == "error"
+        assert "boom" in error["detail"]
+        assert invalid["reason"] == "invalid"
+        assert done["type"] == "done"
+
+    def test_messages_beyond_the_pending_limit_are_rejected(self, mocker, monkeypatch):
+        """
+        Test que con la cola llena un mensaje recibe 'busy' en lugar de acumularse.
+        """
+
+        # Arrange
+        async def slow_stream(message, session_id, user_id):
+            yield {"type": "session", "session_id": "session_1"}
+            await asyncio.sleep(0.3)
+            yield {
+                "type": "done",
+                "response": f"<p>{message}</p>",
+                "session_id": "session_1",
+            }
+
+        mocker.patch("main.stream_agent_async", side_effect=slow_stream)
+        monkeypatch.setattr("assistant.ws.WS_MAX_PENDING_MESSAGES", 1)
+
+        # Act
+        with self.client.websocket_connect("/api/ws") as ws:
+            ws.send_json({"message": "uno"})
+            assert ws.receive_json()["type"] == "session"
+            ws.send_json({"message": "dos"})
+            ws.send_json({"message": "tres"})
+            events = [ws.receive_json() for _ in range(4)]
+
+        # Assert
+        busy = [event for event in events if event["type"] == "error"]
+        done = [event["response"] for event in events if event["type"] == "done"]
+        assert len(busy) == 1 and busy[0]["reason"] == "busy"
+        assert done == ["<p>uno</p>", "<p>dos</p>"]
+
+    def test_idle_connection_is_closed_after_heartbeats(self, monkeypatch):
+        """
+        Test que se envían pings y una conexión sin mensajes se cierra por inactividad.
+        """
+        from starlette.websockets import WebSocketDisconnect
+
+        # Arrange
+        monkeypatch.setattr("assistant.ws.WS_HEARTBEAT_SECONDS", 0.05)
+        monkeypatch.setattr("assistant.ws.WS_IDLE_TIMEOUT_SECONDS", 0.2)
+        pings = 0
+
+        # Act
+        with self.client.websocket_connect("/api/ws") as ws:
+            with pytest.raises(WebSocketDisconnect) as closed:
+                while True:
+                    assert ws.receive_json() == {"type": "ping"}
+                    pings += 1
+                    ws.send_json({"type": "pong"})
+
+        # Assert
+        assert pings >= 2
+        assert closed.value.code == 1000
+
+    def test_connection_without_pongs_is_closed(self, monkeypatch):
+        """Test que un cliente que no responde al heartbeat se desconecta."""
+        from starlette.websockets import WebSocketDisconnect
+
+        # Arrange
+        monkeypatch.setattr("assistant.ws.WS_HEARTBEAT_SECONDS", 0.05)
+
+        # Act
+        with self.client.websocket_connect("/api/ws") as ws:
+            with pytest.raises(WebSocketDisconnect) as closed:
+                while True:
+                    ws.receive_json()
+
+        # Assert
+        assert closed.value.code == 1001
+
+    def test_disconnect_cancels_the_running_turn(self, mocker):
+        """Test que cerrar el WebSocket cancela la ejecución del agente en curso."""
+        import threading
+
+        # Arrange
+        cancelled = threading.Event()
+
+        async def endless_stream(message, session_id, user_id):
+            yield {"type": "session", "session_id": "session_1"}
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            yield {
+                "type": "done",
+                "response": "<p>tarde</p>",
+                "session_id": "session_1",
+            }
+
+        mocker.patch("main.stream_agent_async", side_effect=endless_stream)
+
+        # Act
+        with self.client.websocket_connect("/api/ws") as ws:
+            ws.send_json({"message": "Hola"})
+            ws.receive_json()
+
+        # Assert
+        assert cancelled.wait(timeout=2)
+
+    def test_cross_origin_connections_are_rejected(self):
+        """Test que un WebSocket abierto desde otra web no se acepta."""
+        from starlette.websockets import WebSocketDisconnect
+
+        # Act & Assert
+        with pytest.raises(WebSocketDisconnect):
+            with self.client.websocket_connect(
+                "/api/ws", headers={"origin": "https://otra-web.example"}
+            ):
+                pass
@@ -0,0 +1,84 @@
+"""
+Tests para el registro de métricas (assistant.metrics).
+"""
+
+from assistant.metrics import Registry
+
+
+class TestRegistry:
+    """Tests de los tipos de métrica y su exportación a Prometheus."""
+
+    def setup_method(self):
+        """Setup para cada test."""
+        self.registry = Registry()
+
+    def test_counter_with_labels(self):
+        """Test que los contadores acumulan por combinación de etiquetas."""
+        # Arrange
+        counter = self.registry.counter("requests_total", "Peticiones.", ("route",))
+
+        # Act
+        counter.inc(route="cv")
+        counter.inc(2, route="cv")
+        counter.inc(route="blog")
+
+        # Assert
+        assert counter.value(route="cv") == 3
+        output = self.registry.render()
+        assert "# TYPE requests_total counter" in output
+        assert 'requests_total{route="cv"} 3' in output
+        assert 'requests_total{route="blog"} 1' in output
+
+    def test_same_name_returns_same_metric(self):
+        """Test que registrar dos veces el mismo nombre devuelve la misma métrica."""
+        # Act
+        first = self.registry.counter("x_total", "X.")
+        second = self.registry.counter("x_total", "X.")
+
+        # Assert
+        assert first is second
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test que el histograma exporta buckets acumulados, suma y recuento."""
+        # Arrange
+        histogram = self.registry.histogram(
+            "latency_seconds", "Latencia.", buckets=(0.1, 1)
+        )
+
+        # Act
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(3)
+
+        # Assert
+        output = self.registry.render()
+        assert 'latency_seconds_bucket{le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{le="1"} 2' in output
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in output
+        assert "latency_seconds_sum 3.55" in output
+        assert "latency_seconds_count 3" in output
+
+    def test_gauge_function_is_evaluated_on_render(self):
+        """Test que un gauge con función se calcula en cada exportación."""
+        # Arrange
+        values = {"size": 1}
+        gauge = self.registry.gauge("cache_entries", "Entradas.", ("cache",))
+        gauge.set_function(lambda: {("blog",): values["size"]})
+
+        # Act
+        values["size"] = 7
+        output = self.registry.render()
+
+        # Assert
+        assert 'cache_entries{cache="blog"} 7' in output
+
+    def test_label_values_are_escaped(self):
+        """Test que las comillas de las etiquetas se escapan."""
+        # Arrange
+        counter = self.registry.counter("q_total", "Consultas.", ("query",))
+
+        # Act
+        counter.inc(query='di "hola"')
+
+        # Assert
+        assert 'q_total{query="di \\"hola\\""} 1' in self.registry.render()
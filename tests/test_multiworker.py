@@ -0,0 +1,97 @@
+"""
+Tests del modo multi-worker con sesiones compartidas entre procesos.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_healthy(port: int, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"El worker del puerto {port} terminó al arrancar")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise TimeoutError(f"El worker del puerto {port} no arrancó a tiempo")
+
+
+@pytest.fixture
+def two_workers(tmp_path):
+    """Dos procesos worker independientes que comparten el mismo fichero de sesiones."""
+    env = dict(
+        os.environ,
+        SESSION_BACKEND="sqlite",
+        SESSION_DB_PATH=str(tmp_path / "sessions.db"),
+        PYTHONPATH=PROJECT_ROOT,
+    )
+    ports = [_free_port(), _free_port()]
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "tests.worker_app", str(port)],
+            cwd=PROJECT_ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        for port in ports
+    ]
+    try:
+        for port, process in zip(ports, processes):
+            _wait_until_healthy(port, process)
+        yield [f"http://127.0.0.1:{port}" for port in ports]
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+@pytest.mark.slow
+@pytest.mark.integration
+class TestSharedSessionsAcrossWorkers:
+    """La continuidad de session_id no depende del worker que atiende la petición."""
+
+    def test_alternating_requests_keep_session_history(self, two_workers):
+        """
+        Test que una sesión continúa aunque cada turno lo atienda un worker distinto.
+        """
+        # Arrange
+        cookies = {"assistant_user_id": "user_multiworker"}
+        messages = ["Primer turno", "Segundo turno", "Tercer turno", "Cuarto turno"]
+        session_id = None
+        responses = []
+
+        # Act
+        for i, message in enumerate(messages):
+            base_url = two_workers[i % 2]
+            response = httpx.post(
+                f"{base_url}/api/invoke",
+                json={"message": message, "session_id": session_id},
+                cookies=cookies,
+                timeout=30,
+            )
+            assert response.status_code == 200, response.text
+            data = response.json()
+            assert session_id in (None, data["session_id"])
+            session_id = data["session_id"]
+            responses.append(data["response"])
+
+        # Assert: el último worker ve el historial escrito por ambos procesos
+        for message in messages:
+            assert message in responses[-1]
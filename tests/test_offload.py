@@ -0,0 +1,200 @@
+"""
+Tests para el módulo assistant.offload
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+
+import httpx
+import pytest
+
+from assistant.offload import offload_tool
+
+
+def slow_tool(query: str) -> str:
+    """Herramienta de prueba que bloquea el hilo."""
+    time.sleep(0.3)
+    return f"resultado para {query}"
+
+
+class TestOffloadTool:
+    """Tests del wrapper de herramientas síncronas."""
+
+    def test_wrapper_preserves_tool_metadata(self):
+        """Test que el wrapper conserva nombre, docstring y firma para ADK."""
+        # Act
+        wrapped = offload_tool(slow_tool)
+
+        # Assert
+        assert inspect.iscoroutinefunction(wrapped)
+        assert wrapped.__name__ == "slow_tool"
+        assert wrapped.__doc__ == slow_tool.__doc__
+        assert list(inspect.signature(wrapped).parameters) == ["query"]
+
+    def test_async_tools_are_returned_unchanged(self):
+        """Test que las herramientas asíncronas no se envuelven."""
+
+        # Arrange
+        async def async_tool(query: str) -> str:
+            return query
+
+        # Act & Assert
+        assert offload_tool(async_tool) is async_tool
+        wrapped = offload_tool(slow_tool)
+        assert offload_tool(wrapped) is wrapped
+
+    @pytest.mark.asyncio
+    async def test_tool_runs_outside_event_loop_thread(self):
+        """Test que la herramienta se ejecuta en un hilo del pool."""
+        # Arrange
+        thread_names = []
+
+        def record_thread() -> str:
+            thread_names.append(threading.current_thread().name)
+            return "ok"
+
+        # Act
+        result = await offload_tool(record_thread)()
+
+        # Assert
+        assert result == "ok"
+        assert thread_names[0].startswith("tool-offload")
+
+    @pytest.mark.asyncio
+    async def test_timeout_returns_friendly_message(self):
+        """Test que superar el timeout devuelve un mensaje en lugar de colgarse."""
+        # Arrange
+        wrapped = offload_tool(slow_tool, timeout=0.05)
+
+        # Act
+        result = await wrapped("docker")
+
+        # Assert
+        assert "ha tardado demasiado" in result
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_per_tool(self):
+        """
+        Test que nunca se ejecutan más invocaciones que el límite de la herramienta.
+        """
+        # Arrange
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def tracked_tool(query: str) -> str:
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return query
+
+        wrapped = offload_tool(tracked_tool, max_concurrency=2)
+
+        # Act
+        results = await asyncio.gather(*(wrapped(str(i)) for i in range(6)))
+
+        # Assert
+        assert results == [str(i) for i in range(6)]
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_timed_out_calls_keep_their_slot_until_the_thread_ends(self):
+        """Test que un timeout no libera el turno mientras el hilo sigue bloqueado."""
+        # Arrange
+        release = threading.Event()
+        started = []
+
+        def blocking_tool(query: str) -> str:
+            started.append(query)
+            release.wait(2)
+            return query
+
+        wrapped = offload_tool(blocking_tool, max_concurrency=1, timeout=0.05)
+
+        # Act
+        first = await wrapped("a")
+        second = await wrapped("b")
+        release.set()
+        await asyncio.sleep(0.05)
+        third = await wrapped("c")
+
+        # Assert
+        assert "ha tardado demasiado" in first
+        assert "ha tardado demasiado" in second
+        assert started == [
+            "a",
+            "c",
+        ]  # "b" esperó turno: el hilo de "a" seguía ocupándolo
+        assert third == "c"  # al terminar el hilo, el turno vuelve a estar libre
+
+    def test_env_overrides_tool_limits(self, monkeypatch):
+        """Test que los límites se pueden ajustar por variable de entorno."""
+        # Arrange
+        monkeypatch.setenv("TOOL_SLOW_TOOL_MAX_CONCURRENCY", "7")
+        monkeypatch.setenv("TOOL_SLOW_TOOL_TIMEOUT_SECONDS", "1.5")
+
+        # Act
+        wrapped = offload_tool(slow_tool, max_concurrency=2, timeout=10)
+
+        # Assert
+        assert wrapped.max_concurrency == 7
+        assert wrapped.timeout == 1.5
+
+
+class TestEventLoopResponsiveness:
+    """Test de concurrencia: las búsquedas del blog no bloquean la API."""
+
+    @pytest.mark.asyncio
+    async def test_health_latency_flat_with_ten_blog_searches(
+        self, mocker, tmp_path, monkeypatch
+    ):
+        """Test que /api/health responde rápido con diez búsquedas en curso."""
+        from assistant.agents import blog_agent
+        from assistant.blog_index import reset_blog_index
+        from main import app
+
+        # Arrange: sin índice local, cada búsqueda va a un "Google" lento y bloqueante
+        monkeypatch.setenv("BLOG_INDEX_PATH", str(tmp_path / "no-existe.json"))
+        reset_blog_index()
+
+        def slow_google(*args, **kwargs):
+            time.sleep(0.4)
+            return ["https://blog.sergiomarquez.dev/post-lento"]
+
+        mocker.patch("assistant.tools.search", side_effect=slow_google)
+        search_tool = blog_agent.tools[0]
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            baseline_start = time.perf_counter()
+            await client.get("/api/health")
+            baseline = time.perf_counter() - baseline_start
+
+            # Act
+            searches = [
+                asyncio.create_task(search_tool(query=f"tema {i}")) for i in range(10)
+            ]
+            await asyncio.sleep(0.05)
+            latencies = []
+            for _ in range(5):
+                start = time.perf_counter()
+                response = await client.get("/api/health")
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+            in_flight = sum(not task.done() for task in searches)
+            results = await asyncio.gather(*searches)
+
+        reset_blog_index()
+
+        # Assert
+        assert in_flight == 10
+        assert max(latencies) < baseline + 0.1
+        assert all("post-lento" in result.lower() for result in results)
@@ -0,0 +1,212 @@
+"""
+Tests para el módulo assistant.prompt_cache (caché del prefijo estático de los prompts)
+"""
+
+import asyncio
+import time
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from assistant.prompt_cache import PromptCache
+from tests.fakes import LocalPromptCacheBackend
+
+INSTRUCTION = "Eres el especialista del CV. " * 20
+
+
+def _request(instruction=INSTRUCTION, model="gemini-1.5-flash"):
+    return LlmRequest(
+        model=model,
+        contents=[types.Content(role="user", parts=[types.Part(text="Hola")])],
+        config=types.GenerateContentConfig(
+            system_instruction=instruction,
+            tools=[
+                types.Tool(
+                    function_declarations=[
+                        types.FunctionDeclaration(
+                            name="query_cv", description="Consulta el CV"
+                        )
+                    ]
+                )
+            ],
+        ),
+    )
+
+
+class TestPromptCache:
+    """Tests del registro y reutilización de prefijos."""
+
+    @pytest.mark.asyncio
+    async def test_prefix_is_registered_once_and_sent_by_handle(self):
+        """
+        Test que el prefijo se registra una vez y las llamadas siguientes usan su
+        handle.
+        """
+        # Arrange
+        backend = LocalPromptCacheBackend()
+        cache = PromptCache(backend, min_tokens=0)
+        first, second = _request(), _request()
+
+        # Act
+        results = [
+            await cache.apply("CV_Expert", first),
+            await cache.apply("CV_Expert", second),
+        ]
+
+        # Assert
+        assert results == ["created", "hit"]
+        assert len(backend.created) == 1
+        assert second.config.cached_content == first.config.cached_content
+        assert second.config.system_instruction is None
+        assert second.config.tools is None
+        prefix = backend.prefixes[second.config.cached_content]
+        assert prefix.system_instruction == INSTRUCTION
+        assert prefix.tools[0].function_declarations[0].name == "query_cv"
+
+    @pytest.mark.asyncio
+    async def test_new_content_or_expired_ttl_registers_a_new_prefix(self):
+        """
+        Test que un prefijo distinto (p. ej. otro CV) o caducado se vuelve a registrar.
+        """
+        # Arrange
+        backend = LocalPromptCacheBackend()
+        cache = PromptCache(backend, ttl=0.2, min_tokens=0)
+        await cache.apply("CV_Expert", _request())
+
+        # Act
+        changed = await cache.apply(
+            "CV_Expert", _request(INSTRUCTION + "Proyectos (1)")
+        )
+        time.sleep(0.2)
+        refreshed = await cache.apply(
+            "CV_Expert", _request(INSTRUCTION + "Proyectos (1)")
+        )
+
+        # Assert
+        assert (changed, refreshed) == ("created", "refreshed")
+        assert len(backend.created) == 3
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_register_the_prefix_once(self):
+        """
+        Test que varias llamadas simultáneas con un prefijo nuevo lo registran una vez.
+        """
+        # Arrange
+        backend = LocalPromptCacheBackend()
+        cache = PromptCache(backend, min_tokens=0)
+        requests = [_request() for _ in range(5)]
+
+        # Act
+        await asyncio.gather(
+            *(cache.apply("CV_Expert", request) for request in requests)
+        )
+
+        # Assert
+        assert len(backend.created) == 1
+        assert {request.config.cached_content for request in requests} == {
+            "cachedContents/local-0"
+        }
+
+    @pytest.mark.asyncio
+    async def test_small_prefixes_and_backend_failures_send_the_full_prompt(self):
+        """
+        Test que un prefijo corto o un fallo del backend dejan la petición como estaba.
+        """
+        # Arrange
+        small = PromptCache(LocalPromptCacheBackend(), min_tokens=100_000)
+        failing_backend = LocalPromptCacheBackend(fail=True)
+        failing = PromptCache(failing_backend, min_tokens=0, retry_after=60)
+        requests = [_request(), _request(), _request()]
+
+        # Act
+        results = [
+            await small.apply("CV_Expert", requests[0]),
+            await failing.apply("CV_Expert", requests[1]),
+            await failing.apply("CV_Expert", requests[2]),
+        ]
+
+        # Assert
+        assert results == ["skipped", "error", "error"]
+        assert all(
+            request.config.system_instruction == INSTRUCTION for request in requests
+        )
+        assert all(request.config.cached_content is None for request in requests)
+        # Tras un fallo no se reintenta en cada llamada.
+        failing_backend.fail = False
+        assert await failing.apply("CV_Expert", _request()) == "error"
+
+
+class TestPromptCacheInAgents:
+    """Tests de la caché de prefijos en los agentes reales con un backend local."""
+
+    @pytest.fixture
+    def local_prompt_cache(self, cv_index_file, monkeypatch):
+        """
+        Caché de prefijos con backend local, CV temporal y sin cachés de respuestas.
+        """
+        from assistant.agents import cv_agent, cv_instruction
+        from assistant.cv_index import get_cv_index
+        from assistant.prompt_cache import get_prompt_cache, set_prompt_cache
+
+        monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+        monkeypatch.setenv("FAQ_ENABLED", "false")
+        instruction = cv_agent.instruction
+        cv_agent.instruction = cv_instruction(get_cv_index())
+        backend = LocalPromptCacheBackend()
+        previous = get_prompt_cache()
+        set_prompt_cache(PromptCache(backend, min_tokens=0))
+        yield backend
+        set_prompt_cache(previous)
+        cv_agent.instruction = instruction
+
+    @pytest.mark.asyncio
+    async def test_agents_reuse_the_prefix_until_the_cv_changes(
+        self, local_prompt_cache, cv_index_file, mock_cv_resume
+    ):
+        """
+        Test que varias sesiones comparten el prefijo y recargar el CV registra otro.
+        """
+        from assistant.cv_index import reload_cv_index
+        from assistant.services import invoke_agent_async
+        from tests.fakes import FakeLlm, install_fake_llm, restore_llm
+        from tests.test_cv_index import _rewrite_cv
+
+        backend = local_prompt_cache
+        seen = []
+
+        class CachingFakeLlm(FakeLlm):
+            async def generate_content_async(self, llm_request, stream=False):
+                # Como haría Gemini: la instrucción llega solo a través del handle.
+                name = llm_request.config.cached_content
+                seen.append(
+                    (self.agent_name, backend.prefixes[name].system_instruction)
+                )
+                assert llm_request.config.system_instruction is None
+                async for response in super().generate_content_async(
+                    llm_request, stream
+                ):
+                    yield response
+
+        originals = install_fake_llm(CachingFakeLlm)
+
+        # Act
+        try:
+            await invoke_agent_async("¿Cuál es tu experiencia?", None, "user_prefix_1")
+            await invoke_agent_async(
+                "Háblame de tus habilidades", None, "user_prefix_2"
+            )
+            created_before_reload = list(backend.created)
+            _rewrite_cv(cv_index_file, mock_cv_resume, "Empresa Nueva")
+            reload_cv_index()
+            await invoke_agent_async("¿Y tus proyectos?", None, "user_prefix_3")
+        finally:
+            restore_llm(originals)
+
+        # Assert
+        cv_calls = [instruction for agent, instruction in seen if agent == "CV_Expert"]
+        assert len(cv_calls) >= 3
+        assert sum(name.startswith("CV_Expert-") for name in created_before_reload) == 1
+        assert sum(name.startswith("CV_Expert-") for name in backend.created) == 2
+        assert "proyectos (1)" not in cv_calls[0]
+        assert "proyectos (1)" in cv_calls[-1]
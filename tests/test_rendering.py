@@ -0,0 +1,186 @@
+"""
+Tests para el módulo assistant.rendering (normalización del HTML de los agentes)
+"""
+
+import pytest
+
+from assistant.rendering import HtmlNormalizer, normalize_html
+
+MIXED = (
+    '```html\n<h1 class="titulo">Experiencia</h1>\n'
+    "<p>Trabajo con **Python** y <b>Go</b> &amp; <i>Rust</i>.</p>\n```\n"
+    "## Proyectos\n\n- [Blog](https://sergiomarquez.dev) con `FastAPI`\n- Agentes *ADK*\n\n"
+    "Texto suelto <script>alert('x')</script>final"
+)
+
+
+def _stream(text, size):
+    normalizer = HtmlNormalizer()
+    chunks = [normalizer.feed(text[i : i + size]) for i in range(0, len(text), size)]
+    return "".join(chunks) + normalizer.close()
+
+
+class TestNormalizeHtml:
+    """Tests de la conversión a HTML permitido."""
+
+    def test_fences_are_stripped_and_markdown_converted(self):
+        """
+        Test que se quita la valla ```html y el Markdown pasa a las etiquetas
+        permitidas.
+        """
+        # Act
+        result = normalize_html(MIXED)
+
+        # Assert
+        assert "```" not in result
+        assert "<h2>Experiencia</h2>" in result
+        assert (
+            "<strong>Python</strong> y <strong>Go</strong> &amp; <em>Rust</em>"
+            in result
+        )
+        assert "<h2>Proyectos</h2>" in result
+        assert (
+            '<li><a href="https://sergiomarquez.dev">Blog</a> con <code>FastAPI</code></li>'
+            in result
+        )
+        assert "<li>Agentes <em>ADK</em></li>" in result
+        assert "<p>Texto suelto final</p>" in result
+
+    @pytest.mark.parametrize(
+        "raw, expected",
+        [
+            (
+                '<a href="javascript:alert(1)" onclick="x()">enlace</a>',
+                "<p><a>enlace</a></p>",
+            ),
+            ('<p style="color:red">Hola<iframe src=x></iframe></p>', "<p>Hola</p>"),
+            ("<div><span>Hola</span><br>mundo</div>", "<p>Hola mundo</p>"),
+            ("a < b && c", "<p>a &lt; b &amp;&amp; c</p>"),
+            (
+                "<p>sin cerrar <strong>negrita",
+                "<p>sin cerrar <strong>negrita</strong></p>",
+            ),
+        ],
+    )
+    def test_unsafe_markup_is_removed_or_escaped(self, raw, expected):
+        """
+        Test que atributos, etiquetas peligrosas y texto suelto quedan neutralizados.
+        """
+        # Act & Assert
+        assert normalize_html(raw) == expected
+
+    def test_code_blocks_of_other_languages_are_kept_as_code(self):
+        """Test que una valla de otro lenguaje se muestra como código escapado."""
+        # Act
+        result = normalize_html("Ejemplo:\n```python\nif a < b:\n    pass\n```")
+
+        # Assert
+        assert result.endswith("<p><code>if a &lt; b:\n    pass\n</code></p>")
+
+    @pytest.mark.parametrize(
+        "raw, expected",
+        [
+            (
+                "Usa `List<String>` aquí",
+                "<p>Usa <code>List&lt;String&gt;</code> aquí</p>",
+            ),
+            (
+                "La etiqueta `<div>` agrupa",
+                "<p>La etiqueta <code>&lt;div&gt;</code> agrupa</p>",
+            ),
+            (
+                "`<script>alert(1)</script>`",
+                "<p><code>&lt;script&gt;alert(1)&lt;/script&gt;</code></p>",
+            ),
+        ],
+    )
+    def test_tags_inside_inline_code_are_literal_text(self, raw, expected):
+        """
+        Test que dentro de `código` Markdown los '<' se muestran escapados, no se
+        interpretan.
+        """
+        # Act & Assert
+        assert normalize_html(raw) == expected
+        assert _stream(raw, 1) == expected
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+    def test_streaming_output_matches_the_whole_response(self, size):
+        """
+        Test que procesar por fragmentos da exactamente el mismo HTML que de una vez.
+        """
+        # Act & Assert
+        assert _stream(MIXED, size) == normalize_html(MIXED)
+
+    def test_incomplete_constructs_are_held_back(self):
+        """Test que una etiqueta o un '**' a medias no se emiten hasta poder decidir."""
+        # Arrange
+        normalizer = HtmlNormalizer()
+
+        # Act
+        first = normalizer.feed("<p>Uso <str")
+        second = normalizer.feed("ong>Python</strong> y **Go")
+        rest = normalizer.feed("**</p>") + normalizer.close()
+
+        # Assert
+        assert first == "<p>Uso "
+        assert second == "<strong>Python</strong> y <strong>Go"
+        assert rest == "</strong></p>"
+
+
+class TestNormalizedAgentOutput:
+    """Tests de la salida normalizada de los agentes."""
+
+    @pytest.mark.asyncio
+    async def test_streamed_deltas_are_normalized_html(self, monkeypatch):
+        """
+        Test que los deltas y la respuesta final del streaming llegan ya normalizados.
+        """
+        from google.adk.models.llm_response import LlmResponse
+        from google.genai import types
+
+        from assistant.services import stream_agent_async
+        from tests.fakes import FakeLlm, install_fake_llm, restore_llm
+
+        monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+        monkeypatch.setenv("FAQ_ENABLED", "false")
+        answer = "```html\n<h2>Experiencia</h2>\n<p>Uso **Python**</p>\n```"
+
+        class FencedFakeLlm(FakeLlm):
+            async def generate_content_async(self, llm_request, stream=False):
+                if self.agent_name == "Personal_Orchestrator":
+                    async for response in super().generate_content_async(
+                        llm_request, stream
+                    ):
+                        yield response
+                    return
+                for i in range(0, len(answer), 5):
+                    yield LlmResponse(
+                        content=types.Content(
+                            role="model", parts=[types.Part(text=answer[i : i + 5])]
+                        ),
+                        partial=True,
+                    )
+                yield LlmResponse(
+                    content=types.Content(role="model", parts=[types.Part(text=answer)])
+                )
+
+        originals = install_fake_llm(FencedFakeLlm)
+
+        # Act
+        try:
+            events = [
+                event
+                async for event in stream_agent_async(
+                    "¿Cuál es tu experiencia?", None, "user_render"
+                )
+            ]
+        finally:
+            restore_llm(originals)
+
+        # Assert
+        deltas = "".join(event["text"] for event in events if event["type"] == "delta")
+        done = events[-1]
+        assert done["type"] == "done"
+        assert done["response"] == deltas == normalize_html(answer)
+        assert done["response"].startswith("<h2>Experiencia</h2>")
+        assert "<strong>Python</strong>" in done["response"]
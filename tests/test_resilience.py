@@ -0,0 +1,349 @@
+"""
+Tests para el módulo assistant.resilience (con upstreams locales que inyectan fallos)
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from google.genai import errors
+
+from assistant.resilience import (
+    CLOSED,
+    DEGRADED_ANSWER,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    RetryPolicy,
+    Upstream,
+    UpstreamUnavailable,
+    is_retryable,
+)
+from tests.fakes import FakeLlm, install_fake_llm, restore_llm
+
+
+class FaultyUpstream:
+    """
+    Upstream local: falla las primeras `failures` llamadas y tarda `latency` segundos.
+    """
+
+    def __init__(self, failures=0, latency=0.0, error=ConnectionError("caído")):
+        self.failures = failures
+        self.latency = latency
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query="consulta"):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.latency)
+        if call <= self.failures:
+            raise self.error
+        return [{"title": f"Resultado {query}", "url": "https://blog.example/post"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _upstream(attempts=3, deadline=2.0, **kwargs):
+    return Upstream(
+        "test",
+        deadline=deadline,
+        retry=RetryPolicy(attempts=attempts, base_delay=0.01, jitter=False),
+        **kwargs,
+    )
+
+
+class TestRetryableErrors:
+    """Tests de la clasificación de errores."""
+
+    def test_transient_errors_are_retryable(self):
+        """Test que timeouts, conexión y HTTP 429/5xx se reintentan y el resto no."""
+        # Act & Assert
+        assert is_retryable(ConnectionError())
+        assert is_retryable(TimeoutError())
+        assert is_retryable(errors.ServerError(503, {"error": {"code": 503}}))
+        assert is_retryable(errors.ClientError(429, {"error": {"code": 429}}))
+        assert not is_retryable(errors.ClientError(400, {"error": {"code": 400}}))
+        assert not is_retryable(ValueError("bug"))
+
+
+class TestUpstream:
+    """Tests de plazos, reintentos y hedging."""
+
+    def test_retries_transient_failures(self):
+        """Test que los fallos transitorios se reintentan hasta obtener respuesta."""
+        # Arrange
+        backend = FaultyUpstream(failures=2)
+
+        # Act
+        result = _upstream(attempts=3).call(backend, "agentes")
+
+        # Assert
+        assert result[0]["title"] == "Resultado agentes"
+        assert backend.calls == 3
+
+    def test_gives_up_after_bounded_attempts(self):
+        """Test que tras agotar los intentos se lanza UpstreamUnavailable."""
+        # Arrange
+        backend = FaultyUpstream(failures=10)
+
+        # Act
+        with pytest.raises(UpstreamUnavailable) as unavailable:
+            _upstream(attempts=3).call(backend)
+
+        # Assert
+        assert backend.calls == 3
+        assert isinstance(unavailable.value.__cause__, ConnectionError)
+
+    def test_non_retryable_errors_propagate_immediately(self):
+        """Test que un error no reintentable no se reintenta ni se enmascara."""
+        # Arrange
+        backend = FaultyUpstream(failures=1, error=ValueError("bug"))
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            _upstream().call(backend)
+        assert backend.calls == 1
+
+    def test_deadline_bounds_a_slow_upstream(self):
+        """Test que un upstream lento no retiene la llamada más allá del plazo."""
+        # Arrange
+        backend = FaultyUpstream(latency=1.0)
+        started = time.monotonic()
+
+        # Act
+        with pytest.raises(UpstreamUnavailable) as unavailable:
+            _upstream(deadline=0.1).call(backend)
+
+        # Assert
+        assert time.monotonic() - started < 0.5
+        assert unavailable.value.reason == "timeout"
+
+    def test_hedged_request_wins_over_slow_first_call(self):
+        """Test que la petición hedged responde cuando la primera se queda colgada."""
+        # Arrange
+        latencies = iter([1.0, 0.0])
+
+        def backend():
+            time.sleep(next(latencies))
+            return "ok"
+
+        started = time.monotonic()
+
+        # Act
+        result = _upstream(hedge_delay=0.05).call(backend)
+
+        # Assert
+        assert result == "ok"
+        assert time.monotonic() - started < 0.5
+
+
+class TestCircuitBreaker:
+    """Tests del circuit breaker."""
+
+    def test_opens_fails_fast_and_recovers_through_half_open(self):
+        """
+        Test que el circuito se abre, falla al instante y se cierra tras una prueba
+        buena.
+        """
+        # Arrange
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            "test", failure_threshold=2, reset_timeout=10, clock=clock
+        )
+        upstream = _upstream(attempts=1, breaker=breaker)
+        backend = FaultyUpstream(failures=2)
+
+        # Act
+        for _ in range(2):
+            with pytest.raises(UpstreamUnavailable):
+                upstream.call(backend)
+        state_after_failures = breaker.state
+        with pytest.raises(UpstreamUnavailable) as short_circuit:
+            upstream.call(backend)
+        calls_while_open = backend.calls
+        clock.now += 10
+        probe_allowed = breaker.allow()
+        second_probe_allowed = breaker.allow()
+        breaker.record_success()
+
+        # Assert
+        assert state_after_failures == OPEN
+        assert short_circuit.value.reason == "circuito abierto"
+        assert calls_while_open == 2
+        assert probe_allowed and not second_probe_allowed
+        assert breaker.state == CLOSED
+
+    def test_failed_probe_reopens_circuit(self):
+        """Test que una prueba fallida en half-open vuelve a abrir el circuito."""
+        # Arrange
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            "test", failure_threshold=1, reset_timeout=5, clock=clock
+        )
+        breaker.record_failure()
+        clock.now += 5
+
+        # Act
+        breaker.allow()
+        state_during_probe = breaker.state
+        breaker.record_failure()
+
+        # Assert
+        assert state_during_probe == HALF_OPEN
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+
+class TestSearchDegradation:
+    """Tests de la búsqueda en Google con fallos inyectados."""
+
+    @pytest.fixture
+    def google_search(self, monkeypatch):
+        import assistant.tools as tools
+        from assistant.blog_index import reset_blog_index
+
+        monkeypatch.setenv("BLOG_INDEX_PATH", os.devnull)
+        monkeypatch.setenv("BLOG_SEARCH_GOOGLE_FALLBACK", "true")
+        reset_blog_index()
+        tools._search_cache.clear()
+        tools._stale_search_cache.clear()
+        monkeypatch.setattr(tools, "_google_search", _upstream(attempts=2))
+        yield tools
+        tools._search_cache.clear()
+        tools._stale_search_cache.clear()
+        monkeypatch.delenv("BLOG_INDEX_PATH")
+        reset_blog_index()
+
+    def test_stale_results_are_served_while_google_is_down(
+        self, google_search, monkeypatch
+    ):
+        """Test que con Google caído se sirven los últimos resultados buenos."""
+        # Arrange
+        monkeypatch.setattr(google_search, "_search_google", FaultyUpstream())
+        google_search.search_blog_posts("agentes")
+        google_search._search_cache.clear()
+        monkeypatch.setattr(
+            google_search, "_search_google", FaultyUpstream(failures=10)
+        )
+
+        # Act
+        response = google_search.search_blog_posts("agentes")
+
+        # Assert
+        assert "Resultado agentes" in response
+
+    def test_degraded_message_without_previous_results(
+        self, google_search, monkeypatch
+    ):
+        """
+        Test que sin resultados anteriores la herramienta responde con un mensaje
+        degradado.
+        """
+        # Arrange
+        backend = FaultyUpstream(failures=10)
+        monkeypatch.setattr(google_search, "_search_google", backend)
+
+        # Act
+        response = google_search.search_blog_posts("rag")
+
+        # Assert
+        assert "no he podido buscar" in response
+        assert backend.calls == 2
+
+
+class FailingLlm(FakeLlm):
+    """Gemini caído: cada llamada lanza un 503 y se cuenta."""
+
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        FailingLlm.calls += 1
+        raise errors.ServerError(503, {"error": {"code": 503, "status": "UNAVAILABLE"}})
+        yield  # pragma: no cover
+
+
+class SlowLlm(FakeLlm):
+    """Gemini colgado: tarda más que cualquier plazo razonable de los tests."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        await asyncio.sleep(5)
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+class TestGeminiDegradation:
+    """Tests de la respuesta degradada con Gemini caído o lento."""
+
+    @pytest.fixture
+    def gemini_breaker(self, monkeypatch):
+        from assistant.resilience import gemini_guard
+
+        breaker = CircuitBreaker("gemini", failure_threshold=1, reset_timeout=60)
+        monkeypatch.setattr(gemini_guard, "breaker", breaker)
+        monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+        return breaker
+
+    @pytest.mark.asyncio
+    async def test_gemini_outage_returns_degraded_answer_and_fails_fast(
+        self, gemini_breaker
+    ):
+        """Test que un 503 de Gemini da una respuesta degradada y abre el circuito."""
+        from assistant.services import invoke_agent_async
+
+        # Arrange
+        originals = install_fake_llm(FailingLlm)
+        FailingLlm.calls = 0
+
+        # Act
+        try:
+            first, _ = await invoke_agent_async(
+                "¿Cuál es tu experiencia?", None, "user_down"
+            )
+            calls_after_first = FailingLlm.calls
+            second, _ = await invoke_agent_async(
+                "¿Cuál es tu experiencia?", None, "user_down"
+            )
+        finally:
+            restore_llm(originals)
+
+        # Assert
+        assert first == DEGRADED_ANSWER
+        assert second == DEGRADED_ANSWER
+        assert gemini_breaker.state == OPEN
+        assert calls_after_first == 1
+        assert FailingLlm.calls == calls_after_first
+
+    def test_slow_run_returns_504_instead_of_hanging(self, gemini_breaker, monkeypatch):
+        """
+        Test que /api/invoke responde 504 cuando se agota el plazo de la ejecución.
+        """
+        import main
+
+        # Arrange
+        monkeypatch.setattr(main, "AGENT_DEADLINE_SECONDS", 0.2)
+        originals = install_fake_llm(SlowLlm)
+        started = time.monotonic()
+
+        # Act
+        try:
+            response = TestClient(main.app).post(
+                "/api/invoke", json={"message": "Hola"}
+            )
+        finally:
+            restore_llm(originals)
+
+        # Assert
+        assert response.status_code == 504
+        assert time.monotonic() - started < 2
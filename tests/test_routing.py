@@ -0,0 +1,129 @@
+"""
+Tests para el pre-router determinista (assistant.routing).
+"""
+
+import pytest
+
+from assistant.routing import KeywordRouter, NullRouter, create_router
+
+
+class TestKeywordRouter:
+    """Tests del pre-router por palabras clave."""
+
+    def setup_method(self):
+        """Setup para cada test."""
+        self.router = KeywordRouter()
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "¿Cuál es tu experiencia?",
+            "Háblame de tus habilidades",
+            "¿Me pasas tu currículum?",
+            "Cuéntame tu TRAYECTORIA profesional",
+        ],
+    )
+    def test_cv_messages_go_to_cv_expert(self, message):
+        """Test que las preguntas obvias sobre el CV van directas a CV_Expert."""
+        # Act
+        decision = self.router.route(message)
+
+        # Assert
+        assert decision.agent == "CV_Expert"
+        assert decision.reason == "keyword"
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "¿Tienes blog?",
+            "¿Hay algún artículo sobre Docker?",
+            "Busca posts de FastAPI",
+            "¿Has escrito sobre LLMs?",
+        ],
+    )
+    def test_blog_messages_go_to_blog_expert(self, message):
+        """Test que las preguntas obvias sobre el blog van directas a Blog_Expert."""
+        # Act
+        decision = self.router.route(message)
+
+        # Assert
+        assert decision.agent == "Blog_Expert"
+        assert decision.confidence == 1.0
+
+    def test_general_message_falls_back_to_orchestrator(self):
+        """Test que un saludo no coincide con ninguna regla."""
+        # Act
+        decision = self.router.route("Hola, ¿qué tal?")
+
+        # Assert
+        assert decision.agent is None
+        assert decision.reason == "no_match"
+
+    def test_ambiguous_message_falls_back_to_orchestrator(self):
+        """Test que un mensaje con señales de ambos especialistas va al orquestador."""
+        # Act
+        decision = self.router.route("¿Has escrito en tu blog sobre tu experiencia?")
+
+        # Assert
+        assert decision.agent is None
+        assert decision.reason == "ambiguous"
+
+    def test_weak_signal_falls_back_to_orchestrator(self):
+        """Test que una palabra poco específica no alcanza la confianza mínima."""
+        # Act
+        decision = self.router.route("¿En qué empresa estás?")
+
+        # Assert
+        assert decision.agent is None
+        assert decision.reason == "low_confidence"
+        assert decision.confidence == pytest.approx(0.5)
+
+    def test_weak_signals_add_up(self):
+        """Test que varias señales débiles del mismo agente suman confianza."""
+        # Act
+        decision = self.router.route("¿Qué tecnologías usabas en tu último trabajo?")
+
+        # Assert
+        assert decision.agent == "CV_Expert"
+        assert decision.confidence == pytest.approx(1.0)
+
+    def test_custom_rules(self):
+        """Test que el pre-router acepta reglas propias."""
+        # Arrange
+        router = KeywordRouter(rules={"Blog_Expert": [(r"\bnewsletter\b", 1.0)]})
+
+        # Act & Assert
+        assert router.route("¿Tienes newsletter?").agent == "Blog_Expert"
+        assert router.route("¿Tienes blog?").agent is None
+
+
+class TestCreateRouter:
+    """Tests de la construcción del pre-router según el entorno."""
+
+    def test_default_is_keyword_router(self, monkeypatch):
+        """Test que por defecto se usa el pre-router por palabras clave."""
+        # Arrange
+        monkeypatch.delenv("PRE_ROUTER", raising=False)
+        monkeypatch.setenv("PRE_ROUTER_MIN_CONFIDENCE", "0.5")
+
+        # Act
+        router = create_router()
+
+        # Assert
+        assert isinstance(router, KeywordRouter)
+        assert router.min_confidence == 0.5
+
+    def test_off_disables_routing(self):
+        """Test que PRE_ROUTER=off envía todo al orquestador."""
+        # Act
+        router = create_router("off")
+
+        # Assert
+        assert isinstance(router, NullRouter)
+        assert router.route("¿Tienes blog?").agent is None
+
+    def test_unknown_router_raises(self):
+        """Test que un tipo de pre-router desconocido es un error de configuración."""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            create_router("bayes")
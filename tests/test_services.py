@@ -106,3 +106,310 @@ class TestTypesAndImports:
         assert "session_id" in params
         assert "user_id" in params
         assert len(params) == 3
+
+
+def _model_event(text, partial=None, author="CV_Expert"):
+    """Crea un evento real del ADK con texto del modelo."""
+    from google.adk.events import Event
+    from google.genai import types
+
+    return Event(
+        author=author,
+        partial=partial,
+        content=types.Content(role="model", parts=[types.Part(text=text)]),
+    )
+
+
+class TestStreamAgentAsync:
+    """Tests para la invocación en modo streaming."""
+
+    async def _collect(self, message="Hola", session_id=None):
+        from assistant.services import stream_agent_async
+
+        return [
+            event
+            async for event in stream_agent_async(
+                message=message, session_id=session_id, user_id="user_test"
+            )
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stream_emits_session_deltas_and_done(
+        self, mocker, mock_session_service
+    ):
+        """Test que los eventos parciales se reenvían antes de la respuesta final."""
+
+        # Arrange
+        async def events(**kwargs):
+            yield _model_event("<p>Hola ", partial=True)
+            yield _model_event("mundo</p>", partial=True)
+            yield _model_event("<p>Hola mundo</p>")
+
+        runner = mocker.patch("assistant.services._runner")
+        runner.run_async.side_effect = events
+
+        # Act
+        result = await self._collect()
+
+        # Assert
+        assert [event["type"] for event in result] == [
+            "session",
+            "delta",
+            "delta",
+            "done",
+        ]
+        assert result[1]["text"] == "<p>Hola "
+        assert result[-1]["response"] == "<p>Hola mundo</p>"
+        assert result[-1]["session_id"] == result[0]["session_id"]
+        assert "run_config" in runner.run_async.call_args.kwargs
+
+    @pytest.mark.asyncio
+    async def test_stream_reuses_existing_session(self, mocker, mock_session_service):
+        """Test que una sesión existente no se vuelve a crear."""
+
+        # Arrange
+        async def events(**kwargs):
+            yield _model_event("<p>Respuesta</p>")
+
+        mocker.patch("assistant.services._runner").run_async.side_effect = events
+
+        # Act
+        result = await self._collect(session_id="session_abc")
+
+        # Assert
+        assert result[0] == {"type": "session", "session_id": "session_abc"}
+        mock_session_service.create_session.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stream_unknown_session_creates_new_one(
+        self, mocker, mock_session_service
+    ):
+        """
+        Test que un session_id inexistente (get_session devuelve None) crea otra sesión.
+        """
+
+        # Arrange
+        async def events(**kwargs):
+            yield _model_event("<p>Respuesta</p>")
+
+        mocker.patch("assistant.services._runner").run_async.side_effect = events
+        mock_session_service.get_session.return_value = None
+
+        # Act
+        result = await self._collect(session_id="session_perdida")
+
+        # Assert
+        assert result[0]["session_id"] != "session_perdida"
+        mock_session_service.create_session.assert_awaited_once()
+
+
+class TestPreRouting:
+    """Tests del atajo que salta el orquestador para los mensajes obvios."""
+
+    @pytest.mark.asyncio
+    async def test_obvious_message_skips_orchestrator(self, fake_llm):
+        """
+        Test que una pregunta sobre el CV va directa a CV_Expert sin transferencia.
+        """
+        import assistant.services as services
+
+        # Arrange
+        routed_before = services._route_decisions.value(
+            route="CV_Expert", reason="keyword"
+        )
+        hops_before = services._orchestrator_hop.count()
+
+        # Act
+        response, _ = await invoke_agent_async(
+            message="¿Cuál es tu experiencia?", session_id=None, user_id="user_route"
+        )
+
+        # Assert
+        assert response == "<p>CV_Expert: ¿Cuál es tu experiencia?</p>"
+        assert (
+            services._route_decisions.value(route="CV_Expert", reason="keyword")
+            == routed_before + 1
+        )
+        assert services._orchestrator_hop.count() == hops_before
+
+    @pytest.mark.asyncio
+    async def test_fallback_measures_hop_and_fast_path_reports_savings(self, fake_llm):
+        """
+        Test que el salto del orquestador se mide y el atajo contabiliza el ahorro.
+        """
+        import assistant.services as services
+
+        # Arrange
+        hops_before = services._orchestrator_hop.count()
+
+        # Act
+        response, _ = await invoke_agent_async(
+            message="Hola, ¿quién eres?", session_id=None, user_id="user_route"
+        )
+        saved_before = services._router_saved.value()
+        await invoke_agent_async(
+            message="¿Tienes blog?", session_id=None, user_id="user_route"
+        )
+
+        # Assert
+        assert response.startswith("<p>CV_Expert:")
+        assert services._orchestrator_hop.count() == hops_before + 1
+        assert services._hop_estimate_seconds is not None
+        assert services._router_saved.value() > saved_before
+
+    @pytest.mark.asyncio
+    async def test_fast_path_keeps_session_history(self, fake_llm):
+        """Test que el atajo y el orquestador comparten la misma conversación."""
+        # Act
+        _, session_id = await invoke_agent_async(
+            message="Háblame de tus habilidades", session_id=None, user_id="user_hist"
+        )
+        response, same_session = await invoke_agent_async(
+            message="¿Y de dónde eres?", session_id=session_id, user_id="user_hist"
+        )
+
+        # Assert
+        assert same_session == session_id
+        assert "Háblame de tus habilidades | ¿Y de dónde eres?" in response
+
+    @pytest.mark.asyncio
+    async def test_router_can_be_replaced(self, fake_llm):
+        """Test que set_router permite desactivar el atajo."""
+        import assistant.services as services
+        from assistant.routing import NullRouter
+
+        # Arrange
+        original = services._router
+        services.set_router(NullRouter())
+        hops_before = services._orchestrator_hop.count()
+
+        # Act
+        try:
+            response, _ = await invoke_agent_async(
+                message="¿Tienes blog?", session_id=None, user_id="user_null"
+            )
+        finally:
+            services.set_router(original)
+
+        # Assert
+        assert response.startswith("<p>Blog_Expert:")
+        assert services._orchestrator_hop.count() == hops_before + 1
+
+
+class TestAnswerCacheIntegration:
+    """Tests de la caché de respuestas delante del agente."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_first_turn_is_served_from_cache(self, fake_llm, mocker):
+        """Test que otra visita con la misma pregunta no ejecuta el agente."""
+        import assistant.services as services
+
+        # Arrange
+        first, _ = await invoke_agent_async(
+            message="¿Cuál es tu experiencia?", session_id=None, user_id="visitor_1"
+        )
+        run_agent = mocker.spy(services, "_run_agent")
+        hits_before = services._answer_lookups.value(result="exact")
+
+        # Act
+        second, session_id = await invoke_agent_async(
+            message="cual es tu EXPERIENCIA", session_id=None, user_id="visitor_2"
+        )
+
+        # Assert
+        assert second == first
+        run_agent.assert_not_called()
+        assert services._answer_lookups.value(result="exact") == hits_before + 1
+        assert services.get_answer_cache_stats()["saved_seconds"] > 0
+
+    @pytest.mark.asyncio
+    async def test_cached_turn_is_recorded_in_session(self, fake_llm):
+        """
+        Test que la respuesta cacheada queda en la sesión y la conversación continúa.
+        """
+        # Arrange
+        await invoke_agent_async(
+            message="¿Cuál es tu experiencia?", session_id=None, user_id="visitor_1"
+        )
+        _, session_id = await invoke_agent_async(
+            message="¿Cuál es tu experiencia?", session_id=None, user_id="visitor_2"
+        )
+
+        # Act
+        response, _ = await invoke_agent_async(
+            message="¿Y tus habilidades?", session_id=session_id, user_id="visitor_2"
+        )
+
+        # Assert
+        assert "¿Cuál es tu experiencia? | ¿Y tus habilidades?" in response
+
+    @pytest.mark.asyncio
+    async def test_follow_up_turns_are_not_cached(self, fake_llm, mocker):
+        """
+        Test que los mensajes con contexto de conversación siempre ejecutan el agente.
+        """
+        import assistant.services as services
+
+        # Arrange
+        _, session_id = await invoke_agent_async(
+            message="Háblame de tus habilidades", session_id=None, user_id="visitor_3"
+        )
+        lookup = mocker.spy(services._answer_cache, "lookup")
+
+        # Act
+        await invoke_agent_async(
+            message="Háblame de tus habilidades",
+            session_id=session_id,
+            user_id="visitor_3",
+        )
+
+        # Assert
+        lookup.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stream_serves_cached_answer(self, fake_llm):
+        """Test que el modo streaming también usa la caché en el primer turno."""
+        from assistant.services import stream_agent_async
+
+        # Arrange
+        first, _ = await invoke_agent_async(
+            message="¿Tienes blog?", session_id=None, user_id="visitor_4"
+        )
+
+        # Act
+        events = [
+            event
+            async for event in stream_agent_async(
+                message="¿Tienes blog?", session_id=None, user_id="visitor_5"
+            )
+        ]
+
+        # Assert
+        assert [event["type"] for event in events] == ["session", "delta", "done"]
+        assert events[-1]["response"] == first
+
+    @pytest.mark.asyncio
+    async def test_bypassed_first_turn_runs_the_agent(self, fake_llm, mocker):
+        """
+        Test que en un lote de evaluación (bypass_cached_answers) la pregunta llega al
+        agente.
+        """
+        import assistant.services as services
+        from assistant.answer_cache import bypass_cached_answers
+
+        # Arrange
+        await invoke_agent_async(
+            message="¿Dónde has trabajado?", session_id=None, user_id="visitor_6"
+        )
+        run_agent = mocker.spy(services, "_run_agent")
+        lookup = mocker.spy(services._answer_cache, "lookup")
+
+        # Act
+        with bypass_cached_answers():
+            await invoke_agent_async(
+                message="¿Dónde has trabajado?", session_id=None, user_id="visitor_7"
+            )
+
+        # Assert
+        run_agent.assert_called_once()
+        lookup.assert_not_called()
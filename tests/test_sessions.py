@@ -0,0 +1,227 @@
+"""
+Tests para el módulo assistant.sessions
+"""
+
+import threading
+
+import pytest
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from assistant.sessions import (
+    BoundedSessionService,
+    _MemoryLedger,
+    create_session_service,
+)
+
+APP = "assistant_app"
+
+
+class FakeClock:
+    """Reloj manual para simular el paso del tiempo."""
+
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _bounded(clock, idle_ttl=60.0, max_per_user=2, max_total=100):
+    return BoundedSessionService(
+        InMemorySessionService(),
+        _MemoryLedger(),
+        idle_ttl=idle_ttl,
+        max_per_user=max_per_user,
+        max_total=max_total,
+        clock=clock,
+    )
+
+
+async def _get(service, user_id, session_id):
+    return await service.get_session(
+        app_name=APP, user_id=user_id, session_id=session_id
+    )
+
+
+class TestBoundedSessionService:
+    """Tests de las políticas de expiración y desalojo."""
+
+    @pytest.mark.asyncio
+    async def test_idle_sessions_expire(self):
+        """Test que una sesión inactiva más del TTL deja de existir."""
+        # Arrange
+        clock = FakeClock()
+        service = _bounded(clock)
+        await service.create_session(app_name=APP, user_id="u1", session_id="s1")
+
+        # Act
+        clock.now += 61
+
+        # Assert
+        assert await _get(service, "u1", "s1") is None
+        assert service.stats()["sessions"] == 0
+
+    @pytest.mark.asyncio
+    async def test_access_refreshes_idle_timer(self):
+        """Test que usar la sesión reinicia su tiempo de inactividad."""
+        # Arrange
+        clock = FakeClock()
+        service = _bounded(clock)
+        await service.create_session(app_name=APP, user_id="u1", session_id="s1")
+
+        # Act
+        clock.now += 40
+        assert await _get(service, "u1", "s1") is not None
+        clock.now += 40
+
+        # Assert
+        assert await _get(service, "u1", "s1") is not None
+
+    @pytest.mark.asyncio
+    async def test_per_user_cap_evicts_least_recently_used(self):
+        """
+        Test que al superar el límite por usuario se desaloja la sesión menos usada.
+        """
+        # Arrange
+        clock = FakeClock()
+        service = _bounded(clock, max_per_user=2)
+        await service.create_session(app_name=APP, user_id="u1", session_id="s1")
+        clock.now += 1
+        await service.create_session(app_name=APP, user_id="u1", session_id="s2")
+        clock.now += 1
+        await _get(service, "u1", "s1")
+        clock.now += 1
+
+        # Act
+        await service.create_session(app_name=APP, user_id="u1", session_id="s3")
+
+        # Assert
+        assert await _get(service, "u1", "s2") is None
+        assert await _get(service, "u1", "s1") is not None
+        assert await _get(service, "u1", "s3") is not None
+
+    @pytest.mark.asyncio
+    async def test_global_cap_evicts_oldest_session(self):
+        """
+        Test que el límite total desaloja la sesión menos reciente de cualquier usuario.
+        """
+        # Arrange
+        clock = FakeClock()
+        service = _bounded(clock, max_total=2)
+        for user in ("u1", "u2", "u3"):
+            await service.create_session(app_name=APP, user_id=user, session_id="s")
+            clock.now += 1
+
+        # Assert
+        assert await _get(service, "u1", "s") is None
+        assert service.stats()["sessions"] == 2
+        assert service.stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_sweep_removes_expired_sessions(self):
+        """Test que el barrido periódico libera las sesiones caducadas."""
+        # Arrange
+        clock = FakeClock()
+        service = _bounded(clock)
+        for i in range(3):
+            await service.create_session(app_name=APP, user_id=f"u{i}", session_id="s")
+
+        # Act
+        clock.now += 120
+        removed = await service.sweep()
+
+        # Assert
+        assert removed == 3
+        assert service.stats()["sessions"] == 0
+
+
+class TestSqliteBackend:
+    """Tests del backend persistente en SQLite."""
+
+    @pytest.mark.asyncio
+    async def test_sessions_survive_restart(self, tmp_path, monkeypatch):
+        """
+        Test que una sesión y sus eventos sobreviven a un nuevo servicio (reinicio).
+        """
+        # Arrange
+        monkeypatch.setenv("SESSION_DB_PATH", str(tmp_path / "sessions.db"))
+        service = create_session_service("sqlite")
+        session = await service.create_session(
+            app_name=APP, user_id="u1", session_id="s1"
+        )
+        await service.append_event(
+            session,
+            Event(
+                author="user",
+                content=types.Content(role="user", parts=[types.Part(text="Hola")]),
+            ),
+        )
+
+        # Act
+        restarted = create_session_service("sqlite")
+        restored = await _get(restarted, "u1", "s1")
+
+        # Assert
+        assert restored is not None
+        assert restored.events[0].content.parts[0].text == "Hola"
+        assert restarted.stats()["sessions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_blocking_ledger_runs_off_the_event_loop(self):
+        """
+        Test que las consultas de un registro que bloquea (SQLite) se hacen en otro
+        hilo.
+        """
+        # Arrange
+        loop_thread = threading.get_ident()
+        threads = []
+
+        class BlockingLedger(_MemoryLedger):
+            blocking = True
+
+            def touch(self, key, now):
+                threads.append(threading.get_ident())
+                super().touch(key, now)
+
+            def last_access(self, key):
+                threads.append(threading.get_ident())
+                return super().last_access(key)
+
+        service = BoundedSessionService(
+            InMemorySessionService(),
+            BlockingLedger(),
+            idle_ttl=60,
+            max_per_user=2,
+            max_total=10,
+        )
+
+        # Act
+        await service.create_session(app_name=APP, user_id="u1", session_id="s1")
+        session = await _get(service, "u1", "s1")
+
+        # Assert
+        assert session is not None
+        assert threads and loop_thread not in threads
+
+    def test_sqlite_uses_wal_mode(self, tmp_path, monkeypatch):
+        """Test que el fichero de sesiones se abre en modo WAL."""
+        import sqlite3
+
+        # Arrange
+        db_path = tmp_path / "sessions.db"
+        monkeypatch.setenv("SESSION_DB_PATH", str(db_path))
+
+        # Act
+        create_session_service("sqlite")
+
+        # Assert
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_unknown_backend_raises(self):
+        """Test que un backend desconocido se rechaza."""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            create_session_service("redis-imaginario")
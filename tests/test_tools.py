@@ -108,3 +108,121 @@ class TestSearchBlogPosts:
 
         # Assert
         assert query in result
+
+
+class TestSearchBlogPostsWithIndex:
+    """Tests de search_blog_posts respondiendo desde el índice local."""
+
+    def test_search_uses_local_index_without_google(
+        self, blog_index_file, mock_googlesearch
+    ):
+        """Test que con índice disponible no se consulta Google."""
+        # Act
+        result = search_blog_posts("Docker")
+
+        # Assert
+        assert "Docker para proyectos Python" in result
+        assert "https://blog.sergiomarquez.dev/docker-para-python" in result
+        mock_googlesearch.assert_not_called()
+
+    def test_search_includes_publish_date(self, blog_index_file):
+        """Test que la fecha de publicación del índice aparece en el resultado."""
+        # Act
+        result = search_blog_posts("agentes")
+
+        # Assert
+        assert "Publicado: 2024-05-10" in result
+
+    def test_search_no_results_from_index(self, blog_index_file, mock_googlesearch):
+        """Test que sin coincidencias en el índice no se recurre a Google."""
+        # Act
+        result = search_blog_posts("kubernetes")
+
+        # Assert
+        assert "no he encontrado ningún artículo sobre 'kubernetes'" in result
+        mock_googlesearch.assert_not_called()
+
+    def test_search_falls_back_to_google_without_index(
+        self, tmp_path, monkeypatch, mock_googlesearch, mock_search_results
+    ):
+        """Test que sin índice se usa Google como fallback."""
+        from assistant.blog_index import reset_blog_index
+
+        # Arrange
+        monkeypatch.setenv("BLOG_INDEX_PATH", str(tmp_path / "no-existe.json"))
+        reset_blog_index()
+        mock_googlesearch.return_value = mock_search_results
+
+        # Act
+        result = search_blog_posts("python")
+
+        # Assert
+        assert "Python Tips" in result
+        mock_googlesearch.assert_called_once()
+        reset_blog_index()
+
+
+class TestSearchBlogPostsCache:
+    """Tests de la caché de resultados de search_blog_posts."""
+
+    def test_equivalent_queries_hit_cache(
+        self, tmp_path, monkeypatch, mock_googlesearch, mock_search_results
+    ):
+        """Test que consultas equivalentes solo llegan una vez al backend."""
+        from assistant.blog_index import reset_blog_index
+        from assistant.tools import get_search_cache_stats
+
+        # Arrange
+        monkeypatch.setenv("BLOG_INDEX_PATH", str(tmp_path / "no-existe.json"))
+        reset_blog_index()
+        mock_googlesearch.return_value = mock_search_results
+        hits_before = get_search_cache_stats()["hits"]
+
+        # Act
+        first = search_blog_posts("¿Tienes artículos sobre Python?")
+        second = search_blog_posts("python")
+
+        # Assert
+        mock_googlesearch.assert_called_once()
+        assert "Python Tips" in first and "Python Tips" in second
+        assert "'python'" in second
+        assert get_search_cache_stats()["hits"] == hits_before + 1
+        reset_blog_index()
+
+
+class TestQueryCv:
+    """Tests para la herramienta query_cv."""
+
+    def test_query_cv_returns_only_relevant_fragments(self, cv_index_file):
+        """Test que la herramienta devuelve solo los fragmentos pedidos."""
+        from assistant.tools import query_cv
+
+        # Act
+        result = query_cv(section="experiencia")
+
+        # Assert
+        lines = result.splitlines()
+        assert len(lines) == 2
+        assert lines[0].startswith("[experiencia/0] ")
+        assert "Universidad" not in result
+
+    def test_query_cv_by_keywords(self, cv_index_file):
+        """Test de búsqueda por palabras clave en todo el CV."""
+        from assistant.tools import query_cv
+
+        # Act
+        result = query_cv(keywords="FastAPI")
+
+        # Assert
+        assert result.startswith("[habilidades/0] ")
+
+    def test_query_cv_no_results_lists_sections(self, cv_index_file):
+        """Test que sin coincidencias se indican las secciones disponibles."""
+        from assistant.tools import query_cv
+
+        # Act
+        result = query_cv(section="premios")
+
+        # Assert
+        assert "No hay información en el CV" in result
+        assert "experiencia (2)" in result
@@ -0,0 +1,295 @@
+"""
+Tests para el módulo assistant.tracing
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from google.adk.events import Event
+from google.genai import types
+
+from assistant.tracing import EventSpanRecorder, Trace, get_trace, start_trace
+
+
+def _event(author, *parts, partial=None, usage=None):
+    return Event(
+        author=author,
+        partial=partial,
+        content=types.Content(role="model", parts=list(parts)),
+        usage_metadata=usage,
+    )
+
+
+def _call(name, args, call_id):
+    return types.Part(
+        function_call=types.FunctionCall(id=call_id, name=name, args=args)
+    )
+
+
+def _response(name, response, call_id):
+    return types.Part(
+        function_response=types.FunctionResponse(
+            id=call_id, name=name, response=response
+        )
+    )
+
+
+def _spans_by_name(trace: Trace):
+    return {span.name: span for span in trace.spans}
+
+
+class TestTrace:
+    """Tests de la traza y su exportación OTLP."""
+
+    def test_spans_are_children_of_root_and_export_as_otlp(self):
+        """
+        Test que los spans cuelgan de la raíz y se serializan con identificadores OTLP.
+        """
+        # Arrange
+        trace = start_trace("POST /api/invoke", **{"http.route": "/api/invoke"})
+
+        # Act
+        with trace.span("session.create", kind="session"):
+            pass
+        trace.finish()
+        document = trace.to_otlp()
+
+        # Assert
+        spans = document["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        root, session = spans
+        assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+        assert "parentSpanId" not in root
+        assert session["parentSpanId"] == root["spanId"]
+        assert root["kind"] == 2
+        assert root["status"] == {"code": 1}
+        assert {"key": "http.route", "value": {"stringValue": "/api/invoke"}} in root[
+            "attributes"
+        ]
+        assert int(root["endTimeUnixNano"]) >= int(session["endTimeUnixNano"])
+        assert get_trace(trace.trace_id) == document
+
+    def test_exception_marks_span_as_error(self):
+        """Test que una excepción dentro de un span lo marca como error."""
+        # Arrange
+        trace = start_trace("test")
+
+        # Act
+        with pytest.raises(KeyError):
+            with trace.span("session.get", kind="session"):
+                raise KeyError("session")
+        trace.finish()
+
+        # Assert
+        span = _spans_by_name(trace)["session.get"]
+        assert span.status == 2
+        assert "session" in span.status_message
+
+    def test_finish_is_idempotent_and_closes_open_spans(self):
+        """Test que finish cierra los spans abiertos y solo exporta una vez."""
+        # Arrange
+        trace = start_trace("test")
+        open_span = trace.start_span("agent.run")
+
+        # Act
+        trace.finish(error="cliente desconectado")
+        trace.finish()
+
+        # Assert
+        assert open_span.end_ns is not None and open_span.status == 2
+        assert trace.root.status_message == "cliente desconectado"
+
+    def test_export_path_is_written_off_the_calling_thread(self, tmp_path, monkeypatch):
+        """
+        Test que las trazas se añaden al fichero desde el hilo del exportador, sin
+        escribir en el hilo que termina la traza.
+        """
+        import builtins
+        import json
+        import threading
+
+        from assistant.tracing import _Exporter
+
+        # Arrange
+        path = tmp_path / "traces.jsonl"
+        exporter = _Exporter(buffer_size=10, path=str(path))
+        writers = []
+        real_open = builtins.open
+
+        def recording_open(file, *args, **kwargs):
+            if str(file) == str(path):
+                writers.append(threading.current_thread().name)
+            return real_open(file, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, "open", recording_open)
+        traces = [start_trace(f"test {i}") for i in range(3)]
+
+        # Act
+        for trace in traces:
+            trace.finish()
+            exporter.export(trace)
+        exporter.flush()
+
+        # Assert
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line) for line in lines] == [t.to_otlp() for t in traces]
+        assert writers and set(writers) == {"trace-exporter"}
+
+
+class TestEventSpanRecorder:
+    """Tests de la reconstrucción de spans a partir de los eventos del runner."""
+
+    def test_transfer_tool_and_llm_calls_become_spans(self):
+        """
+        Test que llamadas al modelo, transferencia y herramientas generan sus spans.
+        """
+        from assistant.metrics import registry
+
+        # Arrange
+        trace = start_trace("test")
+        parent = trace.start_span("agent.run")
+        recorder = EventSpanRecorder(trace, parent)
+        tokens = registry.counter("assistant_llm_tokens_total", "", ("agent", "type"))
+        prompt_before = tokens.value(agent="CV_Expert", type="prompt")
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=120, candidates_token_count=30
+        )
+
+        # Act
+        for event in (
+            _event(
+                "Personal_Orchestrator",
+                _call("transfer_to_agent", {"agent_name": "CV_Expert"}, "t1"),
+            ),
+            _event(
+                "Personal_Orchestrator",
+                _response("transfer_to_agent", {"result": None}, "t1"),
+            ),
+            _event("CV_Expert", _call("query_cv", {"section": "experiencia"}, "q1")),
+            _event(
+                "CV_Expert",
+                _response("query_cv", {"result": "[experiencia/0] ..."}, "q1"),
+            ),
+            _event("CV_Expert", types.Part(text="<p>Hola</p>"), partial=True),
+            _event("CV_Expert", types.Part(text="<p>Hola</p>"), usage=usage),
+        ):
+            recorder.record(event)
+        recorder.close()
+        parent.end()
+        trace.finish()
+
+        # Assert
+        names = [span.name for span in trace.spans]
+        assert names == [
+            "test",
+            "agent.run",
+            "llm Personal_Orchestrator",
+            "tool transfer_to_agent",
+            "llm CV_Expert",
+            "tool query_cv",
+            "llm CV_Expert",
+        ]
+        spans = trace.spans
+        assert all(span.parent_id == parent.span_id for span in spans[2:])
+        assert spans[3].attributes["transfer.target"] == "CV_Expert"
+        assert spans[6].attributes["gen_ai.usage.input_tokens"] == 120
+        assert "gen_ai.time_to_first_token_ms" in spans[6].attributes
+        assert all(span.status == 1 for span in spans)
+        assert tokens.value(agent="CV_Expert", type="prompt") == prompt_before + 120
+
+    def test_unanswered_tool_is_marked_as_interrupted(self):
+        """Test que una herramienta sin respuesta (cancelación) queda como error."""
+        # Arrange
+        trace = start_trace("test")
+        recorder = EventSpanRecorder(trace, trace.root)
+
+        # Act
+        recorder.record(
+            _event("Blog_Expert", _call("search_blog_posts", {"query": "ia"}, "s1"))
+        )
+        recorder.close()
+
+        # Assert
+        tool = _spans_by_name(trace)["tool search_blog_posts"]
+        assert tool.status == 2 and tool.status_message == "interrumpida"
+
+
+class TestTracingEndpoints:
+    """Tests de la traza completa de una petición HTTP."""
+
+    def test_invoke_returns_trace_id_and_trace_is_exported(self, fake_llm, monkeypatch):
+        """
+        Test que /api/invoke devuelve X-Trace-Id y la traza recoge el recorrido
+        completo.
+        """
+        from main import app
+
+        # Arrange
+        client = TestClient(app)
+        monkeypatch.setenv("ADMIN_TOKEN", "secreto")
+        admin = {"X-Admin-Token": "secreto"}
+
+        # Act
+        response = client.post("/api/invoke", json={"message": "Hola, ¿quién eres?"})
+        trace_id = response.headers["X-Trace-Id"]
+        trace = client.get(f"/api/traces/{trace_id}", headers=admin).json()
+        recent = client.get("/api/traces", params={"limit": 1}, headers=admin).json()
+        metrics = client.get("/api/metrics").text
+
+        # Assert
+        assert response.status_code == 200
+        spans = trace["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        names = [span["name"] for span in spans]
+        assert names[0] == "POST /api/invoke"
+        for name in (
+            "session.create",
+            "answer_cache.lookup",
+            "agent.run",
+            "llm Personal_Orchestrator",
+            "tool transfer_to_agent",
+            "llm CV_Expert",
+        ):
+            assert name in names
+        assert (
+            recent["resourceSpans"][0]["scopeSpans"][0]["spans"][0]["traceId"]
+            == trace_id
+        )
+        assert 'assistant_llm_call_seconds_count{agent="CV_Expert"}' in metrics
+        assert (
+            'assistant_request_duration_seconds_count{operation="POST /api/invoke",status="ok"}'
+            in metrics
+        )
+
+    def test_unknown_trace_returns_404(self, monkeypatch):
+        """Test que una traza desconocida devuelve 404."""
+        from main import app
+
+        # Arrange
+        monkeypatch.setenv("ADMIN_TOKEN", "secreto")
+
+        # Act
+        response = TestClient(app).get(
+            "/api/traces/inexistente", headers={"X-Admin-Token": "secreto"}
+        )
+
+        # Assert
+        assert response.status_code == 404
+
+    def test_traces_require_the_admin_token(self, monkeypatch):
+        """
+        Test que las trazas (con los session_id de otros visitantes) no son públicas.
+        """
+        from main import app
+
+        # Arrange
+        client = TestClient(app)
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+
+        # Act
+        disabled = client.get("/api/traces")
+        monkeypatch.setenv("ADMIN_TOKEN", "secreto")
+        anonymous = client.get("/api/traces")
+        forbidden = client.get("/api/traces/abc", headers={"X-Admin-Token": "otro"})
+
+        # Assert
+        assert disabled.status_code == 404
+        assert anonymous.status_code == 403
+        assert forbidden.status_code == 403
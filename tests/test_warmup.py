@@ -0,0 +1,155 @@
+"""
+Tests para el módulo assistant.warmup y el endpoint /api/ready
+"""
+
+import subprocess
+import sys
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from assistant.warmup import FAILED, READY, Warmup
+
+
+class TestWarmup:
+    """Tests del calentamiento en segundo plano."""
+
+    def test_runs_steps_once_and_reports_timings(self):
+        """Test que los pasos se ejecutan una sola vez aunque se pida varias veces."""
+        # Arrange
+        calls = []
+        warmup = Warmup(
+            [("uno", lambda: calls.append("uno")), ("dos", lambda: calls.append("dos"))]
+        )
+
+        # Act
+        warmup.start().result(timeout=5)
+        warmup.start().result(timeout=5)
+        state = warmup.snapshot()
+
+        # Assert
+        assert calls == ["uno", "dos"]
+        assert warmup.ready
+        assert state["status"] == READY
+        assert set(state["steps"]) == {"uno", "dos"}
+        assert state["warmup_seconds"] >= 0
+
+    def test_failed_warmup_is_reported_and_retried(self):
+        """
+        Test que un calentamiento fallido se informa y el siguiente start() lo
+        reintenta.
+        """
+        # Arrange
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("CV ilegible")
+
+        warmup = Warmup([("flaky", flaky)])
+
+        # Act
+        with pytest.raises(RuntimeError):
+            warmup.start().result(timeout=5)
+        failed_state = warmup.snapshot()
+        warmup.start().result(timeout=5)
+
+        # Assert
+        assert failed_state["status"] == FAILED
+        assert "CV ilegible" in failed_state["error"]
+        assert warmup.ready
+        assert len(attempts) == 2
+
+
+class TestReadyEndpoint:
+    """Tests de /api/ready y de las peticiones que llegan durante el calentamiento."""
+
+    @pytest.fixture
+    def slow_warmup(self):
+        import assistant.warmup as warmup_module
+
+        release = threading.Event()
+        original = warmup_module.get_warmup()
+        warmup = Warmup([("lento", lambda: release.wait(5))])
+        warmup_module.set_warmup(warmup)
+        yield warmup, release
+        release.set()
+        warmup_module.set_warmup(original)
+
+    def test_ready_goes_green_only_after_warmup(self, slow_warmup):
+        """
+        Test que /api/health responde enseguida y /api/ready da 503 hasta terminar.
+        """
+        from main import app
+
+        # Arrange
+        warmup, release = slow_warmup
+
+        # Act
+        with TestClient(app) as client:
+            health = client.get("/api/health")
+            warming = client.get("/api/ready")
+            release.set()
+            warmup.start().result(timeout=5)
+            ready = client.get("/api/ready")
+            metrics = client.get("/api/metrics").text
+
+        # Assert
+        assert health.status_code == 200
+        assert warming.status_code == 503
+        assert warming.json()["status"] == "warming"
+        assert ready.status_code == 200
+        assert ready.json()["status"] == READY
+        assert "assistant_ready 1" in metrics
+
+    def test_request_during_warmup_waits_for_it(self, slow_warmup, fake_llm):
+        """
+        Test que una petición que llega durante el calentamiento espera y se atiende.
+        """
+        from main import app
+
+        # Arrange
+        warmup, release = slow_warmup
+        client = TestClient(app)
+        warmup.start()
+        threading.Timer(0.2, release.set).start()
+
+        # Act
+        response = client.post("/api/invoke", json={"message": "Hola, ¿quién eres?"})
+
+        # Assert
+        assert response.status_code == 200
+        assert warmup.ready
+
+
+class TestLazyImports:
+    """Tests de la carga bajo demanda."""
+
+    def test_importing_main_does_not_load_adk_or_agents(self):
+        """Test que importar main no carga google.adk, google.genai ni los agentes."""
+        # Arrange
+        code = (
+            "import sys, main; "
+            "print(sorted(m for m in ('google.adk', 'google.genai', 'googlesearch', "
+            "'assistant.agents', 'assistant.services') if m in sys.modules))"
+        )
+
+        # Act
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, timeout=60
+        )
+
+        # Assert
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
+
+    def test_package_attributes_load_on_first_access(self):
+        """Test que assistant.services sigue accesible como atributo del paquete."""
+        import assistant
+
+        # Act & Assert
+        assert assistant.services.invoke_agent_async is not None
+        with pytest.raises(AttributeError):
+            assistant.no_existe
@@ -0,0 +1,18 @@
+"""
+Arranca un worker de la API con el LLM de prueba (lo usan los tests multi-worker).
+
+Uso: python -m tests.worker_app <puerto>
+"""
+
+import sys
+
+import uvicorn
+
+from tests.fakes import install_fake_llm
+
+if __name__ == "__main__":
+    install_fake_llm()
+
+    from main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")